@@ -0,0 +1,122 @@
+"""
+Throughput benchmark for JSON line decoding on a large NDJSON input.
+
+Usage:
+    python -m benchmarks.json_decoding --lines 500000 --non-json 0.5
+
+Writes a seeded NDJSON file (benchmarks.generators 'json' lines, with a share
+of syslog lines mixed in by --non-json) and reads it back line by line. For
+each decoder available here (the standard library, orjson) it reports lines/s
+and MB/s of
+
+    decode       the decoder alone on the JSON lines (json.loads / orjson.loads)
+    parse        JSONParser.handle on the JSON lines
+    parse.fields JSONParser with --fields, keeping only those fields
+    miss         JSONParser.handle on the other lines, which it passes on
+    flatten      flatten_fields on the parsed records, as the tabular writers do
+
+`miss.no_prefix_check` is the cost of a miss when every line goes through the
+decoder first, as JSONParser did before the leading-character check.
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.generators import generate_lines
+from log_analyzer.parsing.interfaces import LogEntry
+from log_analyzer.parsing.json_parser import JSONParser, orjson
+from log_analyzer.writers.interfaces import flatten_fields
+
+DEFAULT_FIELDS = ['timestamp', 'level', 'client_ip', 'user.name']
+
+def write_ndjson(path: Path, lines: int, non_json: float, seed: int) -> None:
+    """Writes `lines` lines, a `non_json` share of them syslog instead of JSON."""
+    rng = random.Random(seed)
+    json_lines = generate_lines('json', lines, pii_density=0.3, seed=seed)
+    other_lines = generate_lines('syslog', lines, pii_density=0.3, seed=seed)
+    with open(path, 'w', encoding='utf-8') as file:
+        for json_line, other_line in zip(json_lines, other_lines):
+            file.write((other_line if rng.random() < non_json else json_line) + '\n')
+
+def _time(function: Callable[[], None], items: int, size: int, repeat: int) -> Dict[str, float]:
+    best = min(_elapsed(function) for _ in range(repeat))
+    return {'lines_per_second': items / best, 'mb_per_second': size / best / 1e6}
+
+def _elapsed(function: Callable[[], None]) -> float:
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+def _loop(handle: Callable[[LogEntry], object], entries: List[LogEntry]) -> Callable[[], None]:
+    def run():
+        for entry in entries:
+            handle(entry)
+    return run
+
+def _no_prefix_check(loads: Callable[[str], object], entries: List[LogEntry]) -> Callable[[], None]:
+    def run():
+        for entry in entries:
+            try:
+                loads(entry.content)
+            except ValueError:
+                pass
+    return run
+
+def run_benchmark(path: Path, fields: List[str], repeat: int) -> Dict[str, Dict[str, float]]:
+    with open(path, encoding='utf-8') as file:
+        entries = [LogEntry(line_number=number, content=line.rstrip('\n')) for number, line in enumerate(file, 1)]
+    json_entries = [entry for entry in entries if entry.content.startswith('{')]
+    other_entries = [entry for entry in entries if not entry.content.startswith('{')]
+    json_size = sum(len(entry.content) for entry in json_entries)
+    other_size = sum(len(entry.content) for entry in other_entries)
+
+    decoders: Dict[str, Callable[[str], object]] = {'json': json.loads}
+    if orjson is not None:
+        decoders['orjson'] = orjson.loads
+    results: Dict[str, Dict[str, float]] = {}
+    for name, loads in decoders.items():
+        parser = JSONParser(decoder=name)
+        projecting = JSONParser(decoder=name, fields=fields)
+        results[f'{name}.decode'] = _time(_no_prefix_check(loads, json_entries), len(json_entries), json_size, repeat)
+        results[f'{name}.parse'] = _time(_loop(parser.handle, json_entries), len(json_entries), json_size, repeat)
+        results[f'{name}.parse.fields'] = _time(_loop(projecting.handle, json_entries), len(json_entries),
+                                                json_size, repeat)
+        if other_entries:
+            results[f'{name}.miss'] = _time(_loop(parser.handle, other_entries), len(other_entries), other_size,
+                                            repeat)
+            results[f'{name}.miss.no_prefix_check'] = _time(_no_prefix_check(loads, other_entries),
+                                                            len(other_entries), other_size, repeat)
+    records = [JSONParser().handle(entry) for entry in json_entries]
+
+    def flatten():
+        for record in records:
+            flatten_fields(record.parsed_data)
+    results['flatten'] = _time(flatten, len(records), json_size, repeat)
+    return results
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=200_000)
+    parser.add_argument('--non-json', type=float, default=0.5, help="Share of non-JSON lines in the input")
+    parser.add_argument('--fields', nargs='*', default=DEFAULT_FIELDS, help="Fields kept by parse.fields")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'input.ndjson'
+        write_ndjson(path, args.lines, args.non_json, args.seed)
+        print(f"{args.lines} lines, {path.stat().st_size / 1e6:.1f} MB, "
+              f"orjson {'installed' if orjson is not None else 'not installed'}")
+        results = run_benchmark(path, args.fields, args.repeat)
+
+    print(f"{'case':<28}{'lines/s':>14}{'MB/s':>10}")
+    for name, result in results.items():
+        print(f"{name:<28}{result['lines_per_second']:>14,.0f}{result['mb_per_second']:>10.1f}")
+
+if __name__ == '__main__':
+    main()
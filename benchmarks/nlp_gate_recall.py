@@ -0,0 +1,109 @@
+"""
+Recall of the Presidio NLP gate against the full NER path.
+
+Usage:
+    python -m benchmarks.nlp_gate_recall --lines 500
+    python -m benchmarks.nlp_gate_recall --labels labeled.jsonl --learn-templates
+
+Each line is labeled by whether the full path (spaCy NER, every enabled
+entity) finds a NER entity in it, or read with its label from a JSON-lines
+file of {"text": ..., "ner": true|false} objects. The gate configured in
+`presidio.nlp_gate` then decides which lines would go through NER:
+
+    recall      share of the lines with a NER entity that the gate sends to NER
+    skip_rate   share of all lines that skip NER
+    missed      the first lines with a NER entity that the gate skipped
+
+With --learn-templates the lines are mined with Drain3 as in the pipeline and
+the gate learns per template from the labels.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.generators import generate_lines
+from log_analyzer.services.config_service import ConfigService
+from log_analyzer.services.nlp_gate import NlpGate
+
+FORMATS = ('syslog', 'fortinet', 'cef', 'json', 'loghub')
+
+def label_with_full_path(config: Dict[str, Any], lines: List[str]) -> List[Tuple[str, bool]]:
+    """Labels each line by whether the full Presidio path finds a NER entity in it."""
+    from log_analyzer.services.presidio_service import NER_ENTITIES, PresidioService
+
+    presidio_config = {**config.get('presidio', {}), 'enabled': True, 'nlp_gate': {'enabled': False}}
+    service = PresidioService(presidio_config)
+    if not service.is_enabled:
+        raise RuntimeError("Presidio engine could not be built (is the spaCy model installed?)")
+    language = presidio_config.get('analyzer', {}).get('languages', ['en'])[0]
+    labeled = []
+    for line in lines:
+        results = service.analyzer.analyze(text=line, language=language, entities=service.entities)
+        labeled.append((line, any(result.entity_type in NER_ENTITIES for result in results)))
+    return labeled
+
+def evaluate(gate: NlpGate, labeled: List[Tuple[str, bool]], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Runs the gate over labeled lines, learning per Drain3 template when it is configured to."""
+    drain3_service = None
+    if gate.learn_templates:
+        from log_analyzer.services.drain3_service import Drain3Service
+        drain3_service = Drain3Service(config or {})
+    positives = kept = 0
+    missed: List[str] = []
+    for line, has_ner in labeled:
+        template_key = drain3_service.match_template(line) if drain3_service is not None else None
+        needed = gate.needs_ner(line, template_key)
+        if needed:
+            gate.observe(template_key, has_ner)
+        if has_ner:
+            positives += 1
+            if needed:
+                kept += 1
+            elif len(missed) < 10:
+                missed.append(line)
+        if drain3_service is not None:
+            drain3_service.process_batch([line], 'original')
+    return {
+        'lines': len(labeled),
+        'ner_lines': positives,
+        'recall': round(kept / positives, 4) if positives else 1.0,
+        **{key: value for key, value in gate.report().items() if key != 'lines'},
+        'missed': missed,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='config/config.yaml')
+    parser.add_argument('--labels', help="JSON-lines file of labeled lines (default: label synthetic lines with the full path)")
+    parser.add_argument('--lines', type=int, default=200, help="Synthetic lines per format")
+    parser.add_argument('--pii-density', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--learn-templates', action='store_true')
+    parser.add_argument('--output', help="Where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    config = ConfigService(args.config).load_config()
+    if args.labels:
+        labeled = [(item['text'], bool(item['ner'])) for item in
+                   (json.loads(line) for line in Path(args.labels).read_text().splitlines() if line.strip())]
+    else:
+        lines = [line for log_format in FORMATS
+                 for line in generate_lines(log_format, args.lines, pii_density=args.pii_density, seed=args.seed)]
+        labeled = label_with_full_path(config, lines)
+
+    gate_config = {**config.get('presidio', {}).get('nlp_gate', {}), 'enabled': True,
+                   'learn_templates': args.learn_templates}
+    report = evaluate(NlpGate(gate_config), labeled, config)
+    print(f"lines {report['lines']}  with NER entities {report['ner_lines']}  "
+          f"recall {report['recall']:.4f}  skip rate {report['skip_rate']:.4f}")
+    for line in report['missed']:
+        print(f"  missed: {line}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Per-line latency and memory of Presidio engine configurations.
+
+Usage:
+    python -m benchmarks.presidio_profiles --lines 500
+    python -m benchmarks.presidio_profiles --profile pruned_md --profile pattern_only --output presidio.json
+
+Each profile overrides `presidio.analyzer` of the configuration (model size,
+pipeline and recognizer pruning, enabled entities) and is measured in a fresh
+process, so that the memory of one engine does not hide another's:
+
+    engine_mb        resident memory added by building the engine (models included)
+    build_seconds    time to build the engine
+    ms_per_line      mean, p50 and p95 of `anonymize_text` on synthetic syslog lines
+
+A profile whose spaCy model is not installed is reported with its error.
+"""
+import argparse
+import copy
+import json
+import multiprocessing
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.generators import generate_lines
+from log_analyzer.services.config_service import ConfigService
+from log_analyzer.services.resource_usage import current_rss_bytes
+
+# Profile name -> overrides merged into `presidio.analyzer`.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'full_lg': {'nlp': {'model_size': 'lg', 'prune_pipeline': False}, 'prune_recognizers': False},
+    'pruned_lg': {'nlp': {'model_size': 'lg'}},
+    'pruned_md': {'nlp': {'model_size': 'md'}},
+    'pruned_sm': {'nlp': {'model_size': 'sm'}},
+    'pruned_lg_no_lemmas': {'nlp': {'model_size': 'lg', 'context_lemmas': False}},
+    # Only the entities found by patterns: no spaCy model is loaded.
+    'pattern_only': {'entities': 'non_ner'},
+}
+
+def _merge(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def profile_config(presidio_config: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """The `presidio` section of a profile."""
+    from log_analyzer.services.presidio_service import NER_ENTITIES
+
+    analyzer = _merge(presidio_config.get('analyzer', {}), {k: v for k, v in overrides.items() if k != 'entities'})
+    if overrides.get('entities') == 'non_ner':
+        analyzer['entities'] = {name: value for name, value in (analyzer.get('entities') or {}).items()
+                                if name not in NER_ENTITIES}
+    return {**presidio_config, 'enabled': True, 'analyzer': analyzer}
+
+def measure(presidio_config: Dict[str, Any], lines: List[str]) -> Dict[str, Any]:
+    """Builds one engine and times `anonymize_text` per line. Run it in a fresh process."""
+    from log_analyzer.services.presidio_service import PresidioService
+
+    rss_before = current_rss_bytes() or 0
+    started = time.perf_counter()
+    service = PresidioService(presidio_config)
+    build_seconds = time.perf_counter() - started
+    if not service.is_enabled:
+        return {'error': "engine could not be built (is the spaCy model installed?)"}
+    engine_mb = ((current_rss_bytes() or 0) - rss_before) / (1024 * 1024)
+
+    language = presidio_config['analyzer'].get('languages', ['en'])[0]
+    service.anonymize_text(lines[0], language=language)  # First call initializes lazy state.
+    timings = []
+    for line in lines:
+        line_started = time.perf_counter()
+        service.anonymize_text(line, language=language)
+        timings.append((time.perf_counter() - line_started) * 1000)
+    timings.sort()
+    return {
+        'engine_mb': round(engine_mb, 1),
+        'build_seconds': round(build_seconds, 3),
+        'ms_per_line': {
+            'mean': round(statistics.fmean(timings), 3),
+            'p50': round(timings[len(timings) // 2], 3),
+            'p95': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        },
+        'lines_per_second': round(1000 / statistics.fmean(timings), 1),
+        'engine': service.describe(),
+    }
+
+def _measure_in_child(queue, presidio_config: Dict[str, Any], lines: List[str]) -> None:
+    try:
+        queue.put(measure(presidio_config, lines))
+    except Exception as e:
+        queue.put({'error': str(e)})
+
+def run_profiles(config: Dict[str, Any], names: List[str], line_count: int, seed: int = 42) -> Dict[str, Any]:
+    """Measures each named profile in its own process."""
+    lines = list(generate_lines('syslog', line_count, pii_density=0.5, seed=seed))
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name in names:
+        presidio_config = profile_config(config.get('presidio', {}), PROFILES[name])
+        queue = context.Queue()
+        process = context.Process(target=_measure_in_child, args=(queue, presidio_config, lines))
+        process.start()
+        results[name] = queue.get()
+        process.join()
+    return {'lines': line_count, 'seed': seed, 'profiles': results}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='config/config.yaml')
+    parser.add_argument('--lines', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                        help="Profile to measure (repeatable, default: all)")
+    parser.add_argument('--output', help="Where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    config = ConfigService(args.config).load_config()
+    report = run_profiles(config, args.profile or list(PROFILES), args.lines, args.seed)
+    print(f"{'profile':<20}{'engine MB':>10}{'build s':>9}{'mean ms':>9}{'p95 ms':>9}{'lines/s':>10}")
+    for name, result in report['profiles'].items():
+        if 'error' in result:
+            print(f"{name:<20}  {result['error']}")
+            continue
+        per_line = result['ms_per_line']
+        print(f"{name:<20}{result['engine_mb']:>10.1f}{result['build_seconds']:>9.2f}"
+              f"{per_line['mean']:>9.2f}{per_line['p95']:>9.2f}{result['lines_per_second']:>10.1f}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Throughput benchmark suite: micro benchmarks per stage plus end-to-end runs.
+
+Usage:
+    python -m benchmarks.suite run --lines 20000 --output results.json
+    python -m benchmarks.suite run --only 'parser.*' --output parsers.json
+    python -m benchmarks.suite compare baseline.json results.json --threshold 0.10
+
+`run` generates seeded synthetic logs (see benchmarks.generators) and times:
+
+    parser.<format>        the parser built for that format, alone
+    parser_chain.<format>  the configured chain, including the misses before the hit
+    presidio.anonymize_text
+    drain3.<format>        Drain3Service.process_batch on the original lines
+    writer.<format>        every writer in WRITER_REGISTRY
+    pipeline.<format>      LogProcessingService end to end, writing NDJSON
+
+Each case runs --repeat times and keeps the best time. Results are stored as
+JSON; `compare` exits with status 1 when a case lost more than --threshold of
+its baseline throughput, so it can gate CI.
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.generators import FORMATS, generate_lines, write_dataset
+from log_analyzer.parsing.cef_parser import CEFParser
+from log_analyzer.parsing.csv_parser import CSVParser
+from log_analyzer.parsing.interfaces import AbstractParser, LogEntry
+from log_analyzer.parsing.json_parser import JSONParser
+from log_analyzer.parsing.key_value_parser import KeyValueParser
+from log_analyzer.parsing.parser_factory import get_compiled_patterns, get_parser_chain
+from log_analyzer.parsing.regex_parser import RegexParser
+from log_analyzer.services.config_service import ConfigService
+from log_analyzer.services.drain3_service import Drain3Service
+from log_analyzer.services.log_processing_service import LogProcessingService
+from log_analyzer.services.presidio_service import PresidioService
+from log_analyzer.writers.writer_factory import WRITER_REGISTRY, create_writers
+
+DEFAULT_THRESHOLD = 0.10
+
+class SkipBenchmark(Exception):
+    """Raised by a case that cannot run in this environment."""
+
+
+def _format_parser(log_format: str, config: Dict[str, Any]) -> AbstractParser:
+    """The parser meant for each synthetic format."""
+    if log_format == 'json':
+        return JSONParser()
+    if log_format == 'csv':
+        return CSVParser()
+    if log_format == 'cef':
+        return CEFParser()
+    if log_format in ('fortinet', 'loghub'):
+        # loghub lines have no structure; the KV parser shows the cost of a miss.
+        return KeyValueParser()
+    pattern = get_compiled_patterns(config, 'parsing').get('syslog')
+    if pattern is None:
+        raise SkipBenchmark("no 'syslog' pattern in centralized_regex.parsing")
+    return RegexParser(pattern=pattern, parser_name='syslog')
+
+def _parse_all(parser: AbstractParser, entries: List[LogEntry]) -> None:
+    for entry in entries:
+        parser.handle(entry)
+
+
+class BenchmarkSuite:
+    """Builds the benchmark cases for one configuration and dataset size."""
+
+    def __init__(self, config: Dict[str, Any], lines: int, pii_density: float, seed: int, work_dir: Path):
+        self.config = config
+        self.lines = lines
+        self.pii_density = pii_density
+        self.seed = seed
+        self.work_dir = work_dir
+        # Stages other than Presidio are measured without NER, which would dominate.
+        self.no_nlp_config = {**config, 'presidio': {'enabled': False}}
+
+    def lines_of(self, log_format: str) -> List[str]:
+        return list(generate_lines(log_format, self.lines, self.pii_density, self.seed))
+
+    def cases(self) -> List[Tuple[str, Callable[[], Tuple[Callable[[], Any], int]]]]:
+        """
+        Returns (name, setup) pairs. `setup()` prepares the inputs outside the
+        timed region and returns (timed function, number of items it handles).
+        """
+        cases = []
+        for log_format in FORMATS:
+            cases.append((f'parser.{log_format}', lambda f=log_format: self._parser_case(f, chain=False)))
+            cases.append((f'parser_chain.{log_format}', lambda f=log_format: self._parser_case(f, chain=True)))
+        cases.append(('presidio.anonymize_text', self._presidio_case))
+        for log_format in FORMATS:
+            cases.append((f'drain3.{log_format}', lambda f=log_format: self._drain3_case(f)))
+        for writer_name in WRITER_REGISTRY:
+            cases.append((f'writer.{writer_name}', lambda w=writer_name: self._writer_case(w)))
+        for log_format in FORMATS:
+            cases.append((f'pipeline.{log_format}', lambda f=log_format: self._pipeline_case(f)))
+        return cases
+
+    def _parser_case(self, log_format: str, chain: bool):
+        parser = get_parser_chain(self.config) if chain else _format_parser(log_format, self.config)
+        entries = [LogEntry(line_number=i, content=line) for i, line in enumerate(self.lines_of(log_format), 1)]
+        return (lambda: _parse_all(parser, entries)), len(entries)
+
+    def _presidio_case(self):
+        presidio_config = self.config.get('presidio', {})
+        service = PresidioService({**presidio_config, 'enabled': True})
+        if not service.is_enabled:
+            raise SkipBenchmark("Presidio could not be initialized (is the spaCy model installed?)")
+        language = presidio_config.get('analyzer', {}).get('languages', ['en'])[0]
+        # NER is orders of magnitude slower than the other stages: a tenth of the lines is enough.
+        texts = self.lines_of('syslog')[:max(1, self.lines // 10)]
+
+        def run():
+            for text in texts:
+                service.anonymize_text(text, language=language)
+        return run, len(texts)
+
+    def _drain3_case(self, log_format: str):
+        messages = self.lines_of(log_format)
+
+        def run():
+            # A fresh miner each time, so every repeat learns the templates from scratch.
+            Drain3Service(self.config).process_batch(messages, 'original')
+        return run, len(messages)
+
+    def _writer_case(self, writer_name: str):
+        service = LogProcessingService(self.no_nlp_config)
+        records = service.process_batch(list(enumerate(self.lines_of('fortinet'), 1)))
+        batch_size = service.batch_size
+        output_dir = self.work_dir / 'writers'
+
+        def run():
+            writer = create_writers([writer_name], str(output_dir), 'bench', self.config, service.schema_hints)[writer_name]
+            with writer:
+                for start in range(0, len(records), batch_size):
+                    writer.write_batch(records[start:start + batch_size])
+        return run, len(records)
+
+    def _pipeline_case(self, log_format: str):
+        input_path = write_dataset(self.work_dir / f'{log_format}.log', log_format, self.lines, self.pii_density, self.seed)
+
+        def run():
+            service = LogProcessingService(self.no_nlp_config)
+            writers = create_writers(['ndjson'], str(self.work_dir / 'pipeline'), log_format, self.config)
+            service.process_file(str(input_path), writers)
+        return run, self.lines
+
+
+def time_case(setup: Callable[[], Tuple[Callable[[], Any], int]], repeat: int) -> Dict[str, Any]:
+    """Runs a case `repeat` times and reports its best throughput."""
+    run, items = setup()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    return {
+        'items': items,
+        'best_seconds': round(best, 6),
+        'mean_seconds': round(sum(timings) / len(timings), 6),
+        'items_per_second': round(items / best, 2) if best > 0 else None,
+        'repeats': repeat,
+    }
+
+def run_suite(config: Dict[str, Any], lines: int, pii_density: float, seed: int, repeat: int,
+              only: Optional[List[str]] = None, log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """
+    Runs the selected cases and returns the results document.
+
+    Args:
+        only: fnmatch patterns selecting case names; all cases when empty.
+    """
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        suite = BenchmarkSuite(config, lines, pii_density, seed, Path(tmp))
+        for name, setup in suite.cases():
+            if only and not any(fnmatch.fnmatch(name, pattern) for pattern in only):
+                continue
+            try:
+                results[name] = time_case(setup, repeat)
+                log(f"{name:<32}{results[name]['items_per_second']:>14,.0f} items/s")
+            except SkipBenchmark as e:
+                results[name] = {'skipped': str(e)}
+                log(f"{name:<32}  skipped: {e}")
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'lines': lines,
+            'pii_density': pii_density,
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compares the throughput of the cases present in both result documents.
+
+    Returns:
+        One row per common case with the throughput ratio (current/baseline)
+        and whether it is a regression (ratio below 1 - threshold).
+    """
+    rows = []
+    for name, base in baseline.get('results', {}).items():
+        now = current.get('results', {}).get(name)
+        if not now or not base.get('items_per_second') or not now.get('items_per_second'):
+            continue
+        ratio = now['items_per_second'] / base['items_per_second']
+        rows.append({
+            'name': name,
+            'baseline': base['items_per_second'],
+            'current': now['items_per_second'],
+            'ratio': round(ratio, 4),
+            'regression': ratio < 1 - threshold,
+        })
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Run the benchmarks and store the results as JSON")
+    run_parser.add_argument('--config', default='config/config.yaml')
+    run_parser.add_argument('--lines', type=int, default=20_000)
+    run_parser.add_argument('--pii-density', type=float, default=0.2)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--only', action='append', help="fnmatch pattern of case names (repeatable)")
+    run_parser.add_argument('--output', help="Where to write the JSON results")
+
+    compare_parser = commands.add_parser('compare', help="Flag throughput regressions against a baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help="Tolerated throughput loss, as a fraction (default 0.10)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        config = ConfigService(args.config).load_config()
+        document = run_suite(config, args.lines, args.pii_density, args.seed, args.repeat, args.only)
+        if args.output:
+            Path(args.output).write_text(json.dumps(document, indent=2))
+            print(f"Results written to {args.output}")
+        return 0
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    rows = compare_results(baseline, current, args.threshold)
+    print(f"{'case':<32}{'baseline':>14}{'current':>14}{'change':>9}")
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['name']:<32}{row['baseline']:>14,.0f}{row['current']:>14,.0f}{row['ratio'] - 1:>+9.1%}{flag}")
+    regressions = [row['name'] for row in rows if row['regression']]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
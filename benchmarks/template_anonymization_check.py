@@ -0,0 +1,104 @@
+"""
+Compares template-level anonymization with the full-line path.
+
+Usage:
+    python -m benchmarks.template_anonymization_check --format syslog --lines 2000
+    python -m benchmarks.template_anonymization_check --input validation.log --output check.json
+
+The lines (synthetic, or read from --input) are mined with Drain3 and each is
+anonymized twice: by `PresidioService.anonymize_text` on the whole line, and by
+the TemplateAnonymizationService along the template it was mined into. The
+report gives the share of identical outputs, the first differing lines, the
+time of each path and how many texts each path sent to Presidio.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.generators import FORMATS, generate_lines
+from log_analyzer.services.config_service import ConfigService
+from log_analyzer.services.drain3_service import Drain3Service
+from log_analyzer.services.template_anonymization_service import TemplateAnonymizationService
+
+class _CountingPresidio:
+    """Counts the texts a path sends to Presidio."""
+
+    def __init__(self, service: Any):
+        self.service = service
+        self.calls = 0
+
+    def anonymize_text(self, text: str, **kwargs) -> str:
+        self.calls += 1
+        return self.service.anonymize_text(text, **kwargs)
+
+    def anonymize_spans(self, text: str, spans: List[Tuple[int, int]], **kwargs) -> List[str]:
+        self.calls += 1
+        return self.service.anonymize_spans(text, spans, **kwargs)
+
+def compare(config: Dict[str, Any], lines: List[str]) -> Dict[str, Any]:
+    """Anonymizes `lines` with both paths and compares the results."""
+    from log_analyzer.services.presidio_service import PresidioService
+
+    presidio_config = config.get('presidio', {})
+    service = PresidioService({**presidio_config, 'enabled': True})
+    if not service.is_enabled:
+        raise RuntimeError("Presidio engine could not be built (is the spaCy model installed?)")
+    language = presidio_config.get('analyzer', {}).get('languages', ['en'])[0]
+    templates = [result.get('template') for result in Drain3Service(config).process_batch(lines, 'original')]
+
+    full = _CountingPresidio(service)
+    started = time.perf_counter()
+    expected = [full.anonymize_text(line, language=language) for line in lines]
+    full_seconds = time.perf_counter() - started
+
+    segmented = _CountingPresidio(service)
+    template_service = TemplateAnonymizationService(
+        {**presidio_config.get('template_anonymization', {}), 'enabled': True}, segmented, language)
+    started = time.perf_counter()
+    actual = [template_service.anonymize(line, template) or segmented.anonymize_text(line, language=language)
+              for line, template in zip(lines, templates)]
+    template_seconds = time.perf_counter() - started
+
+    differences = [{'line': line, 'full': want, 'template': got}
+                   for line, want, got in zip(lines, expected, actual) if want != got]
+    return {
+        'lines': len(lines),
+        'templates': len(set(templates)),
+        'match_rate': round(1 - len(differences) / len(lines), 4) if lines else 1.0,
+        'full_line': {'seconds': round(full_seconds, 3), 'presidio_calls': full.calls},
+        'template': {'seconds': round(template_seconds, 3), 'presidio_calls': segmented.calls},
+        'differences': differences[:20],
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default='config/config.yaml')
+    parser.add_argument('--input', help="Validation corpus, one line per log line (default: synthetic lines)")
+    parser.add_argument('--format', default='syslog', choices=sorted(FORMATS))
+    parser.add_argument('--lines', type=int, default=1000)
+    parser.add_argument('--pii-density', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    config = ConfigService(args.config).load_config()
+    if args.input:
+        lines = [line for line in Path(args.input).read_text(errors='replace').splitlines() if line.strip()]
+    else:
+        lines = list(generate_lines(args.format, args.lines, pii_density=args.pii_density, seed=args.seed))
+    report = compare(config, lines)
+    print(f"lines {report['lines']}  templates {report['templates']}  match rate {report['match_rate']:.4f}")
+    for path in ('full_line', 'template'):
+        print(f"  {path:<10}{report[path]['seconds']:>9.2f}s {report[path]['presidio_calls']:>8} Presidio calls")
+    for difference in report['differences'][:5]:
+        print(f"  differs: {difference['line']}\n    full:     {difference['full']}\n    template: {difference['template']}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
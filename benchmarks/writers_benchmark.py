@@ -0,0 +1,89 @@
+"""
+Throughput and memory benchmark for the streaming output writers.
+
+Usage:
+    python -m benchmarks.writers_benchmark --records 200000 --batch-size 1000
+
+For every writer/compression combination it reports records/s, MB/s of output
+and the peak Python heap allocated while writing (via tracemalloc). The peak
+should stay flat when --records grows, since the writers never hold more than
+one batch.
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+from log_analyzer.parsing.interfaces import ParsedRecord
+from log_analyzer.writers.json_writer import JSONArrayWriter, NDJSONWriter
+from log_analyzer.writers.logppt_writer import LogPPTWriter
+
+def _logppt_writer(path: Path, compression: str) -> LogPPTWriter:
+    if compression != 'none':
+        raise ValueError("LogPPT CSV is written uncompressed")
+    return LogPPTWriter(path)
+
+WRITERS = {
+    'ndjson': NDJSONWriter,
+    'json_array': JSONArrayWriter,
+    'logppt': _logppt_writer,
+}
+COMPRESSIONS = ['none', 'gzip', 'zstd']
+
+def synthetic_batch(batch_size: int) -> List[ParsedRecord]:
+    """Builds one batch of realistic firewall-like records."""
+    return [
+        ParsedRecord(
+            original_content=f"date=2024-05-01 time=10:00:{i % 60:02d} srcip=10.0.{i % 255}.{i % 250} dstport=443 action=deny",
+            line_number=i + 1,
+            parser_name='KeyValueParser',
+            parsed_data={'date': '2024-05-01', 'srcip': f"10.0.{i % 255}.{i % 250}", 'dstport': '443', 'action': 'deny'},
+            presidio_anonymized="date=<DATE> time=<TIME> srcip=<IP> dstport=443 action=deny",
+            drain3_original={'cluster_id': 1, 'template': 'date=<*> time=<*> srcip=<*> dstport=443 action=deny', 'change_type': 'none'},
+        )
+        for i in range(batch_size)
+    ]
+
+def run_case(writer_name: str, compression: str, total: int, batch_size: int, output_dir: Path) -> Dict[str, float]:
+    # The same batch is written repeatedly so that only serialization and I/O
+    # are timed, not record construction.
+    batch = synthetic_batch(batch_size)
+    tracemalloc.start()
+    started = time.perf_counter()
+    with WRITERS[writer_name](output_dir / f"bench_{writer_name}", compression) as writer:
+        for _ in range(total // batch_size):
+            writer.write_batch(batch)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size_mb = writer.output_path.stat().st_size / 1e6
+    return {
+        'records_per_s': writer.records_written / elapsed,
+        'output_mb': size_mb,
+        'mb_per_s': size_mb / elapsed,
+        'peak_heap_mb': peak / 1e6,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'writer':<12}{'codec':<7}{'rec/s':>12}{'out MB':>10}{'MB/s':>9}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for writer_name in WRITERS:
+            for compression in COMPRESSIONS:
+                try:
+                    result = run_case(writer_name, compression, args.records, args.batch_size, Path(tmp))
+                except ValueError as e:
+                    print(f"{writer_name:<12}{compression:<7}  skipped: {e}")
+                    continue
+                print(f"{writer_name:<12}{compression:<7}{result['records_per_s']:>12,.0f}"
+                      f"{result['output_mb']:>10.1f}{result['mb_per_s']:>9.1f}{result['peak_heap_mb']:>10.2f}")
+
+if __name__ == '__main__':
+    main()
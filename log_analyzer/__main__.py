@@ -0,0 +1,3 @@
+from log_analyzer.cli import main
+
+main()
@@ -0,0 +1,335 @@
+# === DESIGN COMMENT ===
+# Headless entry point for batch runs, without the web server:
+#
+#   python -m log_analyzer analyze examples/ --format ndjson --format logppt
+#   zcat big.log.gz | python -m log_analyzer analyze - --no-presidio
+#
+# It runs the same single-pass LogProcessingService as the web app. Inputs can
+# be files, directories (searched recursively with --pattern) or `-` for stdin.
+# `--jobs N` processes N input files at a time in separate processes, which is
+# where CPU parallelism comes from; within a file, `--anonymize-workers` and
+# `--write-workers` size the thread pools of those stages.
+#
+# Distributed runs (see distributed_service) split each input into tasks on
+# a spool directory shared by every node; `worker` processes them anywhere
+# the directory is mounted, and `coordinate` merges the results:
+#
+#   python -m log_analyzer worker --spool /mnt/shared/spool           # on each node
+#   python -m log_analyzer coordinate /mnt/shared/fw.log --spool /mnt/shared/spool
+#
+# `coordinate --workers N` also starts N local worker processes.
+#
+# Start-up cost matters for a CLI: this module imports only typer at the top.
+# The pipeline, the writers, and `rich` for the live display are imported when
+# a command runs; Presidio (spaCy) only when anonymization is enabled.
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import typer
+
+app = typer.Typer(help="Parse, anonymize and mine log files from the command line.", add_completion=False)
+
+DEFAULT_CONFIG_PATH = "config/config.yaml"
+
+def _collect_inputs(inputs: List[str], pattern: str) -> List[str]:
+    """Expands directories into the files they contain; `-` stands for stdin."""
+    files: List[str] = []
+    for item in inputs:
+        if item == '-':
+            files.append(item)
+            continue
+        path = Path(item)
+        if path.is_dir():
+            files.extend(str(p) for p in sorted(path.rglob(pattern)) if p.is_file())
+        elif path.is_file():
+            files.append(str(path))
+        else:
+            raise typer.BadParameter(f"Input not found: {item}")
+    return files
+
+def _build_config(config_path: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    from log_analyzer.services.config_service import ConfigService
+
+    config = ConfigService(config_path).load_config()
+    if not config:
+        raise typer.BadParameter(f"Could not load configuration from {config_path}")
+    pipeline = config.setdefault('pipeline', {})
+    if overrides.get('batch_size'):
+        pipeline['batch_size'] = overrides['batch_size']
+    if overrides.get('memory_budget_mb'):
+        pipeline['memory_budget_mb'] = overrides['memory_budget_mb']
+    workers = pipeline.setdefault('workers', {})
+    if overrides.get('anonymize_workers'):
+        workers['anonymize'] = overrides['anonymize_workers']
+    if overrides.get('write_workers'):
+        workers['write'] = overrides['write_workers']
+    if overrides.get('presidio') is not None:
+        config.setdefault('presidio', {})['enabled'] = overrides['presidio']
+    return config
+
+def _base_name(input_file: str, used: set) -> str:
+    stem = 'stdin' if input_file == '-' else Path(input_file).stem
+    base_name = f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    candidate, counter = base_name, 1
+    while candidate in used:
+        counter += 1
+        candidate = f"{base_name}_{counter}"
+    used.add(candidate)
+    return candidate
+
+def _analyze_one(input_file: str, base_name: str, formats: List[str], output_dir: str,
+                 config: Dict[str, Any], progress=None) -> Dict[str, Any]:
+    """Runs the pipeline on one input. Top-level so that worker processes can run it."""
+    from log_analyzer.services.log_processing_service import LogProcessingService
+    from log_analyzer.writers.writer_factory import create_writers
+
+    service = LogProcessingService(config)
+    writers = create_writers(formats, output_dir, base_name, config, service.schema_hints)
+    if input_file == '-':
+        lines = ((number, line.strip()) for number, line in enumerate(sys.stdin, 1))
+        summary = service.process_lines(lines, writers, source_file='<stdin>', progress=progress)
+    else:
+        summary = service.process_file(input_file, writers, progress=progress)
+    summary['input'] = input_file
+    return summary
+
+def _coordinate_one(input_file: str, base_name: str, formats: List[str], output_dir: str,
+                    config: Dict[str, Any], progress=None, coordinator=None) -> Dict[str, Any]:
+    """`_analyze_one` for a distributed run: the coordinator merges the workers' results."""
+    from log_analyzer.writers.writer_factory import create_writers
+
+    writers = create_writers(formats, output_dir, base_name, config, coordinator.schema_hints)
+    summary = coordinator.run(input_file, writers, progress=progress)
+    summary['input'] = input_file
+    return summary
+
+def _run_worker(spool_dir: str, settings: Dict[str, Any], max_tasks: Optional[int] = None,
+                idle_exit: Optional[float] = None, stop=None) -> int:
+    """Runs a distributed worker until it stops. Top-level so that local worker processes can run it."""
+    from log_analyzer.services.distributed_service import DEFAULT_HEARTBEAT_SECONDS, DEFAULT_POLL_SECONDS, Worker
+    from log_analyzer.services.work_queue import SpoolDirectoryBroker
+
+    worker = Worker(SpoolDirectoryBroker(spool_dir),
+                    heartbeat_seconds=settings.get('heartbeat_seconds', DEFAULT_HEARTBEAT_SECONDS),
+                    poll_seconds=settings.get('poll_seconds', DEFAULT_POLL_SECONDS))
+    return worker.run(max_tasks=max_tasks, idle_exit=idle_exit, stop=stop)
+
+def _print_summary(console, summaries: List[Dict[str, Any]], elapsed: float) -> None:
+    from rich.table import Table
+
+    table = Table(title="Analysis summary")
+    for column in ("input", "records", "seconds", "records/s", "outputs"):
+        table.add_column(column, justify="right" if column in ("records", "seconds", "records/s") else "left")
+    for summary in summaries:
+        seconds = summary.get('elapsed_seconds') or 0
+        rate = summary['records'] / seconds if seconds else 0
+        table.add_row(summary['input'], f"{summary['records']:,}", f"{seconds:.2f}", f"{rate:,.0f}",
+                      "\n".join(Path(p).name for p in summary['outputs'].values()))
+    console.print(table)
+    total = sum(s['records'] for s in summaries)
+    console.print(f"{total:,} records from {len(summaries)} input(s) in {elapsed:.2f}s "
+                  f"({total / elapsed if elapsed else 0:,.0f} records/s)")
+
+@app.command()
+def analyze(
+    inputs: List[str] = typer.Argument(..., help="Files, directories or '-' for stdin."),
+    formats: List[str] = typer.Option(["anonymize", "logppt", "json_report"], "--format", "-f",
+                                      help="Output format (repeatable). See `formats`."),
+    output_dir: str = typer.Option("outputs", "--output-dir", "-o", help="Directory for the outputs."),
+    config_path: str = typer.Option(DEFAULT_CONFIG_PATH, "--config", "-c", help="Configuration file."),
+    pattern: str = typer.Option("*", help="File name pattern used inside directories."),
+    batch_size: Optional[int] = typer.Option(None, help="Lines per batch (pipeline.batch_size)."),
+    jobs: int = typer.Option(1, "--jobs", "-j", min=1, help="Input files processed in parallel, one process each."),
+    anonymize_workers: Optional[int] = typer.Option(None, min=1, help="Presidio threads per file."),
+    write_workers: Optional[int] = typer.Option(None, min=1, help="Writer threads per file (default: one per format)."),
+    memory_budget_mb: Optional[int] = typer.Option(None, min=1, help="Shrink batches, caches and dedup index, spill to disk while RSS exceeds this (per process)."),
+    presidio: Optional[bool] = typer.Option(None, "--presidio/--no-presidio", help="Override presidio.enabled."),
+    progress: bool = typer.Option(True, "--progress/--no-progress", help="Live throughput display on stderr."),
+):
+    """Run the parse → anonymize → mine pipeline and write the selected formats."""
+    from log_analyzer.writers.writer_factory import resolve_formats
+
+    try:
+        resolve_formats(formats)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    files = _collect_inputs(inputs, pattern)
+    if not files:
+        raise typer.BadParameter("No input files found.")
+    if files.count('-') and jobs > 1:
+        raise typer.BadParameter("stdin cannot be combined with --jobs > 1.")
+
+    config = _build_config(config_path, {
+        'batch_size': batch_size, 'memory_budget_mb': memory_budget_mb, 'anonymize_workers': anonymize_workers,
+        'write_workers': write_workers, 'presidio': presidio,
+    })
+    used_names: set = set()
+    work = [(input_file, _base_name(input_file, used_names)) for input_file in files]
+
+    from rich.console import Console
+    console = Console(stderr=True)
+    started = time.perf_counter()
+    summaries: List[Dict[str, Any]] = []
+    try:
+        if jobs == 1:
+            summaries = _run_sequential(work, formats, output_dir, config, console if progress else None)
+        else:
+            summaries = _run_parallel(work, formats, output_dir, config, jobs, console if progress else None)
+    except Exception as e:
+        console.print(f"[red]Analysis failed:[/red] {e}")
+        raise typer.Exit(code=1)
+    _print_summary(console, summaries, time.perf_counter() - started)
+
+def _run_sequential(work, formats, output_dir, config, console, analyze=_analyze_one) -> List[Dict[str, Any]]:
+    if console is None:
+        return [analyze(input_file, base_name, formats, output_dir, config) for input_file, base_name in work]
+
+    from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+
+    summaries = []
+    columns = (SpinnerColumn(), TextColumn("{task.description}"), TextColumn("{task.completed:,.0f} lines"),
+               TextColumn("[cyan]{task.fields[rate]:,.0f} lines/s"), TimeElapsedColumn())
+    with Progress(*columns, console=console, transient=False) as live:
+        for input_file, base_name in work:
+            task = live.add_task(input_file, total=None, rate=0.0)
+            started = time.perf_counter()
+
+            def on_batch(lines: int, records: int, task=task, started=started) -> None:
+                live.advance(task, lines)
+                completed = live.tasks[task].completed
+                live.update(task, rate=completed / max(time.perf_counter() - started, 1e-9))
+
+            summaries.append(analyze(input_file, base_name, formats, output_dir, config, on_batch))
+            live.update(task, total=live.tasks[task].completed)
+    return summaries
+
+def _run_parallel(work, formats, output_dir, config, jobs, console) -> List[Dict[str, Any]]:
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(_analyze_one, input_file, base_name, formats, output_dir, config): input_file
+                   for input_file, base_name in work}
+        if console is None:
+            return [future.result() for future in as_completed(futures)]
+
+        from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn, TimeElapsedColumn
+        started = time.perf_counter()
+        records = 0
+        columns = (TextColumn("files"), BarColumn(), MofNCompleteColumn(),
+                   TextColumn("[cyan]{task.fields[rate]:,.0f} records/s"), TimeElapsedColumn())
+        with Progress(*columns, console=console) as live:
+            task = live.add_task("files", total=len(futures), rate=0.0)
+            for future in as_completed(futures):
+                summary = future.result()
+                summaries.append(summary)
+                records += summary['records']
+                live.update(task, advance=1, rate=records / max(time.perf_counter() - started, 1e-9))
+    return summaries
+
+@app.command()
+def coordinate(
+    inputs: List[str] = typer.Argument(..., help="Files or directories, readable by the workers at the same path."),
+    formats: List[str] = typer.Option(["anonymize", "logppt", "json_report"], "--format", "-f",
+                                      help="Output format (repeatable). See `formats`."),
+    output_dir: str = typer.Option("outputs", "--output-dir", "-o", help="Directory for the outputs."),
+    config_path: str = typer.Option(DEFAULT_CONFIG_PATH, "--config", "-c", help="Configuration file."),
+    pattern: str = typer.Option("*", help="File name pattern used inside directories."),
+    spool_dir: Optional[str] = typer.Option(None, "--spool", help="Shared spool directory (distributed.spool_dir)."),
+    task_mb: Optional[float] = typer.Option(None, min=0.001, help="Input bytes per task (distributed.task_mb)."),
+    workers: int = typer.Option(0, "--workers", "-w", min=0, help="Local worker processes to start as well."),
+    batch_size: Optional[int] = typer.Option(None, help="Lines per batch (pipeline.batch_size)."),
+    presidio: Optional[bool] = typer.Option(None, "--presidio/--no-presidio", help="Override presidio.enabled."),
+    progress: bool = typer.Option(True, "--progress/--no-progress", help="Live throughput display on stderr."),
+):
+    """Split inputs into tasks for the workers, then mine and write their merged results."""
+    import functools
+    import multiprocessing
+
+    from log_analyzer.services.distributed_service import DEFAULT_SPOOL_DIR, Coordinator
+    from log_analyzer.services.work_queue import SpoolDirectoryBroker
+    from log_analyzer.writers.writer_factory import resolve_formats
+
+    try:
+        resolve_formats(formats)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    if '-' in inputs:
+        raise typer.BadParameter("stdin cannot be distributed: workers read the input themselves.")
+    files = _collect_inputs(inputs, pattern)
+    if not files:
+        raise typer.BadParameter("No input files found.")
+
+    config = _build_config(config_path, {'batch_size': batch_size, 'presidio': presidio})
+    settings = config.setdefault('distributed', {})
+    if task_mb:
+        settings['task_mb'] = task_mb
+    spool_dir = spool_dir or settings.get('spool_dir', DEFAULT_SPOOL_DIR)
+    coordinator = Coordinator(config, SpoolDirectoryBroker(spool_dir))
+    used_names: set = set()
+    work = [(input_file, _base_name(input_file, used_names)) for input_file in files]
+
+    from rich.console import Console
+    console = Console(stderr=True)
+    stop = multiprocessing.Event()
+    local_workers = [multiprocessing.Process(target=_run_worker, args=(spool_dir, settings), kwargs={'stop': stop},
+                                             name=f'worker-{index}', daemon=True)
+                     for index in range(workers)]
+    for process in local_workers:
+        process.start()
+    started = time.perf_counter()
+    try:
+        summaries = _run_sequential(work, formats, output_dir, config, console if progress else None,
+                                    analyze=functools.partial(_coordinate_one, coordinator=coordinator))
+    except Exception as e:
+        console.print(f"[red]Distributed analysis failed:[/red] {e}")
+        raise typer.Exit(code=1)
+    finally:
+        stop.set()
+        for process in local_workers:
+            process.join()
+    _print_summary(console, summaries, time.perf_counter() - started)
+    for summary in summaries:
+        per_worker = ", ".join(f"{worker_id}: {count}" for worker_id, count in sorted(summary['workers'].items()))
+        console.print(f"{summary['input']}: {summary['tasks']} task(s), {summary['retries']} retried ({per_worker})")
+
+@app.command()
+def worker(
+    spool_dir: Optional[str] = typer.Option(None, "--spool", help="Shared spool directory (distributed.spool_dir)."),
+    config_path: str = typer.Option(DEFAULT_CONFIG_PATH, "--config", "-c",
+                                    help="Configuration file, read for the `distributed` settings only."),
+    max_tasks: Optional[int] = typer.Option(None, min=1, help="Exit after this many tasks."),
+    idle_exit: Optional[float] = typer.Option(None, min=0, help="Exit after the queue stayed empty this many seconds."),
+):
+    """Process distributed tasks from the spool directory; the pipeline settings come with each run."""
+    from log_analyzer.services.config_service import ConfigService
+    from log_analyzer.services.distributed_service import DEFAULT_SPOOL_DIR
+
+    settings = (ConfigService(config_path).load_config() or {}).get('distributed', {}) if Path(config_path).is_file() else {}
+    spool_dir = spool_dir or settings.get('spool_dir', DEFAULT_SPOOL_DIR)
+    typer.echo(f"Worker polling {spool_dir}", err=True)
+    try:
+        completed = _run_worker(spool_dir, settings, max_tasks=max_tasks, idle_exit=idle_exit)
+    except KeyboardInterrupt:
+        raise typer.Exit(code=130)
+    typer.echo(f"{completed} task(s) completed", err=True)
+
+@app.command("formats")
+def list_formats():
+    """List the available output formats."""
+    from log_analyzer.writers.writer_factory import FORMAT_ALIASES, WRITER_REGISTRY
+
+    for name, spec in WRITER_REGISTRY.items():
+        typer.echo(f"{name:<20}{spec.description}")
+    for alias, expanded in FORMAT_ALIASES.items():
+        typer.echo(f"{alias:<20}alias of {', '.join(expanded)}")
+
+def main() -> None:
+    app()
+
+if __name__ == '__main__':
+    main()
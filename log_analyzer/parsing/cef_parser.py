@@ -8,6 +8,13 @@ class CEFParser(AbstractParser):
     A concrete parser for the Common Event Format (CEF).
     It parses the CEF header and the key-value extension field.
     """
+    parser_name = 'CEFParser'
+    supports_rebuild = True
+
+    # The header fields, in order; `extension` holds everything after them.
+    header_fields = ('version', 'device_vendor', 'device_product', 'device_version',
+                     'signature_id', 'name', 'severity')
+
     # Regex to capture the CEF header fields
     header_regex = re.compile(
         r"CEF:(?P<version>\d+)\|(?P<device_vendor>[^|]*)\|(?P<device_product>[^|]*)\|"
@@ -47,10 +54,20 @@ class CEFParser(AbstractParser):
             original_content=log_entry.content,
             line_number=log_entry.line_number,
             source_file=log_entry.source_file,
-            parser_name='CEFParser',
+            parser_name=self.parser_name,
             parsed_data=parsed_data
         )
 
+    def rebuild_line(self, content: str, data: Dict[str, Any]) -> Optional[str]:
+        if 'extension_parsing_error' in data:
+            return None
+        header = '|'.join(str(data.get(field, '')) for field in self.header_fields[1:])
+        if 'raw_extension' in data:
+            extension = str(data['raw_extension'])
+        else:
+            extension = ' '.join(f"{key}={value}" for key, value in data.items() if key not in self.header_fields)
+        return f"CEF:{data.get('version', '')}|{header}|{extension}"
+
     def _parse_extension(self, extension_string: str) -> Dict[str, Any]:
         """
         Parses the extension part of a CEF message.
@@ -10,10 +10,18 @@ class CSVParser(AbstractParser):
     This parser needs to be configured with a delimiter and a header.
     It's less of a general-purpose detector and more of a specific processor.
     """
+    parser_name = 'CSVParser'
+    supports_rebuild = True
+
     def __init__(self, delimiter: str = ',', header: Optional[List[str]] = None):
         self.delimiter = delimiter
         self.header = header
 
+    def field_names(self) -> Optional[List[str]]:
+        # Only a configured header fixes the columns; generic `field_N`
+        # names depend on each line's field count.
+        return list(self.header) if self.header else None
+
     def handle(self, log_entry: LogEntry) -> Optional[ParsedRecord]:
         """
         Tries to parse the log entry content as a CSV line.
@@ -42,7 +50,7 @@ class CSVParser(AbstractParser):
                         original_content=log_entry.content,
                         line_number=log_entry.line_number,
                         source_file=log_entry.source_file,
-                        parser_name='CSVParser',
+                        parser_name=self.parser_name,
                         parsed_data=parsed_data
                     )
             # If no header is provided, we can still parse it with generic field names
@@ -52,7 +60,7 @@ class CSVParser(AbstractParser):
                     original_content=log_entry.content,
                     line_number=log_entry.line_number,
                     source_file=log_entry.source_file,
-                    parser_name='CSVParser',
+                    parser_name=self.parser_name,
                     parsed_data=parsed_data
                 )
 
@@ -64,3 +72,9 @@ class CSVParser(AbstractParser):
         # If parsing was attempted but didn't meet criteria (e.g., field count mismatch),
         # pass to the next handler.
         return super().handle(log_entry)
+
+    def rebuild_line(self, content: str, data: Dict[str, Any]) -> Optional[str]:
+        # `parsed_data` keeps the column order of the line.
+        output = StringIO()
+        csv.writer(output, delimiter=self.delimiter, lineterminator='').writerow(data.values())
+        return output.getvalue()
@@ -23,6 +23,12 @@ class ParsedRecord(BaseModel):
     drain3_original: Dict[str, Any] = Field(default_factory=dict)
     drain3_anonymized: Dict[str, Any] = Field(default_factory=dict)
     parsed_data_anonymized: Dict[str, Any] = Field(default_factory=dict)
+    # Epoch seconds (UTC), set by the timestamp stage (timestamp_normalization).
+    timestamp: Optional[float] = None
+    # Category of the record's Drain3 template, set by LLM labeling (template_labeling).
+    template_label: Optional[str] = None
+    # Set when duplicate lines are emitted collapsed (pipeline.dedup.emit: count).
+    occurrences: Optional[int] = None
 
     class Config:
         extra = 'allow' # Allow extra fields to be added during processing
@@ -34,6 +40,9 @@ class AbstractParser(ABC):
     It defines the interface for all concrete parser handlers.
     """
     _next_handler: Optional[AbstractParser] = None
+    parser_name: str = 'AbstractParser'
+    # Whether `rebuild_line` can render this parser's lines back.
+    supports_rebuild: bool = False
 
     def set_next(self, handler: AbstractParser) -> AbstractParser:
         """
@@ -43,6 +52,29 @@ class AbstractParser(ABC):
         self._next_handler = handler
         return handler
 
+    def field_names(self) -> Optional[List[str]]:
+        """
+        Returns the keys this parser always puts in `parsed_data`, or None
+        when they depend on the content. Writers use it as a schema hint.
+        """
+        return None
+
+    def can_rebuild(self, content: str) -> bool:
+        """
+        Whether `rebuild_line` would render this line, checked before its
+        fields are anonymized.
+        """
+        return self.supports_rebuild
+
+    def rebuild_line(self, content: str, data: Dict[str, Any]) -> Optional[str]:
+        """
+        Renders `content`, a line this parser accepted, with its field values
+        replaced by those in `data` (the record's `parsed_data` keys), or
+        returns None when the format cannot be rendered back. Field-level
+        anonymization uses it to rebuild the anonymized line.
+        """
+        return None
+
     @abstractmethod
     def handle(self, log_entry: LogEntry) -> Optional[ParsedRecord]:
         """
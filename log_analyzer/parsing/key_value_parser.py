@@ -9,6 +9,9 @@ class KeyValueParser(AbstractParser):
     It can be configured with different delimiters.
     Example: key1=value1 key2="value with spaces"
     """
+    parser_name = 'KeyValueParser'
+    supports_rebuild = True
+
     def __init__(self, delimiter: str = '=', min_pairs: int = 3):
         """
         Initializes the parser.
@@ -52,9 +55,55 @@ class KeyValueParser(AbstractParser):
                 original_content=log_entry.content,
                 line_number=log_entry.line_number,
                 source_file=log_entry.source_file,
-                parser_name='KeyValueParser',
+                parser_name=self.parser_name,
                 parsed_data=parsed_data
             )
 
         # If not enough pairs were found, pass to the next handler
         return super().handle(log_entry)
+
+    def can_rebuild(self, content: str) -> bool:
+        # Only the pairs are rewritten. Text around them (a syslog header, a
+        # free-text message) is in no field, so it may carry PII nothing
+        # would anonymize: such lines are not rebuilt, and go through
+        # full-text anonymization instead. So are lines with a repeated key:
+        # `parsed_data` keeps only its last value, which every occurrence
+        # would be rebuilt from.
+        position = 0
+        keys = set()
+        for match in self.kv_regex.finditer(content):
+            if match.start() > position and not content[position:match.start()].isspace():
+                return False
+            if match.group(1) in keys:
+                return False
+            keys.add(match.group(1))
+            position = match.end()
+        return position == len(content) or content[position:].isspace()
+
+    def rebuild_line(self, content: str, data: Dict[str, Any]) -> Optional[str]:
+        parts = []
+        position = 0
+        keys = set()
+        for match in self.kv_regex.finditer(content):
+            gap = content[position:match.start()]
+            if (gap and not gap.isspace()) or match.group(1) in keys:
+                return None
+            keys.add(match.group(1))
+            parts.append(gap)
+            parts.append(self._rebuild_pair(match, data))
+            position = match.end()
+        tail = content[position:]
+        if tail and not tail.isspace():
+            return None
+        parts.append(tail)
+        return ''.join(parts)
+
+    def _rebuild_pair(self, match: re.Match, data: Dict[str, Any]) -> str:
+        key = match.group(1)
+        if key not in data:
+            return match.group(0)
+        value = str(data[key])
+        # group(3) is the unquoted form; keep quotes where they were or are now needed.
+        if match.group(3) is None or not value or any(ch.isspace() for ch in value):
+            value = f'"{value}"'
+        return f"{key}{self.delimiter}{value}"
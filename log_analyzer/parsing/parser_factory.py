@@ -1,6 +1,7 @@
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, List, Optional, Pattern
 
+from ..services.config_service import get_artifact
 from .interfaces import AbstractParser, LogEntry, ParsedRecord
 from .json_parser import JSONParser
 from .csv_parser import CSVParser
@@ -8,6 +9,40 @@ from .cef_parser import CEFParser
 from .key_value_parser import KeyValueParser
 from .regex_parser import RegexParser
 
+# The config subtrees the parser chain is built from.
+PARSER_CHAIN_CONFIG_PATHS = ('parsers', 'centralized_regex.parsing')
+
+def compile_patterns(patterns: Dict[str, str]) -> Dict[str, Pattern]:
+    """
+    Compiles a name -> regex mapping, skipping (with a warning) the
+    patterns that do not compile.
+    """
+    compiled: Dict[str, Pattern] = {}
+    for name, pattern_str in (patterns or {}).items():
+        try:
+            compiled[name] = re.compile(pattern_str)
+        except re.error as e:
+            print(f"Warning: Could not compile regex pattern '{name}': {e}")
+    return compiled
+
+def get_compiled_patterns(config: Dict[str, Any], category: str) -> Dict[str, Pattern]:
+    """
+    Returns the compiled `centralized_regex.<category>` patterns, compiled
+    once per distinct pattern set.
+    """
+    key_path = f'centralized_regex.{category}'
+    return get_artifact(
+        f'regex:{category}', config, [key_path],
+        lambda c: compile_patterns(c.get('centralized_regex', {}).get(category, {})))
+
+def get_parser_chain(config: Dict[str, Any]) -> Optional[AbstractParser]:
+    """
+    Returns the parser chain for the configuration, reusing the chain built
+    for an identical `parsers` / `centralized_regex.parsing` configuration.
+    Parsers are stateless, so a chain can be shared by concurrent analyses.
+    """
+    return get_artifact('parser_chain', config, PARSER_CHAIN_CONFIG_PATHS, create_parser_chain)
+
 def create_parser_chain(config: Dict[str, Any]) -> Optional[AbstractParser]:
     """
     Creates and links a chain of parsers based on the application configuration.
@@ -30,8 +65,12 @@ def create_parser_chain(config: Dict[str, Any]) -> Optional[AbstractParser]:
 
     # 1. JSON Parser
     # The JSON parser is usually first as it's very specific.
-    if config.get('parsers', {}).get('json', {}).get('enabled', True):
-        json_parser = JSONParser()
+    json_config = config.get('parsers', {}).get('json', {})
+    if json_config.get('enabled', True):
+        json_parser = JSONParser(
+            decoder=json_config.get('decoder', 'auto'),
+            fields=json_config.get('fields')
+        )
         if not head:
             head = json_parser
         if current:
@@ -79,28 +118,28 @@ def create_parser_chain(config: Dict[str, Any]) -> Optional[AbstractParser]:
 
     # 5. Regex Parsers
     # We can add multiple regex parsers from the config.
-    regex_configs = config.get('centralized_regex', {}).get('parsing', {})
-    for name, pattern_str in regex_configs.items():
-        try:
-            pattern = re.compile(pattern_str)
-            regex_parser = RegexParser(pattern=pattern, parser_name=name)
-            if not head:
-                head = regex_parser
-            if current:
-                current.set_next(regex_parser)
-            current = regex_parser
-        except re.error as e:
-            print(f"Warning: Could not compile regex pattern '{name}': {e}")
+    for name, pattern in get_compiled_patterns(config, 'parsing').items():
+        regex_parser = RegexParser(pattern=pattern, parser_name=name)
+        if not head:
+            head = regex_parser
+        if current:
+            current.set_next(regex_parser)
+        current = regex_parser
 
     # Add a final fallback parser that does nothing but create a basic record
     # This ensures that no log entry is ever truly "lost".
     class FallbackParser(AbstractParser):
+        parser_name = 'FallbackParser'
+
+        def field_names(self) -> Optional[List[str]]:
+            return ['raw_content']
+
         def handle(self, log_entry: LogEntry) -> Optional[ParsedRecord]:
             return ParsedRecord(
                 original_content=log_entry.content,
                 line_number=log_entry.line_number,
                 source_file=log_entry.source_file,
-                parser_name='FallbackParser',
+                parser_name=self.parser_name,
                 parsed_data={'raw_content': log_entry.content}
             )
 
@@ -111,3 +150,26 @@ def create_parser_chain(config: Dict[str, Any]) -> Optional[AbstractParser]:
         current.set_next(fallback_parser)
 
     return head
+
+
+def iter_parsers(head: Optional[AbstractParser]) -> Iterator[AbstractParser]:
+    """Yields the parsers of a chain in the order they are tried."""
+    parser = head
+    while parser is not None:
+        yield parser
+        parser = parser._next_handler
+
+def get_schema_hints(head: Optional[AbstractParser]) -> Dict[str, List[str]]:
+    """
+    Walks the parser chain and collects the fixed field names of every parser
+    that declares them.
+
+    Returns:
+        A dict mapping parser name to its field names.
+    """
+    hints: Dict[str, List[str]] = {}
+    for parser in iter_parsers(head):
+        field_names = parser.field_names()
+        if field_names is not None:
+            hints[parser.parser_name] = field_names
+    return hints
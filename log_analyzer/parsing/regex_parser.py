@@ -1,5 +1,5 @@
 import re
-from typing import Optional, Pattern
+from typing import List, Optional, Pattern
 
 from .interfaces import AbstractParser, LogEntry, ParsedRecord
 
@@ -19,6 +19,10 @@ class RegexParser(AbstractParser):
         self.pattern = pattern
         self.parser_name = parser_name
 
+    def field_names(self) -> Optional[List[str]]:
+        # `groupdict()` always contains every named group, matched or not.
+        return list(self.pattern.groupindex)
+
     def handle(self, log_entry: LogEntry) -> Optional[ParsedRecord]:
         """
         Tries to match the regex pattern against the log entry content.
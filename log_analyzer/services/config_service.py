@@ -1,5 +1,120 @@
+# === DESIGN COMMENT ===
+# Parsing config.yaml takes tens of milliseconds, and every endpoint (and every
+# `get_value` call) used to do it again. The parsed configuration is now cached
+# process-wide, per file path, and re-read only when the file's signature
+# (mtime, inode, size) changes. A changed inode catches editors and deploy tools
+# that replace the file atomically instead of rewriting it in place.
+#
+# `load_config` still returns a private deep copy, so callers may mutate it
+# freely (the endpoints do), and a copy costs about 1% of a parse.
+#
+# Objects derived from the configuration (compiled regexes, the parser chain,
+# Presidio engines and operators, Drain3 configs) are cached with `get_artifact`,
+# keyed by a digest of only the config subtrees they depend on: saving a new
+# Presidio strategy does not rebuild the parser chain, and vice versa.
+# Heavyweight artifacts get a small cap of their own (`max_entries`): an
+# AnalyzerEngine holds a spaCy pipeline of several hundred MB, and every
+# unsaved configuration sent to the preview endpoint builds another one, so
+# only the most recent couple are kept, not up to MAX_CACHED_ARTIFACTS.
+#
+# When a reload changes the configuration, the subscribers registered with
+# `subscribe` are notified with the new configuration and the changed top-level
+# sections. Running analyses subscribe for their duration and apply the change
+# at the next batch boundary (see LogProcessingService).
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
 import yaml
-from typing import Dict, Any, Optional
+
+from . import metrics_service
+
+ConfigListener = Callable[[Dict[str, Any], Set[str]], None]
+
+# Artifacts kept per process; several configurations can be live at once
+# (e.g. the Presidio preview endpoint builds engines for an unsaved config).
+MAX_CACHED_ARTIFACTS = 32
+
+_lock = threading.RLock()
+# config path -> (file signature, parsed config, generation)
+_config_cache: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any], int]] = {}
+_listeners: Dict[str, List[ConfigListener]] = {}
+_artifacts: 'OrderedDict[Tuple[str, str], Any]' = OrderedDict()
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+def _get_subtree(config: Dict[str, Any], key_path: str) -> Any:
+    value: Any = config
+    for key in key_path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+def subtree_digest(config: Dict[str, Any], key_paths: Sequence[str]) -> str:
+    """
+    Returns a stable digest of the given dot-separated config subtrees.
+    Key order in the YAML file does not affect it.
+    """
+    canonical = json.dumps([_get_subtree(config, path) for path in key_paths], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def get_artifact(name: str, config: Dict[str, Any], key_paths: Sequence[str],
+                 builder: Callable[[Dict[str, Any]], Any], max_entries: Optional[int] = None) -> Any:
+    """
+    Returns an object derived from the configuration, building it only if
+    the subtrees it depends on changed since it was last built.
+
+    Artifacts are shared by every caller with an equal configuration, so
+    they must be safe to use concurrently (stateless or read-only).
+
+    Args:
+        name: Identifies the kind of artifact, e.g. 'parser_chain'.
+        config: The configuration the artifact is built from.
+        key_paths: The dot-separated subtrees of `config` the builder reads.
+        builder: Builds the artifact from `config`. A None result is not cached.
+        max_entries: At most this many artifacts named `name` are kept, the
+                     least recently used being dropped first.
+
+    Returns:
+        The cached or freshly built artifact.
+    """
+    key = (name, subtree_digest(config, key_paths))
+    with _lock:
+        if key in _artifacts:
+            _artifacts.move_to_end(key)
+            metrics_service.count_cache('config_artifacts', hit=True)
+            return _artifacts[key]
+    metrics_service.count_cache('config_artifacts', hit=False)
+    # Built outside the lock: some artifacts (NLP engines) take seconds.
+    artifact = builder(config)
+    if artifact is not None:
+        with _lock:
+            _artifacts[key] = artifact
+            if max_entries is not None:
+                same_name = [cached for cached in _artifacts if cached[0] == name]
+                for cached in same_name[:-max_entries]:
+                    del _artifacts[cached]
+            while len(_artifacts) > MAX_CACHED_ARTIFACTS:
+                _artifacts.popitem(last=False)
+    return artifact
+
+def clear_caches() -> None:
+    """Drops every cached configuration and artifact (used by tests)."""
+    with _lock:
+        _config_cache.clear()
+        _artifacts.clear()
+
 
 class ConfigService:
     """
@@ -13,15 +128,81 @@ class ConfigService:
             config_path: The path to the YAML configuration file.
         """
         self.config_path = config_path
+        self._cache_key = os.path.abspath(config_path)
 
     def load_config(self) -> Dict[str, Any]:
         """
-        Loads the configuration from the YAML file.
+        Loads the configuration, from the process-wide cache when the file
+        has not changed.
 
         Returns:
-            A dictionary representing the configuration. Returns an empty
-            dictionary if the file is not found or an error occurs.
+            A private copy of the configuration. Returns an empty dictionary
+            if the file is not found or an error occurs.
+        """
+        return copy.deepcopy(self._cached_config())
+
+    def refresh(self) -> int:
+        """
+        Re-reads the file if it changed, notifying the subscribers.
+
+        Returns:
+            The configuration generation, incremented on every change.
+        """
+        self._cached_config()
+        with _lock:
+            entry = _config_cache.get(self._cache_key)
+            return entry[2] if entry else 0
+
+    def subscribe(self, listener: ConfigListener) -> None:
         """
+        Registers `listener(new_config, changed_sections)`, called (from the
+        thread that noticed the change) whenever the configuration is reloaded
+        with different content.
+        """
+        with _lock:
+            _listeners.setdefault(self._cache_key, []).append(listener)
+
+    def unsubscribe(self, listener: ConfigListener) -> None:
+        with _lock:
+            listeners = _listeners.get(self._cache_key, [])
+            if listener in listeners:
+                listeners.remove(listener)
+
+    def _cached_config(self) -> Dict[str, Any]:
+        """Returns the shared cached configuration; callers must not mutate it."""
+        signature = _file_signature(self.config_path)
+        with _lock:
+            entry = _config_cache.get(self._cache_key)
+            if entry and signature is not None and entry[0] == signature:
+                metrics_service.count_cache('config_file', hit=True)
+                return entry[1]
+            metrics_service.count_cache('config_file', hit=False)
+
+            config = self._read_config()
+            if signature is None:
+                # Keep reporting the error on every call, as before caching.
+                return config
+            previous = entry[1] if entry else None
+            generation = entry[2] if entry else 0
+            changed = self._changed_sections(previous, config) if previous is not None else set()
+            if changed:
+                generation += 1
+            _config_cache[self._cache_key] = (signature, config, generation)
+            listeners = list(_listeners.get(self._cache_key, []))
+
+        for listener in listeners if changed else []:
+            try:
+                listener(copy.deepcopy(config), changed)
+            except Exception as e:
+                print(f"Error notifying configuration listener: {e}")
+        return config
+
+    @staticmethod
+    def _changed_sections(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+        return {key for key in set(old) | set(new)
+                if subtree_digest(old, [key]) != subtree_digest(new, [key])}
+
+    def _read_config(self) -> Dict[str, Any]:
         try:
             with open(self.config_path, 'r') as f:
                 config = yaml.safe_load(f)
@@ -50,10 +231,17 @@ class ConfigService:
         try:
             with open(self.config_path, 'w') as f:
                 yaml.dump(config_data, f, sort_keys=False, default_flow_style=False)
-            return True
         except Exception as e:
             print(f"Error saving config file: {e}")
             return False
+        # A rewrite within the filesystem's timestamp granularity may keep the
+        # same signature, so force the reload (and the notifications) here.
+        with _lock:
+            entry = _config_cache.get(self._cache_key)
+            if entry:
+                _config_cache[self._cache_key] = ((-1, -1, -1), entry[1], entry[2])
+        self.refresh()
+        return True
 
     def get_value(self, key_path: str, default: Any = None) -> Any:
         """
@@ -61,12 +249,12 @@ class ConfigService:
 
         Example: get_value('presidio.analyzer.confidence_threshold')
         """
-        config = self.load_config()
+        config = self._cached_config()
         keys = key_path.split('.')
         value = config
         try:
             for key in keys:
                 value = value[key]
-            return value
+            return copy.deepcopy(value)
         except (KeyError, TypeError):
             return default
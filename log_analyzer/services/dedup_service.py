@@ -0,0 +1,172 @@
+# === DESIGN COMMENT ===
+# Exact-duplicate collapsing (`pipeline.dedup`). Firewall and syslog feeds repeat
+# the same line over and over (heartbeats, repeated denies); without this stage
+# every copy goes through the parser chain, Presidio and both Drain3 miners.
+#
+# A line is identified by a 16-byte BLAKE2b digest of its content, so the index
+# holds fixed-size keys instead of the lines themselves (at 128 bits a collision
+# is not a practical concern). Each key maps to the fully processed record of
+# the line's first occurrence (the "prototype"), or to UNPARSED when the parser
+# chain rejected it. Two scopes:
+#
+# - window: the last `window_size` distinct lines, evicted least recently seen
+#   first. Memory is bounded; repeats further apart are processed again.
+# - global: every distinct line of the run. Memory grows with the number of
+#   distinct lines, so it suits low-cardinality feeds.
+#
+# Under memory pressure (see MemoryGovernor) a window index halves its window,
+# and a global index spills to an SQLite file in the run's spill directory:
+# lookups then cost a primary-key read (a few microseconds) instead of a dict
+# access, but the index no longer grows in memory. The spill file is dropped
+# with the run (`release_spill`).
+#
+# Prototypes are only read once stored: repeats are shallow copies with their
+# own line number, so records must not be mutated after the pipeline returns them.
+
+import hashlib
+import pickle
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ..parsing.interfaces import ParsedRecord
+
+DEFAULT_WINDOW_SIZE = 10_000
+# Under memory pressure the window is not halved below this.
+MIN_WINDOW_SIZE = 1000
+SCOPES = ('window', 'global')
+EMIT_MODES = ('fanout', 'count')
+
+# Stored for lines the parser chain rejected, so they are not parsed again.
+UNPARSED = object()
+
+def line_key(content: str) -> bytes:
+    """The fixed-size index key of a line."""
+    return hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+class DedupService:
+    """Remembers the processed record of recently (or ever) seen lines."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: The `pipeline.dedup` section.
+
+        Raises:
+            ValueError: If the scope or the emit mode is unknown.
+        """
+        self.scope = config.get('scope', 'window')
+        self.emit = config.get('emit', 'fanout')
+        if self.scope not in SCOPES:
+            raise ValueError(f"Unknown dedup scope: {self.scope}. Choose from {', '.join(SCOPES)}")
+        if self.emit not in EMIT_MODES:
+            raise ValueError(f"Unknown dedup emit mode: {self.emit}. Choose from {', '.join(EMIT_MODES)}")
+        self.window_size = max(1, int(config.get('window_size', DEFAULT_WINDOW_SIZE)))
+        self._index: 'OrderedDict[bytes, Any]' = OrderedDict()
+        self.duplicates = 0
+
+    @staticmethod
+    def is_enabled(config: Dict[str, Any]) -> bool:
+        return bool(config and config.get('enabled', False))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, key: bytes) -> Optional[Any]:
+        """Returns the prototype (or UNPARSED) stored for a line, None if unseen."""
+        entry = self._index.get(key)
+        if entry is not None and self.scope == 'window':
+            self._index.move_to_end(key)
+        return entry
+
+    def put(self, key: bytes, record: Optional[ParsedRecord]) -> None:
+        """Stores the processed record of a line's first occurrence."""
+        self._index[key] = UNPARSED if record is None else record
+        if self.scope == 'window' and len(self._index) > self.window_size:
+            self._index.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forgets every line, e.g. after a configuration change."""
+        self._index.clear()
+
+    def relieve_memory(self, spill_dir: Callable[[], Path]) -> Optional[str]:
+        """
+        Halves a window index, or moves a global index to disk.
+
+        Args:
+            spill_dir: Returns the directory to spill to (created on first call).
+
+        Returns:
+            What was done, or None if there was nothing left to give back.
+        """
+        if self.scope == 'window':
+            new_size = max(MIN_WINDOW_SIZE, self.window_size // 2)
+            if new_size >= self.window_size:
+                return None
+            old_size, self.window_size = self.window_size, new_size
+            while len(self._index) > self.window_size:
+                self._index.popitem(last=False)
+            return f"window {old_size} -> {new_size}"
+        if isinstance(self._index, _SpilledIndex):
+            return None
+        spilled = _SpilledIndex(spill_dir() / f"dedup_{id(self):x}.sqlite")
+        spilled.update(self._index.items())
+        self._index = spilled
+        return f"{len(spilled)} lines spilled to disk"
+
+    def release_spill(self) -> None:
+        """Closes a spilled index and starts over in memory, at the end of a run."""
+        if isinstance(self._index, _SpilledIndex):
+            self._index.close()
+            self._index = OrderedDict()
+
+
+class _SpilledIndex:
+    """The part of the OrderedDict interface a global index uses, on an SQLite file."""
+
+    def __init__(self, path: Path):
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=OFF')
+        self._connection.execute('PRAGMA synchronous=OFF')
+        self._connection.execute('CREATE TABLE entries (key BLOB PRIMARY KEY, value BLOB) WITHOUT ROWID')
+
+    def __len__(self) -> int:
+        return self._connection.execute('SELECT count(*) FROM entries').fetchone()[0]
+
+    def get(self, key: bytes) -> Optional[Any]:
+        row = self._connection.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return UNPARSED if row[0] is None else pickle.loads(row[0])
+
+    def __setitem__(self, key: bytes, value: Any) -> None:
+        self.update([(key, value)])
+
+    def update(self, items) -> None:
+        rows = [(key, None if value is UNPARSED else pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) for key, value in items]
+        self._connection.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?)', rows)
+
+    def clear(self) -> None:
+        self._connection.execute('DELETE FROM entries')
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def collapse_occurrences(records: List[ParsedRecord]) -> List[ParsedRecord]:
+    """
+    Returns one record per distinct line of a batch, in order of first
+    occurrence, with `occurrences` set to how often the line appeared.
+    """
+    counts: Dict[str, int] = {}
+    firsts: List[ParsedRecord] = []
+    for record in records:
+        content = record.original_content
+        if content in counts:
+            counts[content] += 1
+        else:
+            counts[content] = 1
+            firsts.append(record)
+    return [record.model_copy(update={'occurrences': counts[record.original_content]}) for record in firsts]
@@ -0,0 +1,341 @@
+# === DESIGN COMMENT ===
+# Distributed runs: one input analyzed by workers on several processes or
+# nodes, for volumes a single pipeline cannot keep up with.
+#
+#   coordinator: split input -> publish tasks -----> WorkBroker (work_queue)
+#   workers:     claim task -> read byte range -> parse + Presidio -> result
+#   coordinator: results, in task order -> Drain3 (both miners) -> writers
+#
+# Parsing and anonymization are per line, so they are spread over the
+# workers; that is where the time goes. Drain3 is stateful: the template a
+# record receives depends on every line mined before it. The coordinator
+# therefore mines the merged records itself, in input order, as task results
+# arrive, so the outputs are those of a single-node run (same records, line
+# numbers and templates). Mining costs a few microseconds per line, and
+# merging starts with the first task, overlapping with the workers.
+#
+# Tasks are byte ranges of the input, cut after a newline every
+# `distributed.task_mb`. The coordinator counts the newlines once (a fast
+# scan) to give each task the number of its first line, and detects the
+# encoding once for all tasks; multi-byte-newline encodings (UTF-16/32) are
+# not split. Inputs must be visible to the workers under the same absolute
+# path (the shared file system that holds the spool). The configuration is
+# published with the run, so workers need none of their own.
+#
+# Workers heartbeat their claim while they work; a worker that dies or hangs
+# loses its task after `lease_seconds`, and the coordinator republishes it
+# (up to `max_attempts` attempts, then the run fails). Worker exceptions are
+# retried the same way. A run with no worker at all would wait forever: when no
+# task in the queue is claimed and none of the run completes for
+# `idle_timeout_seconds` (by default `IDLE_LEASES` leases), the run fails.
+#
+# Not distributed: `pipeline.dedup` (it is bound to the Drain3 state) is
+# turned off for these runs. With template anonymization or the NLP gate,
+# each worker mines the original lines of its own tasks to guide Presidio;
+# those local templates are discarded and the records mined again by the
+# coordinator.
+
+import io
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..parsing.interfaces import ParsedRecord
+from ..writers.interfaces import AbstractWriter
+from .log_processing_service import LogProcessingService, batched
+from .log_reader import detect_encoding, has_byte_newlines
+from .work_queue import DEFAULT_MAX_ATTEMPTS, Task, WorkBroker, default_worker_id
+
+DEFAULT_SPOOL_DIR = 'spool'
+DEFAULT_TASK_MB = 16
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_HEARTBEAT_SECONDS = 10.0
+DEFAULT_POLL_SECONDS = 0.5
+# Leases without any claimed task after which a run is given up (no live worker).
+IDLE_LEASES = 3
+SCAN_BLOCK_SIZE = 1024 * 1024
+
+class DistributedRunError(Exception):
+    """A task ran out of attempts, or no worker took the run's tasks."""
+
+
+class _ClaimLost(Exception):
+    """The task was taken back from this worker."""
+
+
+def split_input(path: str, task_bytes: int, encoding: str = 'utf-8') -> List[Dict[str, int]]:
+    """
+    Cuts a file into line-aligned byte ranges of about `task_bytes`.
+
+    Returns:
+        One {'start', 'end', 'first_line'} per range, in file order.
+    """
+    size = os.path.getsize(path)
+    if not has_byte_newlines(encoding) or size <= task_bytes:
+        return [{'start': 0, 'end': size, 'first_line': 1}]
+    ranges = []
+    start, first_line, lines = 0, 1, 0
+    position = 0
+    target = task_bytes
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(SCAN_BLOCK_SIZE), b''):
+            offset = 0
+            # Cut after the first newline past each target offset.
+            while position + len(block) > target:
+                cut = block.find(b'\n', max(offset, target - position))
+                if cut < 0:
+                    break
+                lines += block.count(b'\n', offset, cut + 1)
+                end = position + cut + 1
+                ranges.append({'start': start, 'end': end, 'first_line': first_line})
+                start, first_line = end, first_line + lines
+                lines, offset = 0, cut + 1
+                target = end + task_bytes
+            lines += block.count(b'\n', offset)
+            position += len(block)
+    if start < size:
+        ranges.append({'start': start, 'end': size, 'first_line': first_line})
+    return ranges
+
+def read_range(path: str, start: int, end: int, first_line: int, encoding: str) -> Iterator[Tuple[int, str]]:
+    """Yields the (line_number, content) pairs of a byte range, like `LogReader.read_lines`."""
+    with io.TextIOWrapper(io.BufferedReader(_RangeReader(path, start, end)), encoding=encoding, errors='ignore') as f:
+        for number, line in enumerate(f, first_line):
+            yield number, line.strip()
+
+
+class _RangeReader(io.RawIOBase):
+    """A raw stream over bytes [start, end) of a file."""
+
+    def __init__(self, path: str, start: int, end: int):
+        super().__init__()
+        self._file = open(path, 'rb', buffering=0)
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:self._remaining]
+        count = self._file.readinto(view)
+        self._remaining -= count
+        return count
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+def _distributed_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """The run configuration, with the stages that cannot be distributed turned off."""
+    pipeline = dict(config.get('pipeline', {}))
+    pipeline['dedup'] = {**pipeline.get('dedup', {}), 'enabled': False}
+    return {**config, 'pipeline': pipeline}
+
+
+class Coordinator:
+    """Splits inputs into tasks, then merges the workers' results into the outputs."""
+
+    def __init__(self, config: Dict[str, Any], broker: WorkBroker):
+        """
+        Args:
+            config: The full application configuration; `distributed` sizes
+                    the tasks and the retry policy.
+            broker: The work queue shared with the workers.
+        """
+        settings = config.get('distributed', {})
+        self.task_bytes = int(settings.get('task_mb', DEFAULT_TASK_MB) * 1024 * 1024)
+        self.lease_seconds = settings.get('lease_seconds', DEFAULT_LEASE_SECONDS)
+        self.poll_seconds = settings.get('poll_seconds', DEFAULT_POLL_SECONDS)
+        self.max_attempts = settings.get('max_attempts', DEFAULT_MAX_ATTEMPTS)
+        self.idle_timeout_seconds = settings.get('idle_timeout_seconds', IDLE_LEASES * self.lease_seconds)
+        self.config = _distributed_config(config)
+        self.broker = broker
+        # The coordinator only mines and writes: it does not load Presidio.
+        self.service = LogProcessingService({**self.config, 'presidio': {'enabled': False}})
+        self.schema_hints = self.service.schema_hints
+        self._tasks: List[str] = []
+
+    def run(self, input_path: str, writers: Dict[str, AbstractWriter],
+            progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Distributes the analysis of one file and writes the merged results.
+        The writers are closed on return and the run's spool files removed.
+
+        Returns:
+            The `process_records` summary, plus the number of tasks, the
+            tasks completed per worker and the retries.
+
+        Raises:
+            DistributedRunError: If a task failed `max_attempts` times, or no
+                                 worker was active for `idle_timeout_seconds`.
+        """
+        run_id = self.submit(input_path)
+        try:
+            summary = self.service.process_records(self._merged_batches(run_id), writers, progress)
+            completed = self.broker.completed(run_id)
+        finally:
+            self.broker.purge(run_id)
+        per_worker: Dict[str, int] = {}
+        for info in completed.values():
+            per_worker[info['worker_id']] = per_worker.get(info['worker_id'], 0) + 1
+        summary.pop('duplicates', None)
+        summary['tasks'] = len(completed)
+        summary['workers'] = per_worker
+        summary['retries'] = sum(info['attempt'] for info in completed.values())
+        return summary
+
+    def submit(self, input_path: str) -> str:
+        """Publishes the tasks of a file. Returns the run id, the prefix of its task ids."""
+        source_file = input_path
+        input_path = os.path.abspath(input_path)
+        encoding = detect_encoding(input_path)
+        run_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.broker.put_run(run_id, self.config)
+        self._tasks = []
+        for index, byte_range in enumerate(split_input(input_path, self.task_bytes, encoding)):
+            task_id = f"{run_id}-{index:06d}"
+            self.broker.publish(task_id, {'run_id': run_id, 'input': input_path, 'source_file': source_file,
+                                          'encoding': encoding,
+                                          'max_attempts': self.max_attempts, **byte_range})
+            self._tasks.append(task_id)
+        return run_id
+
+    def _merged_batches(self, run_id: str) -> Iterator[List[ParsedRecord]]:
+        """Yields the results of the run's tasks in task order, each as soon as it is complete."""
+        batch_size = self.service.batch_size
+        for task_id in self._tasks:
+            attempt = self._wait_for(run_id, task_id)
+            with self.broker.read_result(task_id, attempt) as f:
+                for lines in batched(f, batch_size):
+                    yield [ParsedRecord.model_validate_json(line) for line in lines]
+
+    def _wait_for(self, run_id: str, task_id: str) -> int:
+        """Waits for a task, taking back expired claims meanwhile. Returns the completed attempt."""
+        active_at = time.monotonic()
+        completed = -1
+        while True:
+            info = self.broker.completed(task_id).get(task_id)
+            if info is not None:
+                return info['attempt']
+            failed = self.broker.failed(run_id)
+            if failed:
+                failed_id, error = next(iter(failed.items()))
+                raise DistributedRunError(f"Task {failed_id} failed {self.max_attempts} times: {error}")
+            self.broker.requeue_stale(self.lease_seconds)
+            # Any claim means a live worker, possibly busy with another run.
+            now_completed = len(self.broker.completed(run_id))
+            if self.broker.claimed() or now_completed != completed:
+                active_at, completed = time.monotonic(), now_completed
+            elif self.idle_timeout_seconds is not None and time.monotonic() - active_at > self.idle_timeout_seconds:
+                raise DistributedRunError(f"No worker took a task of run {run_id} "
+                                          f"in {self.idle_timeout_seconds:g}s; are workers running?")
+            time.sleep(self.poll_seconds)
+
+
+class Worker:
+    """Claims tasks from a broker and parses and anonymizes their lines."""
+
+    def __init__(self, broker: WorkBroker, worker_id: Optional[str] = None,
+                 heartbeat_seconds: float = DEFAULT_HEARTBEAT_SECONDS, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        """
+        Args:
+            broker: The work queue shared with the coordinators.
+            worker_id: A name unique among the workers; host name and pid by default.
+            heartbeat_seconds: Interval between two renewals of a claim; keep
+                               it well below the coordinators' lease.
+            poll_seconds: Wait between two polls of an empty queue.
+        """
+        self.broker = broker
+        self.worker_id = worker_id or default_worker_id()
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self._services: Dict[str, LogProcessingService] = {}
+
+    def run(self, max_tasks: Optional[int] = None, idle_exit: Optional[float] = None,
+            stop: Optional[Any] = None) -> int:
+        """
+        Processes tasks until told to stop.
+
+        Args:
+            max_tasks: Stop after this many tasks.
+            idle_exit: Stop after the queue has been empty for this many seconds.
+            stop: An Event (threading or multiprocessing) that stops the loop when set.
+
+        Returns:
+            The number of tasks completed.
+        """
+        completed = 0
+        idle_since = time.monotonic()
+        while (max_tasks is None or completed < max_tasks) and not (stop is not None and stop.is_set()):
+            task = self.broker.claim(self.worker_id)
+            if task is None:
+                if idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                    break
+                time.sleep(self.poll_seconds)
+                continue
+            if self.process(task):
+                completed += 1
+            idle_since = time.monotonic()
+        return completed
+
+    def process(self, task: Task) -> bool:
+        """
+        Runs one claimed task and publishes its result.
+
+        Returns:
+            True if the result was accepted; False if the task failed or was
+            taken back meanwhile.
+        """
+        lost = threading.Event()
+        stop_heartbeat = threading.Event()
+
+        def heartbeat() -> None:
+            while not stop_heartbeat.wait(self.heartbeat_seconds):
+                if not self.broker.heartbeat(task):
+                    lost.set()
+                    return
+
+        beating = threading.Thread(target=heartbeat, name=f'heartbeat-{task.task_id}', daemon=True)
+        beating.start()
+        try:
+            self._run_task(task, lost)
+        except _ClaimLost:
+            print(f"Worker {self.worker_id}: task {task.task_id} was taken back, result dropped")
+            self.broker.fail(task, f"{self.worker_id}: claim lost")
+            return False
+        except Exception as e:
+            print(f"Worker {self.worker_id}: task {task.task_id} failed: {e}")
+            self.broker.fail(task, f"{self.worker_id}: {e}")
+            return False
+        finally:
+            stop_heartbeat.set()
+            beating.join()
+        return self.broker.complete(task)
+
+    def _run_task(self, task: Task, lost: threading.Event) -> None:
+        payload = task.payload
+        service = self._service(payload['run_id'])
+        lines = read_range(payload['input'], payload['start'], payload['end'], payload['first_line'], payload['encoding'])
+        non_empty_lines = ((number, content) for number, content in lines if content)
+        with self.broker.open_result(task) as result:
+            for batch in batched(non_empty_lines, service.batch_size):
+                if lost.is_set():
+                    raise _ClaimLost()
+                for record in service.anonymize_batch(batch, payload['source_file']):
+                    result.write(record.model_dump_json().encode('utf-8') + b'\n')
+
+    def _service(self, run_id: str) -> LogProcessingService:
+        """The pipeline of a run, built from its published configuration (the last run's is kept)."""
+        service = self._services.get(run_id)
+        if service is None:
+            self._services = {run_id: LogProcessingService(self.broker.get_run(run_id))}
+            service = self._services[run_id]
+        return service
@@ -1,8 +1,11 @@
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from drain3 import TemplateMiner
 from drain3.template_miner_config import TemplateMinerConfig
 
+from . import metrics_service
+from .config_service import get_artifact
+
 class Drain3Service:
     """
     A service for template mining using Drain3.
@@ -36,24 +39,47 @@ class Drain3Service:
         Returns:
             A configured TemplateMiner instance.
         """
-        miner_config = self.config.get(miner_type, {})
+        # The miner holds the mined clusters, so only its configuration is shared.
+        config = get_artifact(f'drain3_config:{miner_type}', {'drain3': self.config}, ['drain3'],
+                              lambda config: self._build_miner_config(config['drain3'], miner_type))
+        return TemplateMiner(config=config)
+
+    @staticmethod
+    def _build_miner_config(drain3_config: Dict[str, Any], miner_type: str) -> TemplateMinerConfig:
+        miner_config = drain3_config.get(miner_type, {})
 
         # Fallback to common settings if type-specific ones aren't present
         config = TemplateMinerConfig()
-        config.drain_similarity_threshold = miner_config.get('similarity_threshold', self.config.get('similarity_threshold', 0.4))
-        config.drain_depth = miner_config.get('depth', self.config.get('depth', 4))
-        config.drain_max_children = miner_config.get('max_children', self.config.get('max_children', 1000))
+        config.drain_similarity_threshold = miner_config.get('similarity_threshold', drain3_config.get('similarity_threshold', 0.4))
+        config.drain_depth = miner_config.get('depth', drain3_config.get('depth', 4))
+        config.drain_max_children = miner_config.get('max_children', drain3_config.get('max_children', 1000))
         # Set other Drain3 parameters from config as needed
+        return config
 
-        return TemplateMiner(config=config)
+    def match_template(self, message: str, miner_type: str = 'original') -> Optional[int]:
+        """
+        Returns the id of the cluster `message` matches among those mined so
+        far, or None, without adding it to the miner.
+        """
+        miner = self.original_miner if miner_type == 'original' else self.anonymized_miner
+        cluster = miner.match(message)
+        return cluster.cluster_id if cluster is not None else None
 
-    def process_batch(self, messages: List[str], miner_type: str) -> List[Dict[str, Any]]:
+    def process_batch(self, messages: List[str], miner_type: str,
+                      known_clusters: Optional[List[Optional[int]]] = None,
+                      occurrences: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         """
         Processes a batch of log messages with the specified miner.
 
         Args:
             messages: A list of log message strings to process.
             miner_type: The type of miner to use ('original' or 'anonymized').
+            known_clusters: Optional cluster id per message, for repeats of a
+                            message mined earlier: it is not mined again but
+                            counted in that cluster, with the cluster's current
+                            template (None: mine the message).
+            occurrences: Optional number of times each message occurred, all
+                         added to its cluster's size (default 1 each).
 
         Returns:
             A list of dictionaries, each containing the result for a message
@@ -66,17 +92,29 @@ class Drain3Service:
         else:
             raise ValueError(f"Invalid miner_type specified: {miner_type}")
 
+        clusters = miner.drain.id_to_cluster
         results = []
-        for message in messages:
-            try:
-                result = miner.add_log_message(message)
-                results.append({
-                    'cluster_id': result['cluster_id'],
-                    'template': result['template_mined'],
-                    'change_type': result['change_type'],
-                })
-            except Exception as e:
-                print(f"Error processing message with Drain3 ({miner_type}): {e}")
-                results.append({'error': str(e)})
+        with metrics_service.timed_stage(f'drain3_{miner_type}', items=len(messages)):
+            for index, message in enumerate(messages):
+                weight = occurrences[index] if occurrences else 1
+                cluster_id = known_clusters[index] if known_clusters else None
+                # A cluster evicted by `max_clusters` is simply mined again.
+                cluster = clusters.get(cluster_id) if cluster_id is not None else None
+                if cluster is not None:
+                    cluster.size += weight
+                    results.append({'cluster_id': cluster_id, 'template': cluster.get_template(), 'change_type': 'none'})
+                    continue
+                try:
+                    result = miner.add_log_message(message)
+                    if weight > 1:
+                        clusters.get(result['cluster_id']).size += weight - 1
+                    results.append({
+                        'cluster_id': result['cluster_id'],
+                        'template': result['template_mined'],
+                        'change_type': result['change_type'],
+                    })
+                except Exception as e:
+                    print(f"Error processing message with Drain3 ({miner_type}): {e}")
+                    results.append({'error': str(e)})
 
         return results
@@ -0,0 +1,238 @@
+# === DESIGN COMMENT ===
+# Field-level anonymization of structured records (`drain3.anonymization`).
+#
+# For a record whose parser can render its format back (JSON, CSV, CEF,
+# key=value: parsers with `supports_rebuild`; key=value lines only when the
+# pairs are the whole line and no key repeats, see `can_rebuild`), the fields
+# are anonymized one by one into `parsed_data_anonymized` and the anonymized
+# line is rebuilt from them, instead of running Presidio's NER over the whole
+# raw line:
+#
+# - fields in `always_anonymize` are always replaced. A field of a known type
+#   (IP, MAC, host or device name, path, ...) gets the type's placeholder from
+#   `centralized_regex.anonymization` without any NLP; `methods.hash` and
+#   `methods.mask` fields are hashed or masked (with `methods.hash.pseudonyms`,
+#   hashed fields get their token in the shared pseudonym table instead, see
+#   pseudonym_store); any other is given to Presidio and, if Presidio finds
+#   nothing, replaced by `<FIELD_NAME>`.
+#   Pseudonyms are taken under the Presidio entity of the field's type
+#   (PSEUDONYM_ENTITIES), so a user gets the same token in `user_id`,
+#   `srcuser` and in free text anonymized by Presidio as PERSON.
+# - other fields are kept when their type carries no PII (timestamps, ports,
+#   process ids) or their value is too short to hold any (booleans, numbers
+#   and numeric strings of up to 6 digits; longer numbers are checked as
+#   text). `methods` fields are replaced as above; the remaining values,
+#   typed or not, are given to Presidio, unless `scan_other_fields` is off:
+#   only `always_anonymize` decides which fields get a type's placeholder.
+#
+# Log fields are highly repetitive (the same hosts, users and actions over and
+# over), so results are memoized per (field, value) in a bounded LRU memo
+# (`memo_size`) shared by the anonymize workers. Records of other parsers
+# (regex, fallback) still go through full-text anonymization.
+
+import hashlib
+import re
+from typing import Any, Dict, Optional
+
+from ..parsing.interfaces import AbstractParser, ParsedRecord
+from . import metrics_service
+from .lru_memo import LRUMemo
+from .pseudonym_store import PseudonymStore, shared_store
+
+DEFAULT_MEMO_SIZE = 50_000
+
+# Field name -> type, for the usual log field names; `field_detection.name_patterns`
+# adds to it.
+FIELD_TYPES = {
+    'ip': 'ip_address', 'ip_address': 'ip_address', 'srcip': 'ip_address', 'dstip': 'ip_address',
+    'src_ip': 'ip_address', 'dst_ip': 'ip_address', 'source_ip': 'ip_address', 'dest_ip': 'ip_address',
+    'src': 'ip_address', 'dst': 'ip_address', 'client_ip': 'ip_address', 'remote_addr': 'ip_address',
+    'mac': 'mac_address', 'mac_address': 'mac_address', 'srcmac': 'mac_address', 'dstmac': 'mac_address',
+    'email': 'email', 'path': 'path', 'file_path': 'path', 'filename': 'path', 'source_file': 'path',
+    'url': 'url', 'uuid': 'uuid',
+    'hostname': 'hostname', 'host': 'hostname', 'shost': 'hostname', 'dhost': 'hostname',
+    'devid': 'device_id', 'device_id': 'device_id',
+    'devname': 'device_name', 'device_name': 'device_name', 'fortinet_device': 'device_name',
+    'tz': 'timezone', 'vd': 'vd',
+    'timestamp': 'timestamp', 'time': 'timestamp', 'date': 'timestamp', 'datetime': 'timestamp',
+    'eventtime': 'timestamp', 'rt': 'timestamp',
+    'port': 'port', 'srcport': 'port', 'dstport': 'port', 'spt': 'port', 'dpt': 'port',
+    'pid': 'process_id', 'process_id': 'process_id',
+    'user': 'user_id', 'user_id': 'user_id', 'userid': 'user_id', 'uid': 'user_id', 'username': 'user_id',
+    'srcuser': 'user_id', 'dstuser': 'user_id', 'suser': 'user_id', 'duser': 'user_id',
+}
+
+# Type -> the Presidio entity its pseudonyms are taken under (the field type,
+# uppercased, for the others).
+PSEUDONYM_ENTITIES = {
+    'ip_address': 'IP_ADDRESS', 'mac_address': 'MAC_ADDRESS', 'email': 'EMAIL_ADDRESS', 'url': 'URL',
+    'user_id': 'PERSON',
+}
+
+# Type -> `centralized_regex.anonymization` placeholder key (and its default).
+TYPE_PLACEHOLDERS = {
+    'ip_address': ('placeholder_ip', '<IP>'),
+    'mac_address': ('placeholder_mac', '<MAC>'),
+    'email': ('placeholder_email', '<EMAIL>'),
+    'path': ('placeholder_path', '<FILE_PATH>'),
+    'url': ('placeholder_url', '<URL>'),
+    'uuid': ('placeholder_uuid', '<UUID>'),
+    'hostname': ('placeholder_hostname', '<HOSTNAME>'),
+    'device_id': ('placeholder_devid', '<DEVICE_ID>'),
+    'device_name': ('placeholder_devname', '<DEVICE_NAME>'),
+    'timezone': ('placeholder_tz', '<TIMEZONE>'),
+    'vd': ('placeholder_vd', '<VD>'),
+    'timestamp': ('placeholder_timestamp', '<TIMESTAMP>'),
+}
+
+# Types whose values are kept unless the field is in `always_anonymize`.
+NON_PII_TYPES = frozenset({'timestamp', 'port', 'process_id'})
+
+# Counters, byte counts, status codes: too short for a phone or card number.
+_SHORT_NUMBER = re.compile(r'[+-]?\d{1,6}(?:\.\d+)?')
+
+
+class FieldAnonymizationService:
+    """Anonymizes the fields of structured records and rebuilds their lines."""
+
+    def __init__(self, config: Dict[str, Any], presidio_service: Optional[Any] = None, language: str = 'en'):
+        """
+        Args:
+            config: The full application configuration.
+            presidio_service: The PresidioService for values without a known
+                              type, or None to use placeholders only.
+            language: The language passed to Presidio.
+        """
+        anonymization_config = config.get('drain3', {}).get('anonymization', {})
+        self.always_anonymize = frozenset(anonymization_config.get('always_anonymize') or [])
+        methods = anonymization_config.get('methods', {})
+        hash_config = methods.get('hash', {})
+        mask_config = methods.get('mask', {})
+        self.hash_fields = frozenset(hash_config.get('fields') or [])
+        self.hash_algorithm = hash_config.get('algorithm', 'sha256')
+        self.hash_salt = str(hash_config.get('salt', ''))
+        self.pseudonyms: Optional[PseudonymStore] = None
+        if self.hash_fields and hash_config.get('pseudonyms', False):
+            self.pseudonyms = shared_store(config.get('presidio', {}).get('anonymizer', {})
+                                           .get('strategy_config', {}).get('pseudonym', {}))
+        self.mask_fields = frozenset(mask_config.get('fields') or [])
+        self.mask_pattern = mask_config.get('pattern', '***')
+        self.scan_other_fields = anonymization_config.get('scan_other_fields', True)
+
+        self.field_types = dict(FIELD_TYPES)
+        for detection in (config.get('field_detection', {}).get('name_patterns') or {}).values():
+            field_type = (detection or {}).get('field_type')
+            for name in (detection or {}).get('patterns', []) if field_type else []:
+                self.field_types.setdefault(name.lower(), field_type)
+        placeholders = config.get('centralized_regex', {}).get('anonymization', {})
+        self.placeholders = {field_type: placeholders.get(key, default)
+                             for field_type, (key, default) in TYPE_PLACEHOLDERS.items()}
+
+        self.presidio_service = presidio_service
+        self.language = language
+        self._memo = LRUMemo(anonymization_config.get('memo_size', DEFAULT_MEMO_SIZE))
+
+    @staticmethod
+    def is_enabled(config: Dict[str, Any]) -> bool:
+        anonymization_config = config.get('drain3', {}).get('anonymization', {})
+        return bool(anonymization_config.get('enabled', False) and anonymization_config.get('field_level', False))
+
+    def shrink_memo(self) -> Optional[str]:
+        """Halves the value memo under memory pressure (see MemoryGovernor)."""
+        return self._memo.shrink()
+
+    def field_type(self, field: str) -> Optional[str]:
+        return self.field_types.get(field.lower())
+
+    def pseudonym_entity(self, field: str) -> str:
+        """The entity the pseudonyms of a field are numbered under."""
+        field_type = self.field_type(field)
+        if field_type is None:
+            return field.upper()
+        return PSEUDONYM_ENTITIES.get(field_type, field_type.upper())
+
+    def anonymize_record(self, record: ParsedRecord, parser: Optional[AbstractParser]) -> bool:
+        """
+        Fills `parsed_data_anonymized` and `presidio_anonymized` of a record.
+
+        Returns:
+            False, leaving the record untouched, when its parser cannot
+            rebuild its lines; the caller anonymizes the full text instead.
+        """
+        if parser is None or not record.parsed_data or not parser.can_rebuild(record.original_content):
+            return False
+        stats = [0, 0]  # memo hits, misses
+        data = {field: self._anonymize(field, value, stats) for field, value in record.parsed_data.items()}
+        line = parser.rebuild_line(record.original_content, data)
+        metrics_service.count_cache('field_anonymization', hit=True, amount=stats[0])
+        metrics_service.count_cache('field_anonymization', hit=False, amount=stats[1])
+        if line is None:
+            return False
+        record.parsed_data_anonymized = data
+        record.presidio_anonymized = line
+        record.presidio_metadata = []
+        return True
+
+    def _anonymize(self, field: str, value: Any, stats: list) -> Any:
+        # Nested JSON: each leaf is anonymized under its own key.
+        if isinstance(value, dict):
+            return {key: self._anonymize(key, item, stats) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._anonymize(field, item, stats) for item in value]
+        forced = field in self.always_anonymize
+        # JSON numbers are checked as text: a phone number or an ID may be one.
+        text = value if isinstance(value, str) else (
+            str(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None)
+        if not forced:
+            if not text or _SHORT_NUMBER.fullmatch(text):
+                return value
+            if self.field_type(field) in NON_PII_TYPES:
+                return value
+            if not self.scan_other_fields and not self._has_fixed_method(field):
+                return value
+        elif value is None or value == '':
+            return value
+
+        key = (field, text if text is not None else str(value))
+        cached = self._memo.get(key)
+        if cached is not None:
+            stats[0] += 1
+            return cached
+        stats[1] += 1
+        result = self.anonymize_value(field, key[1], forced)
+        self._memo.put(key, result)
+        return result
+
+    def _has_fixed_method(self, field: str) -> bool:
+        """Whether a field is hashed or masked, without Presidio."""
+        return field in self.hash_fields or field in self.mask_fields
+
+    def anonymize_value(self, field: str, value: str, forced: bool = False) -> str:
+        """
+        Anonymizes one field value (uncached).
+
+        Args:
+            field: The field name.
+            value: The value, as a string.
+            forced: Whether the field is in `always_anonymize`, i.e. must not
+                    be returned unchanged.
+        """
+        if field in self.hash_fields:
+            if self.pseudonyms is not None:
+                return self.pseudonyms.token(self.pseudonym_entity(field), value)
+            digest = hashlib.new(self.hash_algorithm, (self.hash_salt + value).encode('utf-8'))
+            return digest.hexdigest()[:16]
+        if field in self.mask_fields:
+            return self.mask_pattern
+        field_type = self.field_type(field)
+        if forced and field_type in self.placeholders:
+            return self.placeholders[field_type]
+        anonymized = value
+        if self.presidio_service is not None:
+            anonymized = self.presidio_service.anonymize_text(value, language=self.language)
+        if forced and anonymized == value:
+            return f"<{field.upper()}>"
+        return anonymized
+
+    def clear(self) -> None:
+        self._memo.clear()
@@ -0,0 +1,167 @@
+# === DESIGN COMMENT ===
+# Analysis runs can take minutes, so the web layer submits them as background
+# jobs instead of holding the HTTP request open. The JobManager owns a small
+# thread pool (`jobs.max_concurrent`) and an in-memory registry of recent jobs.
+#
+# A job knows its output paths *before* it starts: the writers are created at
+# submission time, which lets the download endpoints start streaming a file
+# while the pipeline is still appending to it. The job also keeps a reference
+# to its writers so a streamer can ask how many trailing bytes are still
+# provisional (see JSONArrayWriter.trailer_size).
+#
+# The registry is bounded (`jobs.max_history`): the oldest finished jobs are
+# forgotten first. Their files stay in `outputs/` until the retention policy
+# removes them.
+
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ..writers.interfaces import AbstractWriter
+
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+DEFAULT_MAX_HISTORY = 100
+
+class JobStatus:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+
+class AnalysisJob:
+    """The state of one background analysis run."""
+
+    def __init__(self, input_file: str, formats: List[str], writers: Dict[str, AbstractWriter],
+                 outputs: Optional[Dict[str, Path]] = None):
+        """
+        Args:
+            writers: The open writers the run will fill.
+            outputs: Existing outputs of a job that needs no run (a result cache hit).
+        """
+        self.job_id = uuid.uuid4().hex
+        self.input_file = input_file
+        self.formats = formats
+        self.writers = writers
+        self.outputs = outputs if outputs is not None else {name: writer.output_path for name, writer in writers.items()}
+        self.status = JobStatus.QUEUED
+        self.summary: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+        # Lines read and records written so far, see `record_progress`.
+        self.progress = {'lines': 0, 'records': 0}
+        # The UploadSpool of a job fed by an upload (see upload_service).
+        self.upload: Optional[Any] = None
+
+    def record_progress(self, lines: int, records: int) -> None:
+        """A `process_file` progress callback: accumulates the counts of each batch."""
+        self.progress = {'lines': self.progress['lines'] + lines, 'records': self.progress['records'] + records}
+
+    @property
+    def is_finished(self) -> bool:
+        return self.done.is_set()
+
+    def provisional_tail_bytes(self, output_name: str) -> int:
+        """
+        Returns how many bytes at the end of an output may still be rewritten
+        by its writer. Zero once the job has finished.
+        """
+        if self.is_finished:
+            return 0
+        return getattr(self.writers.get(output_name), 'trailer_size', 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'input_file': self.input_file,
+            'formats': self.formats,
+            'outputs': {name: path.name for name, path in self.outputs.items()},
+            'progress': self.progress,
+            'summary': self.summary,
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+        if self.upload is not None:
+            data['upload'] = self.upload.to_dict()
+        return data
+
+
+class JobManager:
+    """Runs analysis jobs on a bounded thread pool and tracks their state."""
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT_JOBS, max_history: int = DEFAULT_MAX_HISTORY):
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='analysis-job')
+        self._jobs: 'OrderedDict[str, AnalysisJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._completion_callbacks: List[Callable[[AnalysisJob], None]] = []
+
+    def on_job_finished(self, callback: Callable[[AnalysisJob], None]) -> None:
+        """Registers a callback run (in the job thread) after every job."""
+        self._completion_callbacks.append(callback)
+
+    def submit(self, job: AnalysisJob, run: Callable[[AnalysisJob], Dict[str, Any]]) -> AnalysisJob:
+        """
+        Registers the job and schedules `run(job)`, whose return value
+        becomes the job summary.
+        """
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._forget_old_jobs()
+        self._executor.submit(self._execute, job, run)
+        return job
+
+    def complete(self, job: AnalysisJob, summary: Dict[str, Any]) -> AnalysisJob:
+        """Registers a job whose outputs already exist (e.g. served from the result cache) as completed."""
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._forget_old_jobs()
+        job.summary = summary
+        job.status = JobStatus.COMPLETED
+        self._finish(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_jobs(self) -> List[AnalysisJob]:
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.is_finished]
+
+    def _execute(self, job: AnalysisJob, run: Callable[[AnalysisJob], Dict[str, Any]]) -> None:
+        job.status = JobStatus.RUNNING
+        try:
+            job.summary = run(job)
+            job.status = JobStatus.COMPLETED
+        except Exception as e:
+            print(traceback.format_exc())
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        finally:
+            self._finish(job)
+
+    def _finish(self, job: AnalysisJob) -> None:
+        job.finished_at = time.time()
+        job.writers = {}
+        job.done.set()
+        for callback in self._completion_callbacks:
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"Error in job completion callback: {e}")
+
+    def _forget_old_jobs(self) -> None:
+        """Drops the oldest finished jobs beyond `max_history`. Caller holds the lock."""
+        excess = len(self._jobs) - self.max_history
+        for job_id in [jid for jid, job in self._jobs.items() if job.is_finished][:max(0, excess)]:
+            del self._jobs[job_id]
@@ -0,0 +1,594 @@
+# === DESIGN COMMENT ===
+# The LogProcessingService runs the whole analysis pipeline in a single pass:
+#
+#   LogReader -> parser chain -> Drain3 (original) -> Presidio -> Drain3 (anonymized) -> writers
+#
+# Lines are processed in batches of `pipeline.batch_size`. Each finished batch is
+# handed to every selected writer at once, each writer on its own thread, so one
+# run produces all the requested reports (e.g. both LogPPT variants plus JSON)
+# without repeating the expensive NER pass. While the writers serialize batch N,
+# the main thread already parses and anonymizes batch N+1; before batch N+1 is
+# handed out we wait for batch N, so every writer still sees batches in order.
+#
+# Drain3 is fed batch by batch. Because `add_log_message` is incremental, each
+# record receives the template current at the time it was mined, exactly as in
+# the previous all-in-memory implementation.
+#
+# Configuration hot reload: when built with a ConfigService, a run subscribes to
+# configuration changes and re-checks the file once per batch (a single stat).
+# A change is applied between batches: the parser chain and the Presidio engines
+# come from the shared artifact cache, so only the sections that changed are
+# rebuilt. The Drain3 miners are kept, since their clusters are the state of the
+# run; Drain3 settings apply from the next run.
+#
+# Workers (`pipeline.workers`): `anonymize` threads share each batch's Presidio
+# calls (spaCy releases the GIL for much of its work); `write` caps the writer
+# threads (default: one per writer). Parsing stays on the pipeline thread: it
+# is pure Python, so extra threads would only contend for the GIL. For CPU
+# parallelism across inputs, run several files in separate processes (the CLI's
+# `--jobs`).
+#
+# Memory budget (`pipeline.memory_budget_mb`, see MemoryGovernor): after each
+# batch the resident set size is checked; while it exceeds the budget the batch
+# size is halved, the dedup index shrinks or spills to disk, the anonymization
+# caches shrink and the writers flush their buffers. With
+# `pipeline.memory.tracemalloc` the peak memory is attributed to stages and
+# code locations in the summary (`memory`).
+#
+# Presidio (and with it spaCy) is imported only when anonymization is enabled,
+# which keeps start-up fast for parse/mine-only runs. With
+# `drain3.anonymization.field_level`, records of structured parsers are
+# anonymized field by field (see FieldAnonymizationService) and only the other
+# records go through full-text Presidio. With `presidio.nlp_gate`, lines that
+# cannot contain a NER entity skip spaCy (see NlpGate); the run summary reports
+# how many did. With `presidio.template_anonymization`, the other records are
+# anonymized along the Drain3 template their original line was just mined
+# into (see TemplateAnonymizationService).
+#
+# Duplicate lines (`pipeline.dedup`, see DedupService): when enabled, only the
+# first occurrence of a line is parsed and anonymized; later ones (in the same
+# batch, or found in the dedup index) reuse its record. Drain3 mines each
+# distinct line of a batch once and adds the repeats to its cluster, and a line
+# already mined in an earlier batch gets its cluster's current template. With
+# `emit: fanout` every line still yields a record; with `emit: count` writers
+# that support it receive one record per distinct line of each batch with an
+# `occurrences` count, the others still get every line.
+#
+# Timestamps (`timestamp_normalization`, see TimestampService): right after
+# parsing, each record gets its time as epoch seconds, read with a layout
+# learned once per file and parser. The stage runs on fresh records only, so
+# duplicate lines reuse the timestamp of their first occurrence.
+#
+# Template labels (`template_labeling`, see TemplateLabelingService): after
+# both miners, each record gets the LLM category of its template. Only the
+# batch's templates missing from the label caches reach the model.
+#
+# Distributed runs (see distributed_service) split the same steps: workers
+# call `anonymize_batch` (parse + anonymize) on their tasks, and the
+# coordinator feeds the merged records to `process_records`, which mines them
+# (`mine_batch`) and fans them out to the writers like `process_lines`.
+
+import contextvars
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ..parsing.interfaces import LogEntry, ParsedRecord
+from ..parsing.parser_factory import get_parser_chain, get_schema_hints, iter_parsers
+from ..writers.interfaces import AbstractWriter
+from . import metrics_service
+from .config_service import ConfigService
+from .dedup_service import UNPARSED, DedupService, collapse_occurrences, line_key
+from .drain3_service import Drain3Service
+from .field_anonymization_service import FieldAnonymizationService
+from .log_reader import LogReader
+from .memory_governor import MemoryGovernor
+from .template_anonymization_service import TemplateAnonymizationService
+from .template_labeling_service import TemplateLabelingService
+from .timestamp_service import TimestampService
+
+DEFAULT_BATCH_SIZE = 1000
+MIN_BATCH_SIZE = 50
+
+def batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yields successive lists of at most `size` items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class LogProcessingService:
+    """
+    Orchestrates read -> parse -> anonymize -> mine -> write for one analysis run.
+    """
+    def __init__(self, config: Dict[str, Any], batch_size: Optional[int] = None,
+                 config_service: Optional[ConfigService] = None):
+        """
+        Args:
+            config: The full application configuration.
+            batch_size: Number of lines per batch. Defaults to `pipeline.batch_size`.
+            config_service: If given, configuration changes saved while a run
+                            is in progress are applied between batches.
+        """
+        pipeline_config = config.get('pipeline', {})
+        self.batch_size = batch_size or pipeline_config.get('batch_size', DEFAULT_BATCH_SIZE)
+        workers = pipeline_config.get('workers', {})
+        self.anonymize_workers = max(1, int(workers.get('anonymize', 1)))
+        self.write_workers = int(workers.get('write', 0))
+        self.memory = MemoryGovernor(config)
+        self.config_service = config_service
+        self._anonymize_executor: Optional[ThreadPoolExecutor] = None
+        self.config_reloads = 0
+        self._pending_config: Optional[Dict[str, Any]] = None
+        self._pending_lock = threading.Lock()
+
+        dedup_config = pipeline_config.get('dedup', {})
+        self.dedup = DedupService(dedup_config) if DedupService.is_enabled(dedup_config) else None
+
+        timestamp_config = config.get('timestamp_normalization', {})
+        self.timestamps = TimestampService(timestamp_config) if TimestampService.is_enabled(timestamp_config) else None
+        labeling_config = config.get('template_labeling', {})
+        self.labeling = (TemplateLabelingService(labeling_config)
+                         if TemplateLabelingService.is_enabled(labeling_config) else None)
+
+        self.log_reader = LogReader(config)
+        self.drain3_service = Drain3Service(config)
+        self._apply_config(config)
+        self.schema_hints = get_schema_hints(self.parser_chain)
+
+    def _apply_config(self, config: Dict[str, Any]) -> None:
+        """(Re)binds the configuration-derived stages, from the artifact cache."""
+        self.config = config
+        self.parser_chain = get_parser_chain(config)
+        self.parser_names = [parser.parser_name for parser in iter_parsers(self.parser_chain)]
+        self.parsers_by_name = {parser.parser_name: parser for parser in iter_parsers(self.parser_chain)}
+        self.presidio_service = self._create_presidio_service(config.get('presidio', {}))
+        self.language = config.get('presidio', {}).get('analyzer', {}).get('languages', ['en'])[0]
+        self.field_anonymizer = (FieldAnonymizationService(config, self.presidio_service, self.language)
+                                 if self.presidio_service is not None and FieldAnonymizationService.is_enabled(config)
+                                 else None)
+        template_config = config.get('presidio', {}).get('template_anonymization', {})
+        self.template_anonymizer = (TemplateAnonymizationService(template_config, self.presidio_service, self.language)
+                                    if self.presidio_service is not None
+                                    and TemplateAnonymizationService.is_enabled(template_config) else None)
+        if self.dedup is not None:
+            # The stored records were parsed and anonymized with the old settings.
+            self.dedup.clear()
+
+    @staticmethod
+    def _create_presidio_service(presidio_config: Dict[str, Any]):
+        """Returns a PresidioService, or None when anonymization is disabled."""
+        if not presidio_config or not presidio_config.get('enabled', False):
+            return None
+        from .presidio_service import PresidioService  # Deferred: imports spaCy.
+        service = PresidioService(presidio_config)
+        return service if service.is_enabled else None
+
+    def _on_config_changed(self, config: Dict[str, Any], changed_sections: Set[str]) -> None:
+        with self._pending_lock:
+            self._pending_config = config
+
+    def _apply_pending_config(self) -> None:
+        """Applies a configuration reload notified since the previous batch."""
+        if self.config_service is None:
+            return
+        self.config_service.refresh()
+        with self._pending_lock:
+            config, self._pending_config = self._pending_config, None
+        if config is not None:
+            self._apply_config(config)
+            self.config_reloads += 1
+
+    def process_file(self, input_path: str, writers: Dict[str, AbstractWriter],
+                     progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Runs the pipeline on a file and closes the writers when done.
+
+        Returns:
+            A summary of the run (see `process_lines`).
+        """
+        return self.process_lines(self.log_reader.read_lines(input_path), writers,
+                                  source_file=input_path, progress=progress)
+
+    def process_stream(self, open_stream: Callable[[], BinaryIO], writers: Dict[str, AbstractWriter],
+                       source_file: Optional[str] = None,
+                       progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Runs the pipeline on a binary stream, e.g. an upload still in progress
+        (see `LogReader.read_stream`), and closes the writers when done.
+
+        Returns:
+            A summary of the run (see `process_lines`).
+        """
+        return self.process_lines(self.log_reader.read_stream(open_stream), writers,
+                                  source_file=source_file, progress=progress)
+
+    def process_lines(self, lines: Iterable[Tuple[int, str]], writers: Dict[str, AbstractWriter],
+                      source_file: Optional[str] = None,
+                      progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Runs the pipeline on (line_number, content) pairs, fanning out every
+        processed batch to all writers. The writers are closed on return.
+
+        Args:
+            progress: Called after every batch with (lines, records) of that batch.
+
+        Returns:
+            A summary dict with the record count, the elapsed time, the
+            path of each output and the per-stage metrics of the run.
+        """
+        non_empty_lines = ((number, content) for number, content in lines if content)
+        return self._run_scoped(self._adaptive_batches(non_empty_lines),
+                                lambda batch: self.process_batch(batch, source_file), writers, progress)
+
+    def process_records(self, batches: Iterable[List[ParsedRecord]], writers: Dict[str, AbstractWriter],
+                        progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """
+        Mines batches of records already parsed and anonymized elsewhere (see
+        `anonymize_batch`) and fans them out to the writers, which are closed
+        on return. The distributed coordinator merges its workers' results
+        through it.
+
+        Returns:
+            A summary of the run (see `process_lines`).
+        """
+        return self._run_scoped(iter(batches), self.mine_batch, writers, progress)
+
+    def _run_scoped(self, batches: Iterator[List[Any]], process: Callable[[List[Any]], List[ParsedRecord]],
+                    writers: Dict[str, AbstractWriter],
+                    progress: Optional[Callable[[int, int], None]]) -> Dict[str, Any]:
+        with metrics_service.run_scope(metrics_service.RunMetrics()) as run_metrics:
+            summary = self._run(batches, process, writers, progress)
+        if metrics_service.is_enabled():
+            summary['metrics'] = run_metrics.summary()
+        return summary
+
+    def _run(self, batches: Iterator[List[Any]], process: Callable[[List[Any]], List[ParsedRecord]],
+             writers: Dict[str, AbstractWriter], progress: Optional[Callable[[int, int], None]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        records_processed = 0
+
+        executor = ThreadPoolExecutor(max_workers=self.write_workers or max(1, len(writers)), thread_name_prefix='writer')
+        self._anonymize_executor = (ThreadPoolExecutor(max_workers=self.anonymize_workers, thread_name_prefix='anonymize')
+                                    if self.anonymize_workers > 1 else None)
+        pending = []
+        if self.config_service is not None:
+            self.config_service.subscribe(self._on_config_changed)
+        self.memory.start()
+        try:
+            while True:
+                read_started = time.perf_counter()
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                metrics_service.observe_stage('read', time.perf_counter() - read_started, items=len(batch))
+
+                self._apply_pending_config()
+                records = process(batch)
+                records_processed += len(records)
+                self._wait_for(pending)
+                # The writers are idle here, so they can flush under memory pressure.
+                self._enforce_memory_budget(writers)
+                # Writer threads run in a copy of this context, so their timings
+                # are attributed to this run.
+                pending = [executor.submit(contextvars.copy_context().run, self._write, name, writer, batch_records)
+                           for name, writer, batch_records in self._records_per_writer(writers, records)]
+                if progress is not None:
+                    progress(len(batch), len(records))
+            self._wait_for(pending)
+            self._wait_for([executor.submit(contextvars.copy_context().run, self._close, name, writer)
+                            for name, writer in writers.items()])
+        finally:
+            if self.config_service is not None:
+                self.config_service.unsubscribe(self._on_config_changed)
+            executor.shutdown(wait=True)
+            if self._anonymize_executor is not None:
+                self._anonymize_executor.shutdown(wait=True)
+                self._anonymize_executor = None
+            for writer in writers.values():
+                writer.close()
+            if self.dedup is not None:
+                self.dedup.release_spill()
+            self.memory.finish()
+
+        summary = {
+            'records': records_processed,
+            'elapsed_seconds': round(time.perf_counter() - started, 3),
+            'config_reloads': self.config_reloads,
+            'outputs': {name: str(writer.output_path) for name, writer in writers.items()},
+        }
+        if self.dedup is not None:
+            summary['duplicates'] = self.dedup.duplicates
+        if self.timestamps is not None:
+            summary['timestamps'] = self.timestamps.report()
+        if self.labeling is not None:
+            summary['template_labels'] = self.labeling.report()
+        if self.presidio_service is not None and self.presidio_service.nlp_gate is not None:
+            summary['nlp_gate'] = self.presidio_service.nlp_gate.report()
+        if self.memory.enabled:
+            summary['memory'] = self.memory.report({'drain3_clusters': {
+                miner_type: len(miner.drain.clusters) for miner_type, miner in
+                (('original', self.drain3_service.original_miner), ('anonymized', self.drain3_service.anonymized_miner))}})
+        return summary
+
+    def _records_per_writer(self, writers: Dict[str, AbstractWriter],
+                            records: List[ParsedRecord]) -> Iterator[Tuple[str, AbstractWriter, List[ParsedRecord]]]:
+        """Pairs each writer with the batch it receives: collapsed when it counts occurrences."""
+        collapsed = None
+        for name, writer in writers.items():
+            if self.dedup is not None and self.dedup.emit == 'count' and writer.supports_occurrences:
+                if collapsed is None:
+                    collapsed = collapse_occurrences(records)
+                yield name, writer, collapsed
+            else:
+                yield name, writer, records
+
+    def _adaptive_batches(self, lines: Iterable[Tuple[int, str]]) -> Iterator[List[Tuple[int, str]]]:
+        """Like `batched`, but reads `self.batch_size` anew for every batch."""
+        iterator = iter(lines)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _enforce_memory_budget(self, writers: Dict[str, AbstractWriter]) -> None:
+        """Gives memory back, cheapest first, while the process is above its budget."""
+        if not self.memory.over_budget():
+            return
+        dedup, template_anonymizer, field_anonymizer = self.dedup, self.template_anonymizer, self.field_anonymizer
+        relievers: Dict[str, Callable[[MemoryGovernor], Optional[str]]] = {'batch_size': self._shrink_batch}
+        if dedup is not None:
+            relievers['dedup'] = lambda governor: dedup.relieve_memory(lambda: governor.spill_dir)
+        if template_anonymizer is not None:
+            relievers['template_cache'] = lambda governor: template_anonymizer.shrink_cache()
+        if field_anonymizer is not None:
+            relievers['field_memo'] = lambda governor: field_anonymizer.shrink_memo()
+        for name, writer in writers.items():
+            relievers[f'writer_{name}'] = lambda governor, writer=writer: writer.relieve_memory()
+        self.memory.relieve(relievers)
+
+    def _shrink_batch(self, governor: MemoryGovernor) -> Optional[str]:
+        if self.batch_size <= MIN_BATCH_SIZE:
+            return None
+        old_size, self.batch_size = self.batch_size, max(MIN_BATCH_SIZE, self.batch_size // 2)
+        return f"{old_size} -> {self.batch_size} lines"
+
+    def _write(self, name: str, writer: AbstractWriter, records: List[ParsedRecord]) -> None:
+        with self.memory.stage(f'write_{name}'), metrics_service.timed_stage(f'write_{name}', items=len(records)):
+            writer.write_batch(records)
+
+    @staticmethod
+    def _close(name: str, writer: AbstractWriter) -> None:
+        with metrics_service.timed_stage(f'write_{name}', items=0):
+            writer.close()
+
+    @staticmethod
+    def _wait_for(futures: List[Any]) -> None:
+        """Waits for the futures and re-raises the first writer error, if any."""
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    def process_batch(self, lines: List[Tuple[int, str]], source_file: Optional[str] = None) -> List[ParsedRecord]:
+        """
+        Parses, anonymizes and mines a batch of lines.
+
+        Args:
+            lines: (line_number, content) pairs.
+            source_file: The file the lines come from, stored on each record.
+
+        Returns:
+            The fully processed records, in input order.
+        """
+        if self.dedup is not None:
+            return self._process_batch_dedup(lines, source_file)
+        records = [record for record in self._parse(lines, source_file) if record is not None]
+
+        # The original lines are mined first: anonymization can use their templates.
+        self._mine(records, 'original')
+        with self.memory.stage('anonymize'):
+            self._anonymize(records)
+        self._mine(records, 'anonymized')
+        self._label(records)
+        metrics_service.count_records(len(records))
+        return records
+
+    def anonymize_batch(self, lines: List[Tuple[int, str]], source_file: Optional[str] = None) -> List[ParsedRecord]:
+        """
+        Parses and anonymizes a batch of lines without keeping their Drain3
+        results: the work of a distributed worker, whose records are mined by
+        the coordinator (`mine_batch`). The original lines are still mined
+        locally when template anonymization or the NLP gate needs templates.
+        """
+        records = [record for record in self._parse(lines, source_file) if record is not None]
+        presidio_service = self.presidio_service
+        if self.template_anonymizer is not None or (presidio_service is not None and presidio_service.nlp_gate is not None):
+            self._mine(records, 'original')
+        with self.memory.stage('anonymize'):
+            self._anonymize(records)
+        for record in records:
+            record.drain3_original = {}
+        return records
+
+    def mine_batch(self, records: List[ParsedRecord]) -> List[ParsedRecord]:
+        """Mines records returned by `anonymize_batch` into both Drain3 miners, in order."""
+        self._mine(records, 'original')
+        self._mine(records, 'anonymized')
+        self._label(records)
+        metrics_service.count_records(len(records))
+        return records
+
+    def _mine(self, records: List[ParsedRecord], miner_type: str) -> None:
+        """Stores each record's result from the 'original' or 'anonymized' miner."""
+        with self.memory.stage(f'drain3_{miner_type}'):
+            if miner_type == 'original':
+                results = self.drain3_service.process_batch([r.original_content for r in records], 'original')
+                for record, original in zip(records, results):
+                    record.drain3_original = original
+            else:
+                results = self.drain3_service.process_batch([r.presidio_anonymized or "" for r in records], 'anonymized')
+                for record, anonymized in zip(records, results):
+                    record.drain3_anonymized = anonymized
+
+    def _label(self, records: List[ParsedRecord]) -> None:
+        if self.labeling is not None:
+            with self.memory.stage('label'), metrics_service.timed_stage('label', items=len(records)):
+                self.labeling.label_records(records)
+
+    def _parse(self, lines: List[Tuple[int, str]], source_file: Optional[str]) -> List[Optional[ParsedRecord]]:
+        """Runs the parser chain on each line; None where every parser declined it."""
+        parsed: List[Optional[ParsedRecord]] = []
+        with self.memory.stage('parse'), metrics_service.timed_stage('parse', items=len(lines)):
+            for line_number, content in lines:
+                log_entry = LogEntry(line_number=line_number, content=content, source_file=source_file)
+                parsed.append(self.parser_chain.handle(log_entry))
+        records = [record for record in parsed if record is not None]
+        self._count_parser_results(records, len(lines))
+        if self.timestamps is not None:
+            with self.memory.stage('timestamps'), metrics_service.timed_stage('timestamps', items=len(records)):
+                self.timestamps.normalize(records)
+        return parsed
+
+    def _process_batch_dedup(self, lines: List[Tuple[int, str]], source_file: Optional[str]) -> List[ParsedRecord]:
+        """`process_batch` doing the heavy work once per distinct line."""
+        dedup = self.dedup
+        keys = [line_key(content) for _, content in lines]
+        # The distinct lines of the batch, in order of first occurrence:
+        # key -> [record (UNPARSED if rejected, None until parsed), occurrences, fresh].
+        distinct: Dict[bytes, List[Any]] = {}
+        fresh_lines: List[Tuple[int, str]] = []
+        for line, key in zip(lines, keys):
+            entry = distinct.get(key)
+            if entry is not None:
+                entry[1] += 1
+                continue
+            known = dedup.get(key)
+            distinct[key] = [known, 1, known is None]
+            if known is None:
+                fresh_lines.append(line)
+        dedup.duplicates += len(lines) - len(fresh_lines)
+        metrics_service.count_cache('dedup', hit=True, amount=len(lines) - len(fresh_lines))
+        metrics_service.count_cache('dedup', hit=False, amount=len(fresh_lines))
+
+        fresh_entries = [entry for entry in distinct.values() if entry[2]]
+        fresh_records = self._parse(fresh_lines, source_file)
+        for entry, record in zip(fresh_entries, fresh_records):
+            entry[0] = UNPARSED if record is None else record
+
+        mined = [(key, entry) for key, entry in distinct.items() if entry[0] is not UNPARSED]
+        occurrences = [entry[1] for _, entry in mined]
+        with self.memory.stage('drain3_original'):
+            original_results = self.drain3_service.process_batch(
+                [entry[0].original_content for _, entry in mined], 'original',
+                [None if entry[2] else entry[0].drain3_original.get('cluster_id') for _, entry in mined], occurrences)
+        for (_, (record, _, fresh)), original in zip(mined, original_results):
+            if fresh:
+                record.drain3_original = original
+        with self.memory.stage('anonymize'):
+            self._anonymize([record for record in fresh_records if record is not None])
+        with self.memory.stage('drain3_anonymized'):
+            anonymized_results = self.drain3_service.process_batch(
+                [entry[0].presidio_anonymized or "" for _, entry in mined], 'anonymized',
+                [None if entry[2] else entry[0].drain3_anonymized.get('cluster_id') for _, entry in mined], occurrences)
+
+        # Per distinct line, the record of its first occurrence in this batch and
+        # the one its repeats are copied from (Drain3 reports no change for those).
+        first: Dict[bytes, ParsedRecord] = {}
+        repeat: Dict[bytes, ParsedRecord] = {}
+        for (key, (record, _, fresh)), original, anonymized in zip(mined, original_results, anonymized_results):
+            if fresh:
+                record.drain3_original = original
+                record.drain3_anonymized = anonymized
+                first[key] = record
+            else:
+                first[key] = record.model_copy(update={'drain3_original': original, 'drain3_anonymized': anonymized})
+            repeat[key] = record.model_copy(update={
+                'drain3_original': {**original, 'change_type': 'none'},
+                'drain3_anonymized': {**anonymized, 'change_type': 'none'},
+            })
+            dedup.put(key, repeat[key])
+        for key, entry in distinct.items():
+            if entry[2] and entry[0] is UNPARSED:
+                dedup.put(key, None)
+
+        records: List[ParsedRecord] = []
+        for (line_number, _), key in zip(lines, keys):
+            record = first.pop(key, None)
+            if record is None:
+                record = repeat.get(key)
+                if record is None:
+                    continue
+            if record.line_number != line_number or record.source_file != source_file:
+                record = record.model_copy(update={'line_number': line_number, 'source_file': source_file})
+            records.append(record)
+        self._label(records)
+        metrics_service.count_records(len(records))
+        return records
+
+    def _anonymize(self, records: List[ParsedRecord]) -> None:
+        """
+        Fills `presidio_anonymized` (and, for structured records anonymized
+        field by field, `parsed_data_anonymized`), on the anonymize workers
+        if configured.
+        """
+        presidio_service = self.presidio_service
+        if presidio_service is None:
+            for record in records:
+                record.presidio_anonymized = record.original_content
+                record.presidio_metadata = []
+            return
+
+        field_anonymizer = self.field_anonymizer
+        template_anonymizer = self.template_anonymizer
+        parsers = self.parsers_by_name
+
+        def anonymize(chunk: List[ParsedRecord]) -> None:
+            for record in chunk:
+                if field_anonymizer is not None and field_anonymizer.anonymize_record(record, parsers.get(record.parser_name)):
+                    continue
+                record.presidio_metadata = []
+                anonymized = None
+                if template_anonymizer is not None:
+                    anonymized = template_anonymizer.anonymize(record.original_content, record.drain3_original.get('template'))
+                if anonymized is None:
+                    # The line's Drain3 cluster lets the NLP gate learn per template.
+                    anonymized = presidio_service.anonymize_text(
+                        record.original_content, template_key=record.drain3_original.get('cluster_id'),
+                        language=self.language)
+                record.presidio_anonymized = anonymized
+
+        executor = self._anonymize_executor
+        if executor is None or len(records) < 2:
+            anonymize(records)
+            return
+        # One contiguous chunk per worker, each in its own copy of the context
+        # so that the Presidio timings are attributed to this run.
+        size = -(-len(records) // self.anonymize_workers)
+        self._wait_for([executor.submit(contextvars.copy_context().run, anonymize, records[start:start + size])
+                        for start in range(0, len(records), size)])
+
+    def _count_parser_results(self, records: List[ParsedRecord], lines: int) -> None:
+        """
+        Derives per-parser hits and misses from which parser produced each
+        record: every parser before it in the chain declined the line.
+        """
+        if not metrics_service.is_enabled():
+            return
+        winners = Counter(record.parser_name for record in records)
+        results: Dict[Tuple[str, str], int] = {}
+        for position, name in enumerate(self.parser_names):
+            hits = winners.get(name, 0)
+            # Lines that reached this parser: all, minus those taken earlier.
+            reached = lines - sum(winners.get(earlier, 0) for earlier in self.parser_names[:position])
+            if reached <= 0:
+                break
+            results[(name, 'hit')] = hits
+            results[(name, 'miss')] = reached - hits
+        metrics_service.count_parser_results(results)
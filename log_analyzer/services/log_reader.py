@@ -1,6 +1,29 @@
-from typing import Iterator, Tuple, Dict, Any
+import codecs
+import io
+import time
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Tuple
 import chardet
 
+from . import metrics_service
+
+# Lines read between two updates of the read counters.
+COUNT_FLUSH_LINES = 10_000
+# Bytes inspected by the encoding detection.
+DETECTION_BYTES = 32 * 1024
+
+def detect_encoding(path: str) -> str:
+    """Detects the encoding of a file from its first 32KB, as `LogReader` does."""
+    with open(path, 'rb') as f:
+        return chardet.detect(f.read(DETECTION_BYTES))['encoding'] or 'utf-8'
+
+def has_byte_newlines(encoding: str) -> bool:
+    """
+    Whether lines of this encoding end with a b'\\n' byte that never occurs
+    inside a character, so a file can be cut or entered at any newline.
+    False for UTF-16 and UTF-32.
+    """
+    return not codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32'))
+
 class LogReader:
     """A service for reading log files with robust encoding detection."""
 
@@ -25,20 +48,41 @@ class LogReader:
             A tuple containing the line number (1-indexed) and the line content.
         """
         try:
-            # Detect encoding
-            with open(file_path, 'rb') as f:
-                raw_data = f.read(32 * 1024) # Read first 32KB to detect encoding
-                result = chardet.detect(raw_data)
-                encoding = result['encoding'] if result['encoding'] else 'utf-8'
-
-            # Read and yield lines with the detected encoding
-            with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-                for i, line in enumerate(f, 1):
-                    yield i, line.strip()
-
+            yield from self._read(lambda: open(file_path, 'rb'))
         except FileNotFoundError:
             print(f"Error: File not found at {file_path}")
             return
         except Exception as e:
             print(f"Error reading file {file_path}: {e}")
             return
+
+    def read_stream(self, open_stream: Callable[[], BinaryIO]) -> Iterator[Tuple[int, str]]:
+        """
+        Like `read_lines`, for a binary stream such as an upload still in
+        progress. `open_stream` is called twice (encoding detection, then
+        reading); the detection waits for the first 32KB or the end of the
+        stream. Errors propagate, so an interrupted stream fails the run.
+        """
+        return self._read(open_stream)
+
+    def _read(self, open_stream: Callable[[], BinaryIO]) -> Iterator[Tuple[int, str]]:
+        # Detect encoding
+        with open_stream() as f:
+            raw_data = f.read(DETECTION_BYTES) # Read first 32KB to detect encoding
+            started = time.perf_counter()
+            result = chardet.detect(raw_data)
+            metrics_service.observe_stage('chardet', time.perf_counter() - started)
+            encoding = result['encoding'] if result['encoding'] else 'utf-8'
+
+        # Read and yield lines with the detected encoding
+        with io.TextIOWrapper(open_stream(), encoding=encoding, errors='ignore') as f:
+            counted = 0
+            i = 0
+            try:
+                for i, line in enumerate(f, 1):
+                    yield i, line.strip()
+                    if i - counted >= COUNT_FLUSH_LINES:
+                        metrics_service.count_read(i - counted, 0)
+                        counted = i
+            finally:
+                metrics_service.count_read(i - counted, f.buffer.tell() if not f.closed else 0)
@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+class LRUMemo:
+    """
+    A bounded mapping that evicts the least recently used entry, safe to share
+    between the anonymize workers. Values are computed outside the lock, so two
+    threads may compute the same one; the later `put` wins.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max(1, int(max_size))
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the value stored for `key`, None if there is none."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def shrink(self, min_size: int = 1000) -> Optional[str]:
+        """
+        Halves the capacity (not below `min_size`) and drops the least
+        recently used entries above it, under memory pressure.
+
+        Returns:
+            What was given back, or None if the memo is already at `min_size`.
+        """
+        with self._lock:
+            new_size = max(min_size, self.max_size // 2)
+            if new_size >= self.max_size:
+                return None
+            dropped = max(0, len(self._entries) - new_size)
+            for _ in range(dropped):
+                self._entries.popitem(last=False)
+            old_size, self.max_size = self.max_size, new_size
+        return f"capacity {old_size} -> {new_size}, {dropped} entries dropped"
@@ -0,0 +1,235 @@
+# === DESIGN COMMENT ===
+# Memory governor of an analysis run. Reading and writing stream, but some
+# state grows with the input: the dedup index (`scope: global` remembers
+# every distinct line), the anonymization caches, the Parquet row group being
+# buffered, Drain3's clusters. On a pathological input that can take down the
+# shared web container, so a run can be given a budget
+# (`pipeline.memory_budget_mb`, resident set size of the process).
+#
+# After every batch the pipeline checks the RSS (one read of /proc). Over
+# budget, it calls its *relievers*, cheapest first, and each one reports what
+# it gave back:
+#
+#   batch_size          halves the batch size (down to MIN_BATCH_SIZE)
+#   dedup               a window index halves its window; a global index
+#                       spills to an SQLite file in the run's spill directory
+#   *_cache / *_memo    the anonymization caches drop their older half
+#   writer_<format>     writers flush what they buffer (Parquet row groups)
+#
+# then collects garbage. CPython seldom returns freed memory to the OS, so the
+# RSS can stay above the budget after a relief: the next one waits until the
+# RSS has grown by another RELIEF_STEP of the budget, instead of shrinking
+# everything again on every batch. Pressure events are counted and the last few are
+# kept, with their actions, in the run summary (`memory`). Drain3's clusters
+# are the state of the run and are not touched; their count is reported.
+#
+# Attribution (`pipeline.memory.tracemalloc.enabled`): tracemalloc is started
+# for the run and every stage boundary (parse, each Drain3 miner, anonymize,
+# each writer) reads the traced peak since the previous boundary and resets
+# it, so each stage gets the highest peak seen while it ran. When a stage sets
+# a new high-water mark (by more than 10%), a snapshot is taken and its top
+# allocation sites (file:line) are reported with the stage. Writers overlap
+# with the next batch: an interval goes to the stage that closes it. tracemalloc
+# is process-wide, so concurrent jobs in the web app share the measurements;
+# it also slows allocation-heavy code by 2-4x, hence off by default.
+
+import gc
+import os
+import shutil
+import tempfile
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .resource_usage import current_rss_bytes
+
+DEFAULT_TOP_LOCATIONS = 10
+DEFAULT_TRACE_FRAMES = 1
+# Pressure events kept in the summary.
+MAX_REPORTED_EVENTS = 20
+# A new peak must exceed the previous one by this factor to be snapshotted again.
+SNAPSHOT_GROWTH = 1.1
+# Growth of the RSS, as a fraction of the budget, that triggers the next relief.
+RELIEF_STEP = 0.1
+MB = 1024 * 1024
+
+_NO_STAGE = nullcontext()
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return round(value / MB, 1) if value is not None else None
+
+def _location(filename: str) -> str:
+    """Shortens a traced file name to the part after site-packages or the working directory."""
+    marker = f'site-packages{os.sep}'
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    cwd = os.getcwd() + os.sep
+    return filename[len(cwd):] if filename.startswith(cwd) else filename
+
+
+class MemoryGovernor:
+    """Enforces a run's memory budget and attributes its peak memory to stages."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: The full application configuration; reads
+                    `pipeline.memory_budget_mb` and `pipeline.memory`.
+        """
+        pipeline_config = config.get('pipeline', {})
+        memory_config = pipeline_config.get('memory', {})
+        budget_mb = pipeline_config.get('memory_budget_mb')
+        self.budget_bytes = int(budget_mb * MB) if budget_mb else None
+        self.spill_root = memory_config.get('spill_dir') or None
+        trace_config = memory_config.get('tracemalloc', {})
+        self.trace = bool(trace_config.get('enabled', False))
+        self.trace_frames = int(trace_config.get('frames', DEFAULT_TRACE_FRAMES))
+        self.top_locations = int(trace_config.get('top', DEFAULT_TOP_LOCATIONS))
+
+        self.rss_peak: Optional[int] = None
+        self.pressure_events = 0
+        self.events: List[Dict[str, Any]] = []
+        self.spilled = False
+        self._relieved_at: Optional[int] = None
+        self._spill_dir: Optional[Path] = None
+        self._started_tracing = False
+        self._stage_peaks: Dict[str, int] = {}
+        self._peak: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_bytes is not None or self.trace
+
+    def start(self) -> None:
+        """Begins a run: starts tracemalloc if attribution is enabled."""
+        self.rss_peak = None
+        self.pressure_events = 0
+        self.events = []
+        self.spilled = False
+        self._relieved_at = None
+        self._stage_peaks = {}
+        self._peak = None
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._started_tracing = True
+        if self.trace:
+            tracemalloc.reset_peak()
+
+    def finish(self) -> None:
+        """Ends a run: stops tracemalloc (if started here) and removes the spill directory."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    @property
+    def spill_dir(self) -> Path:
+        """The run's directory for spilled state, created on first use."""
+        if self._spill_dir is None:
+            if self.spill_root:
+                os.makedirs(self.spill_root, exist_ok=True)
+            self._spill_dir = Path(tempfile.mkdtemp(prefix='log_analyzer_spill_', dir=self.spill_root))
+            self.spilled = True
+        return self._spill_dir
+
+    def over_budget(self) -> bool:
+        """
+        Reads the RSS, tracks its peak, and tells whether it exceeds the
+        budget (and has grown by RELIEF_STEP since the last relief).
+        """
+        if not self.enabled:
+            return False
+        rss = current_rss_bytes()
+        if rss is None:
+            return False
+        if self.rss_peak is None or rss > self.rss_peak:
+            self.rss_peak = rss
+        if self.budget_bytes is None or rss <= self.budget_bytes:
+            return False
+        return self._relieved_at is None or rss > self._relieved_at + self.budget_bytes * RELIEF_STEP
+
+    def relieve(self, relievers: Dict[str, Callable[['MemoryGovernor'], Optional[str]]]) -> Dict[str, str]:
+        """
+        Runs the relievers, in order, then collects garbage.
+
+        Args:
+            relievers: Name -> callable receiving this governor (for its
+                       `spill_dir`) and returning a description of what it
+                       freed, or None if it had nothing to give back.
+
+        Returns:
+            Name -> description of the relievers that acted.
+        """
+        rss = current_rss_bytes()
+        actions = {}
+        for name, relieve in relievers.items():
+            try:
+                action = relieve(self)
+            except Exception as e:
+                print(f"Memory reliever {name} failed: {e}")
+                continue
+            if action:
+                actions[name] = action
+        gc.collect()
+        self._relieved_at = current_rss_bytes()
+        self.pressure_events += 1
+        if len(self.events) < MAX_REPORTED_EVENTS:
+            self.events.append({'rss_mb': _mb(rss), 'after_mb': _mb(self._relieved_at), 'actions': actions})
+        return actions
+
+    def stage(self, name: str):
+        """Context manager marking a stage for tracemalloc attribution; free when tracing is off."""
+        return self._traced_stage(name) if self.trace else _NO_STAGE
+
+    @contextmanager
+    def _traced_stage(self, name: str) -> Iterator[None]:
+        try:
+            yield
+        finally:
+            if tracemalloc.is_tracing():
+                self._close_interval(name)
+
+    def _close_interval(self, name: str) -> None:
+        with self._lock:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            if peak > self._stage_peaks.get(name, 0):
+                self._stage_peaks[name] = peak
+            if self._peak is None or peak > self._peak['bytes'] * SNAPSHOT_GROWTH:
+                self._peak = {'stage': name, 'bytes': peak, 'top': self._top_locations()}
+
+    def _top_locations(self) -> List[Dict[str, Any]]:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+        return [{'location': f"{_location(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                 'size_mb': _mb(stat.size), 'blocks': stat.count}
+                for stat in snapshot.statistics('lineno')[:self.top_locations]]
+
+    def report(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """The `memory` section of the run summary."""
+        report: Dict[str, Any] = {
+            'budget_mb': _mb(self.budget_bytes),
+            'rss_peak_mb': _mb(self.rss_peak),
+            'pressure_events': self.pressure_events,
+            'events': self.events,
+            'spilled': self.spilled,
+        }
+        if extra:
+            report.update(extra)
+        if self.trace:
+            with self._lock:
+                report['tracemalloc'] = {
+                    'stages': {name: {'peak_mb': _mb(peak)}
+                               for name, peak in sorted(self._stage_peaks.items(), key=lambda item: -item[1])},
+                    'peak': ({'stage': self._peak['stage'], 'mb': _mb(self._peak['bytes']), 'top': self._peak['top']}
+                             if self._peak is not None else None),
+                }
+        return report
@@ -0,0 +1,264 @@
+# === DESIGN COMMENT ===
+# Built-in pipeline instrumentation, without a client library dependency.
+#
+# Every measurement goes to two places:
+# 1.  The process-wide REGISTRY, rendered in the Prometheus text exposition
+#     format by the web app's `/metrics` endpoint.
+# 2.  The RunMetrics of the analysis in progress, if any, which becomes the
+#     `metrics` section of the job summary. The current run is carried in a
+#     context variable, so the instrumented services (LogReader, PresidioService,
+#     the config cache...) do not need a reference to it. Work handed to other
+#     threads must run in a copied context (`contextvars.copy_context().run`).
+#
+# Overhead: stages are timed per batch where possible (parse, Drain3, writers)
+# and per line only where a line costs milliseconds anyway (Presidio). An
+# observation is a perf_counter pair, a bisect and a dict update under a lock.
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from a per-line NER call to a large writer batch.
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, labels: Tuple[str, ...] = ()) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Tuple[str, ...] = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Observation counts per bucket, plus their sum, per label set."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple[str, ...] = (), count: int = 1) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += count
+            series[1] += value * count
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(list(self.buckets) + [float('inf')], counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                    bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % le)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """A named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, documentation, labelnames, buckets))
+
+    def _get_or_create(self, name: str, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'log_analyzer_stage_seconds', 'Time spent per pipeline stage call.', ['stage'])
+LINES_READ = REGISTRY.counter('log_analyzer_lines_read_total', 'Lines read from input files.')
+BYTES_READ = REGISTRY.counter('log_analyzer_bytes_read_total', 'Bytes of input files read.')
+RECORDS = REGISTRY.counter('log_analyzer_records_total', 'Records produced by the pipeline.')
+PARSER_RESULTS = REGISTRY.counter(
+    'log_analyzer_parser_results_total', 'Parser chain attempts per parser, by result (hit/miss).',
+    ['parser', 'result'])
+CACHE_REQUESTS = REGISTRY.counter(
+    'log_analyzer_cache_requests_total', 'Cache lookups by cache and result (hit/miss).', ['cache', 'result'])
+NLP_GATE_LINES = REGISTRY.counter(
+    'log_analyzer_nlp_gate_lines_total', 'Lines checked by the Presidio NLP gate, by decision (ner/skipped).',
+    ['decision'])
+
+_enabled = True
+
+def set_enabled(enabled: bool) -> None:
+    """Turns instrumentation on or off process-wide (`metrics.enabled`)."""
+    global _enabled
+    _enabled = bool(enabled)
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class RunMetrics:
+    """The measurements of a single analysis run, summarized in its result."""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.parsers: Dict[str, Dict[str, int]] = {}
+        self.caches: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'stages': {
+                    stage: {'calls': int(calls), 'items': int(items), 'seconds': round(seconds, 6)}
+                    for stage, (calls, items, seconds) in sorted(self.stages.items())
+                },
+                'counters': dict(self.counters),
+                'parsers': {name: dict(results) for name, results in self.parsers.items()},
+                'caches': {
+                    name: {**results, 'hit_rate': round(results['hit'] / max(1, results['hit'] + results['miss']), 4)}
+                    for name, results in self.caches.items()
+                },
+            }
+
+
+_current_run: ContextVar[Optional[RunMetrics]] = ContextVar('log_analyzer_run_metrics', default=None)
+
+@contextmanager
+def run_scope(run: RunMetrics) -> Iterator[RunMetrics]:
+    """Makes `run` the target of the measurements taken in this context."""
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+def observe_stage(stage: str, seconds: float, items: int = 1) -> None:
+    """Records one call of a stage that processed `items` lines or records."""
+    if not _enabled:
+        return
+    STAGE_SECONDS.observe(seconds, (stage,))
+    run = _current_run.get()
+    if run is not None:
+        with run._lock:
+            totals = run.stages.setdefault(stage, [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += items
+            totals[2] += seconds
+
+@contextmanager
+def timed_stage(stage: str, items: int = 1) -> Iterator[None]:
+    """Times the enclosed block as one call of `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started, items)
+
+def _count(counter: Counter, key: str, amount: float) -> None:
+    counter.inc(amount)
+    run = _current_run.get()
+    if run is not None:
+        with run._lock:
+            run.counters[key] = run.counters.get(key, 0) + amount
+
+def count_read(lines: int, bytes_read: int) -> None:
+    if not _enabled:
+        return
+    _count(LINES_READ, 'lines_read', lines)
+    _count(BYTES_READ, 'bytes_read', bytes_read)
+
+def count_records(records: int) -> None:
+    if _enabled:
+        _count(RECORDS, 'records', records)
+
+def count_parser_results(results: Dict[Tuple[str, str], int]) -> None:
+    """Adds per-parser attempt counts, keyed by (parser name, 'hit' | 'miss')."""
+    if not _enabled:
+        return
+    run = _current_run.get()
+    for (parser, result), amount in results.items():
+        PARSER_RESULTS.inc(amount, (parser, result))
+        if run is not None:
+            with run._lock:
+                per_parser = run.parsers.setdefault(parser, {'hit': 0, 'miss': 0})
+                per_parser[result] += amount
+
+def count_cache(cache: str, hit: bool, amount: int = 1) -> None:
+    if not _enabled or amount <= 0:
+        return
+    result = 'hit' if hit else 'miss'
+    CACHE_REQUESTS.inc(amount, (cache, result))
+    run = _current_run.get()
+    if run is not None:
+        with run._lock:
+            run.caches.setdefault(cache, {'hit': 0, 'miss': 0})[result] += amount
+
+def count_nlp_gate(skipped: bool, amount: int = 1) -> None:
+    """Counts lines the NLP gate sent to NER or let skip it."""
+    if not _enabled or amount <= 0:
+        return
+    decision = 'skipped' if skipped else 'ner'
+    NLP_GATE_LINES.inc(amount, (decision,))
+    run = _current_run.get()
+    if run is not None:
+        with run._lock:
+            key = f'nlp_gate_{decision}'
+            run.counters[key] = run.counters.get(key, 0) + amount
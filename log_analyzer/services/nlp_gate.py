@@ -0,0 +1,145 @@
+# === DESIGN COMMENT ===
+# NLP gate (`presidio.nlp_gate`): decides per line whether Presidio has to run
+# the spaCy pipeline, the most expensive part of `anonymize_text`.
+#
+# The NER entities (PERSON, LOCATION, ORGANIZATION, NRP) are names, and in the
+# languages we support names are written capitalized. Machine-generated lines
+# (key=value pairs, numbers, addresses, lowercase messages) usually contain no
+# capitalized word other than well-known log vocabulary (levels, months,
+# "Accepted", "Connection", ...). A line without any other capitalized word of
+# `min_word_length` letters is sent to the pattern recognizers only, with an
+# NLP artifact holding the tokens and lemmas but no entities. DATE_TIME, the remaining NER entity, is matched
+# on such lines with the timestamp shapes in `date_time_patterns` instead, so
+# timestamps are still replaced consistently.
+#
+# With `learn_templates`, the pipeline passes the Drain3 cluster a line
+# matches. Once `min_samples` lines of a template went through NER without any
+# NER entity, its lines skip NER even when they have capitalized words (e.g.
+# "Server started"); one line in `recheck_every` is still checked, and a single
+# NER hit sends the template back to NER for good.
+#
+# `report()` gives the share of lines that skipped NER; the recall of the gate
+# against the full path is measured by `python -m benchmarks.nlp_gate_recall`.
+
+import re
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+DEFAULT_MIN_WORD_LENGTH = 3
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_RECHECK_EVERY = 200
+
+# Capitalized words that are log vocabulary rather than names.
+DEFAULT_IGNORE_WORDS = frozenset(word.lower() for word in (
+    'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Sept', 'Oct', 'Nov', 'Dec',
+    'January', 'February', 'March', 'April', 'June', 'July', 'August', 'September', 'October',
+    'November', 'December', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun', 'Monday', 'Tuesday',
+    'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday',
+    'Info', 'Information', 'Debug', 'Trace', 'Notice', 'Warn', 'Warning', 'Error', 'Critical',
+    'Alert', 'Emergency', 'Fatal', 'Severe',
+    'Accept', 'Accepted', 'Allow', 'Allowed', 'Deny', 'Denied', 'Drop', 'Dropped', 'Block', 'Blocked',
+    'Close', 'Closed', 'Closing', 'Open', 'Opened', 'Timeout', 'Reset', 'Success', 'Successful',
+    'Failed', 'Failure', 'Invalid', 'Unknown', 'Connection', 'Connected', 'Disconnected',
+    'Received', 'Sent', 'Started', 'Starting', 'Stopped', 'Stopping', 'Created', 'Deleted', 'Removed',
+    'Updated', 'New', 'Session', 'User', 'Login', 'Logout', 'Logon', 'Authentication', 'Password',
+    'Request', 'Response', 'Server', 'Client', 'Service', 'Process', 'Kernel', 'System', 'Traffic',
+    'Exception', 'Traceback', 'File', 'Line', 'True', 'False', 'None', 'Null', 'Event', 'Events',
+    'Security', 'Audit', 'Receiving', 'Sending', 'Running', 'Terminating', 'Terminated',
+))
+
+# Timestamp shapes standing in for spaCy's DATE_TIME on lines that skip NER.
+DEFAULT_DATE_TIME_PATTERNS = (
+    r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)?',
+    r'\b\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?\b',
+    r'\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2}\b',
+    r'\b\d{1,2}/(?:\d{1,2}|[A-Z][a-z]{2})/\d{2,4}\b',
+)
+
+# A run of letters, in any script.
+_WORD = re.compile(r'[^\W\d_]+')
+
+
+class NlpGate:
+    """Token-shape (and optionally per-template) prefilter for NER."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: The `presidio.nlp_gate` section.
+        """
+        self.min_word_length = int(config.get('min_word_length', DEFAULT_MIN_WORD_LENGTH))
+        self.ignore_words = DEFAULT_IGNORE_WORDS | {word.lower() for word in config.get('ignore_words') or []}
+        self.learn_templates = bool(config.get('learn_templates', False))
+        self.min_samples = max(1, int(config.get('min_samples', DEFAULT_MIN_SAMPLES)))
+        self.recheck_every = max(1, int(config.get('recheck_every', DEFAULT_RECHECK_EVERY)))
+        self.date_time_patterns = [re.compile(pattern) for pattern in
+                                   config.get('date_time_patterns') or DEFAULT_DATE_TIME_PATTERNS]
+        self.lines = 0
+        self.skipped = 0
+        # Template key -> [lines checked with NER, lines with a NER entity, lines skipped since the last check]
+        self._templates: Dict[Hashable, List[int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_enabled(config: Dict[str, Any]) -> bool:
+        return bool(config and config.get('enabled', False))
+
+    def has_name_shape(self, text: str) -> bool:
+        """Whether the line has a capitalized word that could start a name."""
+        for match in _WORD.finditer(text):
+            word = match.group()
+            if len(word) < self.min_word_length or not word[0].isupper() or not word[1:].islower():
+                continue
+            # A key of a key=value pair is not a name.
+            if text[match.end():match.end() + 1] == '=':
+                continue
+            if word.lower() not in self.ignore_words:
+                return True
+        return False
+
+    def needs_ner(self, text: str, template_key: Optional[Hashable] = None) -> bool:
+        """Decides whether `text` goes through the spaCy pipeline, and counts the decision."""
+        needed = self.has_name_shape(text)
+        if needed and self.learn_templates and template_key is not None:
+            with self._lock:
+                state = self._templates.get(template_key)
+                if state is not None and state[0] >= self.min_samples and state[1] == 0:
+                    state[2] += 1
+                    needed = state[2] >= self.recheck_every
+                    if needed:
+                        state[2] = 0
+        with self._lock:
+            self.lines += 1
+            if not needed:
+                self.skipped += 1
+        return needed
+
+    def observe(self, template_key: Optional[Hashable], found_ner_entity: bool) -> None:
+        """Records the outcome of a NER run for a line of a template."""
+        if not self.learn_templates or template_key is None:
+            return
+        with self._lock:
+            state = self._templates.setdefault(template_key, [0, 0, 0])
+            state[0] += 1
+            if found_ner_entity:
+                state[1] += 1
+
+    def date_time_spans(self, text: str) -> List[Tuple[int, int]]:
+        """The timestamp spans of a line; earlier patterns win where matches overlap."""
+        spans: List[Tuple[int, int]] = []
+        for pattern in self.date_time_patterns:
+            for match in pattern.finditer(text):
+                start, end = match.span()
+                if start < end and not any(start < s_end and s_start < end for s_start, s_end in spans):
+                    spans.append((start, end))
+        return sorted(spans)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'lines': self.lines,
+                'skipped': self.skipped,
+                'skip_rate': round(self.skipped / self.lines, 4) if self.lines else 0.0,
+                'templates_skipped': sum(1 for checked, hits, _ in self._templates.values()
+                                         if checked >= self.min_samples and hits == 0),
+            }
@@ -0,0 +1,99 @@
+import shutil
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+DEFAULT_MAX_AGE_HOURS = 168
+DEFAULT_MAX_TOTAL_MB = 10_240
+
+class OutputRetentionService:
+    """
+    Keeps the output directory bounded in age and size.
+
+    Every entry of the directory (a report file, or a Parquet dataset
+    directory) is one unit: entries older than `max_age_hours` are removed,
+    then the oldest remaining entries until the total is under
+    `max_total_mb`. Outputs of running jobs are never touched. Hidden
+    entries are skipped, except stale writer spool files (`.*.spool`) left
+    behind by a crashed run.
+    """
+    def __init__(self, output_dir: str, max_age_hours: Optional[float] = DEFAULT_MAX_AGE_HOURS,
+                 max_total_mb: Optional[float] = DEFAULT_MAX_TOTAL_MB):
+        """
+        Args:
+            output_dir: The directory holding the analysis outputs.
+            max_age_hours: Maximum age of an output; None disables the limit.
+            max_total_mb: Maximum total size of the directory; None disables the limit.
+        """
+        self.output_dir = Path(output_dir)
+        self.max_age_seconds = max_age_hours * 3600 if max_age_hours is not None else None
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024) if max_total_mb is not None else None
+
+    def enforce(self, protected_paths: Iterable[Path] = ()) -> List[Path]:
+        """
+        Applies the retention policy.
+
+        Args:
+            protected_paths: Outputs that must be kept (e.g. of running jobs).
+
+        Returns:
+            The removed paths.
+        """
+        if not self.output_dir.is_dir():
+            return []
+
+        protected: Set[Path] = {Path(p).resolve() for p in protected_paths}
+        now = time.time()
+        removed: List[Path] = []
+        entries: List[Tuple[float, int, Path]] = []
+
+        for entry in self.output_dir.iterdir():
+            if entry.resolve() in protected:
+                continue
+            try:
+                modified, size = self._stat(entry)
+            except FileNotFoundError:
+                continue
+            expired = self.max_age_seconds is not None and now - modified > self.max_age_seconds
+            if entry.name.startswith('.'):
+                if expired and entry.suffix == '.spool' and self._remove(entry):
+                    removed.append(entry)
+                continue
+            if expired and self._remove(entry):
+                removed.append(entry)
+                continue
+            entries.append((modified, size, entry))
+
+        if self.max_total_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            for modified, size, entry in sorted(entries, key=lambda item: item[0]):
+                if total <= self.max_total_bytes:
+                    break
+                if self._remove(entry):
+                    removed.append(entry)
+                    total -= size
+
+        return removed
+
+    @staticmethod
+    def _stat(entry: Path) -> Tuple[float, int]:
+        """Returns (last modification, total size) of a file or directory tree."""
+        if not entry.is_dir():
+            stat = entry.stat()
+            return stat.st_mtime, stat.st_size
+        stats = [child.stat() for child in entry.rglob('*') if child.is_file()]
+        if not stats:
+            return entry.stat().st_mtime, 0
+        return max(stat.st_mtime for stat in stats), sum(stat.st_size for stat in stats)
+
+    @staticmethod
+    def _remove(entry: Path) -> bool:
+        try:
+            if entry.is_dir():
+                shutil.rmtree(entry)
+            else:
+                entry.unlink()
+            return True
+        except OSError as e:
+            print(f"Error removing expired output {entry}: {e}")
+            return False
@@ -6,23 +6,190 @@
 # 3.  Correctly instantiating the AnonymizerEngine and preparing the operators for it.
 # 4.  Providing a simple, high-level interface for anonymizing text.
 # 5.  Providing a method to inspect the recognizer registry for the UI.
+#
+# Building an AnalyzerEngine loads the NLP models and takes seconds. The engine
+# and the operators are therefore shared config artifacts (see config_service):
+# a new PresidioService for an unchanged 'analyzer' / 'anonymizer' subtree reuses
+# them instead of rebuilding.
+#
+# Pruning: every `analyze` call runs each registered recognizer and the full
+# spaCy pipeline, so the engine is built for the enabled entities only.
+# - Recognizers that support none of the entities enabled in
+#   `analyzer.entities` are not registered (`analyzer.prune_recognizers`), and
+#   `anonymize_text` asks only for the enabled entities. Keys of
+#   `analyzer.entities` that are categories (PERSON_ID, CITY, ...) are expanded
+#   to the Presidio entities they stand for (ENTITY_ALIASES), which inherit the
+#   category's anonymizer strategy; enabled keys Presidio has no recognizer
+#   for are reported with a warning.
+# - spaCy models are loaded without the components Presidio does not read
+#   (`analyzer.nlp.prune_pipeline`): the parser and sentence splitters. The
+#   tagger, attribute ruler and lemmatizer are kept unless
+#   `analyzer.nlp.context_lemmas` is turned off: Presidio matches its context
+#   words ("ssn", "passport", ...) on lemmas, and without them no score is
+#   boosted, so weak patterns such as US_SSN (0.5 at most) never reach the
+#   default 0.7 threshold. Excluded components are not loaded at all, which
+#   also saves their memory.
+# - When no NER entity is enabled, no model is loaded: a blank spaCy pipeline
+#   (tokenizer only) is enough for the pattern recognizers.
+# - `analyzer.nlp.model_size` picks sm / md / lg / trf for every language;
+#   `analyzer.nlp.models` can name a package (or a path) per language instead.
+# `python -m benchmarks.presidio_profiles` reports the per-line latency and the
+# memory of each combination.
+#
+# NLP gate (`presidio.nlp_gate`, see NlpGate): lines that cannot contain a NER
+# entity skip the NER component. They are analyzed by the pattern recognizers
+# on an artifact with the tokens and lemmas only, and their timestamps are
+# matched as DATE_TIME by the gate's patterns. The gate is per service, i.e.
+# per analysis run.
+#
+# The "pseudonym" strategy replaces an entity with its token in the shared
+# pseudonym table (`anonymizer.strategy_config.pseudonym`, see
+# pseudonym_store), so a value gets the same token in every worker and run.
 
 import logging
-from typing import Dict, Any, List, Optional
+import time
+from functools import partial
+from typing import Dict, Any, Hashable, List, Optional, Sequence, Set, Tuple
 
-from presidio_analyzer import AnalyzerEngine, Pattern, PatternRecognizer
+from presidio_analyzer import AnalyzerEngine, Pattern, PatternRecognizer, RecognizerResult
+from presidio_analyzer.nlp_engine import NlpArtifacts, SpacyNlpEngine
 # Correctly import the provider for multi-language support
 from presidio_analyzer.recognizer_registry import RecognizerRegistry, RecognizerRegistryProvider
 from presidio_anonymizer import AnonymizerEngine, OperatorConfig
 
+from . import metrics_service
+from .config_service import get_artifact
+from .nlp_gate import NlpGate
+from .pseudonym_store import shared_store
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The parts of the 'presidio' config section each shared artifact depends on.
+ANALYZER_CONFIG_PATHS = ('analyzer',)
+OPERATORS_CONFIG_PATHS = ('anonymizer', 'analyzer.ad_hoc_recognizers')
+CATALOG_CONFIG_PATHS = ('analyzer.languages', 'analyzer.ad_hoc_recognizers')
+# Analyzers kept alive per process: each holds its spaCy models.
+MAX_CACHED_ANALYZERS = 2
+# Strategy mapping entities to consistent tokens (see pseudonym_store).
+PSEUDONYM_STRATEGY = 'pseudonym'
+
+# spaCy pipeline packages per language; `analyzer.nlp.model_size` is appended.
+SPACY_MODEL_PACKAGES = {
+    'en': 'en_core_web',
+    'it': 'it_core_news',
+    'de': 'de_core_news',
+    'es': 'es_core_news',
+    'fr': 'fr_core_news',
+    'nl': 'nl_core_news',
+    'pt': 'pt_core_news',
+}
+MODEL_SIZES = ('sm', 'md', 'lg', 'trf')
+DEFAULT_MODEL_SIZE = 'lg'
+# `analyzer.nlp.models` value for a tokenizer-only pipeline.
+BLANK_MODEL = 'blank'
+
+# Entities that come from the spaCy NER model rather than from patterns.
+NER_ENTITIES = frozenset({'PERSON', 'LOCATION', 'ORGANIZATION', 'NRP', 'DATE_TIME'})
+# Components Presidio never reads, and those it only needs for context lemmas.
+UNUSED_COMPONENTS = ('parser', 'senter', 'sentencizer', 'entity_linker', 'textcat', 'textcat_multilabel', 'spancat')
+LEMMA_COMPONENTS = ('tagger', 'morphologizer', 'attribute_ruler', 'lemmatizer', 'trainable_lemmatizer')
+# What runs on lines the NLP gate sends past NER: the lemmas and what they need.
+LEMMA_PIPES = ('tok2vec',) + LEMMA_COMPONENTS
+
+# `analyzer.entities` keys that are categories rather than Presidio entity
+# names -> the Presidio entities they stand for. Pruning and `analyze` work on
+# Presidio names, so without this an enabled category would silently drop the
+# recognizers of its entities (e.g. PERSON_ID: no SSN or fiscal code found).
+ENTITY_ALIASES = {
+    'PERSON': ('NRP',),
+    'PERSON_ID': ('US_SSN', 'US_ITIN', 'US_PASSPORT', 'US_DRIVER_LICENSE', 'UK_NHS', 'IT_FISCAL_CODE',
+                  'IT_IDENTITY_CARD', 'IT_PASSPORT', 'IT_DRIVER_LICENSE', 'ES_NIF', 'ES_NIE', 'PL_PESEL'),
+    'ADDRESS': ('LOCATION',),
+    'CITY': ('LOCATION',),
+    'COUNTRY': ('LOCATION',),
+    'ZIP_CODE': ('LOCATION',),
+    'DOMAIN_NAME': ('URL',),
+    'DATE': ('DATE_TIME',),
+    'TIME': ('DATE_TIME',),
+    'COMPANY': ('ORGANIZATION', 'IT_VAT_CODE'),
+    'BANK_ACCOUNT': ('US_BANK_NUMBER', 'IBAN_CODE', 'CRYPTO'),
+    'MEDICAL_RECORD': ('MEDICAL_LICENSE',),
+}
+
+def enabled_entities(analyzer_config: Dict[str, Any]) -> Optional[Set[str]]:
+    """
+    The entities enabled in `analyzer.entities` (values `true` or
+    `{enabled: true}`, categories expanded with ENTITY_ALIASES) plus the
+    ad-hoc recognizers, or None when no entity list is configured, meaning
+    all of them.
+    """
+    entities = analyzer_config.get('entities') or {}
+    if not entities:
+        return None
+    enabled = {name for name, value in entities.items()
+               if (value.get('enabled', True) if isinstance(value, dict) else value)}
+    enabled.update(alias for name in list(enabled) for alias in ENTITY_ALIASES.get(name, ()))
+    enabled.update(rec['name'] for rec in analyzer_config.get('ad_hoc_recognizers', []) if rec.get('name'))
+    return enabled
+
+def spacy_model_name(language: str, nlp_config: Dict[str, Any]) -> str:
+    """The spaCy package (or path) loaded for a language."""
+    explicit = (nlp_config.get('models') or {}).get(language)
+    if explicit:
+        return explicit
+    size = nlp_config.get('model_size', DEFAULT_MODEL_SIZE)
+    if size not in MODEL_SIZES:
+        raise ValueError(f"Unknown spaCy model size: {size}. Choose from {', '.join(MODEL_SIZES)}")
+    if language not in SPACY_MODEL_PACKAGES:
+        raise ValueError(f"No spaCy package known for language '{language}'; set analyzer.nlp.models.{language}")
+    if size == 'trf' and language != 'en':
+        # Only English has a transformer pipeline named like the others.
+        return f"{SPACY_MODEL_PACKAGES[language]}_lg"
+    return f"{SPACY_MODEL_PACKAGES[language]}_{size}"
+
+
+class PrunedSpacyNlpEngine(SpacyNlpEngine):
+    """A SpacyNlpEngine that loads its models without the excluded components."""
+
+    def __init__(self, models: List[Dict[str, str]], exclude: Sequence[str] = ()):
+        super().__init__(models=models)
+        self.exclude = list(exclude)
+
+    def load(self) -> None:
+        import spacy
+
+        self.nlp = {}
+        for model in self.models:
+            self._validate_model_params(model)
+            if model['model_name'] == BLANK_MODEL:
+                self.nlp[model['lang_code']] = spacy.blank(model['lang_code'])
+            else:
+                # Unlike the base class, never downloads: images ship their models.
+                self.nlp[model['lang_code']] = spacy.load(model['model_name'], exclude=self.exclude)
+
+    def pipe_names(self) -> Dict[str, List[str]]:
+        return {language: list(nlp.pipe_names) for language, nlp in (self.nlp or {}).items()}
+
+    def tokenize_text(self, text: str, language: str) -> NlpArtifacts:
+        """
+        Artifacts without entities, for the pattern recognizers: the tokens,
+        and the lemmas their context words are matched on when the loaded
+        pipeline sets them.
+        """
+        nlp = self.get_nlp(language)
+        doc = nlp.make_doc(text)
+        for name, component in nlp.pipeline:
+            if name in LEMMA_PIPES:
+                doc = component(doc)
+        return self._doc_to_nlp_artifact(doc, language)
+
 class PresidioService:
     """
     A service to handle all Presidio-related operations, including PII analysis and anonymization.
     """
     def __init__(self, presidio_config: Dict[str, Any]):
+        self.nlp_gate: Optional[NlpGate] = None
         if not presidio_config or not presidio_config.get('enabled', False):
             self.is_enabled = False
             self.analyzer = None
@@ -31,13 +198,33 @@ class PresidioService:
         logger.info("Initializing PresidioService...")
         self.config = presidio_config
         self.is_enabled = True
-        self.analyzer = self._create_analyzer()
+        self.analyzer = get_artifact('presidio_analyzer', presidio_config, ANALYZER_CONFIG_PATHS,
+                                     lambda config: self._create_analyzer(), max_entries=MAX_CACHED_ANALYZERS)
         if not self.analyzer:
             self.is_enabled = False
             logger.error("PresidioService disabled due to AnalyzerEngine creation failure.")
             return
 
-        self.operators = self._get_operators()
+        self.operators = get_artifact('presidio_operators', presidio_config, OPERATORS_CONFIG_PATHS,
+                                      lambda config: self._get_operators())
+        # Entities requested from `analyze`: the enabled ones the engine can find.
+        enabled = enabled_entities(presidio_config.get('analyzer', {}))
+        supported = set(self.analyzer.get_supported_entities())
+        self.entities = sorted(enabled & supported) if enabled is not None else None
+        if enabled is not None:
+            aliased = {alias for aliases in ENTITY_ALIASES.values() for alias in aliases}
+            unknown = sorted(enabled - supported - aliased - set(ENTITY_ALIASES))
+            if unknown:
+                logger.warning(f"No Presidio recognizer for the enabled entities {unknown}; "
+                               f"add an ad-hoc recognizer to detect them.")
+        # What lines without NER are analyzed for.
+        self.pattern_entities = [entity for entity in (self.entities or self.analyzer.get_supported_entities())
+                                 if entity not in NER_ENTITIES]
+        gate_config = presidio_config.get('nlp_gate', {})
+        uses_ner = self.entities is None or bool(NER_ENTITIES.intersection(self.entities))
+        self.nlp_gate = (NlpGate(gate_config)
+                         if uses_ner and NlpGate.is_enabled(gate_config)
+                         and isinstance(self.analyzer.nlp_engine, PrunedSpacyNlpEngine) else None)
         self.anonymizer = AnonymizerEngine()
         logger.info("PresidioService initialized successfully.")
 
@@ -51,27 +238,15 @@ class PresidioService:
             analyzer_config = self.config.get('analyzer', {})
             languages = analyzer_config.get('languages', ['en'])
 
-            # --- FIX: Use RecognizerRegistryProvider for multi-language support ---
-            provider = RecognizerRegistryProvider(
-                registry_configuration={"supported_languages": languages}
-            )
-            registry = provider.create_recognizer_registry()
-
-            # The provider should load the default recognizers, but an explicit call ensures it.
-            # This might be redundant depending on the library version, but it's safe.
-            registry.load_predefined_recognizers(languages=languages)
-
-            ad_hoc_recognizers = analyzer_config.get('ad_hoc_recognizers', [])
-            for rec_conf in ad_hoc_recognizers:
-                if rec_conf.get("name") and rec_conf.get("regex"):
-                    pattern = Pattern(name=rec_conf['name'], regex=rec_conf['regex'], score=float(rec_conf['score']))
-                    ad_hoc_recognizer = PatternRecognizer(supported_entity=rec_conf['name'], patterns=[pattern])
-                    registry.add_recognizer(ad_hoc_recognizer)
+            nlp_engine = self._create_nlp_engine(analyzer_config, languages)
+            registry = self._create_registry(analyzer_config, languages, nlp_engine,
+                                             prune=analyzer_config.get('prune_recognizers', True))
 
-            confidence_threshold = analyzer_config.get('analysis', {}).get('confidence_threshold')
+            confidence_threshold = analyzer_config.get('analysis', {}).get('confidence_threshold') or 0.0
 
             return AnalyzerEngine(
                 registry=registry,
+                nlp_engine=nlp_engine,
                 supported_languages=languages,
                 default_score_threshold=confidence_threshold
             )
@@ -79,6 +254,68 @@ class PresidioService:
             logger.error(f"Fatal error creating Presidio AnalyzerEngine: {e}", exc_info=True)
             return None
 
+    @staticmethod
+    def _create_registry(analyzer_config: Dict[str, Any], languages: List[str],
+                         nlp_engine: Optional[SpacyNlpEngine] = None, prune: bool = False) -> RecognizerRegistry:
+        """
+        The predefined recognizers for the languages plus the ad-hoc ones.
+        With `prune`, only those supporting an enabled entity are kept.
+        """
+        # --- FIX: Use RecognizerRegistryProvider for multi-language support ---
+        provider = RecognizerRegistryProvider(
+            registry_configuration={"supported_languages": languages}
+        )
+        registry = provider.create_recognizer_registry()
+
+        # The provider should load the default recognizers, but an explicit call ensures it.
+        # This might be redundant depending on the library version, but it's safe.
+        registry.load_predefined_recognizers(languages=languages, nlp_engine=nlp_engine)
+
+        enabled = enabled_entities(analyzer_config)
+        if prune and enabled is not None:
+            registry.recognizers = [rec for rec in registry.recognizers
+                                    if enabled.intersection(rec.supported_entities)]
+
+        ad_hoc_recognizers = analyzer_config.get('ad_hoc_recognizers', [])
+        for rec_conf in ad_hoc_recognizers:
+            if rec_conf.get("name") and rec_conf.get("regex"):
+                pattern = Pattern(name=rec_conf['name'], regex=rec_conf['regex'], score=float(rec_conf['score']))
+                ad_hoc_recognizer = PatternRecognizer(supported_entity=rec_conf['name'], patterns=[pattern])
+                registry.add_recognizer(ad_hoc_recognizer)
+        return registry
+
+    @staticmethod
+    def _create_nlp_engine(analyzer_config: Dict[str, Any], languages: List[str]) -> PrunedSpacyNlpEngine:
+        """The spaCy engine for the configured languages, pruned to what the enabled entities need."""
+        nlp_config = analyzer_config.get('nlp') or {}
+        enabled = enabled_entities(analyzer_config)
+        needs_ner = enabled is None or bool(enabled & NER_ENTITIES)
+        models = [{'lang_code': language,
+                   'model_name': spacy_model_name(language, nlp_config) if needs_ner else BLANK_MODEL}
+                  for language in languages]
+        exclude: List[str] = []
+        if nlp_config.get('prune_pipeline', True):
+            exclude.extend(UNUSED_COMPONENTS)
+            if not nlp_config.get('context_lemmas', True):
+                exclude.extend(LEMMA_COMPONENTS)
+        engine = PrunedSpacyNlpEngine(models, exclude)
+        engine.load()
+        logger.info(f"spaCy pipelines: {engine.pipe_names()}")
+        return engine
+
+    def describe(self) -> Dict[str, Any]:
+        """What the engine was built with: models, spaCy components, recognizers, entities."""
+        if not self.is_enabled:
+            return {'enabled': False}
+        nlp_engine = self.analyzer.nlp_engine
+        return {
+            'enabled': True,
+            'models': {model['lang_code']: model['model_name'] for model in getattr(nlp_engine, 'models', [])},
+            'pipes': nlp_engine.pipe_names() if isinstance(nlp_engine, PrunedSpacyNlpEngine) else None,
+            'recognizers': sorted({rec.name for rec in self.analyzer.registry.recognizers}),
+            'entities': self.entities,
+        }
+
     def _get_operators(self) -> Dict[str, OperatorConfig]:
         """
         Builds the dictionary of 'operators' that defines anonymization strategy.
@@ -89,38 +326,104 @@ class PresidioService:
         strategy_configs = anonymizer_config.get('strategy_config', {})
 
         for entity_name, strategy_name in strategies.items():
-            params = strategy_configs.get(strategy_name, {})
-            operators[entity_name.upper()] = OperatorConfig(strategy_name, params)
+            operators[entity_name.upper()] = self._operator(entity_name.upper(), strategy_name, strategy_configs)
 
         ad_hoc_recognizers = self.config.get('analyzer', {}).get('ad_hoc_recognizers', [])
         for rec_conf in ad_hoc_recognizers:
             strategy_name = rec_conf.get("strategy")
             entity_name = rec_conf.get("name")
             if entity_name and strategy_name:
-                params = strategy_configs.get(strategy_name, {})
-                operators[entity_name.upper()] = OperatorConfig(strategy_name, params)
+                operators[entity_name.upper()] = self._operator(entity_name.upper(), strategy_name, strategy_configs)
 
+        # Entities found for a category are anonymized like the category,
+        # unless they have a strategy of their own.
+        for category, aliases in ENTITY_ALIASES.items():
+            if category in operators:
+                for alias in aliases:
+                    operators.setdefault(alias, operators[category])
         return operators
 
-    def anonymize_text(self, text: str, **kwargs) -> str:
+    @staticmethod
+    def _operator(entity_name: str, strategy_name: str, strategy_configs: Dict[str, Any]) -> OperatorConfig:
+        params = strategy_configs.get(strategy_name, {})
+        if strategy_name == PSEUDONYM_STRATEGY:
+            # Presidio's custom operator, backed by the shared pseudonym table.
+            return OperatorConfig('custom', {'lambda': partial(shared_store(params).token, entity_name)})
+        return OperatorConfig(strategy_name, params)
+
+    def anonymize_text(self, text: str, template_key: Optional[Hashable] = None, **kwargs) -> str:
         """
         Anonymizes a given text string using the configured Presidio engines.
+
+        Args:
+            text: The text to anonymize.
+            template_key: The Drain3 template the line belongs to, if known;
+                          lets the NLP gate learn which templates never
+                          contain NER entities.
+            **kwargs: Passed to `AnalyzerEngine.analyze` (e.g. `language`).
         """
         if not self.is_enabled:
             return text
 
         try:
-            analyzer_results = self.analyzer.analyze(text=text, **kwargs)
-            anonymized_result = self.anonymizer.anonymize(
-                text=text,
-                analyzer_results=analyzer_results,
-                operators=self.operators
-            )
-            return anonymized_result.text
+            return self._anonymize(text, self._analyze(text, template_key, kwargs))
         except Exception as e:
             logger.error(f"Error during anonymization: {e}", exc_info=True)
             return text
 
+    def anonymize_spans(self, text: str, spans: List[Tuple[int, int]], **kwargs) -> List[str]:
+        """
+        Anonymizes each `text[start:end]` of `spans`, with a single analysis of
+        the whole `text` (the surrounding words serve as context). Entities
+        crossing a span boundary are cut at it.
+        """
+        if not self.is_enabled:
+            return [text[start:end] for start, end in spans]
+
+        try:
+            analyzer_results = self._analyze(text, None, kwargs)
+            return [self._anonymize(text[start:end], [
+                RecognizerResult(result.entity_type, max(result.start, start) - start,
+                                 min(result.end, end) - start, result.score)
+                for result in analyzer_results if result.start < end and result.end > start])
+                for start, end in spans]
+        except Exception as e:
+            logger.error(f"Error during anonymization: {e}", exc_info=True)
+            return [text[start:end] for start, end in spans]
+
+    def _analyze(self, text: str, template_key: Optional[Hashable], kwargs: Dict[str, Any]) -> List[RecognizerResult]:
+        # Running the NLP pipeline here, rather than inside analyze(), lets
+        # the NER time be measured apart from the pattern recognizers.
+        started = time.perf_counter()
+        language = kwargs.get('language')
+        gate = self.nlp_gate if language and 'nlp_artifacts' not in kwargs else None
+        run_ner = gate is None or gate.needs_ner(text, template_key)
+        if 'entities' not in kwargs and (self.entities is not None or not run_ner):
+            kwargs['entities'] = self.entities if run_ner else self.pattern_entities
+        if 'nlp_artifacts' not in kwargs and language:
+            kwargs['nlp_artifacts'] = (self.analyzer.nlp_engine.process_text(text, language) if run_ner
+                                       else self.analyzer.nlp_engine.tokenize_text(text, language))
+        ner_done = time.perf_counter()
+        analyzer_results = self.analyzer.analyze(text=text, **kwargs)
+        if gate is not None and run_ner:
+            gate.observe(template_key, any(result.entity_type in NER_ENTITIES for result in analyzer_results))
+        elif gate is not None and (self.entities is None or 'DATE_TIME' in self.entities):
+            analyzer_results.extend(RecognizerResult('DATE_TIME', start, end, 0.85)
+                                    for start, end in gate.date_time_spans(text))
+        metrics_service.observe_stage('presidio_ner' if run_ner else 'presidio_tokenize', ner_done - started)
+        metrics_service.observe_stage('presidio_recognizers', time.perf_counter() - ner_done)
+        if gate is not None:
+            metrics_service.count_nlp_gate(skipped=not run_ner)
+        return analyzer_results
+
+    def _anonymize(self, text: str, analyzer_results: List[RecognizerResult]) -> str:
+        with metrics_service.timed_stage('presidio_anonymizer'):
+            return self.anonymizer.anonymize(
+                text=text,
+                analyzer_results=analyzer_results,
+                operators=self.operators
+            ).text
+
     def get_recognizer_details(self) -> Dict[str, Any]:
         """
         Inspects the analyzer's registry and returns a detailed dictionary of
@@ -132,10 +435,14 @@ class PresidioService:
         user_entities = self.config.get("analyzer", {}).get("entities", {})
         user_strategies = self.config.get("anonymizer", {}).get("strategies", {})
 
+        # Listed from the unpruned catalog, so that disabled entities can be re-enabled.
+        analyzer_config = self.config.get('analyzer', {})
+        catalog = get_artifact('presidio_recognizer_catalog', self.config, CATALOG_CONFIG_PATHS,
+                               lambda config: self._create_registry(analyzer_config, self.analyzer.supported_languages))
         detailed_entities = {}
         try:
             for lang in self.analyzer.supported_languages:
-                recognizers = self.analyzer.get_recognizers(language=lang)
+                recognizers = catalog.get_recognizers(language=lang, all_fields=True)
                 for rec in recognizers:
                     entities = getattr(rec, 'supported_entities', [])
                     if not entities:
@@ -0,0 +1,338 @@
+# === DESIGN COMMENT ===
+# Consistent pseudonyms (`presidio.anonymizer.strategy_config.pseudonym`): the
+# same value of the same entity becomes the same token (`<IP_ADDRESS_42>`) in
+# every line, worker process and run, so anonymized outputs can still be
+# joined and counted per user, host or session.
+#
+# Tokens are numbered per entity in order of first appearance, which keeps
+# them short and collision-free but means they cannot be derived from the value
+# alone: they live in a shared table on disk (`path`), an open-addressing hash
+# table in a single file that every process memory-maps:
+#
+#   header   magic, version, slot bits, record count, end of the records,
+#            salt fingerprint, value count
+#   slots    2^bits x (record offset, key fingerprint), linear probing
+#   records  appended: key digest (16 bytes), token length, token
+#
+# The last number given for an entity is a record too, keyed by the digest of
+# the entity alone, whose 8-byte "token" writers update in place.
+#
+# A value is looked up by the salted digest of (entity, value) (`algorithm`,
+# `salt`), so the file holds no original value; a table built with another
+# salt is refused rather than mixed. Reads probe the mapping without any lock:
+# a record is written before its slot, and a slot's offset before its
+# fingerprint, so a reader sees either no entry or a complete one. Writes
+# (a value seen for the first time) append under an exclusive `flock` on the
+# file, after looking the value up again: another process may have added it
+# meanwhile. The records region is extended a megabyte or more at a time, so
+# readers remap only when the file grew. Past half full the table is rebuilt with twice the slots into a
+# new file that replaces the old one; processes still mapping the old file
+# keep reading it (its entries stay valid) and switch over on their next write.
+#
+# The table is opened once per process and configuration (`shared_store`) and
+# is reused by every later run, so a value keeps its token for the lifetime of
+# the file.
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .config_service import get_artifact
+
+DEFAULT_PATH = 'cache/pseudonyms.bin'
+DEFAULT_TOKEN_FORMAT = '<{entity}_{number}>'
+DEFAULT_SLOT_BITS = 16
+MAX_LOAD = 0.5
+# The records region grows by at least this much at a time.
+RECORDS_CHUNK = 1 << 20
+
+MAGIC = b'LAPSEUDO'
+VERSION = 2
+# magic, version, slot bits, record count, end of the records (from their start),
+# salt fingerprint, value count; padded to HEADER_SIZE.
+HEADER = struct.Struct('<8sIIQQ16sQ')
+HEADER_SIZE = 64
+# Record count and end of the records, rewritten together after each append.
+COUNTERS = struct.Struct('<QQ')
+COUNTERS_OFFSET = 16
+# Values with a token (records less the per-entity counters).
+VALUES = struct.Struct('<Q')
+VALUES_OFFSET = 48
+# The last number of an entity, stored as its counter record's token.
+NUMBER = struct.Struct('<Q')
+# Record offset (from the start of the records), key fingerprint (0: empty slot).
+SLOT = struct.Struct('<QQ')
+# Key digest, token length; the token follows.
+RECORD = struct.Struct('<16sH')
+
+
+def _fingerprint(key: bytes) -> int:
+    return int.from_bytes(key[:8], 'little') or 1
+
+
+class PseudonymStore:
+    """A persistent value -> token table shared by the processes on the host."""
+
+    def __init__(self, path: str = DEFAULT_PATH, salt: str = '', algorithm: str = 'sha256',
+                 token_format: str = DEFAULT_TOKEN_FORMAT, slot_bits: int = DEFAULT_SLOT_BITS):
+        """
+        Args:
+            path: The table file, created if missing.
+            salt: Mixed into the value digests; a table is bound to its salt.
+            algorithm: The hashlib algorithm of the digests.
+            token_format: The token of the n-th value of an entity, with
+                          `{entity}` and `{number}` fields.
+            slot_bits: Log2 of the initial number of slots of a new table.
+
+        Raises:
+            ValueError: If the file is not a pseudonym table, or was built
+                        with another salt or algorithm.
+        """
+        if algorithm not in hashlib.algorithms_available:
+            raise ValueError(f"Unknown hash algorithm: {algorithm}. "
+                             f"Choose from {', '.join(sorted(hashlib.algorithms_guaranteed))}")
+        self.path = path
+        self.salt = salt.encode('utf-8')
+        self.algorithm = algorithm
+        self.token_format = token_format
+        self.salt_fingerprint = hashlib.sha256(f"{algorithm}\0{salt}".encode('utf-8')).digest()[:16]
+        self._initial_bits = max(4, int(slot_bits))
+        self._lock = threading.Lock()
+        self._fd = -1
+        # (mapping, slot count, start of the records), swapped as a whole:
+        # readers in other threads finish with the mapping they started with.
+        self._view: Optional[Tuple[mmap.mmap, int, int]] = None
+        self.hits = 0
+        self.inserts = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._switch(self._open_file())
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'PseudonymStore':
+        """Opens the table described by a `strategy_config.pseudonym` section."""
+        return cls(config.get('path', DEFAULT_PATH), str(config.get('salt', '')), config.get('algorithm', 'sha256'),
+                   config.get('token_format', DEFAULT_TOKEN_FORMAT), int(config.get('slot_bits', DEFAULT_SLOT_BITS)))
+
+    def __len__(self) -> int:
+        return VALUES.unpack_from(self._view[0], VALUES_OFFSET)[0]
+
+    def token(self, entity: str, value: str) -> str:
+        """Returns the token of `value`, giving it the entity's next number if it is new."""
+        key = self._digest(entity, value)
+        token = self._find(key)
+        if token is not None:
+            self.hits += 1
+            return token
+        return self._insert(entity, key)
+
+    def get(self, entity: str, value: str) -> Optional[str]:
+        """Returns the token of `value`, None if it has none yet."""
+        return self._find(self._digest(entity, value))
+
+    def report(self) -> Dict[str, Any]:
+        return {'path': self.path, 'entries': len(self), 'slots': self._view[1], 'hits': self.hits,
+                'inserts': self.inserts}
+
+    def close(self) -> None:
+        if self._view is not None:
+            self._view[0].close()
+            self._view = None
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _digest(self, entity: str, value: str) -> bytes:
+        digest = hashlib.new(self.algorithm, self.salt)
+        digest.update(f"\0{entity}\0{value}".encode('utf-8'))
+        return digest.digest()[:16]
+
+    def _counter_key(self, entity: str) -> bytes:
+        # Never the digest of a value: those start with a NUL.
+        digest = hashlib.new(self.algorithm, self.salt)
+        digest.update(f"\1{entity}".encode('utf-8'))
+        return digest.digest()[:16]
+
+    # --- Reads (no lock) ---
+
+    def _find(self, key: bytes) -> Optional[str]:
+        found = self._locate(key)
+        if found is None:
+            return None
+        view, position = found
+        length = RECORD.unpack_from(view, position)[1]
+        return view[position + RECORD.size:position + RECORD.size + length].decode('utf-8')
+
+    def _locate(self, key: bytes) -> Optional[Tuple[mmap.mmap, int]]:
+        """The mapping holding the record of `key` and its position in it, None if it has none."""
+        fingerprint = _fingerprint(key)
+        view, slots, records = self._view
+        mask = slots - 1
+        slot = fingerprint & mask
+        while True:
+            offset, stored = SLOT.unpack_from(view, HEADER_SIZE + slot * SLOT.size)
+            if stored == 0:
+                return None
+            if stored == fingerprint:
+                position = records + offset
+                if position + RECORD.size > len(view):
+                    # Appended since this mapping was made, in a grown region.
+                    self._remap()
+                    if self._view[2] != records:
+                        # The table was rebuilt meanwhile: look it up there.
+                        return self._locate(key)
+                    view = self._view[0]
+                if RECORD.unpack_from(view, position)[0] == key:
+                    return view, position
+            slot = (slot + 1) & mask
+
+    # --- Writes (flock) ---
+
+    def _insert(self, entity: str, key: bytes) -> str:
+        with self._lock:
+            self._lock_file()
+            try:
+                # Another process may have added it, or rebuilt the table.
+                token = self._find(key)
+                if token is not None:
+                    self.hits += 1
+                    return token
+                count, end = COUNTERS.unpack_from(self._view[0], COUNTERS_OFFSET)
+                # Room for the value and, for a new entity, its counter.
+                if count + 2 > self._view[1] * MAX_LOAD:
+                    self._grow(count, end)
+                counter_key = self._counter_key(entity)
+                counter = self._locate(counter_key)
+                if counter is None:
+                    number = 1
+                    end = self._append(counter_key, NUMBER.pack(number), end)
+                    count += 1
+                else:
+                    # The mapping of this file: the write lock rules out a rebuild.
+                    view, position = counter
+                    number = NUMBER.unpack_from(view, position + RECORD.size)[0] + 1
+                    os.pwrite(self._fd, NUMBER.pack(number), position + RECORD.size)
+                token = self.token_format.format(entity=entity, number=number)
+                end = self._append(key, token.encode('utf-8'), end)
+                os.pwrite(self._fd, COUNTERS.pack(count + 1, end), COUNTERS_OFFSET)
+                os.pwrite(self._fd, VALUES.pack(len(self) + 1), VALUES_OFFSET)
+                self.inserts += 1
+                return token
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _append(self, key: bytes, payload: bytes, end: int) -> int:
+        """Appends and publishes a record at `end` (write lock held); returns the new end."""
+        record = RECORD.pack(key, len(payload)) + payload
+        start = self._view[2]
+        size = os.fstat(self._fd).st_size
+        if start + end + len(record) > size:
+            os.ftruncate(self._fd, size + max(RECORDS_CHUNK, size // 2))
+        os.pwrite(self._fd, record, start + end)
+        self._publish(key, end)
+        return end + len(record)
+
+    def _publish(self, key: bytes, offset: int) -> None:
+        view, slots, _ = self._view
+        fingerprint = _fingerprint(key)
+        mask = slots - 1
+        slot = fingerprint & mask
+        while SLOT.unpack_from(view, HEADER_SIZE + slot * SLOT.size)[1] != 0:
+            slot = (slot + 1) & mask
+        position = HEADER_SIZE + slot * SLOT.size
+        # The offset first: a reader that sees the fingerprint finds the record.
+        os.pwrite(self._fd, struct.pack('<Q', offset), position)
+        os.pwrite(self._fd, struct.pack('<Q', fingerprint), position + 8)
+
+    def _lock_file(self) -> None:
+        """Takes the write lock on the current table, following its replacement by a larger one."""
+        while True:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(self._fd).st_ino:
+                return
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._switch(self._open_file())
+
+    def _grow(self, count: int, end: int) -> None:
+        """Rebuilds the table with twice the slots into a file that replaces this one (write lock held)."""
+        self._remap()
+        view, slots, start = self._view
+        bits = slots.bit_length()  # log2(slots) + 1
+        records = view[start:start + end]
+        table = bytearray(SLOT.size << bits)
+        mask = (1 << bits) - 1
+        offset = 0
+        while offset < end:
+            key, length = RECORD.unpack_from(records, offset)
+            slot = _fingerprint(key) & mask
+            while SLOT.unpack_from(table, slot * SLOT.size)[1] != 0:
+                slot = (slot + 1) & mask
+            SLOT.pack_into(table, slot * SLOT.size, offset, _fingerprint(key))
+            offset += RECORD.size + length
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temporary, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        # Held until the new file is in place, so no writer slips into it first.
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        header = HEADER.pack(MAGIC, VERSION, bits, count, end, self.salt_fingerprint,
+                             len(self)).ljust(HEADER_SIZE, b'\0')
+        os.write(fd, header + table + records)
+        os.ftruncate(fd, HEADER_SIZE + len(table) + end + RECORDS_CHUNK)
+        os.replace(temporary, self.path)
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._switch(fd)
+
+    # --- File ---
+
+    def _open_file(self) -> int:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size == 0:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    header = HEADER.pack(MAGIC, VERSION, self._initial_bits, 0, 0, self.salt_fingerprint, 0)
+                    os.pwrite(fd, header.ljust(HEADER_SIZE, b'\0'), 0)
+                    os.ftruncate(fd, HEADER_SIZE + (SLOT.size << self._initial_bits) + RECORDS_CHUNK)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        return fd
+
+    def _switch(self, fd: int) -> None:
+        """Moves to another file of the table (a replaced one stays mapped for the readers still on it)."""
+        previous = self._fd
+        self._fd = fd
+        try:
+            self._remap()
+        except ValueError:
+            self._fd = previous
+            os.close(fd)
+            raise
+        if previous >= 0:
+            os.close(previous)
+
+    def _remap(self) -> None:
+        size = os.fstat(self._fd).st_size
+        if size < HEADER_SIZE:
+            raise ValueError(f"Not a pseudonym table: {self.path}")
+        view = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+        magic, version, bits, _, _, salt_fingerprint, _ = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a pseudonym table (version {VERSION}): {self.path}")
+        if salt_fingerprint != self.salt_fingerprint:
+            raise ValueError(f"Pseudonym table {self.path} was built with another salt or algorithm")
+        # The previous mapping is unmapped once no reader holds it any more.
+        self._view = (view, 1 << bits, HEADER_SIZE + (SLOT.size << bits))
+
+
+def shared_store(config: Dict[str, Any]) -> PseudonymStore:
+    """Returns this process's table for a `strategy_config.pseudonym` section, opening it once."""
+    return get_artifact('pseudonym_store', {'pseudonym': config}, ('pseudonym',),
+                        lambda wrapped: PseudonymStore.from_config(wrapped['pseudonym']))
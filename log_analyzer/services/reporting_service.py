@@ -1,12 +1,15 @@
-import json
-import csv
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from ..parsing.interfaces import ParsedRecord
+from ..writers.json_writer import JSONArrayWriter, NDJSONWriter
+from ..writers.logppt_writer import LOGPPT_VERSIONS, LogPPTWriter
+from ..writers.parquet_writer import ParquetDatasetWriter
 
 class ReportingService:
     """
-    A service for generating output reports from processed log records.
+    A service for generating output reports from an in-memory list of
+    processed records. It is a thin facade over the streaming writers in
+    `log_analyzer.writers`; the analysis pipeline uses those writers directly.
     """
     def __init__(self, output_dir: str):
         """
@@ -18,86 +21,52 @@ class ReportingService:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-    def generate_json_report(self, records: List[ParsedRecord]):
+    def generate_json_report(self, records: List[ParsedRecord], compression: Optional[str] = None):
         """
-        Saves the list of fully processed records as a single JSON file.
+        Saves the list of fully processed records as a single JSON array,
+        serializing them one at a time instead of building a second copy.
 
         Args:
             records: A list of ParsedRecord objects.
+            compression: Optional on-the-fly compression ('gzip' or 'zstd').
         """
-        output_file = self.output_dir / "full_structured_output.json"
+        with JSONArrayWriter(self.output_dir / "full_structured_output.json", compression) as writer:
+            writer.write_batch(records)
+        print(f"Full JSON report saved to: {writer.output_path}")
 
-        # Convert Pydantic models to dictionaries for JSON serialization
-        records_as_dicts = [record.model_dump() for record in records]
-
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(records_as_dicts, f, indent=2)
-        print(f"Full JSON report saved to: {output_file}")
-
-    def generate_logppt_reports(self, records: List[ParsedRecord]):
+    def generate_ndjson_report(self, records: List[ParsedRecord], compression: Optional[str] = None):
         """
-        Generates two CSV files in a format compatible with LogPPT: one with
-        original data and one with anonymized data.
-        """
-        # Generate the report for the original data
-        self._generate_logppt_csv(records, 'original')
+        Saves the records as newline-delimited JSON, one record per line.
 
-        # Generate the report for the anonymized data
-        self._generate_logppt_csv(records, 'anonymized')
+        Args:
+            records: A list of ParsedRecord objects.
+            compression: Optional on-the-fly compression ('gzip' or 'zstd').
+        """
+        with NDJSONWriter(self.output_dir / "full_structured_output.ndjson", compression) as writer:
+            writer.write_batch(records)
+        print(f"NDJSON report saved to: {writer.output_path}")
 
-    def _generate_logppt_csv(self, records: List[ParsedRecord], version: str):
+    def generate_parquet_report(self, records: List[ParsedRecord], compression: Optional[str] = 'zstd'):
         """
-        A helper method to generate a single LogPPT-compatible CSV file.
+        Saves the records as a Parquet dataset directory with typed columns,
+        ready to be queried directly by pandas, DuckDB or Spark.
 
         Args:
             records: A list of ParsedRecord objects.
-            version: The version to generate ('original' or 'anonymized').
+            compression: The Parquet codec ('zstd', 'snappy', 'gzip', 'none').
+        """
+        with ParquetDatasetWriter(self.output_dir / "full_structured_output.parquet", compression) as writer:
+            writer.write_batch(records)
+        print(f"Parquet report saved to: {writer.output_path}")
+
+    def generate_logppt_reports(self, records: List[ParsedRecord]):
+        """
+        Generates two CSV files in a format compatible with LogPPT: one with
+        original data and one with anonymized data.
         """
         if not records:
             return
-
-        output_file = self.output_dir / f"logppt_{version}.csv"
-
-        # --- Dynamically determine the header ---
-        # Start with fixed columns
-        fixed_start_cols = ['LineId']
-        fixed_end_cols = ['Content', 'EventId', 'EventTemplate']
-
-        # Find all unique parsed field keys from all records
-        parsed_field_keys = set()
-        for record in records:
-            if record.parsed_data:
-                parsed_field_keys.update(record.parsed_data.keys())
-
-        # Sort for consistent column order
-        sorted_parsed_keys = sorted(list(parsed_field_keys))
-
-        # Final header
-        header = fixed_start_cols + sorted_parsed_keys + fixed_end_cols
-
-        # --- Write data to CSV ---
-        with open(output_file, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
-
-            for i, record in enumerate(records):
-                row = [i + 1] # LineId
-
-                # Add parsed field values, using empty string if a key is missing
-                for key in sorted_parsed_keys:
-                    row.append(record.parsed_data.get(key, ''))
-
-                # Add the final fixed columns based on the version
-                if version == 'original':
-                    content = record.original_content
-                    event_id = f"E{record.drain3_original.get('cluster_id', -1)}"
-                    template = record.drain3_original.get('template', '<NO_TEMPLATE>')
-                else: # anonymized
-                    content = record.presidio_anonymized or record.original_content
-                    event_id = f"E{record.drain3_anonymized.get('cluster_id', -1)}"
-                    template = record.drain3_anonymized.get('template', '<NO_TEMPLATE>')
-
-                row.extend([content, event_id, template])
-                writer.writerow(row)
-
-        print(f"LogPPT ({version}) report saved to: {output_file}")
+        for version in LOGPPT_VERSIONS:
+            with LogPPTWriter(self.output_dir / f"logppt_{version}.csv", version) as writer:
+                writer.write_batch(records)
+            print(f"LogPPT ({version}) report saved to: {writer.output_path}")
@@ -0,0 +1,22 @@
+import os
+import sys
+from typing import Optional
+
+def current_rss_bytes() -> Optional[int]:
+    """
+    Returns the resident set size of this process, or None where it cannot
+    be read cheaply. Linux reads /proc; elsewhere the peak RSS reported by
+    `resource` is used as an upper bound.
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == 'darwin' else peak * 1024
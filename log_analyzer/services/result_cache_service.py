@@ -0,0 +1,222 @@
+# === DESIGN COMMENT ===
+# Content-addressed cache of analysis results. Re-running an analysis on the
+# same file with the same effective settings repeats minutes of NER and Drain3
+# work to produce byte-identical outputs, e.g. after a UI change that does not
+# touch the pipeline. The cache key combines:
+#
+# - the input fingerprint: by default the size, mtime and a hash of sampled
+#   blocks (head, middle, tail), which costs three reads whatever the file
+#   size; `fingerprint: full` hashes every byte instead, so a copied or
+#   touched file still hits;
+# - `subtree_digest` of only the config subtrees that change the outputs
+#   (RESULT_CONFIG_PATHS): saving unrelated settings (jobs, retention, UI
+#   metrics...) keeps the entries valid;
+# - the output format. Each format is cached on its own, so a request for
+#   another combination of formats hits when each of them is cached; when one
+#   is missing the whole run is needed anyway, and it is a miss.
+#
+# An entry is a directory `<root>/<key>/` holding the outputs and `entry.json`
+# (file names, run summary, last use). Outputs are hard-linked in and out of
+# the cache (copied when the cache is on another filesystem), so storing and
+# serving a multi-GB result is a metadata operation. On a hit the outputs are
+# linked into `outputs/` under a new name and the job completes immediately.
+#
+# Entries are evicted least-recently-used first once the cache exceeds
+# `max_total_mb`. Lookups, stores and evictions are serialized by one lock;
+# they only touch metadata.
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import metrics_service
+from .config_service import subtree_digest
+
+DEFAULT_CACHE_DIR = 'cache/results'
+DEFAULT_MAX_TOTAL_MB = 10_240
+SAMPLE_BLOCK_SIZE = 64 * 1024
+ENTRY_FILE = 'entry.json'
+# Bumped when a change to the pipeline alters the outputs for the same input and config.
+CACHE_FORMAT_VERSION = 2
+
+# The config subtrees read by the parser chain, the anonymization stages,
+# Drain3 and the writers.
+RESULT_CONFIG_PATHS = (
+    'parsers', 'presidio', 'drain3', 'centralized_regex', 'field_detection',
+    'pipeline.dedup', 'timestamp_normalization', 'template_labeling', 'output.parquet', 'output.result_store',
+)
+
+def fingerprint_file(path: str, mode: str = 'sampled') -> str:
+    """
+    Returns a digest identifying the content of a file.
+
+    Args:
+        path: The input file.
+        mode: 'sampled' (size, mtime and head/middle/tail blocks) or 'full'
+              (every byte).
+    """
+    digest = hashlib.sha256()
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        if mode == 'full':
+            digest.update(f'full:{stat.st_size}'.encode())
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        else:
+            digest.update(f'sampled:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+            for offset in sorted({0, max(0, stat.st_size // 2 - SAMPLE_BLOCK_SIZE // 2),
+                                  max(0, stat.st_size - SAMPLE_BLOCK_SIZE)}):
+                f.seek(offset)
+                digest.update(f.read(SAMPLE_BLOCK_SIZE))
+    return digest.hexdigest()
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    """Hard-links a file or directory tree, copying where links are not possible."""
+    def link(src: str, dst: str) -> None:
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    if source.is_dir():
+        shutil.copytree(source, target, copy_function=link)
+    else:
+        link(str(source), str(target))
+
+def _size(path: Path) -> int:
+    if path.is_dir():
+        return sum(child.stat().st_size for child in path.rglob('*') if child.is_file())
+    return path.stat().st_size
+
+
+class ResultCacheService:
+    """Stores and serves analysis outputs keyed on input fingerprint, config and format."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_total_mb: Optional[float] = DEFAULT_MAX_TOTAL_MB,
+                 fingerprint: str = 'sampled'):
+        """
+        Args:
+            cache_dir: The directory holding the entries.
+            max_total_mb: The disk quota; None disables eviction.
+            fingerprint: 'sampled' or 'full', see `fingerprint_file`.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024) if max_total_mb is not None else None
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+
+    def key(self, input_path: str, config: Dict[str, Any], output_format: str) -> str:
+        """Returns the cache key of one output format of an analysis."""
+        parts = [str(CACHE_FORMAT_VERSION), fingerprint_file(input_path, self.fingerprint),
+                 subtree_digest(config, RESULT_CONFIG_PATHS), output_format]
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def lookup(self, keys: Dict[str, str], output_dir: str, base_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Serves a set of outputs from the cache if every one of them is cached.
+
+        Args:
+            keys: Output format -> cache key.
+            output_dir: Where to link the cached outputs.
+            base_name: The file name prefix of the served outputs.
+
+        Returns:
+            None on a miss, otherwise {'outputs': format -> served path,
+            'summary': the summary of the run that produced them}.
+        """
+        with self._lock:
+            entries = {name: self._read_entry(key) for name, key in keys.items()}
+            for name, entry in entries.items():
+                # An entry whose output changed size was modified through a link: drop it.
+                if entry is not None and not self._intact(keys[name], entry):
+                    shutil.rmtree(self.cache_dir / keys[name], ignore_errors=True)
+                    entries[name] = None
+            if not entries or any(entry is None for entry in entries.values()):
+                metrics_service.count_cache('result_cache', hit=False)
+                return None
+            outputs: Dict[str, Path] = {}
+            for name, entry in entries.items():
+                source = self.cache_dir / keys[name] / entry['file']
+                target = Path(output_dir) / f"{base_name}{entry['suffix']}"
+                if target.exists():
+                    target = target.with_name(f"{base_name}_{keys[name][:8]}{entry['suffix']}")
+                target.parent.mkdir(parents=True, exist_ok=True)
+                _link_or_copy(source, target)
+                # A hard link shares the cached mtime: the served copy is new for the output retention.
+                os.utime(target)
+                outputs[name] = target
+                entry['last_used'] = time.time()
+                self._write_entry(keys[name], entry)
+            metrics_service.count_cache('result_cache', hit=True)
+            summary = dict(next(iter(entries.values()))['summary'])
+        summary['cache'] = 'hit'
+        return {'outputs': outputs, 'summary': summary}
+
+    def store(self, keys: Dict[str, str], outputs: Dict[str, Path], base_name: str, summary: Dict[str, Any]) -> None:
+        """
+        Adds the outputs of a finished run, then evicts entries over the quota.
+
+        Args:
+            keys: Output format -> cache key.
+            outputs: Output format -> path of the produced output.
+            base_name: The file name prefix of the outputs; the rest is kept
+                       as the suffix of the outputs served on hits.
+            summary: The run summary, served again on hits.
+        """
+        cached_summary = {key: value for key, value in summary.items() if key not in ('outputs', 'download_urls')}
+        with self._lock:
+            for name, key in keys.items():
+                source = Path(outputs[name])
+                if not source.exists():
+                    continue
+                entry_dir = self.cache_dir / key
+                staging = self.cache_dir / f".{key}.tmp"
+                shutil.rmtree(staging, ignore_errors=True)
+                staging.mkdir(parents=True)
+                suffix = source.name[len(base_name):] if source.name.startswith(base_name) else source.suffix
+                _link_or_copy(source, staging / source.name)
+                entry = {'file': source.name, 'suffix': suffix, 'size': _size(source),
+                         'summary': cached_summary, 'created': time.time(), 'last_used': time.time()}
+                (staging / ENTRY_FILE).write_text(json.dumps(entry))
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(staging, entry_dir)
+            self._evict()
+
+    def _evict(self) -> List[str]:
+        """Removes least-recently-used entries until the cache fits its quota. Caller holds the lock."""
+        if self.max_total_bytes is None or not self.cache_dir.is_dir():
+            return []
+        entries = []
+        for entry_dir in self.cache_dir.iterdir():
+            entry = self._read_entry(entry_dir.name) if not entry_dir.name.startswith('.') else None
+            if entry is not None:
+                entries.append((entry['last_used'], entry['size'], entry_dir))
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, entry_dir in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_total_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            removed.append(entry_dir.name)
+            total -= size
+        return removed
+
+    def _intact(self, key: str, entry: Dict[str, Any]) -> bool:
+        try:
+            return _size(self.cache_dir / key / entry['file']) == entry['size']
+        except OSError:
+            return False
+
+    def _read_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self.cache_dir / key / ENTRY_FILE).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, key: str, entry: Dict[str, Any]) -> None:
+        (self.cache_dir / key / ENTRY_FILE).write_text(json.dumps(entry))
@@ -0,0 +1,226 @@
+# === DESIGN COMMENT ===
+# Server-side queries over a job's result store (see
+# writers/result_store_writer.py), so the UI can filter and page through
+# millions of records without downloading an output.
+#
+# Paging is keyset-based: a page returns an opaque cursor holding the sort key
+# of its last record, and the next page asks for records strictly after it
+# (`WHERE id > ?` in line order, `WHERE (timestamp, id) > (?, ?)` in time
+# order). Unlike LIMIT/OFFSET, page 10,000 costs the same as page 1, and pages
+# stay stable while a running job appends records.
+#
+# Filters map onto the store's indexes: the template and parser filters walk
+# their (column, id) index in cursor order, and each `field=value` filter is a
+# lookup in the inverted `fields` index. Several filters are ANDed; a selective
+# field filter drives the query, otherwise it is probed per record (see
+# `_field_driver`). Counts are exact: `COUNT(*)` over the same
+# filters, served from the index (or from the `templates` table for a
+# template-only filter on a finished store); `with_count=False` skips them.
+#
+# Connections are opened read-only per query. They are cheap, and the store
+# is in WAL mode, so queries never block the job writing it.
+
+import base64
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Index entries read at most to estimate how many records a field filter matches.
+ESTIMATE_CAP = 10_000
+ORDERS = ('line', 'time')
+# The types of a cursor's key in each order: (id,) or (timestamp, id).
+CURSOR_TYPES = {'line': (int,), 'time': (str, int)}
+
+
+def encode_cursor(key: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """
+    Args:
+        cursor: A cursor produced by `encode_cursor`.
+        types: The type of each element of the key.
+
+    Raises:
+        ValueError: If the cursor was not produced by `encode_cursor`, or
+                    its key does not have the given types.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    # bool is an int to isinstance, not to the sort order.
+    if (not isinstance(key, list) or len(key) != len(types)
+            or any(type(value) is bool or not isinstance(value, kind) for value, kind in zip(key, types))):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key
+
+
+class ResultQueryService:
+    """Filters, counts and pages the records of one result store."""
+
+    def __init__(self, store_path: Path):
+        """
+        Args:
+            store_path: The SQLite database written by ResultStoreWriter.
+        """
+        self.store_path = Path(store_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.store_path}?mode=ro", uri=True)
+
+    def query(self, template_id: Optional[int] = None, anonymized_template_id: Optional[int] = None,
+              parser_name: Optional[str] = None, fields: Optional[Dict[str, str]] = None,
+              line_from: Optional[int] = None, line_to: Optional[int] = None,
+              order: str = 'line', cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+              with_count: bool = True) -> Dict[str, Any]:
+        """
+        Returns one page of the records matching every given filter.
+
+        Args:
+            template_id: The Drain3 cluster id of the original line.
+            anonymized_template_id: The Drain3 cluster id of the anonymized line.
+            parser_name: The parser that produced the record.
+            fields: Parsed field values, among the store's indexed fields.
+            line_from: The first line number included.
+            line_to: The last line number included.
+            order: 'line' (input order) or 'time' (timestamp, then line order).
+            cursor: The `next_cursor` of the previous page.
+            limit: The page size, capped at MAX_PAGE_SIZE.
+            with_count: Whether to count all the matching records.
+
+        Returns:
+            A dict with the page's `records`, the `next_cursor` (None on the
+            last page) and the total `count` (None when not requested).
+
+        Raises:
+            ValueError: On an unknown order or an invalid cursor.
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order: {order}")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        sort_columns = ('timestamp', 'id') if order == 'time' else ('id',)
+
+        after = decode_cursor(cursor, CURSOR_TYPES[order]) if cursor else []
+
+        with closing(self._connect()) as connection:
+            where, params = self._filters(
+                connection, template_id, anonymized_template_id, parser_name, fields, line_from, line_to)
+            page_where, page_params = list(where), params + after
+            if after:
+                page_where.append(f"({', '.join(sort_columns)}) > ({', '.join('?' * len(after))})")
+            sql = (f"SELECT id, timestamp, record FROM records {self._where(page_where)} "
+                   f"ORDER BY {', '.join(sort_columns)} LIMIT ?")
+            rows = connection.execute(sql, page_params + [limit + 1]).fetchall()
+            count = self._count(connection, where, params, template_id, len(where)) if with_count else None
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last_id, last_timestamp, _ = rows[-1]
+            next_cursor = encode_cursor([last_timestamp, last_id] if order == 'time' else [last_id])
+        return {
+            'records': [json.loads(record) for _, _, record in rows],
+            'next_cursor': next_cursor,
+            'count': count,
+        }
+
+    def templates(self, limit: int = MAX_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """Returns the templates with their record counts, most frequent first."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT template_id, template, count FROM templates ORDER BY count DESC LIMIT ?", (limit,)).fetchall()
+            if not rows:
+                # The store is still being written: the templates table is filled on close.
+                rows = connection.execute(
+                    "SELECT template_id, NULL, COUNT(*) AS count FROM records WHERE template_id IS NOT NULL "
+                    "GROUP BY template_id ORDER BY count DESC LIMIT ?", (limit,)).fetchall()
+        return [{'template_id': template_id, 'template': template, 'count': count}
+                for template_id, template, count in rows]
+
+    def parsers(self) -> Dict[str, int]:
+        """Returns the record count per parser."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT parser_name, COUNT(*) FROM records GROUP BY parser_name").fetchall()
+        return {parser_name: count for parser_name, count in rows}
+
+    def field_values(self, name: str, limit: int = DEFAULT_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """Returns the most frequent values of an indexed field."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT value, COUNT(*) AS count FROM fields WHERE name = ? GROUP BY value ORDER BY count DESC LIMIT ?",
+                (name, limit)).fetchall()
+        return [{'value': value, 'count': count} for value, count in rows]
+
+    def _filters(self, connection: sqlite3.Connection, template_id, anonymized_template_id, parser_name,
+                 fields, line_from, line_to) -> Tuple[List[str], List[Any]]:
+        columns = [(column, value) for column, value in (
+            ('template_id', template_id), ('anonymized_template_id', anonymized_template_id),
+            ('parser_name', parser_name)) if value is not None]
+        where = [f"{column} = ?" for column, _ in columns]
+        params: List[Any] = [value for _, value in columns]
+
+        field_items = [(name, str(value)) for name, value in (fields or {}).items()]
+        driver = self._field_driver(connection, columns, field_items)
+        for index, (name, value) in enumerate(field_items):
+            if index == driver:
+                where.append("id IN (SELECT record_id FROM fields WHERE name = ? AND value = ?)")
+            else:
+                where.append("EXISTS (SELECT 1 FROM fields WHERE name = ? AND value = ? AND record_id = records.id)")
+            params.extend([name, value])
+        if line_from is not None:
+            where.append("line_number >= ?")
+            params.append(line_from)
+        if line_to is not None:
+            where.append("line_number <= ?")
+            params.append(line_to)
+        return where, params
+
+    @staticmethod
+    def _field_driver(connection: sqlite3.Connection, columns: List[Tuple[str, Any]],
+                      field_items: List[Tuple[str, str]]) -> Optional[int]:
+        """
+        Returns the index of the field filter that should drive the query, or
+        None when the record indexes should.
+
+        SQLite has no value statistics for the inverted index, so it cannot
+        tell `srcip=10.0.7.7` (a few rows) from `action=accept` (a third of the
+        store). A field filter drives only when it matches fewer than
+        ESTIMATE_CAP records and fewer than every column filter; other field
+        filters are probed per record through the (name, value, record_id) key.
+        Each estimate reads at most ESTIMATE_CAP index entries.
+        """
+        if not field_items:
+            return None
+        estimates = [connection.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM fields WHERE name = ? AND value = ? LIMIT ?)",
+            (name, value, ESTIMATE_CAP)).fetchone()[0] for name, value in field_items]
+        driver = min(range(len(estimates)), key=estimates.__getitem__)
+        if estimates[driver] >= ESTIMATE_CAP:
+            return None
+        for column, value in columns:
+            column_estimate = connection.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM records WHERE {column} = ? LIMIT ?)",
+                (value, estimates[driver])).fetchone()[0]
+            if column_estimate < estimates[driver]:
+                return None
+        return driver
+
+    @staticmethod
+    def _where(conditions: List[str]) -> str:
+        return f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    def _count(self, connection: sqlite3.Connection, where: List[str], params: List[Any],
+               template_id: Optional[int], filter_count: int) -> int:
+        if template_id is not None and filter_count == 1:
+            row = connection.execute("SELECT count FROM templates WHERE template_id = ?", (template_id,)).fetchone()
+            if row is not None:
+                return row[0]
+        return connection.execute(f"SELECT COUNT(*) FROM records {self._where(where)}", params).fetchone()[0]
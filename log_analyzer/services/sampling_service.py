@@ -0,0 +1,271 @@
+# === DESIGN COMMENT ===
+# Sampled preview of an analysis: parser coverage, top templates and sample
+# anonymizations of a huge file in seconds, before committing to a full run.
+#
+# Sampling. Large files are never read in full: the file is cut into N equal
+# byte strata, a random offset is drawn in each, and the line *containing*
+# that offset is read (a short read back to the previous newline, in 4 KB
+# steps that double until one is found, and one forward to the next). N seeks,
+# spread over the whole file. A line is hit with probability proportional to
+# its length in bytes, so each sampled line is weighted by 1 / length
+# (Hansen-Hurwitz):
+#
+#   estimated lines       = file size * mean(1 / length)
+#   share of a category   = sum(1 / length over the category) / sum(1 / length)
+#
+# Offsets that land in a line longer than MAX_LINE_BYTES are not read; they
+# still count in the mean, with weight 0 (their 1 / length is below 2^-16),
+# or the line count would be biased upwards.
+#
+# Files small enough to read quickly (`sampling.full_scan_mb`), or whose
+# encoding has multi-byte newlines (UTF-16/32, where an offset cannot be
+# aligned on a line), are read sequentially with reservoir sampling instead:
+# a uniform sample, weight 1, and an exact line count.
+#
+# Estimation. The sample goes through the normal pipeline (parsers, Presidio,
+# Drain3 mined on the sample). Shares come with a Wilson score interval at
+# `sampling.confidence`, computed on Kish's effective sample size
+# (sum w)^2 / sum w^2 to account for the weights; estimated counts are the
+# share and its bounds times the estimated number of lines. Templates are
+# mined from the sample only: rare ones are missed and similar lines may be
+# merged differently than in a full run, so the template table is an
+# indication of the dominant shapes, not of the exact full-run clusters.
+
+import math
+import random
+import time
+from collections import defaultdict
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..parsing.interfaces import ParsedRecord
+from .log_processing_service import LogProcessingService, batched
+from .log_reader import detect_encoding, has_byte_newlines
+
+DEFAULT_SAMPLE_LINES = 1000
+MAX_SAMPLE_LINES = 20_000
+DEFAULT_TOP_TEMPLATES = 20
+DEFAULT_EXAMPLES = 10
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_FULL_SCAN_MB = 8
+# Longest line found by reading back from a sampled offset; longer ones are skipped.
+MAX_LINE_BYTES = 64 * 1024
+# First read back from a sampled offset, doubled until a newline is found.
+READ_BACK_BYTES = 4 * 1024
+UNPARSED = '(unparsed)'
+EMPTY = '(empty)'
+
+class SampledLine:
+    """A line picked by the sampler, with its estimation weight."""
+    __slots__ = ('offset', 'content', 'weight')
+
+    def __init__(self, offset: int, content: str, weight: float):
+        self.offset = offset
+        self.content = content
+        self.weight = weight
+
+
+def seek_sample(path: str, size: int, encoding: str, rng: random.Random) -> Tuple[List[SampledLine], int]:
+    """
+    Draws one line per byte stratum of the file.
+
+    Returns:
+        The sampled lines, in file order, and how many offsets landed in a
+        line longer than MAX_LINE_BYTES (skipped).
+    """
+    lines: List[SampledLine] = []
+    skipped = 0
+    with open(path, 'rb') as f:
+        file_size = f.seek(0, 2)
+        strata = max(1, size)
+        for index in range(strata):
+            offset = int(file_size * (index + rng.random()) / strata)
+            head = _read_back(f, offset)
+            if head is None:
+                skipped += 1
+                continue
+            f.seek(offset)
+            raw = head + f.readline(MAX_LINE_BYTES + 1)
+            if len(raw) > MAX_LINE_BYTES:
+                skipped += 1
+                continue
+            lines.append(SampledLine(offset - len(head), raw.decode(encoding, errors='ignore').strip(),
+                                     1.0 / len(raw)))
+    return lines, skipped
+
+def _read_back(f, offset: int) -> Optional[bytes]:
+    """
+    The bytes from the start of the line holding `offset` up to it, or None
+    if that line starts more than MAX_LINE_BYTES before.
+    """
+    head = b''
+    reach = READ_BACK_BYTES
+    while True:
+        start = max(0, offset - min(reach, MAX_LINE_BYTES))
+        f.seek(start)
+        block = f.read(offset - len(head) - start)
+        newline = block.rfind(b'\n')
+        if newline >= 0:
+            return block[newline + 1:] + head
+        head = block + head
+        if start == 0:
+            return head
+        if reach >= MAX_LINE_BYTES:
+            return None
+        reach *= 2
+
+def reservoir_sample(path: str, size: int, encoding: str, rng: random.Random) -> Tuple[List[SampledLine], int]:
+    """
+    Reads the whole file and keeps a uniform sample of `size` lines (Algorithm R).
+
+    Returns:
+        The sampled lines, in file order (`offset` is the line index), and the
+        number of lines in the file.
+    """
+    reservoir: List[SampledLine] = []
+    count = 0
+    with open(path, 'r', encoding=encoding, errors='ignore') as f:
+        for count, line in enumerate(f, 1):
+            if len(reservoir) < size:
+                reservoir.append(SampledLine(count - 1, line.strip(), 1.0))
+            else:
+                slot = rng.randrange(count)
+                if slot < size:
+                    reservoir[slot] = SampledLine(count - 1, line.strip(), 1.0)
+    reservoir.sort(key=lambda line: line.offset)
+    return reservoir, count
+
+def wilson_interval(share: float, effective_n: float, z: float) -> Tuple[float, float]:
+    """The Wilson score interval of a proportion observed on `effective_n` draws."""
+    if effective_n <= 0:
+        return 0.0, 1.0
+    denominator = 1 + z * z / effective_n
+    center = (share + z * z / (2 * effective_n)) / denominator
+    margin = z * math.sqrt(share * (1 - share) / effective_n + z * z / (4 * effective_n * effective_n)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class SamplingService:
+    """Runs the pipeline on a sample of a file and extrapolates its statistics."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: The full application configuration; `sampling` holds the
+                    sampler settings, the rest configures the pipeline.
+        """
+        settings = config.get('sampling', {})
+        self.config = config
+        self.default_lines = int(settings.get('default_lines', DEFAULT_SAMPLE_LINES))
+        self.max_lines = int(settings.get('max_lines', MAX_SAMPLE_LINES))
+        self.top_templates = int(settings.get('top_templates', DEFAULT_TOP_TEMPLATES))
+        self.examples = int(settings.get('examples', DEFAULT_EXAMPLES))
+        self.confidence = float(settings.get('confidence', DEFAULT_CONFIDENCE))
+        self.full_scan_bytes = int(settings.get('full_scan_mb', DEFAULT_FULL_SCAN_MB) * 1024 * 1024)
+
+    def preview(self, path: str, lines: Optional[int] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Samples a file, processes the sample and estimates the full-run statistics.
+
+        Args:
+            path: The input file.
+            lines: The sample size (capped at `sampling.max_lines`).
+            seed: Makes the sample reproducible.
+
+        Returns:
+            A report with the sampling method, the estimated line count, the
+            parser distribution and the top templates (each with share,
+            estimated count and confidence bounds) and example anonymizations.
+        """
+        started = time.perf_counter()
+        size = max(1, min(int(lines or self.default_lines), self.max_lines))
+        rng = random.Random(seed)
+        encoding = detect_encoding(path)
+        with open(path, 'rb') as f:
+            file_bytes = f.seek(0, 2)
+
+        skipped = 0
+        if file_bytes > self.full_scan_bytes and has_byte_newlines(encoding):
+            method = 'seek'
+            sample, skipped = seek_sample(path, size, encoding, rng)
+            scale = file_bytes
+        else:
+            method = 'reservoir'
+            sample, scale = reservoir_sample(path, size, encoding, rng)
+        sampled_at = time.perf_counter()
+
+        records = self._process(sample, path)
+        z = NormalDist().inv_cdf((1 + self.confidence) / 2)
+        weights = [line.weight for line in sample]
+        # Skipped draws hit over-long lines: weight 0 in the line count.
+        total = self._estimate_lines(weights + [0.0] * skipped, scale, z, exact=method == 'reservoir')
+
+        parsers: Dict[str, float] = defaultdict(float)
+        templates: Dict[str, float] = defaultdict(float)
+        for line, record in zip(sample, records):
+            category = EMPTY if not line.content else (record.parser_name if record is not None else UNPARSED)
+            parsers[category] += line.weight
+            if record is not None:
+                templates[record.drain3_original.get('template') or ''] += line.weight
+
+        top = sorted(templates.items(), key=lambda item: -item[1])[:self.top_templates]
+        return {
+            'file': path,
+            'method': method,
+            'encoding': encoding,
+            'file_bytes': file_bytes,
+            'sampled_lines': len(sample),
+            'skipped_long_lines': skipped,
+            'confidence': self.confidence,
+            'estimated_lines': total,
+            'parsers': {name: self._estimate(weight, weights, total['estimate'], z)
+                        for name, weight in sorted(parsers.items(), key=lambda item: -item[1])},
+            'templates': [{'template': template, **self._estimate(weight, weights, total['estimate'], z)}
+                          for template, weight in top],
+            'distinct_templates_in_sample': len(templates),
+            'examples': self._examples(sample, records),
+            'elapsed_seconds': {'sampling': round(sampled_at - started, 3),
+                                'pipeline': round(time.perf_counter() - sampled_at, 3)},
+        }
+
+    def _process(self, sample: List[SampledLine], path: str) -> List[Optional[ParsedRecord]]:
+        """Runs the pipeline on the sampled lines; None for the lines it drops (empty or unparsed)."""
+        service = LogProcessingService(self.config)
+        numbered = [(index, line.content) for index, line in enumerate(sample, 1) if line.content]
+        by_number: Dict[int, ParsedRecord] = {}
+        for batch in batched(numbered, service.batch_size):
+            for record in service.process_batch(batch, path):
+                by_number[record.line_number] = record
+        return [by_number.get(index) for index in range(1, len(sample) + 1)]
+
+    @staticmethod
+    def _estimate_lines(weights: List[float], scale: int, z: float, exact: bool) -> Dict[str, Any]:
+        if exact or not weights:
+            return {'estimate': scale, 'low': scale, 'high': scale}
+        n = len(weights)
+        mean = sum(weights) / n
+        variance = sum((w - mean) ** 2 for w in weights) / (n - 1) if n > 1 else mean * mean
+        margin = z * math.sqrt(variance / n)
+        return {'estimate': round(scale * mean), 'low': round(scale * max(0.0, mean - margin)),
+                'high': round(scale * (mean + margin))}
+
+    @staticmethod
+    def _estimate(weight: float, weights: List[float], total_lines: int, z: float) -> Dict[str, Any]:
+        """Share, bounds and estimated counts of a category holding `weight` of the sample's weights."""
+        weight_sum = sum(weights)
+        share = weight / weight_sum
+        effective_n = weight_sum * weight_sum / sum(w * w for w in weights)
+        low, high = wilson_interval(share, effective_n, z)
+        return {
+            'share': round(share, 4), 'share_low': round(low, 4), 'share_high': round(high, 4),
+            'estimated_lines': round(share * total_lines),
+            'estimated_low': round(low * total_lines), 'estimated_high': round(high * total_lines),
+        }
+
+    def _examples(self, sample: List[SampledLine], records: List[Optional[ParsedRecord]]) -> List[Dict[str, Any]]:
+        """Sampled lines whose anonymization changed something first, then the others."""
+        examples = [{'offset': line.offset, 'parser_name': record.parser_name, 'original': record.original_content,
+                     'anonymized': record.presidio_anonymized, 'template': record.drain3_original.get('template')}
+                    for line, record in zip(sample, records) if record is not None]
+        examples.sort(key=lambda example: example['anonymized'] == example['original'])
+        return examples[:self.examples]
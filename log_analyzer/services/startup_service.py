@@ -0,0 +1,116 @@
+# === DESIGN COMMENT ===
+# Start-up profiling and warm-up for the web app.
+#
+# The app module imports only what answering a request needs (FastAPI, the
+# configuration, the job and retention services, the writers). The heavy
+# dependencies are imported by the services that use them, at first use:
+# Presidio and spaCy (about a second to import, several more to load the model)
+# by PresidioService, Drain3 and chardet with the LogProcessingService. A
+# `--reload` restart and the first cheap request no longer wait for them.
+#
+# So that the first analysis or preview does not pay for them either, the app
+# starts a WarmupService thread that imports those modules and builds the cached
+# configuration artifacts (the parser chain, the Presidio analyzer with its
+# spaCy model) in the background. `/api/health` answers as soon as the server
+# is up; `/api/ready` returns 503 until the warm-up has finished, so a load
+# balancer or a deploy script can wait for a warm instance.
+#
+# The startup report (`/api/startup-profile`) breaks the time down into the app
+# import and each warm-up step, with the number of modules a step loaded and
+# the top-level packages among them.
+
+import importlib
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+class WarmupStatus:
+    PENDING = 'pending'
+    WARMING = 'warming'
+    READY = 'ready'
+
+
+def timed_import(module_name: str) -> Callable[[], Any]:
+    """A warm-up step that imports a module."""
+    return lambda: importlib.import_module(module_name)
+
+
+class WarmupService:
+    """Runs the warm-up steps once, in order, and reports their timings."""
+
+    def __init__(self, process_started: Optional[float] = None):
+        """
+        Args:
+            process_started: The `time.perf_counter()` value to measure the
+                             start-up from (e.g. taken first thing in the app
+                             module). Defaults to now.
+        """
+        self.started = process_started if process_started is not None else time.perf_counter()
+        self.app_import_seconds: Optional[float] = None
+        self.app_modules_loaded: Optional[int] = None
+        self.status = WarmupStatus.PENDING
+        self.ready_after_seconds: Optional[float] = None
+        self.steps: List[Dict[str, Any]] = []
+        self._pending_steps: List[tuple] = []
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def mark_app_imported(self) -> None:
+        """Records how long the app module took to import (call it at its end)."""
+        self.app_import_seconds = round(time.perf_counter() - self.started, 4)
+        self.app_modules_loaded = len(sys.modules)
+
+    def add_step(self, name: str, step: Callable[[], Any]) -> None:
+        self._pending_steps.append((name, step))
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def start(self) -> threading.Thread:
+        """Runs the steps on a daemon thread and returns it."""
+        thread = threading.Thread(target=self.run, name='warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def run(self) -> None:
+        """
+        Runs the steps in order. A failing step is recorded in the report and
+        does not stop the others: the service behind it reports the problem
+        again (e.g. Presidio disabled for a missing model) when it is used.
+        """
+        with self._lock:
+            if self.status != WarmupStatus.PENDING:
+                return
+            self.status = WarmupStatus.WARMING
+        for name, step in self._pending_steps:
+            modules_before = set(sys.modules)
+            started = time.perf_counter()
+            entry: Dict[str, Any] = {'step': name}
+            try:
+                step()
+            except Exception as e:
+                print(f"Warm-up step '{name}' failed: {e}")
+                entry['error'] = str(e)
+            entry['seconds'] = round(time.perf_counter() - started, 4)
+            loaded = set(sys.modules) - modules_before
+            entry['modules_loaded'] = len(loaded)
+            entry['packages'] = sorted({module.split('.')[0] for module in loaded})
+            self.steps.append(entry)
+        self.ready_after_seconds = round(time.perf_counter() - self.started, 4)
+        self.status = WarmupStatus.READY
+        self._ready.set()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'app_import_seconds': self.app_import_seconds,
+            'app_modules_loaded': self.app_modules_loaded,
+            'ready_after_seconds': self.ready_after_seconds,
+            'steps': list(self.steps),
+            'pending_steps': [name for name, _ in self._pending_steps[len(self.steps):]],
+        }
@@ -0,0 +1,140 @@
+# === DESIGN COMMENT ===
+# Template-level anonymization (`presidio.template_anonymization`).
+#
+# Lines of one Drain3 template differ only in its `<*>` slots, yet full-line
+# anonymization analyzes the constant words of every line again. In this mode
+# the pipeline mines the original line first and splits it along the template
+# it was mined into: runs of constant tokens and runs of slot tokens. Each
+# segment is anonymized once and cached:
+#
+# - a constant run on its own, so it is analyzed once per distinct template
+#   text (while a cluster is young its template is the whole line, which makes
+#   this the full-line path for the first lines of a template);
+# - a slot run together with up to `context_tokens` constant words on each
+#   side, so that e.g. "user <*> logged in" still gives NER the context of a
+#   name; only the entities within the slot are applied. The cache key is
+#   (left context, value, right context), shared by every line and template
+#   with that context.
+#
+# The segments of a line missing from the cache are analyzed together, in one
+# Presidio call (one text line per segment), and the line is re-assembled with
+# its own whitespace. The work therefore grows with distinct templates and
+# distinct slot values, not with lines: a line made only of known segments
+# costs no Presidio call at all. An entity crossing a constant/slot boundary
+# is cut at it, so the result can differ from the full-line path there;
+# `python -m benchmarks.template_anonymization_check` compares both paths on a
+# corpus. A line whose tokens do not line up with its template falls back to
+# the full-line path.
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics_service
+from .lru_memo import LRUMemo
+
+DEFAULT_CONTEXT_TOKENS = 3
+DEFAULT_CACHE_SIZE = 100_000
+# Drain3's wildcard for a variable token.
+PARAM = '<*>'
+
+# Drain3 splits on whitespace; these are the same tokens, with their offsets.
+_TOKEN = re.compile(r'\S+')
+
+
+def split_by_template(line: str, template: str) -> Optional[List[Tuple[int, int, bool]]]:
+    """
+    Splits a line into (start, end, is_slot) runs along its Drain3 template,
+    or returns None when the line does not fit the template.
+    """
+    spans = [match.span() for match in _TOKEN.finditer(line)]
+    tokens = template.split()
+    if len(spans) != len(tokens):
+        return None
+    runs: List[List[Any]] = []
+    for (start, end), token in zip(spans, tokens):
+        is_slot = token == PARAM
+        if not is_slot and line[start:end] != token:
+            return None
+        if runs and runs[-1][2] == is_slot:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end, is_slot])
+    return [tuple(run) for run in runs]
+
+
+class TemplateAnonymizationService:
+    """Anonymizes lines segment by segment along their Drain3 templates."""
+
+    def __init__(self, config: Dict[str, Any], presidio_service: Any, language: str = 'en'):
+        """
+        Args:
+            config: The `presidio.template_anonymization` section.
+            presidio_service: The PresidioService analyzing the segments.
+            language: The language passed to Presidio.
+        """
+        self.context_tokens = max(0, int(config.get('context_tokens', DEFAULT_CONTEXT_TOKENS)))
+        self.presidio_service = presidio_service
+        self.language = language
+        self._cache = LRUMemo(config.get('cache_size', DEFAULT_CACHE_SIZE))
+
+    @staticmethod
+    def is_enabled(config: Dict[str, Any]) -> bool:
+        return bool(config and config.get('enabled', False))
+
+    def anonymize(self, line: str, template: Optional[str]) -> Optional[str]:
+        """
+        Returns the anonymized line, or None when it does not fit `template`
+        (the caller then anonymizes the full line).
+        """
+        runs = split_by_template(line, template) if template else None
+        if runs is None:
+            return None
+        keys = [self._segment_key(line, runs, index) for index in range(len(runs))]
+        anonymized = [self._cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, value in zip(keys, anonymized) if value is None))
+        metrics_service.count_cache('template_anonymization', hit=True, amount=len(keys) - len(missing))
+        metrics_service.count_cache('template_anonymization', hit=False, amount=len(missing))
+        if missing:
+            computed = dict(zip(missing, self._anonymize_segments(missing)))
+            for key, value in computed.items():
+                self._cache.put(key, value)
+            anonymized = [computed[key] if value is None else value for key, value in zip(keys, anonymized)]
+
+        parts: List[str] = []
+        position = 0
+        for (start, end, _), value in zip(runs, anonymized):
+            parts.append(line[position:start])
+            parts.append(value)
+            position = end
+        parts.append(line[position:])
+        return ''.join(parts)
+
+    def _segment_key(self, line: str, runs: List[Tuple[int, int, bool]], index: int) -> Tuple[str, str, str]:
+        """(left context, segment, right context); only slots have a context."""
+        start, end, is_slot = runs[index]
+        left = right = ''
+        if is_slot and self.context_tokens:
+            if index > 0:
+                left = ' '.join(line[runs[index - 1][0]:runs[index - 1][1]].split()[-self.context_tokens:])
+            if index + 1 < len(runs):
+                right = ' '.join(line[runs[index + 1][0]:runs[index + 1][1]].split()[:self.context_tokens])
+        return left, line[start:end], right
+
+    def _anonymize_segments(self, keys: List[Tuple[str, str, str]]) -> List[str]:
+        """Anonymizes the segments of a line in one Presidio call, one text line each."""
+        pieces: List[str] = []
+        spans: List[Tuple[int, int]] = []
+        offset = 0
+        for left, segment, right in keys:
+            start = offset + (len(left) + 1 if left else 0)
+            spans.append((start, start + len(segment)))
+            pieces.append(' '.join(part for part in (left, segment, right) if part))
+            offset += len(pieces[-1]) + 1
+        return self.presidio_service.anonymize_spans('\n'.join(pieces), spans, language=self.language)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def shrink_cache(self) -> Optional[str]:
+        """Halves the segment cache under memory pressure (see MemoryGovernor)."""
+        return self._cache.shrink()
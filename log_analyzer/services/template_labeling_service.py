@@ -0,0 +1,286 @@
+# === DESIGN COMMENT ===
+# LLM labeling of Drain3 templates (`template_labeling`): each record gets a
+# category (`template_label`, e.g. "authentication", "network") from a model
+# served by Ollama (the `ollama` service of docker-compose, OLLAMA_BASE_URL).
+#
+# A model call takes hundreds of milliseconds, so lines are never sent: only
+# templates are, and only once. After each batch is mined, the batch's distinct
+# templates are looked up in
+#
+#   1. an in-memory memo of this service's labels,
+#   2. a persistent SQLite cache (`cache_path`) keyed by template text, model
+#      and category list, shared by every run and process on the host,
+#
+# and the remaining ones are sent to the model in requests of
+# `batch_templates` templates each, at most `concurrency` in flight (asyncio
+# tasks behind a semaphore). Within a run a Drain3 cluster keeps the label of
+# the first template text it was labeled under: templates generalize as more
+# lines are mined (`<*>` replacing tokens), which hardly changes their
+# category but would otherwise mean a new call for every variant. The cost of
+# a run thus grows with the number of clusters, not with its lines, and a
+# re-run of similar logs (whose clusters go through the same texts) costs no
+# call at all.
+#
+# The anonymized templates are sent by default (`source`), so the model never
+# sees the PII the rest of the pipeline removes. Labels outside `categories`
+# become "other". A failed request leaves its templates unlabeled (and
+# uncached); after `max_failures` failures in a row labeling is switched off
+# for the rest of the run, so an unreachable server costs a few timeouts, not
+# one per batch.
+#
+# The transport is a LabelClient: OllamaClient posts to `/api/generate`
+# with the standard library (in worker threads, keeping the pipeline free of
+# new dependencies); tests and other backends plug in their own client.
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..parsing.interfaces import ParsedRecord
+from .lru_memo import LRUMemo
+
+DEFAULT_BASE_URL = 'http://localhost:11434'
+DEFAULT_MODEL = 'llama3.2'
+DEFAULT_CATEGORIES = ('authentication', 'network', 'security', 'system', 'application', 'storage', 'database',
+                      'other')
+DEFAULT_BATCH_TEMPLATES = 20
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT_SECONDS = 60
+DEFAULT_MAX_FAILURES = 3
+DEFAULT_CACHE_PATH = 'cache/template_labels.sqlite'
+DEFAULT_MEMO_SIZE = 10_000
+SOURCES = ('anonymized', 'original')
+OTHER = 'other'
+
+PROMPT = """You classify log message templates. <*> marks a variable part.
+Assign each template exactly one category from this list: {categories}.
+
+Templates:
+{templates}
+
+Answer with JSON only: {{"labels": [one category per template, in order]}}"""
+
+
+class LabelingError(Exception):
+    """A labeling request failed or returned an unusable answer."""
+
+
+class LabelClient(ABC):
+    """Transport of labeling requests to a model."""
+
+    model: str
+
+    @abstractmethod
+    async def label(self, templates: List[str], categories: List[str]) -> List[str]:
+        """
+        Labels templates in one request.
+
+        Returns:
+            One raw label per template, in order.
+
+        Raises:
+            LabelingError: If the request fails or the answer cannot be read.
+        """
+
+
+class OllamaClient(LabelClient):
+    """Labels templates with Ollama's `/api/generate` endpoint (JSON mode, temperature 0)."""
+
+    def __init__(self, base_url: str, model: str, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.url = base_url.rstrip('/') + '/api/generate'
+        self.model = model
+        self.timeout = timeout
+
+    async def label(self, templates: List[str], categories: List[str]) -> List[str]:
+        prompt = PROMPT.format(categories=', '.join(categories),
+                               templates='\n'.join(f"{i}. {template}" for i, template in enumerate(templates, 1)))
+        payload = {'model': self.model, 'prompt': prompt, 'stream': False, 'format': 'json',
+                   'options': {'temperature': 0}}
+        body = await asyncio.to_thread(self._post, payload)
+        try:
+            labels = json.loads(body['response'])['labels']
+        except (KeyError, TypeError, ValueError) as e:
+            raise LabelingError(f"unreadable answer from {self.model}: {e}") from e
+        if not isinstance(labels, list) or len(labels) != len(templates):
+            raise LabelingError(f"{self.model} returned {len(labels) if isinstance(labels, list) else 'no'} labels "
+                                f"for {len(templates)} templates")
+        return [str(label) for label in labels]
+
+    def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError) as e:
+            raise LabelingError(f"request to {self.url} failed: {e}") from e
+
+
+class LabelCache:
+    """Persistent template labels in SQLite, keyed by (model, categories, template)."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS labels (model TEXT NOT NULL, categories TEXT NOT NULL, '
+                                 'template TEXT NOT NULL, label TEXT NOT NULL, '
+                                 'PRIMARY KEY (model, categories, template)) WITHOUT ROWID')
+
+    def get_many(self, model: str, categories: str, templates: List[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        # Stays under SQLite's default limit of 999 bound parameters.
+        for start in range(0, len(templates), 900):
+            chunk = templates[start:start + 900]
+            rows = self._connection.execute(
+                f"SELECT template, label FROM labels WHERE model = ? AND categories = ? "
+                f"AND template IN ({', '.join('?' * len(chunk))})", (model, categories, *chunk))
+            found.update(rows)
+        return found
+
+    def put_many(self, model: str, categories: str, labels: Iterable[Tuple[str, str]]) -> None:
+        with self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?)',
+                                         [(model, categories, template, label) for template, label in labels])
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class TemplateLabelingService:
+    """Attaches an LLM category to each record, labeling every distinct template once."""
+
+    def __init__(self, config: Dict[str, Any], client: Optional[LabelClient] = None):
+        """
+        Args:
+            config: The `template_labeling` section.
+            client: The model transport; an OllamaClient built from the
+                    section (and OLLAMA_BASE_URL) by default.
+        """
+        self.source = config.get('source', 'anonymized')
+        if self.source not in SOURCES:
+            raise ValueError(f"Unknown template labeling source: {self.source}. Choose from {', '.join(SOURCES)}")
+        self.categories = [str(category).lower() for category in config.get('categories') or DEFAULT_CATEGORIES]
+        self.batch_templates = max(1, int(config.get('batch_templates', DEFAULT_BATCH_TEMPLATES)))
+        self.concurrency = max(1, int(config.get('concurrency', DEFAULT_CONCURRENCY)))
+        self.max_failures = max(1, int(config.get('max_failures', DEFAULT_MAX_FAILURES)))
+        self.client = client or OllamaClient(
+            config.get('base_url') or os.environ.get('OLLAMA_BASE_URL') or DEFAULT_BASE_URL,
+            config.get('model', DEFAULT_MODEL), float(config.get('timeout_seconds', DEFAULT_TIMEOUT_SECONDS)))
+        self.categories_key = hashlib.sha256('\n'.join(self.categories).encode('utf-8')).hexdigest()[:16]
+        cache_path = config.get('cache_path', DEFAULT_CACHE_PATH)
+        self.cache = LabelCache(cache_path) if cache_path else None
+        self._memo = LRUMemo(DEFAULT_MEMO_SIZE)
+        # Drain3 cluster id -> label, for the run.
+        self._cluster_labels: Dict[Any, str] = {}
+
+        self.labeled = 0
+        self.cache_hits = 0
+        self.requests = 0
+        self.failures = 0
+        self.disabled = False
+        self._failures_in_a_row = 0
+
+    @staticmethod
+    def is_enabled(config: Dict[str, Any]) -> bool:
+        return bool(config and config.get('enabled', False))
+
+    def label_records(self, records: List[ParsedRecord]) -> None:
+        """Sets `template_label` on mined records (None where the template could not be labeled)."""
+        field = 'drain3_anonymized' if self.source == 'anonymized' else 'drain3_original'
+        results = [getattr(record, field) for record in records]
+        # Cluster id -> its template, for the clusters not labeled yet in this run.
+        unlabeled: Dict[Any, str] = {}
+        for result in results:
+            cluster_id, template = result.get('cluster_id'), result.get('template')
+            if template and cluster_id not in self._cluster_labels:
+                unlabeled.setdefault(cluster_id, template)
+        if unlabeled:
+            labels = self.labels(unlabeled.values())
+            for cluster_id, template in unlabeled.items():
+                if template in labels and cluster_id is not None:
+                    self._cluster_labels[cluster_id] = labels[template]
+        else:
+            labels = {}
+        for record, result in zip(records, results):
+            label = self._cluster_labels.get(result.get('cluster_id'))
+            record.template_label = label if label is not None else labels.get(result.get('template'))
+
+    def labels(self, templates: Iterable[str]) -> Dict[str, str]:
+        """Returns the label of each distinct template, asking the model for those not cached."""
+        labels: Dict[str, str] = {}
+        missing: List[str] = []
+        for template in dict.fromkeys(templates):
+            label = self._memo.get(template)
+            if label is None:
+                missing.append(template)
+            else:
+                labels[template] = label
+        if missing and self.cache is not None:
+            cached = self.cache.get_many(self.client.model, self.categories_key, missing)
+            self.cache_hits += len(cached)
+            for template, label in cached.items():
+                self._memo.put(template, label)
+            labels.update(cached)
+            missing = [template for template in missing if template not in cached]
+        if missing and not self.disabled:
+            fresh = asyncio.run(self._ask(missing))
+            for template, label in fresh.items():
+                self._memo.put(template, label)
+            if fresh and self.cache is not None:
+                self.cache.put_many(self.client.model, self.categories_key, fresh.items())
+            self.labeled += len(fresh)
+            labels.update(fresh)
+        return labels
+
+    async def _ask(self, templates: List[str]) -> Dict[str, str]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def request(chunk: List[str]) -> Dict[str, str]:
+            async with semaphore:
+                if self.disabled:
+                    return {}
+                self.requests += 1
+                try:
+                    raw = await self.client.label(chunk, self.categories)
+                except LabelingError as e:
+                    self._failed(e)
+                    return {}
+                self._failures_in_a_row = 0
+                return {template: self._category(label) for template, label in zip(chunk, raw)}
+
+        chunks = [templates[i:i + self.batch_templates] for i in range(0, len(templates), self.batch_templates)]
+        labels: Dict[str, str] = {}
+        for result in await asyncio.gather(*(request(chunk) for chunk in chunks)):
+            labels.update(result)
+        return labels
+
+    def _category(self, label: str) -> str:
+        label = label.strip().lower()
+        return label if label in self.categories else OTHER
+
+    def _failed(self, error: LabelingError) -> None:
+        self.failures += 1
+        self._failures_in_a_row += 1
+        print(f"Template labeling failed: {error}")
+        if self._failures_in_a_row >= self.max_failures:
+            self.disabled = True
+            print(f"Template labeling disabled for this run after {self._failures_in_a_row} failures in a row.")
+
+    def report(self) -> Dict[str, Any]:
+        """The `template_labels` section of the run summary."""
+        return {
+            'model': self.client.model,
+            'labeled': self.labeled,
+            'cache_hits': self.cache_hits,
+            'requests': self.requests,
+            'failures': self.failures,
+            'disabled': self.disabled,
+        }
@@ -0,0 +1,296 @@
+# === DESIGN COMMENT ===
+# Timestamp stage: fills `ParsedRecord.timestamp` with the record's time as
+# epoch seconds (UTC), so outputs can be ordered and windowed by time whatever
+# the source format (ISO 8601, syslog, Apache CLF, Fortinet `date`/`time` or
+# nanosecond `eventtime`, CEF `rt` in milliseconds, ...).
+#
+# Generic date parsers (dateutil) guess the layout of every value again, which
+# costs more than parsing the rest of the line. A file handled by one parser
+# has one layout, so it is learned once instead:
+#
+#   learn   The first time a parser's records are seen in a file, each
+#           candidate *extractor* (a source: one of `timestamp_normalization.fields`,
+#           the `date` + `time` pair or the start of the line; times a format:
+#           one of FORMATS or the configured `patterns`) is tried on the first
+#           `sample_lines` of them. The one matching the most records wins if it
+#           matches at least `min_match_ratio` of them; otherwise the parser is
+#           remembered as having no timestamp.
+#   parse   Every batch then runs each parser's extractor over its records:
+#           one compiled regex match per value. The part of the match up to
+#           the seconds (plus the UTC offset, if any) is looked up in a cache of
+#           recent prefixes: logs write many lines per second, so the calendar
+#           conversion runs about once per distinct second. The fraction of a
+#           second is added to the cached value.
+#   miss    A value the extractor does not match goes through every candidate
+#           (the slow path) and is counted as a fallback; a record without any
+#           timestamp keeps None.
+#
+# Naive timestamps are read in `timestamp_normalization.timezone`; formats
+# without a year (syslog) use `default_year` (default: the current year).
+# Learned extractors live as long as the service, i.e. for the runs of one
+# LogProcessingService; the settings apply from the next run.
+
+import re
+import time
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from ..parsing.interfaces import ParsedRecord
+
+DEFAULT_FIELDS = ('@timestamp', 'timestamp', 'eventtime', 'datetime', 'Event Time', 'rt', 'ts', 'time', 'date')
+DEFAULT_SAMPLE_LINES = 200
+DEFAULT_MIN_MATCH_RATIO = 0.5
+DEFAULT_PREFIX_CACHE_SIZE = 4096
+# Characters at the start of a line searched for a timestamp.
+CONTENT_SEARCH_CHARS = 64
+# Epoch values outside 2000-01-01 .. 2100-01-01 are not timestamps.
+EPOCH_MIN, EPOCH_MAX = 946_684_800, 4_102_444_800
+
+MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+# Every pattern names the part up to the seconds `k`, and may have a fraction
+# `f` and a UTC offset `z`. The date is in Y (or y, two digits), mo (or mon, a
+# month name) and d; the time in H, M, S.
+_SECONDS = r'(?P<H>\d{2}):(?P<M>\d{2}):(?P<S>\d{2})'
+_FRACTION = r'(?:[.,](?P<f>\d{1,9}))?'
+FORMATS = {
+    'iso8601': rf'(?P<k>(?P<Y>\d{{4}})-(?P<mo>\d{{2}})-(?P<d>\d{{2}})[T ]{_SECONDS}){_FRACTION} ?(?P<z>Z|[+-]\d{{2}}:?\d{{2}})?',
+    'slash_date': rf'(?P<k>(?P<Y>\d{{4}})/(?P<mo>\d{{2}})/(?P<d>\d{{2}})[ T-]{_SECONDS}){_FRACTION}',
+    'clf': rf'(?P<k>(?P<d>\d{{2}})/(?P<mon>[A-Z][a-z]{{2}})/(?P<Y>\d{{4}}):{_SECONDS}){_FRACTION}(?: (?P<z>[+-]\d{{4}}))?',
+    'syslog': rf'(?P<k>(?P<mon>[A-Z][a-z]{{2}}) +(?P<d>\d{{1,2}}) {_SECONDS}){_FRACTION}',
+    'month_day': rf'(?<![\d-])(?P<k>(?P<mo>\d{{2}})-(?P<d>\d{{2}})[ ,]{_SECONDS}){_FRACTION}',
+    'compact': r'^(?P<k>(?P<y>\d{2})(?P<mo>\d{2})(?P<d>\d{2}) (?P<H>\d{2})(?P<M>\d{2})(?P<S>\d{2}))\b',
+}
+# Seconds, milliseconds, microseconds or nanoseconds since the epoch (fields only).
+_EPOCH = re.compile(r'(\d{10}|\d{13}|\d{16}|\d{19})(?:\.(\d{1,9}))?')
+
+
+class _Format:
+    """A compiled timestamp layout and its cache of converted second prefixes."""
+
+    def __init__(self, name: str, pattern: str, service: 'TimestampService'):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.has_zone = 'z' in self.pattern.groupindex
+        self.has_fraction = 'f' in self.pattern.groupindex
+        self.service = service
+        self.cache: Dict[Any, float] = {}
+
+    def parse(self, value: Any, search: bool) -> Optional[float]:
+        if not isinstance(value, str):
+            return None
+        match = self.pattern.search(value, 0, CONTENT_SEARCH_CHARS) if search else self.pattern.match(value)
+        if match is None:
+            return None
+        key = match.group('k', 'z') if self.has_zone else match.group('k')
+        seconds = self.cache.get(key)
+        if seconds is None:
+            seconds = self._convert(match)
+            if seconds is None:
+                return None
+            if len(self.cache) >= self.service.prefix_cache_size:
+                self.cache.clear()
+            self.cache[key] = seconds
+        else:
+            self.service.cache_hits += 1
+        fraction = match.group('f') if self.has_fraction else None
+        return seconds + int(fraction) / 10 ** len(fraction) if fraction else seconds
+
+    def _convert(self, match: 're.Match[str]') -> Optional[float]:
+        """Epoch seconds of the match, without its fraction; None for an impossible date."""
+        groups = match.groupdict()
+        try:
+            if groups.get('Y'):
+                year = int(groups['Y'])
+            elif groups.get('y'):
+                year = 2000 + int(groups['y'])
+            else:
+                year = self.service.default_year
+            month = int(groups['mo']) if groups.get('mo') else MONTHS[groups['mon']]
+            zone = self.service.zone(groups.get('z'))
+            return datetime(year, month, int(groups['d']), int(groups['H']), int(groups['M']), int(groups['S']),
+                            tzinfo=zone).timestamp()
+        except (KeyError, ValueError):
+            return None
+
+
+class _RewriteFormat:
+    """A configured `timestamp_normalization.patterns` entry: rewritten to ISO 8601, then parsed."""
+
+    def __init__(self, name: str, pattern: str, replacement: str, iso: _Format, default_year: int):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.replacement = replacement.replace('{year}', str(default_year))
+        self.iso = iso
+
+    def parse(self, value: Any, search: bool) -> Optional[float]:
+        if not isinstance(value, str):
+            return None
+        match = self.pattern.search(value, 0, CONTENT_SEARCH_CHARS) if search else self.pattern.match(value)
+        if match is None:
+            return None
+        return self.iso.parse(match.expand(self.replacement), False)
+
+
+class _EpochFormat:
+    """Numeric epoch values, their unit told by the number of digits."""
+    name = 'epoch'
+
+    def parse(self, value: Any, search: bool) -> Optional[float]:
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            value = repr(value)
+        elif not isinstance(value, str):
+            return None
+        match = _EPOCH.fullmatch(value)
+        if match is None:
+            return None
+        digits, fraction = match.groups()
+        seconds = int(digits) / 10 ** (len(digits) - 10)
+        if fraction and len(digits) == 10:
+            seconds += int(fraction) / 10 ** len(fraction)
+        return seconds if EPOCH_MIN <= seconds < EPOCH_MAX else None
+
+
+class _Extractor:
+    """A source of the timestamp (a field, the date + time pair or the line) read with one format."""
+    __slots__ = ('source', 'format')
+
+    def __init__(self, source: Tuple[str, ...], format: Any):
+        self.source = source
+        self.format = format
+
+    def value(self, record: ParsedRecord) -> Any:
+        if not self.source:
+            return record.original_content
+        if len(self.source) == 2:
+            date, clock = record.parsed_data.get(self.source[0]), record.parsed_data.get(self.source[1])
+            return f"{date} {clock}" if date and clock else None
+        return record.parsed_data.get(self.source[0])
+
+    def parse(self, record: ParsedRecord) -> Optional[float]:
+        value = self.value(record)
+        return None if value is None else self.format.parse(value, not self.source)
+
+    def describe(self) -> str:
+        source = '+'.join(self.source) if self.source else 'line'
+        return f"{source}: {self.format.name}"
+
+
+class TimestampService:
+    """Learns each parser's timestamp layout per file and normalizes batches to epoch seconds."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: The `timestamp_normalization` section.
+        """
+        self.fields = tuple(config.get('fields') or DEFAULT_FIELDS)
+        self.sample_lines = max(1, int(config.get('sample_lines', DEFAULT_SAMPLE_LINES)))
+        self.min_match_ratio = float(config.get('min_match_ratio', DEFAULT_MIN_MATCH_RATIO))
+        self.prefix_cache_size = max(1, int(config.get('prefix_cache_size', DEFAULT_PREFIX_CACHE_SIZE)))
+        zone_name = config.get('timezone') or 'UTC'
+        self.timezone: tzinfo = timezone.utc if zone_name.upper() == 'UTC' else ZoneInfo(zone_name)
+        self.default_year = int(config.get('default_year') or time.gmtime().tm_year)
+        self._zones: Dict[str, tzinfo] = {}
+
+        self.formats = [_Format(name, pattern, self) for name, pattern in FORMATS.items()]
+        iso = self.formats[0]
+        self.formats.extend(_RewriteFormat(entry['name'], entry['pattern'], entry['replacement'], iso, self.default_year)
+                            for entry in config.get('patterns') or [])
+        self.epoch = _EpochFormat()
+        # (source file, parser name) -> learned extractor, None when the parser has no timestamp.
+        self.extractors: Dict[Tuple[Optional[str], str], Optional[_Extractor]] = {}
+        self.records = 0
+        self.cache_hits = 0
+        self.fallbacks = 0
+        self.missing = 0
+
+    @staticmethod
+    def is_enabled(config: Dict[str, Any]) -> bool:
+        return bool(config and config.get('enabled', False))
+
+    def zone(self, offset: Optional[str]) -> tzinfo:
+        """The tzinfo of a matched UTC offset ('Z', '+0200', '-05:00'), the configured zone if None."""
+        if offset is None:
+            return self.timezone
+        zone = self._zones.get(offset)
+        if zone is None:
+            if offset == 'Z':
+                zone = timezone.utc
+            else:
+                digits = offset[1:].replace(':', '')
+                delta = timedelta(hours=int(digits[:2]), minutes=int(digits[2:]))
+                zone = timezone(-delta if offset[0] == '-' else delta)
+            self._zones[offset] = zone
+        return zone
+
+    def normalize(self, records: List[ParsedRecord]) -> None:
+        """Sets `timestamp` on each record of a batch (None where none is found)."""
+        groups: Dict[Tuple[Optional[str], str], List[ParsedRecord]] = {}
+        for record in records:
+            groups.setdefault((record.source_file, record.parser_name), []).append(record)
+        for key, group in groups.items():
+            if key not in self.extractors:
+                self.extractors[key] = self._learn(group[:self.sample_lines])
+            extractor = self.extractors[key]
+            if extractor is None:
+                for record in group:
+                    record.timestamp = None
+                self.missing += len(group)
+                continue
+            parse = extractor.parse
+            for record in group:
+                value = parse(record)
+                if value is None:
+                    value = self._fallback(record)
+                record.timestamp = value
+        self.records += len(records)
+
+    def _candidates(self, records: List[ParsedRecord]) -> List[_Extractor]:
+        """The extractors worth trying on these records, most specific sources first."""
+        present = {name for record in records for name in record.parsed_data}
+        candidates = []
+        for name in self.fields:
+            if name in present:
+                candidates.append(_Extractor((name,), self.epoch))
+                candidates.extend(_Extractor((name,), fmt) for fmt in self.formats)
+        if 'date' in present and 'time' in present:
+            candidates.extend(_Extractor(('date', 'time'), fmt) for fmt in self.formats)
+        candidates.extend(_Extractor((), fmt) for fmt in self.formats)
+        return candidates
+
+    def _learn(self, sample: List[ParsedRecord]) -> Optional[_Extractor]:
+        best, best_hits = None, 0
+        # Trying the candidates fills the prefix caches, but is not a cache hit of the run.
+        cache_hits = self.cache_hits
+        for candidate in self._candidates(sample):
+            hits = sum(1 for record in sample if candidate.parse(record) is not None)
+            if hits > best_hits:
+                best, best_hits = candidate, hits
+        self.cache_hits = cache_hits
+        return best if best_hits >= len(sample) * self.min_match_ratio else None
+
+    def _fallback(self, record: ParsedRecord) -> Optional[float]:
+        """The slow path: every candidate on a record the learned extractor missed."""
+        for candidate in self._candidates([record]):
+            value = candidate.parse(record)
+            if value is not None:
+                self.fallbacks += 1
+                return value
+        self.missing += 1
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        """The `timestamps` section of the run summary."""
+        return {
+            'records': self.records,
+            'cache_hits': self.cache_hits,
+            'fallbacks': self.fallbacks,
+            'missing': self.missing,
+            'formats': {parser: extractor.describe() if extractor is not None else None
+                        for (_, parser), extractor in self.extractors.items()},
+        }
@@ -0,0 +1,268 @@
+# === DESIGN COMMENT ===
+# Streaming upload ingestion. An uploaded log is analyzed *while* it arrives
+# instead of after it has been copied into `examples/`:
+#
+#   HTTP body chunks -> UploadBodyDecoder -> UploadSpool (file in `uploads/`)
+#                                                 |
+#                     analysis job <- LogReader <- SpoolReader (follows the file)
+#
+# The spool is a plain file on disk, appended to as chunks arrive. Readers
+# follow it like `tail -f`: a read past the written end blocks on a condition
+# variable until the next chunk, the end of the upload, or a failure. Memory
+# is therefore bounded on both sides (one HTTP chunk, the reader's buffer and
+# one pipeline batch); when the pipeline is slower than the network the
+# backlog accumulates on disk, not in memory.
+#
+# An upload can be a raw body (`application/octet-stream`, `text/plain`) or a
+# `multipart/form-data` form, whose first file part is extracted on the fly
+# with python-multipart's streaming parser (nothing is buffered per part).
+#
+# Failure modes: a body larger than `uploads.max_mb`, a client disconnect or a
+# reader waiting longer than `uploads.idle_timeout_seconds` for data fail the
+# spool, and the reader raises UploadError, which fails the analysis job
+# instead of completing it with partial results.
+
+import io
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # pragma: no cover - python-multipart < 0.0.13 names its module `multipart`
+    from multipart.multipart import MultipartParser, parse_options_header
+
+DEFAULT_UPLOAD_DIR = 'uploads'
+DEFAULT_MAX_UPLOAD_MB = 10_240
+DEFAULT_IDLE_TIMEOUT_SECONDS = 300.0
+
+class UploadError(Exception):
+    """The upload was rejected, interrupted or stalled."""
+
+
+class UploadTooLargeError(UploadError):
+    """The upload exceeds the configured size limit."""
+
+
+class UploadStatus:
+    RECEIVING = 'receiving'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+
+
+class UploadSpool:
+    """An upload being written to disk, readable while it grows."""
+
+    def __init__(self, path: Path, expected_bytes: Optional[int] = None,
+                 max_bytes: Optional[int] = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS):
+        """
+        Args:
+            path: The spool file, created (or truncated) here.
+            expected_bytes: The announced size, used for progress only.
+            max_bytes: The size above which the upload is rejected.
+            idle_timeout: Seconds a reader waits for new data before failing the upload.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.expected_bytes = expected_bytes
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.bytes_received = 0
+        self.status = UploadStatus.RECEIVING
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._file = open(self.path, 'wb')
+        self._condition = threading.Condition()
+
+    def write(self, data: bytes) -> None:
+        """
+        Appends a chunk and wakes up the readers.
+
+        Raises:
+            UploadError: If the spool is no longer receiving or the chunk
+                         exceeds `max_bytes` (the spool is then failed).
+        """
+        if not data:
+            return
+        with self._condition:
+            if self.status != UploadStatus.RECEIVING:
+                raise UploadError(self.error or f"Upload is {self.status}")
+            if self.max_bytes is not None and self.bytes_received + len(data) > self.max_bytes:
+                message = f"Upload exceeds the limit of {self.max_bytes} bytes"
+                self.fail(message)
+                raise UploadTooLargeError(message)
+            self._file.write(data)
+            # Flushed before it is counted, so readers never wait on bytes still in our buffer.
+            self._file.flush()
+            self.bytes_received += len(data)
+            self._condition.notify_all()
+
+    def finish(self) -> None:
+        """Marks the upload complete: readers see end-of-file after the last byte."""
+        self._close(UploadStatus.COMPLETE)
+
+    def fail(self, message: str) -> None:
+        """Marks the upload failed: readers raise UploadError."""
+        self._close(UploadStatus.FAILED, message)
+
+    def _close(self, status: str, error: Optional[str] = None) -> None:
+        with self._condition:
+            if self.status != UploadStatus.RECEIVING:
+                return
+            self._file.close()
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self._condition.notify_all()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status != UploadStatus.RECEIVING
+
+    def wait_for_data(self, position: int) -> bool:
+        """
+        Blocks until more than `position` bytes have been received.
+
+        Returns:
+            True if there is data past `position`, False at the end of a
+            complete upload.
+
+        Raises:
+            UploadError: If the upload failed or no data arrived within `idle_timeout`.
+        """
+        with self._condition:
+            while True:
+                if self.bytes_received > position:
+                    return True
+                if self.status == UploadStatus.COMPLETE:
+                    return False
+                if self.status == UploadStatus.FAILED:
+                    raise UploadError(self.error or "Upload failed")
+                if not self._condition.wait(timeout=self.idle_timeout) and self.bytes_received <= position \
+                        and self.status == UploadStatus.RECEIVING:
+                    self._close(UploadStatus.FAILED, f"No upload data received for {self.idle_timeout:g}s")
+
+    def open(self) -> io.BufferedReader:
+        """Opens a binary reader that follows the spool until the upload ends."""
+        return io.BufferedReader(SpoolReader(self))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'status': self.status,
+            'bytes_received': self.bytes_received,
+            'expected_bytes': self.expected_bytes,
+            'error': self.error,
+        }
+
+
+class SpoolReader(io.RawIOBase):
+    """A raw stream over an UploadSpool that blocks at the written end instead of returning EOF."""
+
+    def __init__(self, spool: UploadSpool):
+        super().__init__()
+        self._spool = spool
+        self._file = open(spool.path, 'rb', buffering=0)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            count = self._file.readinto(buffer)
+            if count:
+                return count
+            if not self._spool.wait_for_data(self._file.tell()):
+                return 0
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class UploadBodyDecoder:
+    """
+    Writes an HTTP request body to a spool, chunk by chunk: raw bodies as they
+    are, multipart forms through a streaming parser keeping only the first file part.
+    """
+
+    def __init__(self, content_type: Optional[str], spool: UploadSpool):
+        """
+        Raises:
+            UploadError: If a multipart content type has no boundary.
+        """
+        self.spool = spool
+        self._parser = None
+        media_type, options = _parse_content_type(content_type)
+        if media_type == 'multipart/form-data':
+            boundary = options.get(b'boundary')
+            if not boundary:
+                raise UploadError("Multipart upload without a boundary")
+            self._headers: Dict[bytes, bytes] = {}
+            self._header_field = b''
+            self._header_value = b''
+            self._in_file_part = False
+            self._file_parts = 0
+            self._parser = MultipartParser(boundary, callbacks={
+                'on_part_begin': self._on_part_begin,
+                'on_header_field': self._on_header_field,
+                'on_header_value': self._on_header_value,
+                'on_header_end': self._on_header_end,
+                'on_headers_finished': self._on_headers_finished,
+                'on_part_data': self._on_part_data,
+            })
+
+    def feed(self, chunk: bytes) -> None:
+        if self._parser is None:
+            self.spool.write(chunk)
+        else:
+            self._parser.write(chunk)
+
+    def close(self) -> None:
+        """
+        Completes the upload.
+
+        Raises:
+            UploadError: If a multipart body carried no file part.
+        """
+        if self._parser is not None:
+            self._parser.finalize()
+            if not self._file_parts:
+                raise UploadError("Multipart upload without a file part")
+        self.spool.finish()
+
+    # --- python-multipart callbacks ---
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._in_file_part = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b''
+
+    def _on_headers_finished(self) -> None:
+        _, options = _parse_content_type(self._headers.get(b'content-disposition', b'').decode('latin-1'))
+        if b'filename' in options and not self._file_parts:
+            self._in_file_part = True
+            self._file_parts += 1
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file_part:
+            self.spool.write(data[start:end])
+
+
+def _parse_content_type(value: Optional[str]) -> Tuple[str, Dict[bytes, bytes]]:
+    media_type, options = parse_options_header(value or '')
+    return media_type.decode('latin-1').lower(), options
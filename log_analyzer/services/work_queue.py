@@ -0,0 +1,260 @@
+# === DESIGN COMMENT ===
+# Work queue for distributed runs (see distributed_service). A coordinator
+# publishes tasks, workers on any number of nodes claim them, heartbeat while
+# they work, and publish one result per task. WorkBroker is the abstraction;
+# SpoolDirectoryBroker, the default, needs nothing but a directory shared by
+# every node (a local disk for one host, NFS for several):
+#
+#   <root>/pending/<task>.a<attempt>.json              published, not claimed
+#   <root>/claimed/<task>.a<attempt>.<worker>.json     being processed
+#   <root>/done/<task>.a<attempt>.<worker>.json        result available
+#   <root>/failed/<task>.a<attempt>.json               out of attempts
+#   <root>/results/<task>.a<attempt>.ndjson            the task's result
+#   <root>/runs/<run>.json                             the run's configuration
+#
+# Every state change is a rename(), which is atomic within one file system,
+# NFS included: two workers renaming the same pending file cannot both
+# succeed, so a task has at most one owner. Files are always written under a
+# dot-prefixed temporary name first and renamed into place, so a reader never
+# sees a partial file.
+#
+# Worker death: a worker touches its claim file every few seconds. A claim
+# left untouched for longer than the lease is taken back (renamed away, so the
+# late worker's `complete` fails) and republished with the next attempt
+# number, or moved to failed/ once the task has used `max_attempts`. Results
+# are kept per attempt, so a late result can never replace the one the
+# coordinator is reading.
+
+import json
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_MAX_ATTEMPTS = 3
+STATES = ('pending', 'claimed', 'done', 'failed', 'results', 'runs')
+
+class Task(NamedTuple):
+    """A unit of work. `worker_id` is set once claimed."""
+    task_id: str
+    attempt: int
+    payload: Dict[str, Any]
+    worker_id: Optional[str] = None
+
+
+def default_worker_id() -> str:
+    """Host name and process id: unique across the nodes sharing a queue."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkBroker(ABC):
+    """Transports tasks from a coordinator to workers and their results back."""
+
+    @abstractmethod
+    def put_run(self, run_id: str, config: Dict[str, Any]) -> None:
+        """Publishes the configuration the workers use for a run's tasks."""
+
+    @abstractmethod
+    def get_run(self, run_id: str) -> Dict[str, Any]:
+        """Returns the configuration published with `put_run`."""
+
+    @abstractmethod
+    def publish(self, task_id: str, payload: Dict[str, Any]) -> None:
+        """Queues a new task (attempt 0)."""
+
+    @abstractmethod
+    def claim(self, worker_id: str) -> Optional[Task]:
+        """Takes the oldest pending task, or returns None if there is none."""
+
+    @abstractmethod
+    def heartbeat(self, task: Task) -> bool:
+        """Renews a claim. Returns False if the claim was taken back."""
+
+    @abstractmethod
+    def open_result(self, task: Task) -> BinaryIO:
+        """Opens the claimed task's result for writing; it is published by `complete`."""
+
+    @abstractmethod
+    def complete(self, task: Task) -> bool:
+        """Publishes the result. Returns False (and drops it) if the claim was taken back."""
+
+    @abstractmethod
+    def fail(self, task: Task, error: str) -> None:
+        """Gives a claimed task back for another attempt, or fails it for good."""
+
+    @abstractmethod
+    def requeue_stale(self, lease_seconds: float) -> List[str]:
+        """Takes back the claims not renewed within the lease. Returns their task ids."""
+
+    @abstractmethod
+    def claimed(self, prefix: str = '') -> Dict[str, str]:
+        """Task id -> worker id of the tasks being processed whose id starts with `prefix`."""
+
+    @abstractmethod
+    def completed(self, prefix: str = '') -> Dict[str, Dict[str, Any]]:
+        """Task id -> {'attempt', 'worker_id'} of the completed tasks whose id starts with `prefix`."""
+
+    @abstractmethod
+    def failed(self, prefix: str = '') -> Dict[str, str]:
+        """Task id -> last error of the tasks out of attempts whose id starts with `prefix`."""
+
+    @abstractmethod
+    def read_result(self, task_id: str, attempt: int) -> BinaryIO:
+        """Opens a completed task's result for reading."""
+
+    @abstractmethod
+    def purge(self, prefix: str) -> None:
+        """Removes every file of the tasks and runs whose id starts with `prefix`."""
+
+
+class SpoolDirectoryBroker(WorkBroker):
+    """A WorkBroker on a shared directory, coordinated by atomic renames."""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: The spool directory, shared by the coordinator and the workers.
+        """
+        self.root = Path(root)
+        for state in STATES:
+            (self.root / state).mkdir(parents=True, exist_ok=True)
+
+    def put_run(self, run_id: str, config: Dict[str, Any]) -> None:
+        self._write_json(self.root / 'runs' / f"{run_id}.json", config)
+
+    def get_run(self, run_id: str) -> Dict[str, Any]:
+        return json.loads((self.root / 'runs' / f"{run_id}.json").read_text(encoding='utf-8'))
+
+    def publish(self, task_id: str, payload: Dict[str, Any]) -> None:
+        self._write_json(self.root / 'pending' / f"{task_id}.a0.json",
+                         {'task_id': task_id, 'attempt': 0, 'payload': payload, 'errors': []})
+
+    def claim(self, worker_id: str) -> Optional[Task]:
+        for name in sorted(self._list('pending')):
+            task_id, attempt = self._parse_name(name)
+            claimed = self.root / 'claimed' / f"{task_id}.a{attempt}.{worker_id}.json"
+            try:
+                os.rename(self.root / 'pending' / name, claimed)
+            except FileNotFoundError:
+                continue  # Another worker was faster.
+            # The claim starts its lease now, not when the task was published.
+            os.utime(claimed)
+            document = json.loads(claimed.read_text(encoding='utf-8'))
+            return Task(task_id, attempt, document['payload'], worker_id)
+        return None
+
+    def heartbeat(self, task: Task) -> bool:
+        try:
+            os.utime(self._claim_path(task))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def open_result(self, task: Task) -> BinaryIO:
+        return open(self._staging_path(task), 'wb')
+
+    def complete(self, task: Task) -> bool:
+        result = self.root / 'results' / f"{task.task_id}.a{task.attempt}.ndjson"
+        os.rename(self._staging_path(task), result)
+        try:
+            os.rename(self._claim_path(task), self.root / 'done' / self._claim_path(task).name)
+        except FileNotFoundError:
+            result.unlink(missing_ok=True)
+            return False
+        return True
+
+    def fail(self, task: Task, error: str) -> None:
+        self._staging_path(task).unlink(missing_ok=True)
+        self._retry(self._claim_path(task), error)
+
+    def requeue_stale(self, lease_seconds: float) -> List[str]:
+        requeued = []
+        now = time.time()
+        for name in self._list('claimed'):
+            path = self.root / 'claimed' / name
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            # A rename updates the ctime and a heartbeat both times.
+            if now - max(stat.st_mtime, stat.st_ctime) > lease_seconds:
+                if self._retry(path, f"Lease of {lease_seconds:g}s expired for worker {self._worker_of(name)}"):
+                    requeued.append(self._parse_name(name)[0])
+        return requeued
+
+    def claimed(self, prefix: str = '') -> Dict[str, str]:
+        return {self._parse_name(name)[0]: self._worker_of(name)
+                for name in self._list('claimed') if name.startswith(prefix)}
+
+    def completed(self, prefix: str = '') -> Dict[str, Dict[str, Any]]:
+        completed = {}
+        for name in self._list('done'):
+            if name.startswith(prefix):
+                task_id, attempt = self._parse_name(name)
+                completed[task_id] = {'attempt': attempt, 'worker_id': self._worker_of(name)}
+        return completed
+
+    def failed(self, prefix: str = '') -> Dict[str, str]:
+        failed = {}
+        for name in self._list('failed'):
+            if name.startswith(prefix):
+                document = json.loads((self.root / 'failed' / name).read_text(encoding='utf-8'))
+                failed[document['task_id']] = document['errors'][-1] if document['errors'] else 'unknown error'
+        return failed
+
+    def read_result(self, task_id: str, attempt: int) -> BinaryIO:
+        return open(self.root / 'results' / f"{task_id}.a{attempt}.ndjson", 'rb')
+
+    def purge(self, prefix: str) -> None:
+        for state in STATES:
+            for name in os.listdir(self.root / state):
+                if name.lstrip('.').startswith(prefix):
+                    (self.root / state / name).unlink(missing_ok=True)
+
+    # --- helpers ---
+
+    def _retry(self, claim: Path, error: str) -> bool:
+        """Moves a claim back to pending with the next attempt, or to failed/. False if it is gone."""
+        # Taking the claim away first makes the owner's `complete` fail and
+        # keeps two coordinators from both requeuing it.
+        taken = claim.with_name(f".{claim.name}.retry")
+        try:
+            os.rename(claim, taken)
+        except FileNotFoundError:
+            return False
+        document = json.loads(taken.read_text(encoding='utf-8'))
+        document['errors'].append(error)
+        document['attempt'] += 1
+        max_attempts = document['payload'].get('max_attempts', DEFAULT_MAX_ATTEMPTS)
+        state = 'pending' if document['attempt'] < max_attempts else 'failed'
+        self._write_json(self.root / state / f"{document['task_id']}.a{document['attempt']}.json", document)
+        taken.unlink()
+        return True
+
+    def _claim_path(self, task: Task) -> Path:
+        return self.root / 'claimed' / f"{task.task_id}.a{task.attempt}.{task.worker_id}.json"
+
+    def _staging_path(self, task: Task) -> Path:
+        return self.root / 'results' / f".{task.task_id}.a{task.attempt}.{task.worker_id}.tmp"
+
+    def _list(self, state: str) -> List[str]:
+        return [name for name in os.listdir(self.root / state) if not name.startswith('.')]
+
+    @staticmethod
+    def _parse_name(name: str) -> Tuple[str, int]:
+        """'<task>.a<attempt>[.<worker>].json' -> (task, attempt). Task ids contain no dots."""
+        task_id, attempt = name.split('.', 2)[:2]
+        return task_id, int(attempt[1:])
+
+    @staticmethod
+    def _worker_of(name: str) -> str:
+        """'<task>.a<attempt>.<worker>.json' -> worker."""
+        return name.split('.', 2)[2][:-len('.json')]
+
+    @staticmethod
+    def _write_json(path: Path, document: Dict[str, Any]) -> None:
+        staging = path.with_name(f".{path.name}.tmp")
+        staging.write_text(json.dumps(document), encoding='utf-8')
+        os.rename(staging, path)
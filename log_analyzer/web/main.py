@@ -1,13 +1,18 @@
 import sys
 import os
-import json
-import csv
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Header, Query, Request
+from starlette.requests import ClientDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
@@ -16,19 +21,120 @@ from pydantic import BaseModel
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 # --- Service-based Imports ---
+# Presidio/spaCy and the pipeline (Drain3, chardet) are imported on first use
+# and by the warm-up thread, see startup_service.
 from log_analyzer.services.config_service import ConfigService
-from log_analyzer.services.presidio_service import PresidioService
-from log_analyzer.parsing.interfaces import LogEntry, ParsedRecord
-from log_analyzer.parsing.parser_factory import create_parser_chain
-from log_analyzer.services.log_reader import LogReader
-from log_analyzer.services.drain3_service import Drain3Service
+from log_analyzer.services import metrics_service
+from log_analyzer.services.startup_service import WarmupService, timed_import
+from log_analyzer.services.job_service import AnalysisJob, JobManager, DEFAULT_MAX_CONCURRENT_JOBS, DEFAULT_MAX_HISTORY
+from log_analyzer.services.upload_service import (
+    UploadBodyDecoder, UploadError, UploadSpool, UploadTooLargeError, DEFAULT_IDLE_TIMEOUT_SECONDS, DEFAULT_MAX_UPLOAD_MB, DEFAULT_UPLOAD_DIR)
+from log_analyzer.services import result_cache_service
+from log_analyzer.services.result_cache_service import ResultCacheService
+from log_analyzer.services.result_query_service import DEFAULT_PAGE_SIZE, ResultQueryService
+from log_analyzer.services.output_retention_service import OutputRetentionService, DEFAULT_MAX_AGE_HOURS, DEFAULT_MAX_TOTAL_MB
+from log_analyzer.parsing.parser_factory import get_parser_chain, get_schema_hints
+from log_analyzer.writers.writer_factory import FORMAT_ALIASES, WRITER_REGISTRY, create_writers, resolve_formats
+from log_analyzer.web import streaming
+
+OUTPUT_DIR = "outputs"
+RESULT_STORE_FORMAT = "result_store"
 
 # --- FastAPI App Initialization ---
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="log_analyzer/web/static"), name="static")
-app.mount("/outputs", StaticFiles(directory="outputs"), name="outputs")
 templates = Jinja2Templates(directory="log_analyzer/web/templates")
 
+# --- Background Jobs & Output Retention ---
+# Built from the configuration by the startup hook, not at import time: the
+# module is also imported outside the container (tests, tooling), where
+# /app/config/config.yaml does not exist.
+job_manager: Optional[JobManager] = None
+retention_service: Optional[OutputRetentionService] = None
+result_cache: Optional[ResultCacheService] = None
+_uploads_config: Dict[str, Any] = {}
+
+# Outputs of the synchronous runs in progress; like those of active jobs,
+# retention must not remove them while they are being written.
+_running_outputs: Dict[int, List[Path]] = {}
+_running_outputs_lock = threading.Lock()
+
+def _enforce_retention(_finished_job: Optional[AnalysisJob] = None) -> None:
+    active_outputs = [path for job in job_manager.active_jobs() for path in job.outputs.values()]
+    with _running_outputs_lock:
+        active_outputs.extend(path for paths in _running_outputs.values() for path in paths)
+    removed = retention_service.enforce(protected_paths=active_outputs)
+    if removed:
+        print(f"Output retention: removed {len(removed)} expired output(s).")
+
+@contextmanager
+def _protected_outputs(writers: Dict[str, Any]):
+    """Protects the outputs of a synchronous run from retention while it writes them."""
+    paths = [writer.output_path for writer in writers.values()]
+    with _running_outputs_lock:
+        _running_outputs[id(paths)] = paths
+    try:
+        yield
+    finally:
+        with _running_outputs_lock:
+            del _running_outputs[id(paths)]
+
+def _configure_services(config: Dict[str, Any]) -> None:
+    """Creates the services configured by config.yaml."""
+    global job_manager, retention_service, result_cache, _uploads_config
+    metrics_service.set_enabled(config.get("metrics", {}).get("enabled", True))
+    jobs_config = config.get("jobs", {})
+    job_manager = JobManager(
+        max_concurrent=jobs_config.get("max_concurrent", DEFAULT_MAX_CONCURRENT_JOBS),
+        max_history=jobs_config.get("max_history", DEFAULT_MAX_HISTORY),
+    )
+    retention_config = config.get("output", {}).get("retention", {})
+    retention_service = OutputRetentionService(
+        OUTPUT_DIR,
+        max_age_hours=retention_config.get("max_age_hours", DEFAULT_MAX_AGE_HOURS),
+        max_total_mb=retention_config.get("max_total_mb", DEFAULT_MAX_TOTAL_MB),
+    )
+    job_manager.on_job_finished(_enforce_retention)
+    job_manager.on_job_finished(_remove_upload)
+
+    cache_config = config.get("result_cache", {})
+    result_cache = ResultCacheService(
+        cache_config.get("directory", result_cache_service.DEFAULT_CACHE_DIR),
+        max_total_mb=cache_config.get("max_total_mb", result_cache_service.DEFAULT_MAX_TOTAL_MB),
+        fingerprint=cache_config.get("fingerprint", "sampled"),
+    ) if cache_config.get("enabled", True) else None
+    _uploads_config = config.get("uploads", {})
+
+# --- Lazy Services & Warm-up ---
+def _presidio_service(presidio_config: Dict[str, Any]):
+    from log_analyzer.services.presidio_service import PresidioService  # Deferred: imports spaCy.
+    return PresidioService(presidio_config)
+
+def _processing_service(config: Dict[str, Any], config_service: ConfigService):
+    from log_analyzer.services.log_processing_service import LogProcessingService  # Deferred: imports Drain3.
+    return LogProcessingService(config, config_service=config_service)
+
+warmup_service = WarmupService(_import_started)
+
+def _add_warmup_steps(config: Dict[str, Any]) -> None:
+    if not config.get("startup", {}).get("warmup", True):
+        return
+    warmup_service.add_step("import_pipeline", timed_import("log_analyzer.services.log_processing_service"))
+    warmup_service.add_step("parser_chain", lambda: get_parser_chain(ConfigService().load_config()))
+    if config.get("presidio", {}).get("enabled", False):
+        warmup_service.add_step("import_presidio", timed_import("log_analyzer.services.presidio_service"))
+        # Builds the cached analyzer, loading the spaCy model.
+        warmup_service.add_step("presidio_analyzer",
+                                lambda: _presidio_service(ConfigService().load_config().get("presidio", {})))
+
+@app.on_event("startup")
+async def start_services():
+    config = ConfigService().load_config()
+    _configure_services(config)
+    await run_in_threadpool(_enforce_retention)
+    _add_warmup_steps(config)
+    warmup_service.start()
+
 # --- Pydantic Models ---
 class PreviewRequest(BaseModel):
     sample_text: str
@@ -40,33 +146,20 @@ class ConfigUpdateRequest(BaseModel):
 class AnalysisRequest(BaseModel):
     input_file: str
 
-# --- Formatting Helper Functions ---
-def format_as_anonymized_text(records: List[ParsedRecord], output_path: str):
-    with open(output_path, "w", encoding="utf-8") as f:
-        for record in records:
-            f.write(f"{record.presidio_anonymized or ''}\n")
-
-def format_as_logppt(records: List[ParsedRecord], output_path: str):
-    if not records: return
-    all_keys = set()
-    for record in records:
-        if record.parsed_data: all_keys.update(record.parsed_data.keys())
-    sorted_keys = sorted(list(all_keys))
-    headers = ["LineId", "Timestamp"] + sorted_keys + ["Content", "EventId", "Template"]
-    with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        for record in records:
-            drain_result = record.drain3_anonymized or {}
-            row = {"LineId": record.line_number, "Timestamp": record.timestamp, "Content": record.unparsed_content, "EventId": drain_result.get("cluster_id", "N/A"), "Template": drain_result.get("template_mined", "N/A")}
-            for key in sorted_keys:
-                row[key] = record.parsed_data.get(key, "")
-            writer.writerow(row)
-
-def format_as_json_report(records: List[ParsedRecord], output_path: str):
-    report = [record.model_dump(exclude_none=True) for record in records]
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2)
+class MultiFormatAnalysisRequest(BaseModel):
+    input_file: str
+    formats: List[str] = ["anonymize", "logppt", "json_report"]
+    # False forces a new run even if the result cache holds these outputs.
+    use_cache: bool = True
+    # When set, returns a sampled preview of that many lines instead of
+    # running the full analysis (no outputs written); `seed` makes it reproducible.
+    sample_lines: Optional[int] = None
+    seed: Optional[int] = None
+
+class UploadJobRequest(BaseModel):
+    filename: str
+    formats: List[str] = ["anonymize", "logppt", "json_report"]
+    size: Optional[int] = None
 
 # --- API Endpoints ---
 
@@ -84,7 +177,7 @@ async def get_config():
     config = config_service.load_config()
     presidio_config = config.get("presidio", {})
 
-    presidio_service = PresidioService(presidio_config)
+    presidio_service = await run_in_threadpool(_presidio_service, presidio_config)
 
     detailed_entities = presidio_service.get_recognizer_details()
 
@@ -134,7 +227,7 @@ async def preview_anonymization(preview_request: PreviewRequest):
         return JSONResponse(content={"anonymized_text": ""})
 
     try:
-        presidio_service = PresidioService(presidio_config)
+        presidio_service = await run_in_threadpool(_presidio_service, presidio_config)
 
         if not presidio_service.is_enabled:
             return JSONResponse(content={"anonymized_text": "[PREVIEW] Presidio is disabled."})
@@ -173,66 +266,418 @@ async def preview_anonymization(preview_request: PreviewRequest):
         import traceback
         return JSONResponse(status_code=500, content={"error": f"An error occurred during preview: {traceback.format_exc()}"})
 
-@app.post("/api/analysis/{analysis_type}")
-async def run_analysis(analysis_type: str, request: AnalysisRequest):
+def _output_base_name(input_file: str) -> str:
+    """
+    The common file name prefix of the outputs of one run, named after the
+    input file. Never reuses the prefix of existing outputs: writers would
+    truncate them in place, and they may be hard links into the result cache.
+    """
+    base_name = f"{Path(input_file).stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    candidate, counter = base_name, 1
+    output_dir = Path(OUTPUT_DIR)
+    while any(output_dir.glob(f"{candidate}.*")) or any(output_dir.glob(f"{candidate}_*")):
+        counter += 1
+        candidate = f"{base_name}_{counter}"
+    return candidate
+
+def _create_analysis_writers(base_name: str, formats: List[str], config: Dict[str, Any]):
+    """Creates the writers of one analysis run."""
+    schema_hints = get_schema_hints(get_parser_chain(config))
+    return create_writers(formats, OUTPUT_DIR, base_name, config, schema_hints)
+
+def _result_cache_keys(input_path: str, formats: List[str], config: Dict[str, Any],
+                       use_cache: bool) -> Optional[Dict[str, str]]:
+    """The result cache key of each output format, or None when the cache is not used."""
+    if result_cache is None or not use_cache:
+        return None
+    return {name: result_cache.key(input_path, config, name) for name in resolve_formats(formats)}
+
+def _store_in_result_cache(cache_keys: Optional[Dict[str, str]], outputs: Dict[str, Any], base_name: str,
+                           summary: Dict[str, Any]) -> None:
+    """Caches the outputs of a run, unless the configuration changed during it (the keys would not describe them)."""
+    if not cache_keys or summary.get("config_reloads"):
+        return
+    result_cache.store(cache_keys, outputs, base_name, summary)
+    summary["cache"] = "miss"
+
+def _download_urls(outputs: Dict[str, Any]) -> Dict[str, str]:
+    return {name: f"/api/outputs/{Path(path).name}" for name, path in outputs.items()}
+
+def _run_analysis(input_file: str, formats: List[str], use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Runs one single-pass analysis producing every requested output format,
+    or serves the outputs from the result cache. Blocking: call it from a
+    worker thread.
+    """
+    config_service = ConfigService()
+    config = config_service.load_config()
+    input_path = os.path.join("examples", input_file)
+    base_name = _output_base_name(input_file)
+    cache_keys = _result_cache_keys(input_path, formats, config, use_cache)
+    hit = result_cache.lookup(cache_keys, OUTPUT_DIR, base_name) if cache_keys else None
+    if hit:
+        summary = hit["summary"]
+        summary["download_urls"] = _download_urls(hit["outputs"])
+        return summary
+
+    writers = _create_analysis_writers(base_name, formats, config)
+    with _protected_outputs(writers):
+        summary = _processing_service(config, config_service).process_file(input_path, writers)
+        outputs = summary.pop("outputs")
+        _store_in_result_cache(cache_keys, outputs, base_name, summary)
+    summary["download_urls"] = _download_urls(outputs)
+    _enforce_retention()
+    return summary
+
+async def _analysis_response(input_file: str, formats: List[str], use_cache: bool = True):
+    if not os.path.exists(os.path.join("examples", input_file)):
+        return JSONResponse(status_code=404, content={"error": "Input file not found."})
     try:
-        config_service = ConfigService()
-        config = config_service.load_config()
-
-        log_reader = LogReader(config)
-        parser_chain = create_parser_chain(config)
-        drain3_service = Drain3Service(config)
-        presidio_service = PresidioService(config.get('presidio', {}))
-
-        input_path = os.path.join("examples", request.input_file)
-        if not os.path.exists(input_path):
-            return JSONResponse(status_code=404, content={"error": "Input file not found."})
-
-        all_records: List[ParsedRecord] = []
-        for line_num, line_content in log_reader.read_lines(input_path):
-            if not line_content: continue
-
-            log_entry = LogEntry(line_number=line_num, content=line_content, source_file=input_path)
-            parsed_record = parser_chain.handle(log_entry)
-
-            if parsed_record:
-                parsed_record.presidio_anonymized = presidio_service.anonymize_text(
-                    parsed_record.original_content,
-                    language=config.get('presidio', {}).get('analyzer', {}).get('languages', ['en'])[0]
-                )
-                parsed_record.presidio_metadata = []
-                all_records.append(parsed_record)
-
-        original_content = [rec.original_content for rec in all_records]
-        original_results = drain3_service.process_batch(original_content, 'original')
-        anonymized_content = [rec.presidio_anonymized or "" for rec in all_records]
-        anonymized_results = drain3_service.process_batch(anonymized_content, 'anonymized')
-
-        for i, record in enumerate(all_records):
-            if i < len(original_results): record.drain3_original = original_results[i]
-            if i < len(anonymized_results): record.drain3_anonymized = anonymized_results[i]
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename_base = f"{Path(request.input_file).stem}_{analysis_type}_{timestamp}"
-        output_filename = ""
-
-        if analysis_type == "anonymize":
-            output_filename = f"{output_filename_base}.log"
-            output_path = os.path.join("outputs", output_filename)
-            format_as_anonymized_text(all_records, output_path)
-        elif analysis_type == "logppt":
-            output_filename = f"{output_filename_base}.csv"
-            output_path = os.path.join("outputs", output_filename)
-            format_as_logppt(all_records, output_path)
-        elif analysis_type == "json_report":
-            output_filename = f"{output_filename_base}.json"
-            output_path = os.path.join("outputs", output_filename)
-            format_as_json_report(all_records, output_path)
-        else:
-            return JSONResponse(status_code=400, content={"error": "Invalid analysis type."})
-
-        return {"download_url": f"/outputs/{output_filename}"}
+        resolve_formats(formats)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    try:
+        return await run_in_threadpool(_run_analysis, input_file, formats, use_cache)
     except Exception as e:
         import traceback
         print(traceback.format_exc())
         return JSONResponse(status_code=500, content={"error": f"An error occurred during analysis: {str(e)}"})
+
+def _run_sampled_analysis(input_file: str, sample_lines: int, seed: Optional[int]) -> Dict[str, Any]:
+    """Previews an analysis on a sample of the file, with estimated totals. Blocking."""
+    from log_analyzer.services.sampling_service import SamplingService  # Deferred: imports Drain3.
+    config = ConfigService().load_config()
+    preview = SamplingService(config).preview(os.path.join("examples", input_file), sample_lines, seed)
+    preview["file"] = input_file
+    return preview
+
+async def _sampled_analysis_response(input_file: str, sample_lines: int, seed: Optional[int]):
+    if not os.path.exists(os.path.join("examples", input_file)):
+        return JSONResponse(status_code=404, content={"error": "Input file not found."})
+    if sample_lines < 1:
+        return JSONResponse(status_code=400, content={"error": "sample_lines must be positive."})
+    try:
+        return await run_in_threadpool(_run_sampled_analysis, input_file, sample_lines, seed)
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        return JSONResponse(status_code=500, content={"error": f"An error occurred during sampling: {str(e)}"})
+
+@app.get("/api/output-formats", response_class=JSONResponse)
+async def get_output_formats():
+    return {
+        "formats": {name: spec.description for name, spec in WRITER_REGISTRY.items()},
+        "aliases": FORMAT_ALIASES,
+    }
+
+@app.post("/api/analysis")
+async def run_multi_format_analysis(request: MultiFormatAnalysisRequest):
+    """
+    Runs the pipeline once and writes all the requested formats from that pass.
+    With `sample_lines`, returns a sampled preview with estimated totals instead.
+    """
+    if request.sample_lines is not None:
+        return await _sampled_analysis_response(request.input_file, request.sample_lines, request.seed)
+    return await _analysis_response(request.input_file, request.formats, request.use_cache)
+
+@app.post("/api/analysis/{analysis_type}")
+async def run_analysis(analysis_type: str, request: AnalysisRequest):
+    """
+    Single-format entry point kept for the UI buttons. `logppt` produces both
+    LogPPT variants; `download_url` points at the first output.
+    """
+    response = await _analysis_response(request.input_file, [analysis_type])
+    if isinstance(response, dict):
+        response["download_url"] = next(iter(response["download_urls"].values()))
+    return response
+
+# --- Monitoring ---
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Pipeline instrumentation in the Prometheus text exposition format."""
+    return PlainTextResponse(metrics_service.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/health")
+async def get_health():
+    """Liveness: the server is up, even while it is still warming up."""
+    return {"status": "ok"}
+
+@app.get("/api/ready")
+async def get_readiness():
+    """Readiness: 503 until the warm-up (heavy imports, NLP model) has finished."""
+    report = warmup_service.report()
+    content = {"ready": warmup_service.is_ready, "status": report["status"], "pending_steps": report["pending_steps"]}
+    return JSONResponse(status_code=200 if warmup_service.is_ready else 503, content=content)
+
+@app.get("/api/startup-profile")
+async def get_startup_profile():
+    """Import-time breakdown of the app and of each warm-up step."""
+    return warmup_service.report()
+
+# --- Background Jobs ---
+
+def _job_formats(formats: List[str], config: Dict[str, Any]) -> List[str]:
+    """Jobs always get a result store so the UI can query them (see /api/jobs/{id}/records)."""
+    formats = list(formats)
+    if config.get("output", {}).get("result_store", {}).get("enabled", True) and RESULT_STORE_FORMAT not in formats:
+        formats.append(RESULT_STORE_FORMAT)
+    return formats
+
+@app.post("/api/jobs", status_code=202)
+async def submit_analysis_job(request: MultiFormatAnalysisRequest):
+    """
+    Queues an analysis and returns immediately. Its outputs can be downloaded
+    (streamed) while the job is still running.
+    """
+    if not os.path.exists(os.path.join("examples", request.input_file)):
+        return JSONResponse(status_code=404, content={"error": "Input file not found."})
+    try:
+        resolve_formats(request.formats)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    config_service = ConfigService()
+    config = config_service.load_config()
+    formats = _job_formats(request.formats, config)
+    input_path = os.path.join("examples", request.input_file)
+    base_name = _output_base_name(request.input_file)
+    # The fingerprint is taken at submission, so a file changed while the job is queued is not cached under it.
+    cache_keys = await run_in_threadpool(_result_cache_keys, input_path, formats, config, request.use_cache)
+    if cache_keys:
+        hit = await run_in_threadpool(result_cache.lookup, cache_keys, OUTPUT_DIR, base_name)
+        if hit:
+            job = AnalysisJob(request.input_file, formats, {}, outputs=hit["outputs"])
+            job_manager.complete(job, hit["summary"])
+            return _job_response(job)
+
+    writers = await run_in_threadpool(_create_analysis_writers, base_name, formats, config)
+    job = AnalysisJob(request.input_file, formats, writers)
+
+    def run(job: AnalysisJob) -> Dict[str, Any]:
+        service = _processing_service(config, config_service)
+        summary = service.process_file(input_path, job.writers, progress=job.record_progress)
+        summary.pop("outputs")
+        _store_in_result_cache(cache_keys, job.outputs, base_name, summary)
+        return summary
+
+    job_manager.submit(job, run)
+    return _job_response(job)
+
+# --- Streaming Uploads ---
+
+def _remove_upload(job: AnalysisJob) -> None:
+    if job.upload is not None and not _uploads_config.get("keep", False):
+        job.upload.path.unlink(missing_ok=True)
+
+@app.post("/api/uploads", status_code=202)
+async def create_upload_job(request: UploadJobRequest):
+    """
+    Creates an analysis job fed by an upload. Send the file to the returned
+    `upload_url` (PUT, raw body or multipart form): the job parses and
+    anonymizes it while it is being uploaded, and `GET /api/jobs/{id}`
+    reports the upload and processing progress together.
+    """
+    try:
+        resolve_formats(request.formats)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    filename = os.path.basename(request.filename)
+    if not filename or filename.startswith("."):
+        return JSONResponse(status_code=400, content={"error": "Invalid file name."})
+    max_bytes = int(_uploads_config.get("max_mb", DEFAULT_MAX_UPLOAD_MB) * 1024 * 1024)
+    if request.size is not None and request.size > max_bytes:
+        return JSONResponse(status_code=413, content={"error": f"Uploads are limited to {max_bytes} bytes."})
+
+    config_service = ConfigService()
+    config = config_service.load_config()
+    formats = _job_formats(request.formats, config)
+    writers = await run_in_threadpool(_create_analysis_writers, _output_base_name(filename), formats, config)
+    job = AnalysisJob(filename, formats, writers)
+    upload_dir = Path(_uploads_config.get("directory", DEFAULT_UPLOAD_DIR))
+    job.upload = UploadSpool(upload_dir / f"{job.job_id}_{filename}", expected_bytes=request.size, max_bytes=max_bytes,
+                             idle_timeout=_uploads_config.get("idle_timeout_seconds", DEFAULT_IDLE_TIMEOUT_SECONDS))
+
+    def run(job: AnalysisJob) -> Dict[str, Any]:
+        service = _processing_service(config, config_service)
+        summary = service.process_stream(job.upload.open, job.writers, source_file=job.input_file,
+                                         progress=job.record_progress)
+        summary.pop("outputs")
+        return summary
+
+    job_manager.submit(job, run)
+    response = _job_response(job)
+    response["upload_url"] = f"/api/uploads/{job.job_id}"
+    return response
+
+@app.put("/api/uploads/{job_id}")
+async def upload_job_input(job_id: str, request: Request):
+    """Receives the body of an upload job chunk by chunk, feeding the running analysis."""
+    job = job_manager.get(job_id)
+    if not job or job.upload is None:
+        return JSONResponse(status_code=404, content={"error": "Upload job not found."})
+    spool = job.upload
+    if spool.is_finished or spool.bytes_received:
+        return JSONResponse(status_code=409, content={"error": "The upload of this job has already started."})
+    try:
+        decoder = UploadBodyDecoder(request.headers.get("content-type"), spool)
+        async for chunk in request.stream():
+            await run_in_threadpool(decoder.feed, chunk)
+        await run_in_threadpool(decoder.close)
+    except UploadError as e:
+        spool.fail(str(e))
+        return JSONResponse(status_code=413 if isinstance(e, UploadTooLargeError) else 400, content={"error": str(e)})
+    except ClientDisconnect:
+        spool.fail("Client disconnected during the upload.")
+        return JSONResponse(status_code=400, content={"error": "Client disconnected during the upload."})
+    finally:
+        # Any other error must not leave the job waiting for data until the idle timeout.
+        if not spool.is_finished:
+            spool.fail("Upload interrupted.")
+    return _job_response(job)
+
+def _job_response(job: AnalysisJob) -> Dict[str, Any]:
+    response = job.to_dict()
+    response["download_urls"] = {
+        name: f"/api/jobs/{job.job_id}/outputs/{name}" for name in job.outputs
+    }
+    return response
+
+@app.get("/api/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"error": "Job not found."})
+    return _job_response(job)
+
+# --- Result Queries ---
+
+def _result_query_service(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        return None, JSONResponse(status_code=404, content={"error": "Job not found."})
+    path = job.outputs.get(RESULT_STORE_FORMAT)
+    if path is None or not path.exists():
+        return None, JSONResponse(status_code=404, content={"error": "This job has no result store."})
+    return ResultQueryService(path), None
+
+def _parse_field_filters(field_filters: Optional[List[str]]) -> Dict[str, str]:
+    """Parses `name:value` query parameters. Raises ValueError on a malformed filter."""
+    fields = {}
+    for item in field_filters or []:
+        name, separator, value = item.partition(":")
+        if not separator or not name:
+            raise ValueError(f"Invalid field filter (expected name:value): {item}")
+        fields[name] = value
+    return fields
+
+@app.get("/api/jobs/{job_id}/records")
+async def query_job_records(job_id: str, template: Optional[int] = None, anonymized_template: Optional[int] = None,
+                            parser: Optional[str] = None, field: Optional[List[str]] = Query(None),
+                            line_from: Optional[int] = None, line_to: Optional[int] = None,
+                            order: str = "line", cursor: Optional[str] = None,
+                            limit: int = DEFAULT_PAGE_SIZE, count: bool = True):
+    """
+    Filters and pages the records of a job (also while it runs). Filters are
+    ANDed; `field` can be repeated as `name:value`. Pass the returned
+    `next_cursor` as `cursor` for the next page.
+    """
+    service, error = _result_query_service(job_id)
+    if error:
+        return error
+    try:
+        return await run_in_threadpool(
+            service.query, template_id=template, anonymized_template_id=anonymized_template, parser_name=parser,
+            fields=_parse_field_filters(field), line_from=line_from, line_to=line_to,
+            order=order, cursor=cursor, limit=limit, with_count=count)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+@app.get("/api/jobs/{job_id}/facets")
+async def get_job_facets(job_id: str, field: Optional[List[str]] = Query(None)):
+    """Record counts per template and per parser, plus the top values of the requested indexed fields."""
+    service, error = _result_query_service(job_id)
+    if error:
+        return error
+
+    def facets() -> Dict[str, Any]:
+        return {
+            "templates": service.templates(),
+            "parsers": service.parsers(),
+            "fields": {name: service.field_values(name) for name in field or []},
+        }
+    return await run_in_threadpool(facets)
+
+# --- Downloads ---
+
+def _stream_output(path: Path, accept_encoding: Optional[str], range_header: Optional[str],
+                   job: Optional[AnalysisJob] = None, output_name: Optional[str] = None):
+    """
+    Builds a chunked response for an output, compressed on the fly when the
+    client accepts it. A file of a running job is followed until it is complete.
+    """
+    encoding = streaming.negotiate_encoding(accept_encoding, path)
+    headers = {"Content-Disposition": f'attachment; filename="{path.name}{".tar" if path.is_dir() else ""}"'}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+
+    if job is not None and not job.is_finished:
+        if path.is_dir():
+            return JSONResponse(status_code=409, content={"error": "Dataset outputs can be downloaded once the job has finished."})
+        chunks = streaming.iter_growing_file(
+            path, lambda: job.is_finished, lambda: job.provisional_tail_bytes(output_name))
+        return StreamingResponse(streaming.iter_encoded(chunks, encoding),
+                                 media_type=streaming.output_media_type(path), headers=headers)
+
+    if not path.exists():
+        return JSONResponse(status_code=404, content={"error": "Output not found."})
+    if path.is_dir():
+        chunks = streaming.iter_directory_tar(path)
+        return StreamingResponse(streaming.iter_encoded(chunks, encoding),
+                                 media_type=streaming.output_media_type(path), headers=headers)
+
+    size = path.stat().st_size
+    if encoding != "identity":
+        return StreamingResponse(streaming.iter_encoded(streaming.iter_file(path), encoding),
+                                 media_type=streaming.output_media_type(path), headers=headers)
+
+    headers["Accept-Ranges"] = "bytes"
+    try:
+        byte_range = streaming.parse_range(range_header, size)
+    except ValueError:
+        return JSONResponse(status_code=416, content={"error": "Requested range not satisfiable."},
+                            headers={"Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(streaming.iter_file(path), media_type=streaming.output_media_type(path), headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(streaming.iter_file(path, start, end), status_code=206,
+                             media_type=streaming.output_media_type(path), headers=headers)
+
+@app.get("/api/jobs/{job_id}/outputs/{output_name}")
+async def download_job_output(job_id: str, output_name: str,
+                              accept_encoding: Optional[str] = Header(None), range: Optional[str] = Header(None)):
+    job = job_manager.get(job_id)
+    if not job or output_name not in job.outputs:
+        return JSONResponse(status_code=404, content={"error": "Output not found."})
+    return _stream_output(job.outputs[output_name], accept_encoding, range, job, output_name)
+
+@app.get("/api/outputs/{filename}")
+@app.get("/outputs/{filename}")
+async def download_output(filename: str,
+                          accept_encoding: Optional[str] = Header(None), range: Optional[str] = Header(None)):
+    output_dir = Path(OUTPUT_DIR).resolve()
+    path = (output_dir / os.path.basename(filename)).resolve()
+    if path.parent != output_dir or path.name.startswith("."):
+        return JSONResponse(status_code=403, content={"error": "Access forbidden."})
+    for job in job_manager.active_jobs():
+        for name, output_path in job.outputs.items():
+            if output_path.resolve() == path:
+                return _stream_output(path, accept_encoding, range, job, name)
+    return _stream_output(path, accept_encoding, range)
+
+warmup_service.mark_app_imported()
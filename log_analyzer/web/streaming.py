@@ -0,0 +1,202 @@
+# === DESIGN COMMENT ===
+# Helpers behind the result download endpoints. They turn an output (a file that
+# may still be growing, or a Parquet dataset directory) into an iterator of byte
+# chunks for a chunked `StreamingResponse`:
+#
+# - Content-Encoding negotiation: zstd (if `zstandard` is installed) or gzip is
+#   applied on the fly when the client accepts it and the payload is not already
+#   compressed. Compression levels favour speed: the bottleneck of a multi-GB
+#   download is the network, but the CPU is shared with running analyses.
+# - Range requests (RFC 7233, single range only) for resuming a download. They
+#   apply to the identity representation of a finished output; a compressed or
+#   still-growing representation has no stable byte offsets, so in those cases
+#   the full body is sent with a 200.
+# - Following a file that a running job is still writing: bytes are sent as they
+#   are flushed, holding back the provisional tail a writer may rewrite, until
+#   the job finishes.
+
+import re
+import tarfile
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+CHUNK_SIZE = 256 * 1024
+FOLLOW_POLL_SECONDS = 0.25
+GZIP_STREAM_LEVEL = 5
+ZSTD_STREAM_LEVEL = 3
+
+# Outputs whose bytes are already compressed gain nothing from a second pass.
+PRECOMPRESSED_SUFFIXES = {'.gz', '.zst', '.parquet', '.zip'}
+
+_RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+
+def _zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def negotiate_encoding(accept_encoding: Optional[str], path: Path) -> str:
+    """
+    Chooses the Content-Encoding for a download.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header.
+        path: The output being downloaded.
+
+    Returns:
+        'zstd', 'gzip' or 'identity'.
+    """
+    if not accept_encoding or path.suffix in PRECOMPRESSED_SUFFIXES:
+        return 'identity'
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            quality = float(match.group(1))
+        accepted[name.strip().lower()] = quality
+
+    def acceptable(name: str) -> bool:
+        return accepted.get(name, accepted.get('*', 0.0)) > 0
+
+    if acceptable('zstd') and _zstd_available():
+        return 'zstd'
+    if acceptable('gzip'):
+        return 'gzip'
+    return 'identity'
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range `Range: bytes=...` header.
+
+    Returns:
+        An inclusive (start, end) tuple, or None if the header is absent,
+        malformed or asks for several ranges (the full body is sent then).
+
+    Raises:
+        ValueError: If the range cannot be satisfied (HTTP 416).
+    """
+    if not range_header:
+        return None
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+def iter_file(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Yields the bytes of a file between start and end (inclusive)."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+def iter_growing_file(path: Path, is_finished: Callable[[], bool],
+                      provisional_tail: Callable[[], int]) -> Iterator[bytes]:
+    """
+    Follows a file that is still being written, like `tail -f`, and stops
+    once the producer has finished and every byte has been sent.
+
+    Args:
+        path: The output file. It may not exist yet (writers such as the
+              LogPPT one create it on close).
+        is_finished: Returns True once the producing job is done.
+        provisional_tail: Returns how many bytes at the end of the file may
+                          still be rewritten and must not be sent yet.
+    """
+    position = 0
+    while True:
+        # Read the flag before the size: if the job was already finished,
+        # the size we read next is final.
+        finished = is_finished()
+        if path.exists():
+            size = path.stat().st_size
+            sendable = size if finished else size - provisional_tail()
+            if sendable > position:
+                for chunk in iter_file(path, position, sendable - 1):
+                    position += len(chunk)
+                    yield chunk
+                continue
+        if finished:
+            return
+        time.sleep(FOLLOW_POLL_SECONDS)
+
+def iter_directory_tar(directory: Path) -> Iterator[bytes]:
+    """
+    Streams a directory (e.g. a Parquet dataset) as an uncompressed tar
+    archive, one file chunk at a time.
+
+    A tar archive is a sequence of 512-byte headers, each followed by the
+    member's bytes padded to a multiple of 512, and ends with two zero
+    blocks. Writing the format by hand avoids `tarfile` buffering whole
+    members in memory.
+    """
+    block = tarfile.BLOCKSIZE
+    for file_path in sorted(p for p in directory.rglob('*') if p.is_file()):
+        info = tarfile.TarInfo(name=f"{directory.name}/{file_path.relative_to(directory).as_posix()}")
+        info.size = file_path.stat().st_size
+        info.mtime = int(file_path.stat().st_mtime)
+        yield info.tobuf(format=tarfile.PAX_FORMAT)
+        yield from iter_file(file_path)
+        padding = (block - info.size % block) % block
+        if padding:
+            yield b'\0' * padding
+    yield b'\0' * (2 * block)
+
+def iter_encoded(chunks: Iterator[bytes], encoding: str) -> Iterator[bytes]:
+    """Compresses a chunk stream on the fly with the negotiated encoding."""
+    if encoding == 'identity':
+        yield from chunks
+        return
+
+    if encoding == 'gzip':
+        # wbits=31 selects the gzip container (16) with a 32 KiB window (15).
+        compressor = zlib.compressobj(GZIP_STREAM_LEVEL, zlib.DEFLATED, 31)
+        finish: Callable[[], bytes] = compressor.flush
+        compress: Callable[[bytes], bytes] = compressor.compress
+    else:
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=ZSTD_STREAM_LEVEL).compressobj()
+        finish = compressor.flush
+        compress = compressor.compress
+
+    for chunk in chunks:
+        compressed = compress(chunk)
+        if compressed:
+            yield compressed
+    yield finish()
+
+def output_media_type(path: Path) -> str:
+    suffixes: List[str] = path.suffixes
+    if path.is_dir():
+        return 'application/x-tar'
+    if suffixes and suffixes[-1] in ('.gz', '.zst'):
+        return 'application/gzip' if suffixes[-1] == '.gz' else 'application/zstd'
+    return {
+        '.json': 'application/json',
+        '.ndjson': 'application/x-ndjson',
+        '.csv': 'text/csv; charset=utf-8',
+        '.log': 'text/plain; charset=utf-8',
+    }.get(path.suffix, 'application/octet-stream')
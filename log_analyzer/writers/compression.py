@@ -0,0 +1,60 @@
+import gzip
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+# Suffix appended to the output file for each supported codec.
+# CHECKLIST: a new codec must also be handled in `open_output_stream`.
+COMPRESSION_SUFFIXES = {
+    'none': '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+# Level 6 is gzip's own default: close to the best ratio for log text at a
+# fraction of the CPU cost of level 9. zstd level 3 is its library default.
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+def normalize_compression(compression: Optional[str]) -> str:
+    """
+    Maps user-facing aliases (None, '', 'gz', 'zst') to a canonical codec name.
+
+    Raises:
+        ValueError: If the codec is not supported.
+    """
+    aliases = {None: 'none', '': 'none', 'gz': 'gzip', 'zst': 'zstd'}
+    name = aliases.get(compression, compression)
+    if name not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return name
+
+def open_output_stream(output_path: Path, compression: Optional[str] = None) -> Tuple[BinaryIO, Path]:
+    """
+    Opens a binary stream for writing, compressing on the fly if requested.
+
+    Args:
+        output_path: The path of the uncompressed output.
+        compression: 'none', 'gzip' or 'zstd'. zstd needs the optional
+                     `zstandard` package.
+
+    Returns:
+        A tuple (stream, final_path) where final_path carries the codec suffix.
+        Closing the stream flushes the compressor and the file.
+    """
+    codec = normalize_compression(compression)
+    final_path = Path(f"{output_path}{COMPRESSION_SUFFIXES[codec]}")
+
+    if codec == 'gzip':
+        return gzip.open(final_path, 'wb', compresslevel=GZIP_LEVEL), final_path
+
+    if codec == 'zstd':
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ValueError("zstd compression requires the 'zstandard' package.") from e
+        raw = open(final_path, 'wb')
+        # closefd=True makes closing the compressor also close the file.
+        stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+        return stream, final_path
+
+    return open(final_path, 'wb'), final_path
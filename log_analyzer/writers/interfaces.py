@@ -0,0 +1,98 @@
+from __future__ import annotations
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..parsing.interfaces import ParsedRecord
+
+# Levels of nested objects the tabular writers turn into dotted columns
+# (`parsers.json.max_depth`).
+DEFAULT_FLATTEN_DEPTH = 10
+
+def flatten_fields(data: Dict[str, Any], max_depth: int = DEFAULT_FLATTEN_DEPTH) -> Dict[str, Any]:
+    """
+    Returns parsed fields as one column per leaf, for the tabular writers:
+    nested objects become dotted keys ({'user': {'name': 'x'}} -> 'user.name'),
+    lists and the objects below `max_depth` levels become JSON text. Flat
+    fields, the common case, are returned as they are, without a copy.
+    """
+    for value in data.values():
+        if isinstance(value, (dict, list)):
+            break
+    else:
+        return data
+    flat: Dict[str, Any] = {}
+    _flatten_into(flat, '', data, max_depth)
+    return flat
+
+def _flatten_into(flat: Dict[str, Any], prefix: str, data: Dict[str, Any], depth: int) -> None:
+    for key, value in data.items():
+        if isinstance(value, dict) and value and depth > 1:
+            _flatten_into(flat, f"{prefix}{key}.", value, depth - 1)
+        elif isinstance(value, (dict, list)):
+            flat[f"{prefix}{key}"] = json.dumps(value, ensure_ascii=False)
+        else:
+            flat[f"{prefix}{key}"] = value
+
+class AbstractWriter(ABC):
+    """
+    The abstract base class for every output writer.
+
+    A writer receives the processed records in batches, serializes them
+    incrementally and releases them immediately, so the memory it needs does
+    not depend on how many records the analysis produces.
+
+    Usage:
+        with SomeWriter(path) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    """
+    # Whether the format can carry `ParsedRecord.occurrences`, i.e. receive one
+    # record per distinct line of a batch instead of one per line.
+    supports_occurrences = False
+
+    def __init__(self, output_path: str):
+        """
+        Args:
+            output_path: The path of the file to produce. Writers that add a
+                         compression suffix expose the final path through
+                         the `output_path` attribute.
+        """
+        self.output_path = Path(output_path)
+        self.records_written = 0
+        self._closed = False
+
+    @abstractmethod
+    def write_batch(self, records: List[ParsedRecord]) -> None:
+        """
+        Serializes a batch of records. The writer must not keep references
+        to the records after this call returns.
+        """
+
+    def relieve_memory(self) -> Optional[str]:
+        """
+        Writes out whatever the writer buffers, under memory pressure (see
+        MemoryGovernor). Called between batches, never during `write_batch`.
+
+        Returns:
+            What was given back, or None if the writer buffers nothing.
+        """
+        return None
+
+    @abstractmethod
+    def _finalize(self) -> None:
+        """Writes any trailer and releases the underlying resources."""
+
+    def close(self) -> None:
+        """Finalizes the output. Calling it more than once is a no-op."""
+        if self._closed:
+            return
+        self._closed = True
+        self._finalize()
+
+    def __enter__(self) -> AbstractWriter:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,157 @@
+# === DESIGN COMMENT ===
+# The LogPPT header is `LineId`, the sorted union of every parsed key (and of
+# the schema hints, see below), then `Content`, `EventId`, `EventTemplate`. The union is only known once the last
+# record has been seen, yet we do not want to keep the records in memory.
+#
+# Rows are therefore streamed to *spool segments* next to the output file. Each
+# segment is plain CSV laid out for the key set known when it was opened; when a
+# record brings a new key, the current segment is closed and a new one starts
+# with the wider layout. On close the header is written and the segments are
+# spliced in order: a segment whose layout already equals the final header is
+# copied byte for byte (one sequential copy, the common case), an older,
+# narrower segment is re-rendered row by row into the final layout.
+#
+# To make the first segment final from the start, the writer accepts *schema
+# hints*: the field names a parser always emits (e.g. the named groups of a
+# regex parser, the configured CSV header). The layout is seeded with the hint
+# of each record's parser, so a file handled by one fixed-schema parser is
+# written in a single segment. The hinted keys of the parsers that produced
+# records are columns of the header even if they never occur (an empty
+# column): dropping them would leave no segment in the final layout, and every
+# row would be re-rendered. Without hints the output is byte-identical to the
+# previous all-in-memory implementation.
+#
+# Nested JSON objects are written as dotted columns (`user.name`), lists as
+# JSON text (see flatten_fields).
+#
+# Memory use is the key set plus the list of segments, independent of the
+# number of records.
+
+import csv
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .interfaces import DEFAULT_FLATTEN_DEPTH, AbstractWriter, flatten_fields
+from ..parsing.interfaces import ParsedRecord
+
+LOGPPT_VERSIONS = ('original', 'anonymized')
+
+# Buffer size for the final splice; large sequential reads keep it I/O bound.
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+class _Segment:
+    """A spool file holding rows laid out for a fixed, sorted key list."""
+
+    def __init__(self, directory: Path, prefix: str, keys: List[str]):
+        handle, path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix='.spool')
+        self.path = Path(path)
+        self.keys = keys
+        self.file = os.fdopen(handle, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+
+
+class LogPPTWriter(AbstractWriter):
+    """
+    Writes a LogPPT-compatible CSV: `LineId`, one column per parsed field
+    (sorted by name), then `Content`, `EventId` and `EventTemplate`.
+
+    The 'original' version uses the raw line and the original Drain3 miner,
+    the 'anonymized' version the Presidio output and the anonymized miner.
+    """
+    FIXED_START_COLUMNS = ['LineId']
+    FIXED_END_COLUMNS = ['Content', 'EventId', 'EventTemplate']
+
+    def __init__(self, output_path: str, version: str = 'original',
+                 schema_hints: Optional[Dict[str, List[str]]] = None, flatten_depth: int = DEFAULT_FLATTEN_DEPTH):
+        """
+        Args:
+            output_path: The path of the CSV file to produce.
+            version: 'original' or 'anonymized'.
+            schema_hints: Optional map of parser name to the field names that
+                          parser always emits.
+            flatten_depth: Levels of nested objects written as dotted columns.
+        """
+        if version not in LOGPPT_VERSIONS:
+            raise ValueError(f"Invalid LogPPT version: {version}")
+        super().__init__(output_path)
+        self.version = version
+        self.schema_hints = schema_hints or {}
+        self.flatten_depth = flatten_depth
+
+        self._layout_keys: Set[str] = set()
+        self._segments: List[_Segment] = []
+
+    def _tail_columns(self, record: ParsedRecord) -> List[Any]:
+        """Returns the Content, EventId and EventTemplate values for a record."""
+        if self.version == 'original':
+            content = record.original_content
+            drain_result = record.drain3_original
+        else:
+            content = record.presidio_anonymized or record.original_content
+            drain_result = record.drain3_anonymized
+        event_id = f"E{drain_result.get('cluster_id', -1)}"
+        template = drain_result.get('template', '<NO_TEMPLATE>')
+        return [content, event_id, template]
+
+    def _open_segment(self, record: ParsedRecord, keys: Iterable[str]) -> _Segment:
+        """Widens the layout with the record's keys and its parser's hint."""
+        self._layout_keys.update(keys)
+        self._layout_keys.update(self.schema_hints.get(record.parser_name, ()))
+        if self._segments:
+            self._segments[-1].file.close()
+        segment = _Segment(self.output_path.parent, f".{self.output_path.name}.", sorted(self._layout_keys))
+        self._segments.append(segment)
+        return segment
+
+    def write_batch(self, records: List[ParsedRecord]) -> None:
+        segment = self._segments[-1] if self._segments else None
+        for record in records:
+            parsed_data = flatten_fields(record.parsed_data, self.flatten_depth)
+            keys = parsed_data.keys()
+            if segment is None or not self._layout_keys.issuperset(keys):
+                segment = self._open_segment(record, keys)
+
+            self.records_written += 1
+            segment.writer.writerow(
+                [self.records_written]
+                + [parsed_data.get(key, '') for key in segment.keys]
+                + self._tail_columns(record)
+            )
+
+    def _finalize(self) -> None:
+        try:
+            # An empty input produces no file, as the original report did.
+            if not self._segments:
+                return
+            self._segments[-1].file.close()
+            # The layout of the last segment, which is copied as is.
+            final_keys = self._segments[-1].keys
+            header = self.FIXED_START_COLUMNS + final_keys + self.FIXED_END_COLUMNS
+
+            with open(self.output_path, 'w', encoding='utf-8', newline='') as output:
+                csv.writer(output).writerow(header)
+                for segment in self._segments:
+                    if segment.keys == final_keys:
+                        output.flush()
+                        with open(segment.path, 'rb') as source:
+                            shutil.copyfileobj(source, output.buffer, _COPY_BUFFER_SIZE)
+                    else:
+                        self._render_segment(segment, final_keys, output)
+        finally:
+            for segment in self._segments:
+                segment.file.close()
+                segment.path.unlink(missing_ok=True)
+            self._segments = []
+
+    @staticmethod
+    def _render_segment(segment: _Segment, final_keys: List[str], output: Any) -> None:
+        """Rewrites the rows of a segment with a narrower or different layout."""
+        key_count = len(segment.keys)
+        writer = csv.writer(output)
+        with open(segment.path, 'r', encoding='utf-8', newline='') as source:
+            for row in csv.reader(source):
+                values = dict(zip(segment.keys, row[1:1 + key_count]))
+                writer.writerow([row[0]] + [values.get(key, '') for key in final_keys] + row[1 + key_count:])
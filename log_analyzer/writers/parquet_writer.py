@@ -0,0 +1,257 @@
+# === DESIGN COMMENT ===
+# Columnar output for downstream analytics. Records are buffered column by column
+# and flushed as one Parquet row group every `row_group_size` rows, so memory is
+# bounded by the row group, not by the dataset.
+#
+# Layout: the output is a *dataset directory* (`<name>.parquet/part-00000.parquet`,
+# ...). A Parquet file has one immutable schema, so when a batch brings a key we
+# have not seen before, or a value that no longer fits a column's inferred type,
+# the current part is closed and a new one is opened with the evolved schema.
+# Query engines read the directory as one table and unify the parts by column
+# name (`pyarrow.dataset.dataset(path)`, DuckDB `read_parquet('dir/*.parquet',
+# union_by_name=true)`). Column types only ever widen, so the schema of the last
+# part is a superset of all earlier ones: it is saved as `_common_metadata` (the
+# Parquet convention for a dataset-wide schema) and `read_parquet_dataset` uses it
+# to read every part with the final types. Alternative considered: rewriting a single file at close
+# with the final schema, which costs a second full pass over the data.
+#
+# Column types: the fixed columns mirror the LogPPT CSV (`LineId`, `Content`,
+# `EventId`, `EventTemplate`, ...) so the analytics team keeps its vocabulary.
+# `TimestampUTC` holds the normalized record time (`ParsedRecord.timestamp`) as a
+# microsecond UTC timestamp, ready for time filters and windows; `EventCategory`
+# the LLM label of the record's template (`ParsedRecord.template_label`).
+# Low-cardinality strings (templates, parser names, source files) are
+# dictionary-encoded. Parsed fields are typed from their values: most parsers
+# yield strings, so digit-only strings become int64 and numeric strings float64
+# (leading zeros stay strings, they are identifiers, not numbers). Nested JSON
+# objects become dotted columns (`user.name`) and lists JSON text (see
+# flatten_fields), so no value is written as its Python repr.
+
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - exercised only without pyarrow
+    pa = None
+    pq = None
+
+from .interfaces import DEFAULT_FLATTEN_DEPTH, AbstractWriter, flatten_fields
+from ..parsing.interfaces import ParsedRecord
+
+DEFAULT_ROW_GROUP_SIZE = 65_536
+DEFAULT_COMPRESSION = 'zstd'
+COMMON_METADATA_FILE = '_common_metadata'
+
+_INT_PATTERN = re.compile(r'-?(?:0|[1-9]\d{0,17})')
+_FLOAT_PATTERN = re.compile(r'-?(?:0|[1-9]\d*)?\.\d+(?:[eE][-+]?\d+)?')
+
+# Widening order used when a column sees incompatible values: a column only
+# ever moves to the right, so earlier parts stay readable with the new type.
+_TYPE_ORDER = ['bool', 'int64', 'float64', 'string']
+
+def _value_type(value: Any) -> str:
+    """Returns the narrowest column type able to hold a single value."""
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int64' if -2**63 <= value < 2**63 else 'string'
+    if isinstance(value, float):
+        return 'float64'
+    if isinstance(value, str):
+        if _INT_PATTERN.fullmatch(value):
+            return 'int64'
+        if _FLOAT_PATTERN.fullmatch(value):
+            return 'float64'
+    return 'string'
+
+def _widen(current: Optional[str], new: str) -> str:
+    """Returns the narrowest type able to hold values of both types."""
+    if current is None or current == new:
+        return new
+    if 'bool' in (current, new):
+        # Booleans mixed with numbers carry no numeric meaning.
+        return 'string'
+    return max(current, new, key=_TYPE_ORDER.index)
+
+def _convert(value: Any, column_type: str) -> Any:
+    if column_type == 'string':
+        return value if value is None or isinstance(value, str) else str(value)
+    if value is None or value == '':
+        return None
+    if column_type == 'int64':
+        return int(value)
+    if column_type == 'float64':
+        return float(value)
+    return bool(value)
+
+_ARROW_TYPES = {
+    'bool': lambda: pa.bool_(),
+    'int64': lambda: pa.int64(),
+    'float64': lambda: pa.float64(),
+    'string': lambda: pa.string(),
+    'timestamp': lambda: pa.timestamp('us', tz='UTC'),
+}
+
+
+class ParquetDatasetWriter(AbstractWriter):
+    """Writes records as a Parquet dataset directory with an evolving schema."""
+
+    # Fixed columns: name -> (arrow type factory, dictionary encoded).
+    FIXED_COLUMNS = {
+        'LineId': ('int64', False),
+        'TimestampUTC': ('timestamp', False),
+        'source_file': ('string', True),
+        'parser_name': ('string', True),
+        'Content': ('string', False),
+        'AnonymizedContent': ('string', False),
+        'EventId': ('int64', False),
+        'EventTemplate': ('string', True),
+        'AnonymizedEventId': ('int64', False),
+        'AnonymizedEventTemplate': ('string', True),
+        'EventCategory': ('string', True),
+    }
+
+    def __init__(self, output_path: str, compression: Optional[str] = DEFAULT_COMPRESSION,
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE, flatten_depth: int = DEFAULT_FLATTEN_DEPTH):
+        """
+        Args:
+            output_path: The dataset directory to create (e.g. 'report.parquet').
+            compression: Parquet codec: 'zstd', 'snappy', 'gzip', 'brotli',
+                         'lz4' or 'none'.
+            row_group_size: Number of rows buffered before a row group is written.
+            flatten_depth: Levels of nested objects written as dotted columns.
+
+        Raises:
+            ValueError: If pyarrow is not installed.
+        """
+        if pa is None:
+            raise ValueError("Parquet output requires the 'pyarrow' package.")
+        super().__init__(output_path)
+        self.compression = compression or 'none'
+        self.row_group_size = row_group_size
+        self.flatten_depth = flatten_depth
+        self.output_path.mkdir(parents=True, exist_ok=True)
+
+        self._field_types: Dict[str, str] = {}
+        self._buffer: Dict[str, List[Any]] = {name: [] for name in self.FIXED_COLUMNS}
+        self._buffered_rows = 0
+        self._writer: Optional[Any] = None
+        self._writer_schema: Optional[Any] = None
+        self._writer_field_types: Dict[str, str] = {}
+        self.parts: List[Path] = []
+
+    # --- Column mapping ---
+
+    def _column_name(self, key: str) -> str:
+        """Parsed keys that clash with a fixed column are prefixed."""
+        return f"parsed_{key}" if key in self.FIXED_COLUMNS else key
+
+    def write_batch(self, records: List[ParsedRecord]) -> None:
+        for record in records:
+            self._append(record)
+            if self._buffered_rows >= self.row_group_size:
+                self._flush_row_group()
+        self.records_written += len(records)
+
+    def relieve_memory(self) -> Optional[str]:
+        rows = self._buffered_rows
+        if not rows:
+            return None
+        self._flush_row_group()
+        return f"flushed a row group of {rows} rows"
+
+    def _append(self, record: ParsedRecord) -> None:
+        buffer = self._buffer
+        buffer['LineId'].append(record.line_number)
+        buffer['TimestampUTC'].append(round(record.timestamp * 1_000_000) if record.timestamp is not None else None)
+        buffer['source_file'].append(record.source_file)
+        buffer['parser_name'].append(record.parser_name)
+        buffer['Content'].append(record.original_content)
+        buffer['AnonymizedContent'].append(record.presidio_anonymized)
+        buffer['EventId'].append(record.drain3_original.get('cluster_id'))
+        buffer['EventTemplate'].append(record.drain3_original.get('template'))
+        buffer['AnonymizedEventId'].append(record.drain3_anonymized.get('cluster_id'))
+        buffer['AnonymizedEventTemplate'].append(record.drain3_anonymized.get('template'))
+        buffer['EventCategory'].append(record.template_label)
+
+        for key, value in flatten_fields(record.parsed_data, self.flatten_depth).items():
+            column = self._column_name(key)
+            if column not in buffer:
+                # Backfill the rows buffered before this key first appeared.
+                buffer[column] = [None] * self._buffered_rows
+            if value is not None and value != '':
+                self._field_types[column] = _widen(self._field_types.get(column), _value_type(value))
+            buffer[column].append(value)
+
+        self._buffered_rows += 1
+        for column, values in buffer.items():
+            if len(values) < self._buffered_rows:
+                values.append(None)
+
+    # --- Row group / part management ---
+
+    def _schema(self) -> Any:
+        fields = []
+        for name, (type_name, dictionary) in self.FIXED_COLUMNS.items():
+            arrow_type = _ARROW_TYPES[type_name]()
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), arrow_type) if dictionary else arrow_type))
+        for name in sorted(self._field_types):
+            fields.append(pa.field(name, _ARROW_TYPES[self._field_types[name]]()))
+        return pa.schema(fields)
+
+    def _open_part(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        part_path = self.output_path / f"part-{len(self.parts):05d}.parquet"
+        self._writer_schema = self._schema()
+        self._writer = pq.ParquetWriter(part_path, self._writer_schema, compression=self.compression)
+        self._writer_field_types = dict(self._field_types)
+        self.parts.append(part_path)
+
+    def _flush_row_group(self) -> None:
+        if not self._buffered_rows:
+            return
+        if self._writer is None or self._field_types != self._writer_field_types:
+            self._open_part()
+
+        schema = self._writer_schema
+        columns = []
+        for field in schema:
+            values = self._buffer.get(field.name, [None] * self._buffered_rows)
+            if field.name not in self.FIXED_COLUMNS:
+                column_type = self._field_types[field.name]
+                values = [_convert(v, column_type) for v in values]
+            columns.append(pa.array(values, type=field.type))
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+        self._buffer = {name: [] for name in self.FIXED_COLUMNS}
+        self._buffered_rows = 0
+
+    def flush(self) -> None:
+        """Writes the buffered rows as a (possibly short) row group."""
+        self._flush_row_group()
+
+    def _finalize(self) -> None:
+        self._flush_row_group()
+        if self._writer is None:
+            # Always leave a readable dataset, even for an empty input.
+            self._open_part()
+        self._writer.close()
+        pq.write_metadata(self._schema(), self.output_path / COMMON_METADATA_FILE)
+
+
+def read_parquet_dataset(dataset_path: str) -> Any:
+    """
+    Opens a dataset produced by ParquetDatasetWriter as a single
+    `pyarrow.dataset.Dataset`, reading every part with the final (widest)
+    column types recorded in `_common_metadata`.
+    """
+    if pa is None:
+        raise ValueError("Parquet output requires the 'pyarrow' package.")
+    import pyarrow.dataset as ds
+
+    schema = pq.read_schema(Path(dataset_path) / COMMON_METADATA_FILE)
+    return ds.dataset(dataset_path, schema=schema, format='parquet')
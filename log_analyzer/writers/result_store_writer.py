@@ -0,0 +1,155 @@
+# === DESIGN COMMENT ===
+# Queryable result store. The JSON/CSV/Parquet outputs are files to download;
+# exploring a multi-million-record run through them means loading the whole
+# file in the browser. This writer streams the records into a per-job SQLite
+# database instead, with the indexes the result queries need
+# (`services/result_query_service.py`):
+#
+# - `records`: one row per record, keyed by its write order (`id`, which is
+#   also line order), with the Drain3 template ids, the parser name, the
+#   record's timestamp string and the full record as JSON. Composite indexes
+#   on (template_id | parser_name, id), (template_id | parser_name, timestamp,
+#   id), (timestamp, id) and (line_number) let those filters walk an index in
+#   the order of the keyset cursor, in line or time order, so a page costs
+#   O(page size) however deep it is.
+# - `fields`: an inverted index (name, value) -> record id over the parsed
+#   fields listed in `output.result_store.indexed_fields`. It is a WITHOUT
+#   ROWID table whose primary key *is* the index, so a field lookup never
+#   touches `records` until the page is fetched.
+# - `templates`: each template's latest text and record count, written on
+#   close, so the template facet does not scan `records`.
+#
+# The timestamp is the normalized record time (`ParsedRecord.timestamp`) as a
+# fixed-width ISO 8601 UTC string, so that text order is time order across
+# source formats; without one, the first of `timestamp_fields` found in the
+# parsed fields, verbatim. Records without either store '' (sorted first), so
+# that the time order stays a plain index walk.
+#
+# Each batch is one transaction. The database runs in WAL mode: the query
+# endpoints read committed batches while the job is still writing, and
+# `synchronous=OFF` skips the fsyncs (a crashed job is re-run, not recovered).
+# SQLite ships with Python, so the store needs no extra dependency.
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .interfaces import AbstractWriter
+from ..parsing.interfaces import ParsedRecord
+
+DEFAULT_INDEXED_FIELDS = ('srcip', 'dstip', 'src', 'dst', 'user', 'username', 'action', 'status', 'level', 'host')
+DEFAULT_TIMESTAMP_FIELDS = ('timestamp', '@timestamp', 'time', 'date', 'datetime', 'rt')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    line_number INTEGER,
+    template_id INTEGER,
+    anonymized_template_id INTEGER,
+    parser_name TEXT,
+    timestamp TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fields (
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    record_id INTEGER NOT NULL,
+    PRIMARY KEY (name, value, record_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS templates (
+    template_id INTEGER PRIMARY KEY,
+    template TEXT,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_template ON records (template_id, id);
+CREATE INDEX IF NOT EXISTS records_template_time ON records (template_id, timestamp, id);
+CREATE INDEX IF NOT EXISTS records_anonymized_template ON records (anonymized_template_id, id);
+CREATE INDEX IF NOT EXISTS records_parser ON records (parser_name, id);
+CREATE INDEX IF NOT EXISTS records_parser_time ON records (parser_name, timestamp, id);
+CREATE INDEX IF NOT EXISTS records_timestamp ON records (timestamp, id);
+CREATE INDEX IF NOT EXISTS records_line ON records (line_number);
+"""
+
+def _cluster_id(result: Optional[Dict[str, Any]]) -> Optional[int]:
+    return result.get('cluster_id') if result else None
+
+
+class ResultStoreWriter(AbstractWriter):
+    """Writes the records into an indexed SQLite database for server-side queries."""
+
+    def __init__(self, output_path: str, indexed_fields: Sequence[str] = DEFAULT_INDEXED_FIELDS,
+                 timestamp_fields: Sequence[str] = DEFAULT_TIMESTAMP_FIELDS):
+        """
+        Args:
+            output_path: The path of the database file (replaced if it exists).
+            indexed_fields: Parsed fields added to the inverted index.
+            timestamp_fields: Parsed fields tried in order for the record's timestamp.
+        """
+        super().__init__(output_path)
+        self.indexed_fields = frozenset(indexed_fields)
+        self.timestamp_fields = tuple(timestamp_fields)
+        self.output_path.unlink(missing_ok=True)
+        self._connection = sqlite3.connect(str(self.output_path), check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=OFF')
+        self._connection.executescript(_SCHEMA)
+        # cluster id -> [latest template, records]; bounded by the number of clusters.
+        self._templates: Dict[int, List[Any]] = {}
+
+    def write_batch(self, records: List[ParsedRecord]) -> None:
+        if not records:
+            return
+        rows: List[Tuple[Any, ...]] = []
+        field_rows: List[Tuple[str, str, int]] = []
+        for record_id, record in enumerate(records, start=self.records_written + 1):
+            parsed = record.parsed_data or {}
+            template_id = _cluster_id(record.drain3_original)
+            if template_id is not None:
+                entry = self._templates.setdefault(template_id, [None, 0])
+                entry[0] = record.drain3_original.get('template') or entry[0]
+                entry[1] += 1
+            rows.append((
+                record_id, record.line_number, template_id, _cluster_id(record.drain3_anonymized),
+                record.parser_name, self._timestamp(record.timestamp, parsed),
+                record.model_dump_json(exclude_none=True),
+            ))
+            field_rows.extend(
+                (name, str(value), record_id) for name, value in parsed.items()
+                if name in self.indexed_fields and value is not None and not isinstance(value, (dict, list))
+            )
+        with self._connection:
+            self._connection.executemany('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._connection.executemany('INSERT OR IGNORE INTO fields VALUES (?, ?, ?)', field_rows)
+        self.records_written += len(records)
+
+    def _timestamp(self, epoch: Optional[float], parsed: Dict[str, Any]) -> str:
+        if epoch is not None:
+            return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        for name in self.timestamp_fields:
+            value = parsed.get(name)
+            if value not in (None, ''):
+                return str(value)
+        return ''
+
+    def _finalize(self) -> None:
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO templates VALUES (?, ?, ?)',
+                [(template_id, template, count) for template_id, (template, count) in self._templates.items()])
+        self._connection.execute('PRAGMA optimize')
+        # Back to a rollback journal: the finished store is a single file, which
+        # read-only connections open without creating -wal/-shm side files.
+        self._connection.execute('PRAGMA journal_mode=DELETE')
+        self._connection.close()
+        self._templates = {}
+
+
+def result_store_writer(path, config: Dict[str, Any], schema_hints: Dict[str, List[str]]) -> ResultStoreWriter:
+    """WRITER_REGISTRY builder reading `output.result_store`."""
+    store_config = config.get('output', {}).get('result_store', {})
+    return ResultStoreWriter(
+        path,
+        indexed_fields=store_config.get('indexed_fields', DEFAULT_INDEXED_FIELDS),
+        timestamp_fields=store_config.get('timestamp_fields', DEFAULT_TIMESTAMP_FIELDS),
+    )
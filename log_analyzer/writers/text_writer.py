@@ -0,0 +1,27 @@
+from typing import List, Optional
+
+from .compression import open_output_stream
+from .interfaces import AbstractWriter
+from ..parsing.interfaces import ParsedRecord
+
+class AnonymizedTextWriter(AbstractWriter):
+    """Writes the anonymized content of each record as a plain log line."""
+
+    def __init__(self, output_path: str, compression: Optional[str] = None):
+        """
+        Args:
+            output_path: The path of the uncompressed output file.
+            compression: 'none', 'gzip' or 'zstd'.
+        """
+        super().__init__(output_path)
+        self._stream, self.output_path = open_output_stream(self.output_path, compression)
+
+    def write_batch(self, records: List[ParsedRecord]) -> None:
+        if not records:
+            return
+        chunk = ''.join(f"{record.presidio_anonymized or ''}\n" for record in records)
+        self._stream.write(chunk.encode('utf-8'))
+        self.records_written += len(records)
+
+    def _finalize(self) -> None:
+        self._stream.close()
@@ -0,0 +1,105 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from .interfaces import DEFAULT_FLATTEN_DEPTH, AbstractWriter
+from .json_writer import JSONArrayWriter, NDJSONWriter
+from .logppt_writer import LogPPTWriter
+from .result_store_writer import result_store_writer
+from .text_writer import AnonymizedTextWriter
+
+class WriterSpec(NamedTuple):
+    """
+    Describes an output format: the file suffix and how to build its writer.
+    `build` receives the output path, the configuration and the parser schema
+    hints (parser name -> fixed field names).
+    """
+    suffix: str
+    build: Callable[[Path, Dict[str, Any], Dict[str, List[str]]], AbstractWriter]
+    description: str
+
+
+def _flatten_depth(config: Dict[str, Any]) -> int:
+    return config.get('parsers', {}).get('json', {}).get('max_depth', DEFAULT_FLATTEN_DEPTH)
+
+def _parquet_writer(path: Path, config: Dict[str, Any], schema_hints: Dict[str, List[str]]) -> AbstractWriter:
+    from .parquet_writer import ParquetDatasetWriter  # Deferred: imports pyarrow.
+    parquet_config = config.get('output', {}).get('parquet', {})
+    return ParquetDatasetWriter(
+        path,
+        compression=parquet_config.get('compression', 'zstd'),
+        row_group_size=parquet_config.get('row_group_size', 65_536),
+        flatten_depth=_flatten_depth(config),
+    )
+
+# The registry of every output format an analysis run can produce.
+# CHECKLIST: a new format also needs an entry in the UI (static/script.js) if
+# it should be selectable there.
+WRITER_REGISTRY: Dict[str, WriterSpec] = {
+    'anonymize': WriterSpec(
+        '_anonymized.log', lambda path, config, hints: AnonymizedTextWriter(path), "Anonymized log lines"),
+    'logppt_original': WriterSpec(
+        '_logppt_original.csv', lambda path, config, hints: LogPPTWriter(path, 'original', hints, _flatten_depth(config)),
+        "LogPPT CSV, original content"),
+    'logppt_anonymized': WriterSpec(
+        '_logppt_anonymized.csv', lambda path, config, hints: LogPPTWriter(path, 'anonymized', hints, _flatten_depth(config)),
+        "LogPPT CSV, anonymized content"),
+    'json_report': WriterSpec(
+        '.json', lambda path, config, hints: JSONArrayWriter(path, exclude_none=True), "Full structured JSON array"),
+    'ndjson': WriterSpec(
+        '.ndjson', lambda path, config, hints: NDJSONWriter(path, exclude_none=True),
+        "Full structured newline-delimited JSON"),
+    'parquet': WriterSpec(
+        '.parquet', _parquet_writer, "Columnar Parquet dataset"),
+    'result_store': WriterSpec(
+        '.results.sqlite', result_store_writer, "Indexed SQLite result store for server-side queries"),
+}
+
+# Names that expand to several formats, e.g. the LogPPT report pair.
+FORMAT_ALIASES: Dict[str, List[str]] = {
+    'logppt': ['logppt_original', 'logppt_anonymized'],
+}
+
+def resolve_formats(formats: List[str]) -> List[str]:
+    """
+    Expands aliases and removes duplicates while keeping the requested order.
+
+    Raises:
+        ValueError: If a format is not registered.
+    """
+    resolved: List[str] = []
+    for name in formats:
+        for expanded in FORMAT_ALIASES.get(name, [name]):
+            if expanded not in WRITER_REGISTRY:
+                raise ValueError(f"Unknown output format: {expanded}")
+            if expanded not in resolved:
+                resolved.append(expanded)
+    return resolved
+
+def create_writers(formats: List[str], output_dir: str, base_name: str, config: Dict[str, Any],
+                   schema_hints: Optional[Dict[str, List[str]]] = None) -> Dict[str, AbstractWriter]:
+    """
+    Creates one writer per requested output format.
+
+    Args:
+        formats: Format names or aliases (see WRITER_REGISTRY / FORMAT_ALIASES).
+        output_dir: The directory where the outputs are created.
+        base_name: The common file name prefix; each format adds its suffix.
+        config: The application configuration.
+        schema_hints: Fixed field names per parser, see `get_schema_hints`.
+
+    Returns:
+        A dict mapping each resolved format name to its open writer.
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    writers: Dict[str, AbstractWriter] = {}
+    try:
+        for name in resolve_formats(formats):
+            spec = WRITER_REGISTRY[name]
+            writers[name] = spec.build(output_path / f"{base_name}{spec.suffix}", config, schema_hints or {})
+    except Exception:
+        for writer in writers.values():
+            writer.close()
+        raise
+    return writers
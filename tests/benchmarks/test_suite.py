@@ -0,0 +1,43 @@
+import pytest
+
+from benchmarks.generators import FORMATS, generate_lines
+from benchmarks.suite import compare_results, run_suite
+from log_analyzer.parsing.interfaces import LogEntry
+from log_analyzer.parsing.parser_factory import create_parser_chain
+
+# === Test Cases ===
+
+def test_generators_are_seeded():
+    for log_format in FORMATS:
+        first = list(generate_lines(log_format, 50, pii_density=0.5, seed=3))
+        assert first == list(generate_lines(log_format, 50, pii_density=0.5, seed=3))
+        assert first != list(generate_lines(log_format, 50, pii_density=0.5, seed=4))
+
+@pytest.mark.parametrize("log_format, parser_name", [
+    ('json', 'JSONParser'),
+    ('cef', 'CEFParser'),
+    ('fortinet', 'KeyValueParser'),
+])
+def test_generated_lines_reach_their_parser(log_format, parser_name):
+    chain = create_parser_chain({'parsers': {'csv': {'enabled': False}}})
+    for number, line in enumerate(generate_lines(log_format, 20, pii_density=1.0), 1):
+        assert chain.handle(LogEntry(line_number=number, content=line)).parser_name == parser_name
+
+def test_run_suite_selects_cases():
+    document = run_suite({'presidio': {'enabled': False}}, lines=50, pii_density=0.2, seed=1, repeat=1,
+                         only=['parser.json', 'drain3.*'], log=lambda message: None)
+
+    assert set(document['results']) == {'parser.json'} | {f'drain3.{f}' for f in FORMATS}
+    assert document['results']['parser.json']['items'] == 50
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = {'results': {'a': {'items_per_second': 1000}, 'b': {'items_per_second': 1000},
+                            'c': {'skipped': 'no model'}}}
+    current = {'results': {'a': {'items_per_second': 950}, 'b': {'items_per_second': 800},
+                           'c': {'items_per_second': 10}}}
+
+    rows = {row['name']: row for row in compare_results(baseline, current, threshold=0.1)}
+
+    assert set(rows) == {'a', 'b'}
+    assert not rows['a']['regression']
+    assert rows['b']['regression']
@@ -0,0 +1,49 @@
+import pytest
+
+from log_analyzer.parsing.interfaces import LogEntry
+from log_analyzer.parsing.json_parser import JSONParser, orjson
+from log_analyzer.parsing.parser_factory import create_parser_chain
+
+# === Test Fixtures ===
+
+DECODERS = ['json'] + (['orjson'] if orjson is not None else [])
+
+def _entry(content, number=1):
+    return LogEntry(line_number=number, content=content)
+
+# === Test Cases ===
+
+@pytest.mark.parametrize("decoder", DECODERS)
+def test_only_lines_starting_an_object_are_decoded(decoder):
+    parser = JSONParser(decoder=decoder)
+    calls = []
+    decode = parser._loads
+    parser._loads = lambda content: calls.append(content) or decode(content)
+
+    assert parser.handle(_entry("srcip=10.0.0.1 dstip=10.0.0.2 action=deny")) is None
+    assert parser.handle(_entry('["not", "an", "object"]')) is None
+    assert parser.handle(_entry("{broken json")) is None
+    record = parser.handle(_entry('  {"level": "INFO", "user": {"name": "alice"}}'))
+    assert record.parsed_data == {'level': 'INFO', 'user': {'name': 'alice'}}
+    assert calls == ["{broken json", '  {"level": "INFO", "user": {"name": "alice"}}']
+
+@pytest.mark.parametrize("decoder", DECODERS)
+def test_decoders_accept_the_same_documents(decoder):
+    parser = JSONParser(decoder=decoder)
+    # NaN and integers beyond 64 bits are rejected by orjson, accepted by json.
+    record = parser.handle(_entry('{"ratio": NaN, "id": 123456789012345678901234567890, "ok": true}'))
+    assert record.parsed_data['id'] == 123456789012345678901234567890 and record.parsed_data['ok'] is True
+
+    with pytest.raises(ValueError, match="Unknown JSON decoder"):
+        JSONParser(decoder='simdjson')
+
+def test_configured_fields_are_extracted_by_dotted_path():
+    chain = create_parser_chain({'parsers': {'csv': {'enabled': False},
+                                             'json': {'fields': ['level', 'user.name', 'missing.path']}}})
+    record = chain.handle(_entry('{"level": "WARN", "user": {"name": "bob", "email": "b@x.org"}, "msg": "hi"}'))
+
+    assert record.parser_name == 'JSONParser'
+    assert record.parsed_data == {'level': 'WARN', 'user.name': 'bob'}
+    # A subset of the fields cannot render the line back.
+    assert not chain.supports_rebuild and chain.rebuild_line(record.original_content, record.parsed_data) is None
+    assert chain.handle(_entry("plain text line")).parser_name == 'FallbackParser'
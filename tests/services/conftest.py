@@ -0,0 +1,14 @@
+import pytest
+
+# === Test Fixtures ===
+
+@pytest.fixture
+def tiny_spacy_model(tmp_path):
+    """A saved spaCy pipeline with a parser-like extra component, so no model download is needed."""
+    spacy = pytest.importorskip("spacy")
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    nlp.add_pipe("ner")
+    nlp.initialize()
+    nlp.to_disk(tmp_path / "tiny_en")
+    return str(tmp_path / "tiny_en")
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+import yaml
+
+from log_analyzer.services import config_service as config_module
+from log_analyzer.services.config_service import ConfigService, get_artifact
+
+# === Test Fixtures ===
+
+@pytest.fixture(autouse=True)
+def isolated_caches():
+    config_module.clear_caches()
+    yield
+    config_module.clear_caches()
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.dump({'parsers': {'csv': {'enabled': False}}, 'drain3': {'depth': 4}}))
+    return path
+
+@pytest.fixture
+def parse_counter(monkeypatch):
+    calls = []
+    original = yaml.safe_load
+
+    def counting_safe_load(stream):
+        calls.append(1)
+        return original(stream)
+
+    monkeypatch.setattr(config_module.yaml, 'safe_load', counting_safe_load)
+    return calls
+
+# === Test Cases ===
+
+def test_file_is_parsed_once_while_unchanged(config_file, parse_counter):
+    first = ConfigService(str(config_file)).load_config()
+    first['parsers']['csv']['enabled'] = True
+    second = ConfigService(str(config_file)).load_config()
+
+    assert len(parse_counter) == 1
+    # Every caller gets a private copy.
+    assert second['parsers']['csv']['enabled'] is False
+    assert ConfigService(str(config_file)).get_value('drain3.depth') == 4
+
+def test_rewrite_and_atomic_replace_invalidate(config_file, parse_counter):
+    service = ConfigService(str(config_file))
+    service.load_config()
+
+    config_file.write_text(yaml.dump({'drain3': {'depth': 5}}))
+    os.utime(config_file, ns=(1, 1))
+    assert service.get_value('drain3.depth') == 5
+
+    replacement = config_file.with_name("config.yaml.new")
+    replacement.write_text(yaml.dump({'drain3': {'depth': 6}}))
+    os.utime(replacement, ns=(1, 1))
+    os.replace(replacement, config_file)
+    assert service.get_value('drain3.depth') == 6
+    assert len(parse_counter) == 3
+
+def test_listeners_receive_changed_sections(config_file):
+    service = ConfigService(str(config_file))
+    config = service.load_config()
+    notifications = []
+    service.subscribe(lambda new_config, changed: notifications.append(changed))
+
+    config['drain3']['depth'] = 7
+    assert service.save_config(config)
+    assert service.save_config(config)
+
+    assert notifications == [{'drain3'}]
+    assert service.refresh() == 1
+
+def test_artifacts_rebuild_only_when_their_subtree_changes():
+    builds = []
+
+    def build(config):
+        builds.append(1)
+        return object()
+
+    config = {'parsers': {'json': {'enabled': True}}, 'presidio': {'enabled': False}}
+    first = get_artifact('chain', config, ['parsers'], build)
+    config['presidio']['enabled'] = True
+    assert get_artifact('chain', config, ['parsers'], build) is first
+    config['parsers']['json']['enabled'] = False
+    assert get_artifact('chain', config, ['parsers'], build) is not first
+    assert len(builds) == 2
+
+def test_artifacts_with_a_cap_keep_only_the_most_recent_of_their_name():
+    chain = get_artifact('chain', {}, ['parsers'], lambda config: object())
+    engines = [get_artifact('engine', {'analyzer': size}, ['analyzer'], lambda config: object(), max_entries=2)
+               for size in ('sm', 'md', 'lg')]
+
+    rebuilt = get_artifact('engine', {'analyzer': 'sm'}, ['analyzer'], lambda config: object(), max_entries=2)
+    assert rebuilt is not engines[0]
+    assert get_artifact('engine', {'analyzer': 'lg'}, ['analyzer'], lambda config: object(), max_entries=2) \
+        is engines[2]
+    assert get_artifact('chain', {}, ['parsers'], lambda config: object()) is chain
@@ -0,0 +1,94 @@
+import os
+import threading
+
+import pytest
+
+from log_analyzer.services.distributed_service import (Coordinator, DistributedRunError, Worker, read_range,
+                                                       split_input)
+from log_analyzer.services.log_processing_service import LogProcessingService
+from log_analyzer.services.work_queue import SpoolDirectoryBroker
+from log_analyzer.writers.writer_factory import create_writers
+
+# === Test Fixtures ===
+
+@pytest.fixture
+def pipeline_config():
+    """Presidio disabled, and tasks of a few lines each."""
+    return {
+        'presidio': {'enabled': False},
+        'parsers': {'csv': {'enabled': False}},
+        'pipeline': {'batch_size': 2},
+        'distributed': {'task_mb': 100 / (1024 * 1024), 'poll_seconds': 0.01, 'lease_seconds': 0.2},
+    }
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "fw.log"
+    lines = [f"srcip=10.0.0.{i} dstip=10.0.1.{i % 7} action={'deny' if i % 3 else 'accept'}" for i in range(40)]
+    lines[5] = ""
+    lines[12] = "plain text line without structure"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+def _run_with_workers(coordinator, broker, log_file, writers, count=2):
+    stop = threading.Event()
+    workers = [threading.Thread(target=Worker(broker, f"w{i}", poll_seconds=0.01).run, kwargs={'stop': stop})
+               for i in range(count)]
+    for worker in workers:
+        worker.start()
+    try:
+        return coordinator.run(str(log_file), writers)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+# === Test Cases ===
+
+def test_byte_ranges_cover_every_line_with_its_number(log_file):
+    expected = [(number, line.strip()) for number, line in enumerate(log_file.open(), 1)]
+    for task_bytes in (1, 64, 500, 10 ** 6):
+        ranges = split_input(str(log_file), task_bytes)
+        assert ranges[0]['start'] == 0 and ranges[-1]['end'] == os.path.getsize(log_file)
+        lines = [line for r in ranges for line in read_range(str(log_file), r['start'], r['end'], r['first_line'], 'utf-8')]
+        assert lines == expected
+
+def test_distributed_run_matches_a_single_node_run(pipeline_config, log_file, tmp_path):
+    service = LogProcessingService(pipeline_config)
+    single = service.process_file(str(log_file), create_writers(['ndjson'], str(tmp_path), "single", pipeline_config))
+
+    broker = SpoolDirectoryBroker(str(tmp_path / "spool"))
+    coordinator = Coordinator(pipeline_config, broker)
+    summary = _run_with_workers(coordinator, broker, log_file,
+                                create_writers(['ndjson'], str(tmp_path), "distributed", pipeline_config))
+
+    assert summary['records'] == single['records'] == 39
+    assert summary['tasks'] > 2 and sum(summary['workers'].values()) == summary['tasks']
+    assert (tmp_path / "distributed.ndjson").read_text() == (tmp_path / "single.ndjson").read_text()
+    assert not os.listdir(tmp_path / "spool" / "results") and not os.listdir(tmp_path / "spool" / "runs")
+
+def test_task_of_a_dead_worker_is_retried(pipeline_config, log_file, tmp_path):
+    broker = SpoolDirectoryBroker(str(tmp_path / "spool"))
+    coordinator = Coordinator(pipeline_config, broker)
+    original_submit = coordinator.submit
+
+    def submit_then_die(input_path):
+        run_id = original_submit(input_path)
+        # A worker claims the first task and dies without a heartbeat.
+        assert broker.claim("dead-worker").attempt == 0
+        return run_id
+
+    coordinator.submit = submit_then_die
+    summary = _run_with_workers(coordinator, broker, log_file,
+                                create_writers(['ndjson'], str(tmp_path), "retried", pipeline_config), count=1)
+
+    assert summary['records'] == 39
+    assert summary['retries'] == 1 and "dead-worker" not in summary['workers']
+
+def test_run_without_workers_fails_after_the_idle_timeout(pipeline_config, log_file, tmp_path):
+    pipeline_config['distributed']['idle_timeout_seconds'] = 0.1
+    broker = SpoolDirectoryBroker(str(tmp_path / "spool"))
+    coordinator = Coordinator(pipeline_config, broker)
+
+    with pytest.raises(DistributedRunError, match="No worker took a task"):
+        coordinator.run(str(log_file), create_writers(['ndjson'], str(tmp_path), "idle", pipeline_config))
@@ -0,0 +1,155 @@
+import json
+
+import pytest
+
+from log_analyzer.parsing.interfaces import LogEntry
+from log_analyzer.parsing.parser_factory import create_parser_chain, iter_parsers
+from log_analyzer.services.field_anonymization_service import FieldAnonymizationService
+from log_analyzer.services.log_processing_service import LogProcessingService
+
+# === Test Fixtures ===
+
+class FakePresidio:
+    """Replaces a fixed name, and counts the calls instead of running NER."""
+
+    nlp_gate = None
+
+    def __init__(self):
+        self.calls = []
+
+    def anonymize_text(self, text, template_key=None, language=None):
+        self.calls.append(text)
+        return text.replace("John", "<PERSON>")
+
+@pytest.fixture
+def anonymization_config():
+    return {
+        'drain3': {'anonymization': {
+            'enabled': True,
+            'field_level': True,
+            'always_anonymize': ['srcip', 'devname', 'user_id', 'comment'],
+            'methods': {'hash': {'algorithm': 'sha256', 'salt': 's', 'fields': ['user_id']}},
+        }},
+        'centralized_regex': {'anonymization': {'placeholder_ip': '<IP>'}},
+    }
+
+def _parse(config, line):
+    chain = create_parser_chain(config)
+    record = chain.handle(LogEntry(line_number=1, content=line))
+    return record, {parser.parser_name: parser for parser in iter_parsers(chain)}[record.parser_name]
+
+# === Test Cases ===
+
+def test_key_value_fields_are_anonymized_by_type_and_line_rebuilt(anonymization_config):
+    presidio = FakePresidio()
+    service = FieldAnonymizationService(anonymization_config, presidio)
+    record, parser = _parse(anonymization_config,
+                            'date=2024-01-01 srcip=10.0.0.1 devname="fw 1" user_id=42 user="John" port=443')
+
+    assert service.anonymize_record(record, parser)
+
+    data = record.parsed_data_anonymized
+    assert data['srcip'] == '<IP>' and data['devname'] == '<DEVICE_NAME>'
+    assert data['user_id'] != '42' and len(data['user_id']) == 16
+    assert data['date'] == '2024-01-01' and data['port'] == '443'
+    assert record.presidio_anonymized == (
+        f'date=2024-01-01 srcip=<IP> devname="<DEVICE_NAME>" user_id={data["user_id"]} user="<PERSON>" port=443')
+    # Only the untyped text field reached Presidio.
+    assert presidio.calls == ['John']
+
+def test_values_are_memoized_per_field(anonymization_config):
+    presidio = FakePresidio()
+    service = FieldAnonymizationService(anonymization_config, presidio)
+    for line in ['{"user": "John", "comment": "ok"}', '{"user": "John", "comment": "ok", "n": 3}']:
+        record, parser = _parse(anonymization_config, line)
+        assert service.anonymize_record(record, parser)
+
+    assert json.loads(record.presidio_anonymized) == {'user': '<PERSON>', 'comment': '<COMMENT>', 'n': 3}
+    assert presidio.calls == ['John', 'ok']
+
+def test_cef_and_csv_lines_are_rebuilt(anonymization_config):
+    service = FieldAnonymizationService(anonymization_config, FakePresidio())
+    record, parser = _parse(anonymization_config, 'CEF:0|Acme|FW|1.0|100|Login by John|5|srcip=10.1.1.1 act=allow')
+    assert service.anonymize_record(record, parser)
+    assert record.presidio_anonymized == 'CEF:0|Acme|FW|1.0|100|Login by <PERSON>|5|srcip=<IP> act=allow'
+
+    record, parser = _parse(anonymization_config, 'John,"a, b",7')
+    assert service.anonymize_record(record, parser)
+    assert record.presidio_anonymized == '<PERSON>,"a, b",7'
+
+def test_pipeline_falls_back_to_full_text_for_unstructured_records(anonymization_config, monkeypatch):
+    presidio = FakePresidio()
+    monkeypatch.setattr(LogProcessingService, '_create_presidio_service', staticmethod(lambda config: presidio))
+    config = {**anonymization_config, 'presidio': {'enabled': True}, 'parsers': {'csv': {'enabled': False}}}
+    service = LogProcessingService(config)
+
+    records = service.process_batch([(1, 'srcip=10.0.0.1 action=deny user=John'), (2, 'John logged in')])
+
+    assert records[0].presidio_anonymized == 'srcip=<IP> action=deny user=<PERSON>'
+    assert records[1].presidio_anonymized == '<PERSON> logged in'
+    assert records[1].parsed_data_anonymized == {}
+
+def test_key_value_lines_with_free_text_are_anonymized_as_full_text(anonymization_config, monkeypatch):
+    presidio = FakePresidio()
+    monkeypatch.setattr(LogProcessingService, '_create_presidio_service', staticmethod(lambda config: presidio))
+    config = {**anonymization_config, 'presidio': {'enabled': True}, 'parsers': {'csv': {'enabled': False}}}
+    line = 'Oct 1 fw01 sshd: Failed password for John Smith (john@x.com) srcip=10.0.0.1 dstport=22 action=deny'
+
+    record, parser = _parse(config, line)
+    assert record.parser_name == 'KeyValueParser'
+    assert not FieldAnonymizationService(config, presidio).anonymize_record(record, parser)
+
+    records = LogProcessingService(config).process_batch([(1, line)])
+    # The whole line, prefix included, went through Presidio.
+    assert presidio.calls == [line]
+    assert records[0].presidio_anonymized.startswith('Oct 1 fw01 sshd: Failed password for <PERSON> Smith')
+    assert records[0].parsed_data_anonymized == {}
+
+def test_numeric_values_and_typed_fields_are_anonymized(anonymization_config):
+    class NumberPresidio(FakePresidio):
+        def anonymize_text(self, text, template_key=None, language=None):
+            self.calls.append(text)
+            return '<PHONE_NUMBER>' if text.isdigit() and len(text) >= 9 else text
+
+    presidio = NumberPresidio()
+    service = FieldAnonymizationService(anonymization_config, presidio)
+    record, parser = _parse(anonymization_config, '{"phone": 3471234567, "bytes": 512, "ok": true}')
+    assert service.anonymize_record(record, parser)
+    assert json.loads(record.presidio_anonymized) == {'phone': '<PHONE_NUMBER>', 'bytes': 512, 'ok': True}
+
+    # Without scanning, only the listed fields are replaced, typed or not.
+    anonymization_config['drain3']['anonymization']['scan_other_fields'] = False
+    presidio = NumberPresidio()
+    service = FieldAnonymizationService(anonymization_config, presidio)
+    record, parser = _parse(anonymization_config, '{"srcip": "10.0.0.6", "client_ip": "10.0.0.7", "phone": 3471234567}')
+    assert service.anonymize_record(record, parser)
+    assert json.loads(record.presidio_anonymized) == {'srcip': '<IP>', 'client_ip': '10.0.0.7', 'phone': 3471234567}
+    assert presidio.calls == []
+
+@pytest.mark.parametrize('scan_other_fields', [False, True])
+def test_unlisted_typed_fields_do_not_get_their_placeholder(anonymization_config, scan_other_fields):
+    anonymization_config['drain3']['anonymization']['scan_other_fields'] = scan_other_fields
+    presidio = FakePresidio()
+    service = FieldAnonymizationService(anonymization_config, presidio)
+    record, parser = _parse(anonymization_config, 'devname="fw 1" devid="FGT80FTK22013405" vd="root"')
+
+    assert service.anonymize_record(record, parser)
+    assert record.presidio_anonymized == 'devname="<DEVICE_NAME>" devid="FGT80FTK22013405" vd="root"'
+    # Scanned like any other unlisted field, not replaced by `<DEVICE_ID>`.
+    assert presidio.calls == (['FGT80FTK22013405', 'root'] if scan_other_fields else [])
+
+def test_key_value_lines_with_a_repeated_key_are_anonymized_as_full_text(anonymization_config, monkeypatch):
+    anonymization_config['drain3']['anonymization']['methods']['hash']['fields'] = ['user']
+    presidio = FakePresidio()
+    monkeypatch.setattr(LogProcessingService, '_create_presidio_service', staticmethod(lambda config: presidio))
+    config = {**anonymization_config, 'presidio': {'enabled': True}, 'parsers': {'csv': {'enabled': False}}}
+    line = 'action=login user=John user=bob status=ok'
+
+    record, parser = _parse(config, line)
+    assert record.parser_name == 'KeyValueParser'
+    # Only bob's value is in the record: both users would get bob's hash.
+    assert not FieldAnonymizationService(config, presidio).anonymize_record(record, parser)
+
+    records = LogProcessingService(config).process_batch([(1, line)])
+    assert presidio.calls == [line]
+    assert records[0].presidio_anonymized == 'action=login user=<PERSON> user=bob status=ok'
@@ -0,0 +1,142 @@
+import csv
+import itertools
+import json
+
+import pytest
+
+from log_analyzer.services.config_service import ConfigService
+from log_analyzer.services.log_processing_service import LogProcessingService, batched
+from log_analyzer.writers.writer_factory import create_writers, resolve_formats
+
+# === Test Fixtures ===
+
+@pytest.fixture
+def pipeline_config():
+    """A minimal configuration with Presidio disabled, so no NLP model is needed."""
+    return {
+        'presidio': {'enabled': False},
+        'parsers': {'csv': {'enabled': False}},
+        'pipeline': {'batch_size': 2},
+        'drain3': {'similarity_threshold': 0.4, 'depth': 4},
+    }
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "fw.log"
+    path.write_text(
+        "srcip=10.0.0.1 dstip=10.0.0.2 action=deny\n"
+        "srcip=10.0.0.3 dstip=10.0.0.4 action=deny\n"
+        "\n"
+        "plain text line without structure\n"
+    )
+    return path
+
+# === Test Cases ===
+
+def test_batched_splits_into_fixed_size_chunks():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+def test_resolve_formats_expands_aliases_and_rejects_unknown():
+    assert resolve_formats(['logppt', 'logppt_original', 'ndjson']) == ['logppt_original', 'logppt_anonymized', 'ndjson']
+    with pytest.raises(ValueError):
+        resolve_formats(['xml'])
+
+def test_single_pass_produces_every_requested_format(pipeline_config, log_file, tmp_path):
+    service = LogProcessingService(pipeline_config)
+    writers = create_writers(['anonymize', 'logppt', 'json_report'], tmp_path / "out", "run", pipeline_config, service.schema_hints)
+
+    summary = service.process_file(str(log_file), writers)
+
+    assert summary['records'] == 3
+    outputs = summary['outputs']
+    assert set(outputs) == {'anonymize', 'logppt_original', 'logppt_anonymized', 'json_report'}
+
+    report = json.loads(open(outputs['json_report']).read())
+    assert [r['line_number'] for r in report] == [1, 2, 4]
+    assert all('cluster_id' in r['drain3_original'] for r in report)
+
+    with open(outputs['logppt_original'], newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['LineId', 'action', 'dstip', 'raw_content', 'srcip', 'Content', 'EventId', 'EventTemplate']
+    assert rows[1][0] == '1' and rows[1][5] == "srcip=10.0.0.1 dstip=10.0.0.2 action=deny"
+    assert len(rows) == 4
+
+    metrics = summary['metrics']
+    assert metrics['counters']['lines_read'] == 4
+    assert metrics['parsers']['KeyValueParser'] == {'hit': 2, 'miss': 1}
+    assert metrics['parsers']['FallbackParser'] == {'hit': 1, 'miss': 0}
+    assert {'read', 'chardet', 'parse', 'drain3_original', 'write_json_report'} <= set(metrics['stages'])
+
+def test_config_change_is_applied_between_batches(pipeline_config, tmp_path):
+    config_path = tmp_path / "config.yaml"
+    config_service = ConfigService(str(config_path))
+    assert config_service.save_config(pipeline_config)
+    service = LogProcessingService(config_service.load_config(), config_service=config_service)
+
+    def lines():
+        yield 1, "srcip=10.0.0.1 dstip=10.0.0.2 action=deny"
+        yield 2, "srcip=10.0.0.3 dstip=10.0.0.4 action=deny"
+        # Disable the key-value parser while the run is in progress.
+        updated = config_service.load_config()
+        updated['parsers']['key_value'] = {'enabled': False}
+        config_service.save_config(updated)
+        yield 3, "srcip=10.0.0.5 dstip=10.0.0.6 action=deny"
+
+    writers = create_writers(['ndjson'], tmp_path / "out", "run", pipeline_config)
+    summary = service.process_lines(lines(), writers)
+
+    with open(summary['outputs']['ndjson']) as f:
+        parsers = [json.loads(line)['parser_name'] for line in f]
+    assert parsers == ['KeyValueParser', 'KeyValueParser', 'FallbackParser']
+    assert summary['config_reloads'] == 1
+
+def test_batches_shrink_while_over_memory_budget(pipeline_config, tmp_path, monkeypatch):
+    config = {**pipeline_config, 'pipeline': {'batch_size': 400, 'memory_budget_mb': 1}}
+    # The RSS keeps growing, so every check is a new pressure event.
+    rss = itertools.count(2 * 1024 * 1024, 1024 * 1024)
+    monkeypatch.setattr('log_analyzer.services.memory_governor.current_rss_bytes', lambda: next(rss))
+    service = LogProcessingService(config)
+    batch_sizes = []
+
+    lines = [(i, f"line {i}") for i in range(1, 1001)]
+    summary = service.process_lines(lines, {}, progress=lambda lines, records: batch_sizes.append(lines))
+
+    assert summary['records'] == 1000
+    assert batch_sizes[:4] == [400, 200, 100, 50]
+    assert service.batch_size == 50
+
+def test_dedup_processes_each_distinct_line_once(pipeline_config, tmp_path):
+    lines = ["srcip=10.0.0.1 action=deny", "heartbeat ok", "srcip=10.0.0.1 action=deny",
+             "srcip=10.0.0.2 action=deny", "heartbeat ok", "srcip=10.0.0.1 action=deny"]
+    numbered = list(enumerate(lines, 1))
+    plain = LogProcessingService(pipeline_config)
+    expected = [record for batch in batched(numbered, 2) for record in plain.process_batch(batch)]
+
+    dedup_config = {**pipeline_config, 'pipeline': {'batch_size': 2, 'dedup': {'enabled': True, 'scope': 'window'}}}
+    service = LogProcessingService(dedup_config)
+    writers = create_writers(['ndjson', 'anonymize'], tmp_path / "out", "run", dedup_config, service.schema_hints)
+    summary = service.process_lines(iter(numbered), writers)
+
+    assert summary['records'] == 6 and summary['duplicates'] == 3
+    assert summary['metrics']['counters']['records'] == 6
+    # The parser chain only saw the three distinct lines.
+    assert sum(summary['metrics']['parsers']['KeyValueParser'].values()) == 3
+    written = [json.loads(line) for line in open(summary['outputs']['ndjson'])]
+    assert [r['line_number'] for r in written] == [1, 2, 3, 4, 5, 6]
+    for record, reference in zip(written, expected):
+        assert record['parsed_data'] == reference.parsed_data
+        assert record['drain3_original']['template'] == reference.drain3_original['template']
+        assert record['drain3_original']['cluster_id'] == reference.drain3_original['cluster_id']
+    assert open(summary['outputs']['anonymize']).read().count("heartbeat ok") == 2
+
+def test_dedup_count_mode_collapses_only_for_formats_that_support_it(pipeline_config, tmp_path):
+    config = {**pipeline_config, 'pipeline': {'batch_size': 10, 'dedup': {'enabled': True, 'emit': 'count'}}}
+    service = LogProcessingService(config)
+    writers = create_writers(['ndjson', 'anonymize'], tmp_path / "out", "run", config, service.schema_hints)
+    lines = ["heartbeat ok", "action=deny", "heartbeat ok", "heartbeat ok"]
+
+    summary = service.process_lines(enumerate(lines, 1), writers)
+
+    written = [json.loads(line) for line in open(summary['outputs']['ndjson'])]
+    assert [(r['original_content'], r['occurrences']) for r in written] == [("heartbeat ok", 3), ("action=deny", 1)]
+    assert open(summary['outputs']['anonymize']).read().splitlines() == lines
@@ -0,0 +1,59 @@
+import os
+import tracemalloc
+
+from log_analyzer.services.log_processing_service import LogProcessingService
+from log_analyzer.services.memory_governor import MemoryGovernor
+from log_analyzer.writers.writer_factory import create_writers
+
+# === Test Fixtures ===
+
+MB = 1024 * 1024
+
+def _config(tmp_path, **pipeline):
+    return {
+        'presidio': {'enabled': False},
+        'parsers': {'csv': {'enabled': False}},
+        'pipeline': {'batch_size': 2, 'memory': {'spill_dir': str(tmp_path / "spill")}, **pipeline},
+    }
+
+LINES = [(i, f"srcip=10.0.0.{i % 5} dstip=10.0.1.{i % 3} action=deny") for i in range(1, 41)]
+
+# === Test Cases ===
+
+def test_relief_backs_off_until_the_rss_grows_again(tmp_path, monkeypatch):
+    rss = [150 * MB]
+    monkeypatch.setattr('log_analyzer.services.memory_governor.current_rss_bytes', lambda: rss[0])
+    governor = MemoryGovernor(_config(tmp_path, memory_budget_mb=100))
+    governor.start()
+
+    assert governor.over_budget()
+    actions = governor.relieve({'cache': lambda g: "halved", 'idle': lambda g: None})
+    assert actions == {'cache': "halved"} and not governor.spilled
+    assert not governor.over_budget()
+    rss[0] = 165 * MB
+    assert governor.over_budget()
+    assert governor.report()['pressure_events'] == 1 and governor.report()['rss_peak_mb'] == 165.0
+
+def test_global_dedup_index_spills_to_disk_without_changing_outputs(tmp_path, monkeypatch):
+    dedup = {'enabled': True, 'scope': 'global'}
+    expected = LogProcessingService(_config(tmp_path, dedup=dedup))
+    expected.process_lines(LINES, create_writers(['ndjson'], str(tmp_path), "expected", {}))
+
+    monkeypatch.setattr('log_analyzer.services.memory_governor.current_rss_bytes', lambda: 2 * MB)
+    service = LogProcessingService(_config(tmp_path, dedup=dedup, memory_budget_mb=1))
+    summary = service.process_lines(LINES, create_writers(['ndjson'], str(tmp_path), "governed", {}))
+
+    assert summary['memory']['spilled'] and "spilled to disk" in summary['memory']['events'][0]['actions']['dedup']
+    assert (tmp_path / "governed.ndjson").read_text() == (tmp_path / "expected.ndjson").read_text()
+    assert summary['duplicates'] == expected.dedup.duplicates > 0
+    assert os.listdir(tmp_path / "spill") == []
+
+def test_tracemalloc_attributes_the_peak_to_stages_and_locations(tmp_path):
+    service = LogProcessingService(_config(tmp_path, memory={'tracemalloc': {'enabled': True, 'top': 3}}))
+    summary = service.process_lines(LINES, create_writers(['ndjson'], str(tmp_path), "traced", {}))
+
+    traced = summary['memory']['tracemalloc']
+    assert {'parse', 'drain3_original', 'anonymize', 'drain3_anonymized', 'write_ndjson'} <= set(traced['stages'])
+    assert traced['peak']['stage'] in traced['stages']
+    assert 0 < len(traced['peak']['top']) <= 3 and ':' in traced['peak']['top'][0]['location']
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,53 @@
+from log_analyzer.services import metrics_service
+from log_analyzer.services.metrics_service import MetricsRegistry, RunMetrics
+
+# === Test Cases ===
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    counter = registry.counter('demo_total', 'A demo counter.', ['kind'])
+    histogram = registry.histogram('demo_seconds', 'A demo histogram.', ['stage'], buckets=(0.1, 1.0))
+    counter.inc(2, ('a"b',))
+    histogram.observe(0.05, ('parse',))
+    histogram.observe(0.5, ('parse',))
+    histogram.observe(5.0, ('parse',))
+
+    lines = registry.render().splitlines()
+
+    assert '# TYPE demo_total counter' in lines
+    assert 'demo_total{kind="a\\"b"} 2' in lines
+    assert 'demo_seconds_bucket{stage="parse",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="parse",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="parse",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{stage="parse"} 3' in lines
+    assert 'demo_seconds_sum{stage="parse"} 5.550000' in lines
+
+def test_histogram_counts_repeated_observations_in_the_sum():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('demo_seconds', 'A demo histogram.', buckets=(1.0,))
+    histogram.observe(0.5, count=4)
+
+    lines = registry.render().splitlines()
+    assert 'demo_seconds_count 4' in lines and 'demo_seconds_sum 2.000000' in lines
+
+def test_run_scope_collects_only_its_own_measurements():
+    metrics_service.observe_stage('parse', 0.5)
+    with metrics_service.run_scope(RunMetrics()) as run:
+        metrics_service.observe_stage('parse', 0.25, items=10)
+        metrics_service.count_parser_results({('JSONParser', 'hit'): 3, ('JSONParser', 'miss'): 7})
+        metrics_service.count_cache('demo', hit=True)
+        metrics_service.count_cache('demo', hit=False)
+
+    summary = run.summary()
+    assert summary['stages']['parse'] == {'calls': 1, 'items': 10, 'seconds': 0.25}
+    assert summary['parsers']['JSONParser'] == {'hit': 3, 'miss': 7}
+    assert summary['caches']['demo']['hit_rate'] == 0.5
+
+def test_disabled_instrumentation_records_nothing():
+    metrics_service.set_enabled(False)
+    try:
+        with metrics_service.run_scope(RunMetrics()) as run:
+            metrics_service.observe_stage('parse', 0.1)
+        assert run.summary()['stages'] == {}
+    finally:
+        metrics_service.set_enabled(True)
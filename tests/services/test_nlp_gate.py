@@ -0,0 +1,61 @@
+from log_analyzer.services.nlp_gate import NlpGate
+
+# === Test Fixtures ===
+
+# Lines labeled by whether they contain a NER entity (person, place, organization).
+LABELED_SAMPLE = [
+    ("date=2025-07-06 time=10:00:01 devname=\"fw01\" srcip=10.0.0.1 action=deny", False),
+    ("Jul  6 10:00:01 web01 sshd[42]: Accepted password for root from 10.0.0.5 port 22", False),
+    ("Connection closed by 10.1.2.3 port 50022", False),
+    ("ERROR disk /dev/sda1 usage 97%", False),
+    ("{\"level\": \"INFO\", \"message\": \"cache miss\", \"status\": 404}", False),
+    ("login failed for user Mario Rossi from 10.0.0.9", True),
+    ("srccountry=\"Germany\" dstip=10.0.0.2 action=accept", True),
+    ("contact Giulia Bianchi <giulia.bianchi@example.com>", True),
+    ("Invoice sent to Acme Corporation", True),
+]
+
+# === Test Cases ===
+
+def test_shape_heuristic_keeps_every_labeled_ner_line():
+    gate = NlpGate({'enabled': True})
+
+    decisions = [(gate.needs_ner(line), needs) for line, needs in LABELED_SAMPLE]
+
+    recall = sum(1 for decided, needs in decisions if decided and needs) / sum(1 for _, needs in decisions if needs)
+    assert recall == 1.0
+    assert [decided for decided, needs in decisions if not needs] == [False] * 5
+    assert gate.report()['skip_rate'] == round(5 / len(LABELED_SAMPLE), 4)
+
+def test_templates_without_ner_entities_learn_to_skip_and_are_rechecked():
+    gate = NlpGate({'enabled': True, 'learn_templates': True, 'min_samples': 2, 'recheck_every': 3})
+    line = "Server Alpha restarted"
+    for _ in range(2):
+        assert gate.needs_ner(line, template_key=7)
+        gate.observe(7, found_ner_entity=False)
+
+    assert [gate.needs_ner(line, template_key=7) for _ in range(3)] == [False, False, True]
+    gate.observe(7, found_ner_entity=True)
+    assert gate.needs_ner(line, template_key=7)
+    assert gate.report()['templates_skipped'] == 0
+
+def test_gated_lines_skip_spacy_but_keep_patterns_and_timestamps(tiny_spacy_model):
+    from log_analyzer.services.presidio_service import PresidioService
+
+    service = PresidioService({
+        'enabled': True,
+        'analyzer': {'languages': ['en'], 'nlp': {'models': {'en': tiny_spacy_model}},
+                     'entities': {'EMAIL_ADDRESS': True, 'PERSON': True, 'DATE_TIME': True}},
+        'anonymizer': {'strategies': {'DEFAULT': 'replace'}, 'strategy_config': {'replace': {'new_value': '<X>'}}},
+        'nlp_gate': {'enabled': True},
+    })
+    ner_calls = []
+    process_text = service.analyzer.nlp_engine.process_text
+    service.analyzer.nlp_engine.process_text = lambda text, language: ner_calls.append(text) or process_text(text, language)
+
+    anonymized = service.anonymize_text("2025-07-06 10:00:01 deny mail ops@example.com", language="en")
+    service.anonymize_text("login by Mario", language="en")
+
+    assert anonymized == "<X> deny mail <X>"
+    assert ner_calls == ["login by Mario"]
+    assert service.nlp_gate.report()['skipped'] == 1
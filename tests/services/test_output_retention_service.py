@@ -0,0 +1,46 @@
+import os
+import time
+
+from log_analyzer.services.output_retention_service import OutputRetentionService
+
+# === Helpers ===
+
+def make_output(path, size, age_hours):
+    path.write_bytes(b'x' * size)
+    modified = time.time() - age_hours * 3600
+    os.utime(path, (modified, modified))
+    return path
+
+# === Test Cases ===
+
+def test_expired_outputs_and_stale_spools_are_removed(tmp_path):
+    old = make_output(tmp_path / "old.json", 10, age_hours=10)
+    recent = make_output(tmp_path / "recent.json", 10, age_hours=1)
+    stale_spool = make_output(tmp_path / ".out.csv.abc.spool", 10, age_hours=10)
+    hidden = make_output(tmp_path / ".keep", 10, age_hours=10)
+
+    removed = OutputRetentionService(str(tmp_path), max_age_hours=5, max_total_mb=None).enforce()
+
+    assert set(removed) == {old, stale_spool}
+    assert recent.exists() and hidden.exists()
+
+def test_oldest_outputs_go_first_when_over_quota(tmp_path):
+    dataset = tmp_path / "run.parquet"
+    dataset.mkdir()
+    make_output(dataset / "part-00000.parquet", 600_000, age_hours=3)
+    middle = make_output(tmp_path / "middle.ndjson", 600_000, age_hours=2)
+    newest = make_output(tmp_path / "newest.ndjson", 600_000, age_hours=1)
+
+    service = OutputRetentionService(str(tmp_path), max_age_hours=None, max_total_mb=1.2)
+    removed = service.enforce()
+
+    assert removed == [dataset]
+    assert middle.exists() and newest.exists()
+
+def test_protected_outputs_are_kept(tmp_path):
+    running = make_output(tmp_path / "running.json", 10, age_hours=10)
+
+    removed = OutputRetentionService(str(tmp_path), max_age_hours=1, max_total_mb=0).enforce([running])
+
+    assert removed == []
+    assert running.exists()
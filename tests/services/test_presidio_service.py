@@ -1,9 +1,14 @@
+from pathlib import Path
+
 import pytest
+import yaml
 from unittest.mock import MagicMock, patch
 from presidio_anonymizer.entities import OperatorConfig
 from presidio_analyzer import RecognizerResult
 
-from log_analyzer.services.presidio_service import PresidioService
+from log_analyzer.services.presidio_service import PresidioService, enabled_entities, spacy_model_name
+
+CONFIG_PATH = Path(__file__).resolve().parents[2] / "config" / "config.yaml"
 
 # === Test Fixtures ===
 
@@ -39,6 +44,20 @@ def sample_presidio_config():
         }
     }
 
+@pytest.fixture
+def lemmatized_spacy_model(tmp_path):
+    """A saved spaCy pipeline whose attribute ruler sets the lemmas of a few context words."""
+    spacy = pytest.importorskip("spacy")
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("attribute_ruler")
+    nlp.add_pipe("ner")
+    nlp.initialize()
+    # After initialize(), which resets the ruler's patterns.
+    for word in ("ssn", "social"):
+        ruler.add([[{"LOWER": word}]], {"LEMMA": word})
+    nlp.to_disk(tmp_path / "lemmatized_en")
+    return str(tmp_path / "lemmatized_en")
+
 # === Test Cases ===
 
 def test_presidio_service_initialization(sample_presidio_config):
@@ -130,3 +149,79 @@ def test_service_disabled_returns_original_text(sample_presidio_config):
     anonymized_text = service.anonymize_text(original_text, language="en")
 
     assert anonymized_text == original_text
+
+def test_enabled_entities_and_model_names():
+    analyzer_config = {
+        "entities": {"PERSON": True, "IP_ADDRESS": False, "EMAIL_ADDRESS": {"enabled": True}},
+        "ad_hoc_recognizers": [{"name": "TICKET_ID", "regex": "T-[0-9]+", "score": 0.9}],
+    }
+    assert enabled_entities(analyzer_config) == {"PERSON", "NRP", "EMAIL_ADDRESS", "TICKET_ID"}
+    assert {"US_SSN", "IT_FISCAL_CODE"} <= enabled_entities({"entities": {"PERSON_ID": True}})
+    assert enabled_entities({}) is None
+    assert spacy_model_name("it", {"model_size": "md"}) == "it_core_news_md"
+    assert spacy_model_name("en", {}) == "en_core_web_lg"
+    assert spacy_model_name("en", {"models": {"en": "/models/custom"}}) == "/models/custom"
+    with pytest.raises(ValueError):
+        spacy_model_name("en", {"model_size": "xl"})
+
+def test_engine_is_pruned_to_enabled_entities(sample_presidio_config, tiny_spacy_model):
+    config = {**sample_presidio_config, "analyzer": {
+        "languages": ["en"],
+        "entities": {"EMAIL_ADDRESS": True, "PERSON": True, "IP_ADDRESS": False},
+        "nlp": {"models": {"en": tiny_spacy_model}},
+    }}
+    service = PresidioService(config)
+
+    description = service.describe()
+    assert description["pipes"] == {"en": ["ner"]}
+    assert description["recognizers"] == ["EmailRecognizer", "SpacyRecognizer"]
+    assert description["entities"] == ["EMAIL_ADDRESS", "NRP", "PERSON"]
+    # Disabled entities are neither recognized nor anonymized.
+    assert service.anonymize_text("mail john@example.com from 10.0.0.1", language="en") == \
+        "mail <REDACTED> from 10.0.0.1"
+    # The UI still lists every entity, so that disabled ones can be re-enabled.
+    assert "IP_ADDRESS" in service.get_recognizer_details()
+
+def test_pattern_only_entities_load_no_model(sample_presidio_config):
+    config = {**sample_presidio_config, "analyzer": {"languages": ["en"], "entities": {"EMAIL_ADDRESS": True}}}
+    service = PresidioService(config)
+
+    assert service.describe()["models"] == {"en": "blank"}
+    assert service.anonymize_text("write to ops@example.com", language="en") == "write to <REDACTED>"
+
+def test_anonymize_spans_analyzes_once_and_cuts_entities_at_span_boundaries(sample_presidio_config):
+    config = {**sample_presidio_config, "analyzer": {"languages": ["en"], "entities": {"EMAIL_ADDRESS": True}}}
+    service = PresidioService(config)
+    text = "mail ops@example.com\nkeep this"
+
+    assert service.anonymize_spans(text, [(5, 20), (0, 12), (21, 25)], language="en") == \
+        ["<REDACTED>", "mail <REDACTED>", "keep"]
+
+def test_shipped_config_keeps_the_recognizers_of_entity_categories(tiny_spacy_model):
+    with open(CONFIG_PATH, encoding="utf-8") as file:
+        config = yaml.safe_load(file)["presidio"]
+    config["analyzer"]["nlp"]["models"] = {"en": tiny_spacy_model, "it": tiny_spacy_model}
+    service = PresidioService(config)
+
+    # PERSON_ID ("SSN, codice fiscale") is not a Presidio entity: it stands for these.
+    assert {"US_SSN", "IT_FISCAL_CODE", "IT_IDENTITY_CARD", "US_PASSPORT"} <= set(service.entities)
+    assert {"UsSsnRecognizer", "ItFiscalCodeRecognizer"} <= set(service.describe()["recognizers"])
+    # ... and they are anonymized with its strategy (hash).
+    assert service.operators["IT_FISCAL_CODE"].operator_name == "hash"
+    anonymized = service.anonymize_text("codice fiscale RSSMRA85T10A562S", language="it")
+    assert anonymized.startswith("codice fiscale ") and "RSSMRA85T10A562S" not in anonymized
+
+def test_context_words_lift_weak_patterns_over_the_shipped_threshold(lemmatized_spacy_model):
+    with open(CONFIG_PATH, encoding="utf-8") as file:
+        config = yaml.safe_load(file)["presidio"]
+    config["analyzer"]["nlp"]["models"] = {"en": lemmatized_spacy_model, "it": lemmatized_spacy_model}
+    service = PresidioService(config)
+
+    assert "attribute_ruler" in service.describe()["pipes"]["en"]
+    anonymized = service.anonymize_text("ssn 536-22-8726 of user", language="en")
+    assert anonymized.startswith("ssn ") and "536-22-8726" not in anonymized
+
+    # Without lemmas no context word matches: the SSN stays under 0.7.
+    config["analyzer"]["nlp"]["context_lemmas"] = False
+    assert PresidioService(config).anonymize_text("ssn 536-22-8726 of user", language="en") == \
+        "ssn 536-22-8726 of user"
@@ -0,0 +1,79 @@
+import multiprocessing
+
+import pytest
+
+from log_analyzer.services.config_service import clear_caches
+from log_analyzer.services.field_anonymization_service import FieldAnonymizationService
+from log_analyzer.services.presidio_service import PresidioService
+from log_analyzer.services.pseudonym_store import PseudonymStore, shared_store
+
+# === Test Fixtures ===
+
+@pytest.fixture
+def store_path(tmp_path):
+    yield str(tmp_path / "pseudonyms.bin")
+    clear_caches()
+
+def _tokens(path, start):
+    """Runs in a worker process: tokens of 2000 overlapping addresses, from a 16-slot table."""
+    store = PseudonymStore(path, salt='s', slot_bits=4)
+    return {value: store.token('IP_ADDRESS', f"10.0.{value // 256}.{value % 256}")
+            for value in range(start, start + 2000)}
+
+# === Test Cases ===
+
+def test_worker_processes_agree_on_every_token(store_path):
+    with multiprocessing.get_context('fork').Pool(4) as pool:
+        results = pool.starmap(_tokens, [(store_path, start) for start in range(0, 800, 100)])
+
+    tokens = {}
+    for result in results:
+        for value, token in result.items():
+            assert tokens.setdefault(value, token) == token
+    assert len(tokens) == 2700 and len(set(tokens.values())) == 2700
+    store = PseudonymStore(store_path, salt='s')
+    assert len(store) == 2700 and store.report()['slots'] >= 2 * 2700
+    assert store.get('IP_ADDRESS', "10.0.0.5") == tokens[5]
+    # Only digests are stored, never the values.
+    with open(store_path, 'rb') as file:
+        assert b"10.0.0.5" not in file.read()
+
+def test_tokens_persist_across_runs_and_are_bound_to_the_salt(store_path):
+    first = PseudonymStore(store_path, salt='s')
+    assert [first.token('PERSON_ID', value) for value in ('alice', 'bob', 'alice')] == \
+           ['<PERSON_ID_1>', '<PERSON_ID_2>', '<PERSON_ID_1>']
+    # Each entity is numbered on its own.
+    assert first.token('USER_ID', 'alice') == '<USER_ID_1>'
+    first.close()
+
+    again = PseudonymStore(store_path, salt='s')
+    assert again.token('PERSON_ID', 'bob') == '<PERSON_ID_2>'
+    assert again.token('PERSON_ID', 'carol') == '<PERSON_ID_3>'
+    assert len(again) == 4
+    assert again.report()['hits'] == 1 and again.report()['inserts'] == 1
+    with pytest.raises(ValueError, match="another salt"):
+        PseudonymStore(store_path, salt='other')
+
+def test_presidio_operator_and_hashed_fields_share_the_table(store_path):
+    pseudonym = {'path': store_path, 'salt': 's'}
+    presidio_config = {
+        'enabled': True,
+        'analyzer': {'languages': ['en'], 'entities': {'IP_ADDRESS': True}},
+        'anonymizer': {'strategies': {'IP_ADDRESS': 'pseudonym'}, 'strategy_config': {'pseudonym': pseudonym}},
+    }
+    presidio = PresidioService(presidio_config)
+    first = presidio.anonymize_text("from 10.0.0.1 to 10.0.0.2", language='en')
+    second = presidio.anonymize_text("reply from 10.0.0.2 to 10.0.0.1", language='en')
+    assert first == "from <IP_ADDRESS_2> to <IP_ADDRESS_1>"
+    assert second == "reply from <IP_ADDRESS_1> to <IP_ADDRESS_2>"
+
+    fields = FieldAnonymizationService({
+        'drain3': {'anonymization': {'methods': {'hash': {'pseudonyms': True,
+                                                          'fields': ['user_id', 'srcuser', 'client_ip']}}}},
+        'presidio': presidio_config,
+    })
+    # Fields take their tokens under the Presidio entity of their type.
+    assert fields.anonymize_value('client_ip', '10.0.0.2') == '<IP_ADDRESS_1>'
+    assert fields.anonymize_value('user_id', 'mrossi') == '<PERSON_1>'
+    assert fields.anonymize_value('srcuser', 'mrossi') == '<PERSON_1>'
+    assert shared_store(pseudonym).token('PERSON', 'mrossi') == '<PERSON_1>'
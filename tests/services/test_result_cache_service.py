@@ -0,0 +1,58 @@
+import os
+
+from log_analyzer.services.result_cache_service import ResultCacheService
+
+# === Test Fixtures ===
+
+CONFIG = {'presidio': {'enabled': True}, 'drain3': {'depth': 4}, 'jobs': {'max_concurrent': 2}}
+
+def _produce(directory, base_name, size=10):
+    """Fakes the outputs of a run: a file and a dataset directory."""
+    report = directory / f"{base_name}.json"
+    report.write_text('x' * size)
+    dataset = directory / f"{base_name}.parquet"
+    dataset.mkdir()
+    (dataset / "part-00000.parquet").write_text('p')
+    return {'json_report': report, 'parquet': dataset}
+
+# === Test Cases ===
+
+def test_key_tracks_input_and_output_relevant_config_only(tmp_path):
+    cache = ResultCacheService(str(tmp_path / "cache"))
+    log = tmp_path / "app.log"
+    log.write_text("line 1\nline 2\n")
+    key = cache.key(str(log), CONFIG, 'json_report')
+
+    assert cache.key(str(log), {**CONFIG, 'jobs': {'max_concurrent': 8}}, 'json_report') == key
+    assert cache.key(str(log), {**CONFIG, 'drain3': {'depth': 5}}, 'json_report') != key
+    assert cache.key(str(log), CONFIG, 'ndjson') != key
+    log.write_text("line 1\nline 3\n")
+    assert cache.key(str(log), CONFIG, 'json_report') != key
+
+def test_hit_links_every_cached_output_under_a_new_name(tmp_path):
+    cache = ResultCacheService(str(tmp_path / "cache"))
+    outputs_dir = tmp_path / "outputs"
+    outputs_dir.mkdir()
+    keys = {'json_report': 'k1', 'parquet': 'k2'}
+    cache.store(keys, _produce(outputs_dir, "app_1"), "app_1", {'records': 2, 'outputs': {}})
+
+    hit = cache.lookup(keys, str(outputs_dir), "app_2")
+
+    assert hit['summary'] == {'records': 2, 'cache': 'hit'}
+    assert hit['outputs']['json_report'] == outputs_dir / "app_2.json"
+    assert (outputs_dir / "app_2.parquet" / "part-00000.parquet").read_text() == 'p'
+    assert cache.lookup({**keys, 'ndjson': 'k3'}, str(outputs_dir), "app_3") is None
+
+def test_least_recently_used_entries_are_evicted_over_the_quota(tmp_path):
+    cache = ResultCacheService(str(tmp_path / "cache"), max_total_mb=25 / (1024 * 1024))
+    outputs_dir = tmp_path / "outputs"
+    outputs_dir.mkdir()
+    for index in range(2):
+        report = _produce(outputs_dir, f"run{index}")['json_report']
+        cache.store({'json_report': f"key{index}"}, {'json_report': report}, f"run{index}", {})
+    assert cache.lookup({'json_report': 'key0'}, str(outputs_dir), "again")
+
+    report = _produce(outputs_dir, "run2")['json_report']
+    cache.store({'json_report': 'key2'}, {'json_report': report}, "run2", {})
+
+    assert sorted(os.listdir(tmp_path / "cache")) == ['key0', 'key2']
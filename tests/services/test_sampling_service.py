@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from log_analyzer.services.sampling_service import SamplingService, seek_sample
+
+# === Test Fixtures ===
+
+@pytest.fixture
+def sampling_config():
+    """Presidio disabled; `full_scan_mb: 0` makes every file go through seek sampling."""
+    return {
+        'presidio': {'enabled': False},
+        'parsers': {'csv': {'enabled': False}},
+        'sampling': {'full_scan_mb': 0, 'confidence': 0.99},
+    }
+
+@pytest.fixture
+def mixed_log(tmp_path):
+    """3000 lines: 2/3 key-value firewall lines, 1/3 free text of a different length."""
+    path = tmp_path / "mixed.log"
+    lines = []
+    for i in range(3000):
+        if i % 3:
+            lines.append(f"srcip=10.0.{i % 250}.{i % 7} dstip=10.1.0.{i % 13} action=deny policyid={i % 5}")
+        else:
+            lines.append(f"plain text line number {i} without structure")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+def _is_line_start(content, offset):
+    return offset == 0 or content[offset - 1:offset] == b"\n"
+
+# === Test Cases ===
+
+def test_seek_sample_returns_whole_lines_spread_over_the_file(mixed_log):
+    content = mixed_log.read_bytes()
+    sample, skipped = seek_sample(str(mixed_log), 200, 'utf-8', random.Random(1))
+
+    assert len(sample) == 200 and skipped == 0
+    offsets = [line.offset for line in sample]
+    assert offsets == sorted(offsets) and offsets[-1] > len(content) * 0.9
+    for line in sample:
+        assert _is_line_start(content, line.offset)
+        assert content[line.offset:].split(b"\n", 1)[0].decode() == line.content
+
+def test_estimates_cover_the_true_totals(sampling_config, mixed_log):
+    preview = SamplingService(sampling_config).preview(str(mixed_log), lines=400, seed=7)
+
+    assert preview['method'] == 'seek' and preview['sampled_lines'] == 400
+    total = preview['estimated_lines']
+    assert total['low'] <= 3000 <= total['high']
+    free_text = preview['parsers']['FallbackParser']
+    assert free_text['share_low'] <= 1 / 3 <= free_text['share_high']
+    assert free_text['estimated_low'] <= 1000 <= free_text['estimated_high']
+    top = preview['templates'][0]
+    assert top['template'] == 'plain text line number <*> without structure'
+    assert top['estimated_low'] <= 1000 <= top['estimated_high']
+    assert preview['examples'] and preview['examples'][0]['parser_name']
+
+def test_small_files_use_reservoir_sampling_with_exact_totals(sampling_config, mixed_log):
+    sampling_config['sampling']['full_scan_mb'] = 8
+    service = SamplingService(sampling_config)
+    preview = service.preview(str(mixed_log), lines=300, seed=3)
+
+    assert preview['method'] == 'reservoir' and preview['sampled_lines'] == 300
+    assert preview['estimated_lines'] == {'estimate': 3000, 'low': 3000, 'high': 3000}
+    assert service.preview(str(mixed_log), lines=300, seed=3)['parsers'] == preview['parsers']
+
+def test_draws_in_over_long_lines_count_with_zero_weight(sampling_config, tmp_path):
+    path = tmp_path / "long_lines.log"
+    lines = [f"srcip=10.0.0.{i % 250} action=deny policyid={i % 5}" for i in range(3000)]
+    for position in (500, 1500, 2500):
+        lines.insert(position, "x" * 200_000)  # Longer than MAX_LINE_BYTES: skipped.
+    lines.insert(1000, "y" * 10_000)  # Found by widening the read back.
+    path.write_text("\n".join(lines) + "\n")
+
+    preview = SamplingService(sampling_config).preview(str(path), lines=400, seed=5)
+
+    assert preview['skipped_long_lines'] > 200
+    total = preview['estimated_lines']
+    assert total['low'] <= 3004 <= total['high']
+    content = path.read_bytes()
+    sample, _ = seek_sample(str(path), 400, 'utf-8', random.Random(5))
+    assert any(len(line.content) == 10_000 for line in sample)
+    assert all(_is_line_start(content, line.offset) for line in sample)
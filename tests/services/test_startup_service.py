@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+from log_analyzer.services.startup_service import WarmupService, WarmupStatus, timed_import
+
+# === Test Cases ===
+
+def test_warmup_runs_steps_in_order_and_reports_them():
+    calls = []
+    service = WarmupService()
+    service.add_step("first", lambda: calls.append("first"))
+    service.add_step("import_json", timed_import("json"))
+    service.mark_app_imported()
+    assert not service.is_ready
+    assert service.report()['pending_steps'] == ["first", "import_json"]
+
+    service.start()
+
+    assert service.wait(timeout=5)
+    report = service.report()
+    assert calls == ["first"]
+    assert report['status'] == WarmupStatus.READY
+    assert [step['step'] for step in report['steps']] == ["first", "import_json"]
+    assert report['pending_steps'] == []
+    assert report['ready_after_seconds'] >= report['app_import_seconds'] >= 0
+
+def test_failing_step_is_recorded_and_does_not_block_readiness():
+    service = WarmupService()
+    service.add_step("broken", timed_import("module_that_does_not_exist"))
+    service.add_step("after", lambda: None)
+
+    service.run()
+
+    assert service.is_ready
+    broken, after = service.report()['steps']
+    assert 'module_that_does_not_exist' in broken['error']
+    assert 'error' not in after
+
+def test_web_app_import_defers_heavy_dependencies():
+    code = ("import sys, log_analyzer.web.main; "
+            "print(sorted(m for m in ('presidio_analyzer', 'spacy', 'drain3', 'chardet') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines() == ["[]"]
+    # The configuration is read by the startup hook, not on import.
+    assert "CRITICAL" not in result.stderr
@@ -0,0 +1,65 @@
+import re
+
+from log_analyzer.services.log_processing_service import LogProcessingService
+from log_analyzer.services.template_anonymization_service import TemplateAnonymizationService, split_by_template
+
+# === Test Fixtures ===
+
+class FakePresidio:
+    """Replaces IPs and a few names, and counts the analyses instead of running NER."""
+
+    nlp_gate = None
+    pattern = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b|\b(?:Mario|Giulia)\b')
+
+    def __init__(self):
+        self.analyses = 0
+
+    def _replace(self, text):
+        return self.pattern.sub(lambda match: '<IP>' if match.group()[0].isdigit() else '<PERSON>', text)
+
+    def anonymize_text(self, text, template_key=None, language=None):
+        self.analyses += 1
+        return self._replace(text)
+
+    def anonymize_spans(self, text, spans, language=None):
+        self.analyses += 1
+        return [self._replace(text[start:end]) for start, end in spans]
+
+LINES = [
+    "login by Mario from 10.0.0.1 ok",
+    "login by Giulia from 10.0.0.2 ok",
+    "login by Mario from  10.0.0.1 ok",
+    "login by Giulia from 10.0.0.2 ok",
+]
+
+# === Test Cases ===
+
+def test_split_by_template_keeps_the_line_whitespace():
+    assert split_by_template("a  b c d", "a <*> <*> d") == [(0, 1, False), (3, 6, True), (7, 8, False)]
+    assert split_by_template("a b c", "a <*>") is None
+    assert split_by_template("x b", "a <*>") is None
+
+def test_template_path_matches_full_line_and_caches_segments():
+    presidio = FakePresidio()
+    service = TemplateAnonymizationService({'enabled': True}, presidio)
+    template = "login by <*> from <*> ok"
+
+    anonymized = [service.anonymize(line, template) for line in LINES]
+
+    assert anonymized == [FakePresidio()._replace(line) for line in LINES]
+    # Lines 3 and 4 only repeat segments seen before (the extra space is kept from the line).
+    assert presidio.analyses == 2
+    assert anonymized[2] == "login by <PERSON> from  <IP> ok"
+
+def test_pipeline_mines_before_anonymizing_along_the_template(monkeypatch):
+    presidio = FakePresidio()
+    monkeypatch.setattr(LogProcessingService, '_create_presidio_service', staticmethod(lambda config: presidio))
+    config = {'presidio': {'enabled': True, 'template_anonymization': {'enabled': True}},
+              'parsers': {'csv': {'enabled': False}, 'key_value': {'enabled': False}}}
+    service = LogProcessingService(config)
+
+    records = service.process_batch(list(enumerate(LINES * 3, start=1)))
+
+    assert [record.presidio_anonymized for record in records] == [FakePresidio()._replace(line) for line in LINES * 3]
+    assert all(record.drain3_original.get('cluster_id') for record in records)
+    assert presidio.analyses < len(records)
@@ -0,0 +1,103 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from log_analyzer.services.log_processing_service import LogProcessingService
+from log_analyzer.services.template_labeling_service import TemplateLabelingService
+from log_analyzer.writers.writer_factory import create_writers
+
+# === Test Fixtures ===
+
+class _StubOllama(BaseHTTPRequestHandler):
+    """Answers /api/generate like Ollama: 'network' for firewall templates, else 'Authentication'."""
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(payload)
+        if self.server.fail:
+            self.send_error(500)
+            return
+        templates = re.findall(r'^\d+\. (.*)$', payload['prompt'], re.MULTILINE)
+        labels = ['network' if 'action=' in template else ' Authentication' for template in templates]
+        body = json.dumps({'model': payload['model'], 'response': json.dumps({'labels': labels}), 'done': True})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def ollama():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubOllama)
+    server.requests = []
+    server.fail = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def labeling_config(ollama, tmp_path):
+    return {'enabled': True, 'base_url': f"http://127.0.0.1:{ollama.server_port}", 'model': 'stub',
+            'batch_templates': 2, 'concurrency': 2, 'cache_path': str(tmp_path / "labels.sqlite")}
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "mixed.log"
+    lines = []
+    for i in range(600):
+        lines.append(f"srcip=10.0.0.{i % 200} dstip=10.0.1.{i % 7} action=deny")
+        lines.append(f"session opened for user u{i % 50} by uid {i % 3}")
+        lines.append(f"password changed for user u{i % 50}")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+# === Test Cases ===
+
+def test_only_distinct_templates_reach_the_model(labeling_config, log_file, ollama, tmp_path):
+    config = {'presidio': {'enabled': False}, 'parsers': {'csv': {'enabled': False}},
+              'template_labeling': labeling_config}
+    summary = LogProcessingService(config).process_file(
+        str(log_file), create_writers(['ndjson'], str(tmp_path), "out", config))
+
+    records = [json.loads(line) for line in (tmp_path / "out.ndjson").read_text().splitlines()]
+    assert len(records) == 1800
+    assert {record['template_label'] for record in records if 'srcip' in record['original_content']} == {'network'}
+    assert {record['template_label'] for record in records if 'user' in record['original_content']} == {'authentication'}
+    report = summary['template_labels']
+    assert report['labeled'] < 20 and report['failures'] == 0
+    assert len(ollama.requests) == report['requests'] <= report['labeled']
+    assert all(payload['prompt'].count('\n1. ') == 1 for payload in ollama.requests)
+
+def test_labels_are_cached_persistently_per_model(labeling_config, ollama):
+    templates = ['<*> <*> action=deny', 'session opened for user <*>', 'password changed for user <*>']
+    first = TemplateLabelingService(labeling_config)
+    assert first.labels(templates + templates) == {templates[0]: 'network', templates[1]: 'authentication',
+                                                   templates[2]: 'authentication'}
+    assert len(ollama.requests) == 2
+
+    again = TemplateLabelingService(labeling_config)
+    assert again.labels(templates)[templates[0]] == 'network'
+    assert again.report()['cache_hits'] == 3 and len(ollama.requests) == 2
+
+    TemplateLabelingService({**labeling_config, 'model': 'other'}).labels(templates)
+    assert len(ollama.requests) == 4
+
+def test_failing_model_leaves_records_unlabeled_and_is_switched_off(labeling_config, ollama):
+    ollama.fail = True
+    service = TemplateLabelingService({**labeling_config, 'concurrency': 1, 'max_failures': 2})
+    templates = [f"event {i} happened <*>" for i in range(10)]
+
+    assert service.labels(templates) == {}
+    assert service.labels(templates) == {}
+    report = service.report()
+    assert report['disabled'] and report['failures'] == 2 and len(ollama.requests) == 2
+
+    ollama.fail = False
+    assert TemplateLabelingService(labeling_config).labels(templates[:1]) == {templates[0]: 'authentication'}
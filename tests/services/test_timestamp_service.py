@@ -0,0 +1,92 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from log_analyzer.parsing.interfaces import ParsedRecord
+from log_analyzer.services.log_processing_service import LogProcessingService
+from log_analyzer.services.timestamp_service import TimestampService
+from log_analyzer.writers.parquet_writer import read_parquet_dataset
+from log_analyzer.writers.writer_factory import create_writers
+
+# === Test Fixtures ===
+
+@pytest.fixture
+def service():
+    return TimestampService({'enabled': True, 'default_year': 2024, 'timezone': 'Europe/Rome'})
+
+def _record(content, parser_name, source_file='test.log', **fields):
+    return ParsedRecord(original_content=content, line_number=1, parser_name=parser_name,
+                        parsed_data=fields, source_file=source_file)
+
+def _epoch(*args, tz=timezone.utc):
+    return datetime(*args, tzinfo=tz).timestamp()
+
+# === Test Cases ===
+
+def test_layout_is_learned_per_parser(service):
+    records = [
+        _record('{"@timestamp": "2024-01-15T10:30:45.123Z"}', 'JSONParser', **{'@timestamp': '2024-01-15T10:30:45.123Z'}),
+        _record('date=2025-07-06 time=00:29:41 eventtime=1751754580373266859', 'KeyValueParser',
+                date='2025-07-06', time='00:29:41', eventtime='1751754580373266859'),
+        _record('CEF:0|x|y|1|2|z|5|rt=1751760001000', 'CEFParser', rt='1751760001000'),
+        _record('Jan  5 08:00:01 host sshd[1]: accepted', 'syslog', timestamp='Jan  5 08:00:01'),
+        _record('1.2.3.4 - - [10/Oct/2024:13:55:36 -0700] "GET / HTTP/1.1" 200 5', 'apache_clf',
+                timestamp='10/Oct/2024:13:55:36 -0700'),
+        _record('250706 000001 225 INFO dfs.DataNode: Receiving block', 'FallbackParser'),
+    ]
+    service.normalize(records)
+
+    assert [record.timestamp for record in records] == pytest.approx([
+        _epoch(2024, 1, 15, 10, 30, 45, 123000),
+        1751754580.373266859,
+        1751760001.0,
+        # Naive, without a year: the configured zone (CET) and default year.
+        _epoch(2024, 1, 5, 7, 0, 1),
+        _epoch(2024, 10, 10, 20, 55, 36),
+        _epoch(2025, 7, 6, 0, 0, 1) - 7200,
+    ])
+    assert service.report()['formats'] == {
+        'JSONParser': '@timestamp: iso8601', 'KeyValueParser': 'eventtime: epoch', 'CEFParser': 'rt: epoch',
+        'syslog': 'timestamp: syslog', 'apache_clf': 'timestamp: clf', 'FallbackParser': 'line: compact',
+    }
+
+def test_repeated_seconds_are_served_from_the_prefix_cache_and_misses_fall_back(service):
+    batch = [_record(f"2024-03-01 12:00:0{i // 3},{i:03d} worker ready", 'FallbackParser') for i in range(9)]
+    batch.append(_record("03-01 12:00:05.5 from another layout", 'FallbackParser'))
+    batch.append(_record("no time here", 'FallbackParser'))
+    service.normalize(batch)
+
+    start = _epoch(2024, 3, 1, 11, 0, 0)
+    assert [record.timestamp for record in batch[:9]] == pytest.approx([start + i // 3 + i / 1000 for i in range(9)])
+    assert batch[9].timestamp == pytest.approx(start + 5.5)
+    assert batch[10].timestamp is None
+    report = service.report()
+    # Every distinct second, the fallback's too, was converted while learning the layout.
+    assert report['formats'] == {'FallbackParser': 'line: iso8601'} and report['cache_hits'] == 10
+    assert report['fallbacks'] == 1 and report['missing'] == 1
+
+def test_configured_patterns_are_rewritten_to_iso8601():
+    service = TimestampService({'patterns': [{'name': 'dotted', 'pattern': r'(\d{4})\.(\d{2})\.(\d{2})-(\d{2})h(\d{2})',
+                                              'replacement': r'\1-\2-\3 \4:\5:00'}]})
+    record = _record("2024.03.01-12h30 backup done", 'FallbackParser')
+    service.normalize([record])
+
+    assert record.timestamp == _epoch(2024, 3, 1, 12, 30)
+    assert service.report()['formats'] == {'FallbackParser': 'line: dotted'}
+
+def test_pipeline_writes_the_timestamp_column(tmp_path):
+    config = {'presidio': {'enabled': False}, 'parsers': {'csv': {'enabled': False}},
+              'timestamp_normalization': {'enabled': True}}
+    path = tmp_path / "fw.log"
+    path.write_text("".join(f"date=2025-07-06 time=00:00:0{i} srcip=10.0.0.{i} action=deny\n" for i in range(5)))
+
+    summary = LogProcessingService(config).process_file(
+        str(path), create_writers(['ndjson', 'parquet'], str(tmp_path), "out", config))
+
+    assert summary['timestamps']['formats'] == {'KeyValueParser': 'date+time: iso8601'}
+    records = [json.loads(line) for line in (tmp_path / "out.ndjson").read_text().splitlines()]
+    expected = [_epoch(2025, 7, 6, 0, 0, i) for i in range(5)]
+    assert [record['timestamp'] for record in records] == expected
+    column = read_parquet_dataset(summary['outputs']['parquet']).to_table().column('TimestampUTC')
+    assert [value.timestamp() for value in column.to_pylist()] == expected
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from log_analyzer.services.log_reader import LogReader
+from log_analyzer.services.upload_service import (
+    UploadBodyDecoder, UploadError, UploadSpool, UploadTooLargeError)
+
+# === Test Cases ===
+
+def test_lines_are_read_while_the_upload_is_in_progress(tmp_path):
+    spool = UploadSpool(tmp_path / "upload.log", idle_timeout=5)
+    lines = LogReader({}).read_stream(spool.open)
+    # Encoding detection waits for the first 32KB, then lines follow the upload.
+    filler = b"x" * 40_000
+    spool.write(b"first line\n" + filler + b"\nsecond ")
+
+    uploader = threading.Thread(target=lambda: spool.write(b"line\n") or spool.finish())
+    assert next(lines) == (1, "first line")
+    assert next(lines) == (2, filler.decode()) and not spool.is_finished
+
+    uploader.start()
+    assert list(lines) == [(3, "second line")]
+    uploader.join()
+
+def test_multipart_body_keeps_only_the_first_file_part(tmp_path):
+    spool = UploadSpool(tmp_path / "upload.log")
+    body = (b'--XyZ\r\nContent-Disposition: form-data; name="note"\r\n\r\nignored\r\n'
+            b'--XyZ\r\nContent-Disposition: form-data; name="file"; filename="app.log"\r\n'
+            b'Content-Type: text/plain\r\n\r\nline 1\nline 2\n\r\n--XyZ--\r\n')
+    decoder = UploadBodyDecoder('multipart/form-data; boundary=XyZ', spool)
+    for start in range(0, len(body), 7):
+        decoder.feed(body[start:start + 7])
+    decoder.close()
+
+    assert (tmp_path / "upload.log").read_bytes() == b"line 1\nline 2\n"
+    assert spool.to_dict()['status'] == 'complete'
+
+def test_failed_or_oversized_uploads_fail_the_reader(tmp_path):
+    spool = UploadSpool(tmp_path / "upload.log", max_bytes=10, idle_timeout=5)
+    lines = LogReader({}).read_stream(spool.open)
+    spool.write(b"0123456789")
+    with pytest.raises(UploadTooLargeError):
+        spool.write(b"x")
+    with pytest.raises(UploadError, match="exceeds"):
+        list(lines)
+
+    stalled = UploadSpool(tmp_path / "stalled.log", idle_timeout=0.05)
+    with pytest.raises(UploadError, match="No upload data"):
+        list(LogReader({}).read_stream(stalled.open))
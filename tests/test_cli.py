@@ -0,0 +1,59 @@
+import json
+
+import pytest
+import yaml
+from typer.testing import CliRunner
+
+from log_analyzer.cli import app
+
+runner = CliRunner()
+
+# === Test Fixtures ===
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.dump({
+        'presidio': {'enabled': True},
+        'parsers': {'csv': {'enabled': False}},
+        'pipeline': {'batch_size': 2},
+    }))
+    return path
+
+@pytest.fixture
+def input_dir(tmp_path):
+    directory = tmp_path / "logs"
+    (directory / "nested").mkdir(parents=True)
+    (directory / "a.log").write_text("srcip=1.1.1.1 dstip=2.2.2.2 action=deny\n" * 3)
+    (directory / "nested" / "b.log").write_text("plain line\n")
+    (directory / "ignored.txt").write_text("not selected\n")
+    return directory
+
+# === Test Cases ===
+
+def test_analyze_directory_without_presidio(config_path, input_dir, tmp_path):
+    output_dir = tmp_path / "out"
+    result = runner.invoke(app, [
+        'analyze', str(input_dir), '--pattern', '*.log', '-f', 'ndjson', '-o', str(output_dir),
+        '-c', str(config_path), '--no-presidio', '--no-progress',
+    ])
+
+    assert result.exit_code == 0, result.output
+    outputs = sorted(output_dir.glob('*.ndjson'))
+    assert [p.name.split('_')[0] for p in outputs] == ['a', 'b']
+    records = [json.loads(line) for line in outputs[0].read_text().splitlines()]
+    assert len(records) == 3
+    assert records[0]['presidio_anonymized'] == records[0]['original_content']
+
+def test_analyze_stdin(config_path, tmp_path):
+    output_dir = tmp_path / "out"
+    result = runner.invoke(app, ['analyze', '-', '-f', 'anonymize', '-o', str(output_dir), '-c', str(config_path),
+                                 '--no-presidio', '--no-progress'], input="one\ntwo\n")
+
+    assert result.exit_code == 0, result.output
+    [output] = output_dir.glob('stdin_*_anonymized.log')
+    assert output.read_text().splitlines() == ['one', 'two']
+
+def test_unknown_format_is_rejected(config_path, input_dir):
+    result = runner.invoke(app, ['analyze', str(input_dir), '-f', 'xml', '-c', str(config_path)])
+    assert result.exit_code != 0
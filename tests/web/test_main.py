@@ -0,0 +1,21 @@
+import os
+from types import SimpleNamespace
+
+from log_analyzer.web import main
+
+# === Test Cases ===
+
+def test_retention_keeps_the_outputs_of_synchronous_runs_in_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "OUTPUT_DIR", str(tmp_path))
+    main._configure_services({"output": {"retention": {"max_age_hours": None, "max_total_mb": 0}},
+                              "result_cache": {"enabled": False}})
+    running, finished = tmp_path / "running.json", tmp_path / "finished.json"
+    for path in (finished, running):
+        path.write_text("{}")
+    os.utime(running, (1, 1))  # The oldest: evicted first if unprotected.
+
+    with main._protected_outputs({"json_report": SimpleNamespace(output_path=running)}):
+        main._enforce_retention()
+        assert running.exists() and not finished.exists()
+    main._enforce_retention()
+    assert not running.exists()
@@ -0,0 +1,77 @@
+import gzip
+import io
+import tarfile
+import threading
+from pathlib import Path
+
+import pytest
+
+from log_analyzer.web import streaming
+
+# === Test Cases ===
+
+@pytest.mark.parametrize("header, suffix, expected", [
+    (None, '.json', 'identity'),
+    ('gzip, deflate', '.json', 'gzip'),
+    ('zstd, gzip', '.json', 'zstd'),
+    ('zstd;q=0, gzip;q=0.5', '.json', 'gzip'),
+    ('*', '.csv', 'zstd'),
+    ('gzip', '.gz', 'identity'),
+    ('gzip', '.parquet', 'identity'),
+])
+def test_negotiate_encoding(header, suffix, expected):
+    if expected == 'zstd':
+        pytest.importorskip("zstandard")
+    assert streaming.negotiate_encoding(header, Path(f"out{suffix}")) == expected
+
+def test_parse_range():
+    assert streaming.parse_range(None, 100) is None
+    assert streaming.parse_range('bytes=10-19', 100) == (10, 19)
+    assert streaming.parse_range('bytes=90-', 100) == (90, 99)
+    assert streaming.parse_range('bytes=-5', 100) == (95, 99)
+    assert streaming.parse_range('bytes=0-999', 100) == (0, 99)
+    assert streaming.parse_range('bytes=0-1,5-6', 100) is None
+    with pytest.raises(ValueError):
+        streaming.parse_range('bytes=100-', 100)
+
+def test_gzip_stream_round_trips(tmp_path):
+    path = tmp_path / "out.log"
+    path.write_bytes(b"line\n" * 100_000)
+
+    compressed = b''.join(streaming.iter_encoded(streaming.iter_file(path), 'gzip'))
+
+    assert gzip.decompress(compressed) == path.read_bytes()
+
+def test_growing_file_holds_back_provisional_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(streaming, 'FOLLOW_POLL_SECONDS', 0.01)
+    path = tmp_path / "out.json"
+    path.write_bytes(b'[{"a":1}\n]\n')
+    finished = threading.Event()
+    tail = {'size': 3}
+
+    def producer():
+        # Rewrites the trailer while the stream is being followed.
+        with open(path, 'r+b') as f:
+            f.seek(-3, 2)
+            f.truncate()
+            f.write(b',{"a":2}\n]\n')
+        tail['size'] = 0
+        finished.set()
+
+    chunks = streaming.iter_growing_file(path, finished.is_set, lambda: tail['size'])
+    first = next(chunks)
+    producer()
+    body = first + b''.join(chunks)
+
+    assert body == b'[{"a":1},{"a":2}\n]\n'
+
+def test_directory_tar_stream(tmp_path):
+    dataset = tmp_path / "run.parquet"
+    dataset.mkdir()
+    (dataset / "part-00000.parquet").write_bytes(b"p" * 1000)
+    (dataset / "_common_metadata").write_bytes(b"m")
+
+    archive = tarfile.open(fileobj=io.BytesIO(b''.join(streaming.iter_directory_tar(dataset))))
+
+    assert archive.getnames() == ['run.parquet/_common_metadata', 'run.parquet/part-00000.parquet']
+    assert archive.extractfile('run.parquet/part-00000.parquet').read() == b"p" * 1000
@@ -0,0 +1,70 @@
+import gzip
+import json
+
+import pytest
+
+from log_analyzer.parsing.interfaces import ParsedRecord
+from log_analyzer.writers.json_writer import JSONArrayWriter, NDJSONWriter
+
+# === Test Fixtures ===
+
+def make_records(count: int, start: int = 1):
+    return [
+        ParsedRecord(
+            original_content=f"srcip=10.0.0.{i} action=deny",
+            line_number=i,
+            parser_name='KeyValueParser',
+            parsed_data={'srcip': f"10.0.0.{i}", 'action': 'deny'},
+        )
+        for i in range(start, start + count)
+    ]
+
+# === Test Cases ===
+
+def test_ndjson_writer_writes_one_record_per_line(tmp_path):
+    with NDJSONWriter(tmp_path / "out.ndjson") as writer:
+        writer.write_batch(make_records(3))
+        writer.write_batch(make_records(2, start=4))
+
+    lines = (tmp_path / "out.ndjson").read_text().splitlines()
+    assert [json.loads(line)['line_number'] for line in lines] == [1, 2, 3, 4, 5]
+    assert writer.records_written == 5
+
+def test_json_array_is_valid_after_every_batch(tmp_path):
+    """
+    The uncompressed array keeps a closing bracket on disk between batches,
+    so a reader can parse the file while the job is still running.
+    """
+    output = tmp_path / "out.json"
+    writer = JSONArrayWriter(output)
+    assert json.loads(output.read_text()) == []
+
+    writer.write_batch(make_records(2))
+    assert len(json.loads(output.read_text())) == 2
+
+    writer.write_batch(make_records(3, start=3))
+    writer.close()
+    parsed = json.loads(output.read_text())
+    assert [r['line_number'] for r in parsed] == [1, 2, 3, 4, 5]
+
+def test_json_array_exclude_none(tmp_path):
+    with JSONArrayWriter(tmp_path / "out.json", exclude_none=True) as writer:
+        writer.write_batch(make_records(1))
+    record = json.loads((tmp_path / "out.json").read_text())[0]
+    assert 'presidio_anonymized' not in record
+
+@pytest.mark.parametrize("writer_class", [NDJSONWriter, JSONArrayWriter])
+def test_gzip_compression_appends_suffix(tmp_path, writer_class):
+    with writer_class(tmp_path / "out.json", compression='gzip') as writer:
+        writer.write_batch(make_records(4))
+
+    assert writer.output_path.name == "out.json.gz"
+    text = gzip.decompress(writer.output_path.read_bytes()).decode()
+    if writer_class is JSONArrayWriter:
+        assert len(json.loads(text)) == 4
+    else:
+        assert len(text.splitlines()) == 4
+
+def test_unknown_compression_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        NDJSONWriter(tmp_path / "out.ndjson", compression='lzma')
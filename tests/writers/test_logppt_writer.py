@@ -0,0 +1,86 @@
+import csv
+import io
+
+import pytest
+
+from log_analyzer.parsing.interfaces import ParsedRecord
+from log_analyzer.writers.logppt_writer import LogPPTWriter
+
+# === Helpers ===
+
+def reference_logppt_csv(records, version):
+    """The previous all-in-memory implementation, kept as the output oracle."""
+    keys = sorted({key for record in records for key in record.parsed_data})
+    buffer = io.StringIO(newline='')
+    writer = csv.writer(buffer)
+    writer.writerow(['LineId'] + keys + ['Content', 'EventId', 'EventTemplate'])
+    for i, record in enumerate(records):
+        drain = record.drain3_original if version == 'original' else record.drain3_anonymized
+        content = record.original_content if version == 'original' else (record.presidio_anonymized or record.original_content)
+        writer.writerow([i + 1] + [record.parsed_data.get(key, '') for key in keys]
+                        + [content, f"E{drain.get('cluster_id', -1)}", drain.get('template', '<NO_TEMPLATE>')])
+    return buffer.getvalue()
+
+def make_record(i, parsed_data, parser_name='KeyValueParser'):
+    return ParsedRecord(
+        original_content=f'line, "{i}"',
+        line_number=i,
+        parser_name=parser_name,
+        parsed_data=parsed_data,
+        presidio_anonymized=f"anon {i}" if i % 2 else None,
+        drain3_original={'cluster_id': i % 3, 'template': 'line, <*>'},
+    )
+
+@pytest.fixture
+def evolving_records():
+    """Keys appear over time, including values that need CSV quoting."""
+    return [
+        make_record(1, {'b': 'x'}),
+        make_record(2, {'b': 'y', 'a': 'comma, inside'}),
+        make_record(3, {'raw_content': 'fallback'}, parser_name='FallbackParser'),
+        make_record(4, {'c': None, 'a': 5}),
+        make_record(5, {'b': 'z'}),
+    ]
+
+# === Test Cases ===
+
+@pytest.mark.parametrize("version", ['original', 'anonymized'])
+def test_output_matches_previous_implementation(tmp_path, evolving_records, version):
+    output = tmp_path / "out.csv"
+    with LogPPTWriter(output, version) as writer:
+        writer.write_batch(evolving_records[:2])
+        writer.write_batch(evolving_records[2:])
+
+    assert output.read_bytes().decode('utf-8') == reference_logppt_csv(evolving_records, version)
+    assert not list(tmp_path.glob('.*.spool'))
+
+def test_schema_hint_keeps_a_single_segment(tmp_path):
+    records = [make_record(i, {'host': 'h'} if i % 2 else {'host': 'h', 'pid': '1'}, parser_name='syslog')
+               for i in range(1, 6)]
+    output = tmp_path / "out.csv"
+    writer = LogPPTWriter(output, schema_hints={'syslog': ['host', 'pid', 'message']})
+    writer.write_batch(records)
+
+    assert len(writer._segments) == 1
+    writer._segments[0].file.flush()
+    spool = writer._segments[0].path.read_bytes()
+    writer.close()
+    # The hinted 'message' column is kept, empty, so the segment is copied as is.
+    lines = output.read_bytes().split(b'\r\n', 1)
+    assert lines[0] == b'LineId,host,message,pid,Content,EventId,EventTemplate'
+    assert lines[1] == spool
+
+def test_empty_input_produces_no_file(tmp_path):
+    LogPPTWriter(tmp_path / "out.csv").close()
+    assert not (tmp_path / "out.csv").exists()
+
+def test_nested_fields_become_dotted_columns(tmp_path):
+    path = tmp_path / "out.csv"
+    with LogPPTWriter(path) as writer:
+        writer.write_batch([make_record(1, {'user': {'name': 'alice', 'roles': ['admin']}, 'level': 'INFO'}),
+                            make_record(2, {'level': 'WARN'})])
+
+    rows = list(csv.reader(path.open(encoding='utf-8', newline='')))
+    assert rows[0] == ['LineId', 'level', 'user.name', 'user.roles', 'Content', 'EventId', 'EventTemplate']
+    assert rows[1][:4] == ['1', 'INFO', 'alice', '["admin"]']
+    assert rows[2][:4] == ['2', 'WARN', '', '']
@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from log_analyzer.parsing.interfaces import ParsedRecord
+from log_analyzer.writers.parquet_writer import ParquetDatasetWriter, read_parquet_dataset
+
+# === Helpers ===
+
+def make_record(line_number: int, parsed_data: dict) -> ParsedRecord:
+    return ParsedRecord(
+        original_content=f"line {line_number}",
+        line_number=line_number,
+        parser_name='KeyValueParser',
+        parsed_data=parsed_data,
+        drain3_original={'cluster_id': 1, 'template': 'line <*>'},
+    )
+
+# === Test Cases ===
+
+def test_parsed_fields_become_typed_columns(tmp_path):
+    with ParquetDatasetWriter(tmp_path / "out.parquet") as writer:
+        writer.write_batch([make_record(1, {'dstport': '443', 'ratio': '0.5', 'action': 'deny', 'seq': '007'})])
+
+    table = read_parquet_dataset(tmp_path / "out.parquet").to_table()
+    assert str(table.schema.field('dstport').type) == 'int64'
+    assert str(table.schema.field('ratio').type) == 'double'
+    assert str(table.schema.field('action').type) == 'string'
+    # Leading zeros are identifiers and must survive as text.
+    assert table.column('seq').to_pylist() == ['007']
+
+def test_template_and_parser_columns_are_dictionary_encoded(tmp_path):
+    with ParquetDatasetWriter(tmp_path / "out.parquet") as writer:
+        writer.write_batch([make_record(i, {}) for i in range(1, 4)])
+
+    table = read_parquet_dataset(tmp_path / "out.parquet").to_table()
+    assert str(table.schema.field('EventTemplate').type).startswith('dictionary')
+    assert str(table.schema.field('parser_name').type).startswith('dictionary')
+    assert table.column('LineId').to_pylist() == [1, 2, 3]
+
+def test_schema_evolves_with_new_keys_and_widened_types(tmp_path):
+    with ParquetDatasetWriter(tmp_path / "out.parquet", row_group_size=2) as writer:
+        writer.write_batch([make_record(1, {'port': '80'}), make_record(2, {'port': '8080'})])
+        writer.write_batch([make_record(3, {'port': 'http', 'user': 'alice'})])
+
+    assert len(writer.parts) == 2
+    table = read_parquet_dataset(tmp_path / "out.parquet").to_table().sort_by('LineId')
+    assert table.column('port').to_pylist() == ['80', '8080', 'http']
+    assert table.column('user').to_pylist() == [None, None, 'alice']
+
+def test_parsed_key_clashing_with_fixed_column_is_prefixed(tmp_path):
+    with ParquetDatasetWriter(tmp_path / "out.parquet") as writer:
+        writer.write_batch([make_record(1, {'Content': 'payload'})])
+
+    table = read_parquet_dataset(tmp_path / "out.parquet").to_table()
+    assert table.column('Content').to_pylist() == ['line 1']
+    assert table.column('parsed_Content').to_pylist() == ['payload']
+
+def test_nested_fields_become_dotted_columns(tmp_path):
+    nested = {'user': {'name': 'alice', 'geo': {'country': 'IT', 'city': {'name': 'Bari'}}}, 'tags': ['a', 'b']}
+    with ParquetDatasetWriter(tmp_path / "out.parquet", flatten_depth=3) as writer:
+        writer.write_batch([make_record(1, nested), make_record(2, {'user': {'name': 'bob'}})])
+
+    table = read_parquet_dataset(tmp_path / "out.parquet").to_table()
+    assert table.column('user.name').to_pylist() == ['alice', 'bob']
+    assert table.column('user.geo.country').to_pylist() == ['IT', None]
+    # Below the depth limit, and lists, as JSON text rather than Python reprs.
+    assert table.column('user.geo.city').to_pylist() == ['{"name": "Bari"}', None]
+    assert table.column('tags').to_pylist() == ['["a", "b"]', None]
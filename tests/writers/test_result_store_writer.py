@@ -0,0 +1,72 @@
+import pytest
+
+from log_analyzer.parsing.interfaces import ParsedRecord
+from log_analyzer.services.result_query_service import ResultQueryService, encode_cursor
+from log_analyzer.writers.result_store_writer import ResultStoreWriter
+
+# === Test Fixtures ===
+
+def make_records(count: int, start: int = 1):
+    return [
+        ParsedRecord(
+            original_content=f"date=2024-01-{1 + i % 3:02d} srcip=10.0.0.{i % 4} action={'deny' if i % 2 else 'accept'}",
+            line_number=i,
+            parser_name='KeyValueParser' if i % 5 else 'FallbackParser',
+            parsed_data={'date': f"2024-01-{1 + i % 3:02d}", 'srcip': f"10.0.0.{i % 4}",
+                         'action': 'deny' if i % 2 else 'accept'},
+            drain3_original={'cluster_id': 1 + i % 2, 'template': f"template {1 + i % 2}"},
+        )
+        for i in range(start, start + count)
+    ]
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "job.results.sqlite"
+    with ResultStoreWriter(path, indexed_fields=['srcip', 'action'], timestamp_fields=['date']) as writer:
+        writer.write_batch(make_records(30))
+        writer.write_batch(make_records(30, start=31))
+    return ResultQueryService(path)
+
+def _all_pages(store, **filters):
+    lines, cursor = [], None
+    while True:
+        page = store.query(cursor=cursor, limit=7, **filters)
+        lines.extend(record['line_number'] for record in page['records'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return lines, page['count']
+
+# === Test Cases ===
+
+def test_cursor_pages_cover_the_filtered_records_once(store):
+    expected = [i for i in range(1, 61) if i % 2 and i % 4 == 1 and 10 <= i <= 50]
+
+    lines, count = _all_pages(store, template_id=2, fields={'srcip': '10.0.0.1'}, line_from=10, line_to=50)
+
+    assert lines == expected
+    assert count == len(expected)
+
+def test_time_order_and_counts(store):
+    lines, count = _all_pages(store, parser_name='FallbackParser', order='time')
+
+    assert count == 12
+    dates = [f"2024-01-{1 + i % 3:02d}" for i in lines]
+    assert dates == sorted(dates) and sorted(lines) == list(range(5, 61, 5))
+    assert store.query(template_id=1, with_count=False)['count'] is None
+    with pytest.raises(ValueError):
+        store.query(cursor='not-a-cursor')
+
+@pytest.mark.parametrize("order, key", [
+    ('line', [{'id': 1}]), ('line', ['5']), ('line', [True]), ('line', [5, 6]),
+    ('time', [5, '2024-01-01']), ('time', ['2024-01-01', [5]]), ('time', ['2024-01-01']),
+])
+def test_well_formed_cursors_with_a_wrong_key_are_rejected(store, order, key):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        store.query(order=order, cursor=encode_cursor(key))
+
+def test_facets(store):
+    templates = sorted(store.templates(), key=lambda item: item['template_id'])
+    assert templates == [{'template_id': 1, 'template': 'template 1', 'count': 30},
+                         {'template_id': 2, 'template': 'template 2', 'count': 30}]
+    assert store.parsers() == {'FallbackParser': 12, 'KeyValueParser': 48}
+    assert sorted((item['value'], item['count']) for item in store.field_values('action')) == [('accept', 30), ('deny', 30)]